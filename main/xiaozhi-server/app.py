@@ -7,8 +7,11 @@ from config.settings import load_config
 from config.logger import setup_logging
 from core.utils.util import get_local_ip, validate_mcp_endpoint
 from core.http_server import SimpleHttpServer
-from core.websocket_server import WebSocketServer
+from core.websocket_server import WebSocketServer, load_server_modules
+from core.worker_supervisor import WorkerSupervisor, report_worker_stats
 from core.utils.util import check_ffmpeg_installed
+from core.utils.cache.manager import cache_manager
+from core.utils.thread_budget import apply_thread_budget
 
 TAG = __name__
 logger = setup_logging()
@@ -42,7 +45,8 @@ async def monitor_stdin():
         await ainput()  # 异步等待输入，消费回车
 
 
-async def main():
+def prepare_config() -> dict:
+    """加载配置并补全运行时参数，多进程模式下在fork前执行，保证各工作进程配置一致"""
     check_ffmpeg_installed()
     config = load_config()
 
@@ -60,16 +64,22 @@ async def main():
     
     config["server"]["auth_key"] = auth_key
 
-    # 添加 stdin 监控任务
-    stdin_task = asyncio.create_task(monitor_stdin())
+    mcp_endpoint = config.get("mcp_endpoint", None)
+    if mcp_endpoint is not None and "你" not in mcp_endpoint:
+        # 校验MCP接入点格式
+        if validate_mcp_endpoint(mcp_endpoint):
+            logger.bind(tag=TAG).info("mcp接入点是\t{}", mcp_endpoint)
+            # 将mcp计入点地址转成调用点
+            mcp_endpoint = mcp_endpoint.replace("/mcp/", "/call/")
+            config["mcp_endpoint"] = mcp_endpoint
+        else:
+            logger.bind(tag=TAG).error("mcp接入点不符合规范")
+            config["mcp_endpoint"] = "你的接入点 websocket地址"
+    return config
 
-    # 启动 WebSocket 服务器
-    ws_server = WebSocketServer(config)
-    ws_task = asyncio.create_task(ws_server.start())
-    # 启动 Simple http 服务器
-    ota_server = SimpleHttpServer(config)
-    ota_task = asyncio.create_task(ota_server.start())
 
+def log_server_addresses(config: dict):
+    """输出各接口地址"""
     read_config_from_api = config.get("read_config_from_api", False)
     port = int(config["server"].get("http_port", 8003))
     if not read_config_from_api:
@@ -83,17 +93,6 @@ async def main():
         get_local_ip(),
         port,
     )
-    mcp_endpoint = config.get("mcp_endpoint", None)
-    if mcp_endpoint is not None and "你" not in mcp_endpoint:
-        # 校验MCP接入点格式
-        if validate_mcp_endpoint(mcp_endpoint):
-            logger.bind(tag=TAG).info("mcp接入点是\t{}", mcp_endpoint)
-            # 将mcp计入点地址转成调用点
-            mcp_endpoint = mcp_endpoint.replace("/mcp/", "/call/")
-            config["mcp_endpoint"] = mcp_endpoint
-        else:
-            logger.bind(tag=TAG).error("mcp接入点不符合规范")
-            config["mcp_endpoint"] = "你的接入点 websocket地址"
 
     # 获取WebSocket配置，使用安全的默认值
     websocket_port = 8000
@@ -117,28 +116,91 @@ async def main():
         "=============================================================\n"
     )
 
+
+async def main(config=None, modules=None, worker_id=None, stats_fd=None):
+    """启动服务
+
+    Args:
+        config: 已准备好的配置，为空时自行加载
+        modules: 父进程预加载的组件，为空时由WebSocketServer自行加载
+        worker_id: 多进程模式下的工作进程编号，单进程模式为None
+        stats_fd: 向父进程上报心跳的管道写端
+    """
+    if config is None:
+        config = prepare_config()
+
+    # 初始化缓存后端，多进程/多节点部署时可共享缓存
+    # 缓存后端的连接和订阅线程不能跨fork使用，必须在工作进程内创建
+    cache_manager.configure(config.get("cache"))
+
+    # 添加 stdin 监控任务，工作进程共享父进程的终端，不监控
+    stdin_task = asyncio.create_task(monitor_stdin()) if worker_id is None else None
+
+    # 启动 WebSocket 服务器
+    ws_server = WebSocketServer(config, modules)
+    ws_task = asyncio.create_task(ws_server.start())
+    # 启动 Simple http 服务器
+    ota_server = SimpleHttpServer(config)
+    ota_task = asyncio.create_task(ota_server.start())
+
+    stats_task = None
+    if stats_fd is not None:
+        stats_task = asyncio.create_task(
+            report_worker_stats(stats_fd, ws_server, worker_id)
+        )
+
+    # 多进程模式下只由第一个工作进程输出接口地址
+    if not worker_id:
+        log_server_addresses(config)
+
     try:
         await wait_for_exit()  # 阻塞直到收到退出信号
     except asyncio.CancelledError:
         print("任务被取消，清理资源中...")
     finally:
         # 取消所有任务（关键修复点）
-        stdin_task.cancel()
-        ws_task.cancel()
-        if ota_task:
-            ota_task.cancel()
+        tasks = [t for t in (stdin_task, ws_task, ota_task, stats_task) if t]
+        for task in tasks:
+            task.cancel()
 
         # 等待任务终止（必须加超时）
         await asyncio.wait(
-            [stdin_task, ws_task, ota_task] if ota_task else [stdin_task, ws_task],
+            tasks,
             timeout=3.0,
             return_when=asyncio.ALL_COMPLETED,
         )
         print("服务器已关闭，程序退出。")
 
 
+def run():
+    """根据server.workers选择单进程或多进程运行"""
+    config = prepare_config()
+    workers = int(config["server"].get("workers", 1) or 1)
+    if workers > 1 and sys.platform == "win32":
+        logger.bind(tag=TAG).warning("Windows不支持多进程模式，使用单进程运行")
+        workers = 1
+        config["server"]["workers"] = 1
+
+    # 加载模型前统一设置推理线程数
+    apply_thread_budget(config)
+
+    if workers <= 1:
+        asyncio.run(main(config))
+        return
+
+    # 父进程只加载一次模型，fork后各工作进程以写时复制方式共享权重
+    # 注意：fork前不要在父进程里执行推理，否则torch/onnxruntime已创建的线程池在子进程中不可用
+    modules = load_server_modules(logger, config)
+    logger.bind(tag=TAG).info(f"多进程模式启动，工作进程数: {workers}")
+
+    def worker_main(worker_id: int, stats_fd: int):
+        asyncio.run(main(config, modules, worker_id, stats_fd))
+
+    WorkerSupervisor(config, workers).run(worker_main)
+
+
 if __name__ == "__main__":
     try:
-        asyncio.run(main())
+        run()
     except KeyboardInterrupt:
         print("手动中断，程序终止。")
@@ -67,7 +67,34 @@ def get_config_from_api(config):
             "http_port": config["server"].get("http_port", ""),
             "vision_explain": config["server"].get("vision_explain", ""),
             "auth_key": config["server"].get("auth_key", ""),
+            "workers": config["server"].get("workers", 1),
+            "worker": config["server"].get("worker", {}),
         }
+    # 缓存后端和推理线程配置以本地为准，同一节点的部署方式由本地决定
+    if config.get("cache"):
+        config_data["cache"] = config["cache"]
+    if config.get("thread_budget"):
+        config_data["thread_budget"] = config["thread_budget"]
+    if config.get("speculative_turn"):
+        config_data["speculative_turn"] = config["speculative_turn"]
+    if config.get("memory_prefetch"):
+        config_data["memory_prefetch"] = config["memory_prefetch"]
+    if config.get("intent_concurrent"):
+        config_data["intent_concurrent"] = config["intent_concurrent"]
+    if config.get("tool_routing"):
+        config_data["tool_routing"] = config["tool_routing"]
+    if config.get("tool_cache"):
+        config_data["tool_cache"] = config["tool_cache"]
+    if config.get("tts_cache"):
+        config_data["tts_cache"] = config["tts_cache"]
+    if config.get("latency_filler"):
+        config_data["latency_filler"] = config["latency_filler"]
+    if config.get("tts_parallel"):
+        config_data["tts_parallel"] = config["tts_parallel"]
+    if config.get("tts_ws_pool"):
+        config_data["tts_ws_pool"] = config["tts_ws_pool"]
+    if config.get("asr_prewarm"):
+        config_data["asr_prewarm"] = config["asr_prewarm"]
     # 如果服务器没有prompt_template，则从本地配置读取
     if not config_data.get("prompt_template"):
         config_data["prompt_template"] = config.get("prompt_template")
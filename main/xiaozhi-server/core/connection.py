@@ -25,12 +25,19 @@ from core.utils.modules_initialize import (
     initialize_asr,
 )
 from core.handle.reportHandle import report
+from core.utils.audio_ingest import AudioIngest
+from core.utils.jitter_buffer import JitterBuffer, plc_packet
+from core.utils.speculative import SpeculationManager
+from core.utils.latency_filler import LatencyFiller
+from core.utils.memory_prefetch import MemoryPrefetcher
+from core.utils.asr_worker_pool import ProcessPoolASRProvider
 from core.providers.tts.default import DefaultTTS
 from concurrent.futures import ThreadPoolExecutor
 from core.utils.dialogue import Message, Dialogue
 from core.providers.asr.dto.dto import InterfaceType
 from core.handle.textHandle import handleTextMessage
 from core.providers.tools.unified_tool_handler import UnifiedToolHandler
+from core.providers.tools.tool_router import tool_name
 from plugins_func.loadplugins import auto_import_modules
 from plugins_func.register import Action
 from core.auth import AuthenticationError
@@ -44,6 +51,9 @@ from core.utils import textUtils
 
 TAG = __name__
 
+# 根据前几个包判断网关是否携带序号
+JITTER_PROBE_PACKETS = 2
+
 auto_import_modules("plugins_func.functions")
 
 
@@ -112,8 +122,22 @@ class ConnectionHandler:
         # 为每个连接单独管理声纹识别
         self.voiceprint_provider = None
 
+        # 上行音频只解码一次，VAD、ASR、声纹按采样点偏移读取
+        self.audio_ingest = AudioIngest()
+        # MQTT网关上行音频的抖动缓冲区，收到第一个带头部的包时创建
+        self.audio_jitter_buffer = None
+        self.jitter_use_sequence = False
+        # 判断排序方式期间暂存的包
+        self.jitter_probe = []
+        self.jitter_flush_handle = None
+        # 根据流式识别中间结果提前请求大模型
+        self.speculation = SpeculationManager(self)
+        # 拿到识别文本时提前查询记忆
+        self.memory_prefetch = MemoryPrefetcher(self)
+
         # vad相关变量
-        self.client_audio_buffer = bytearray()
+        # VAD已处理到的采样点偏移
+        self.vad_offset = 0
         self.client_have_voice = False
         self.client_voice_window = deque(maxlen=5)
         self.last_activity_time = 0.0  # 统一的活动时间戳（毫秒）
@@ -134,10 +158,14 @@ class ConnectionHandler:
         self.sentence_id = None
         # 处理TTS响应没有文本返回
         self.tts_MessageText = ""
+        # 工具调用或大模型首字慢时的过渡语，初始化TTS后按配置创建
+        self.latency_filler = LatencyFiller(self)
 
         # iot相关变量
         self.iot_descriptors = {}
         self.func_handler = None
+        # 本轮对话提供给大模型的工具（开启工具路由时为筛选后的子集）
+        self.turn_functions = None
 
         self.cmd_exit = self.config["exit_commands"]
 
@@ -153,6 +181,8 @@ class ConnectionHandler:
 
         # {"mcp":true} 表示启用MCP功能
         self.features = None
+        # 协商后的下行音频合帧数，0表示一帧一条消息
+        self.audio_batch_frames = 0
 
         # 标记连接是否来自MQTT
         self.conn_from_mqtt_gateway = False
@@ -230,6 +260,8 @@ class ConnectionHandler:
         """保存记忆并关闭连接"""
         try:
             if self.memory:
+                # 记忆即将更新，本次会话缓存的查询结果作废
+                self.memory_prefetch.invalidate()
                 # 使用线程池异步保存记忆
                 def save_memory_task():
                     try:
@@ -289,6 +321,7 @@ class ConnectionHandler:
         """
         try:
             # 提取头部信息
+            sequence = int.from_bytes(message[4:8], "big")
             timestamp = int.from_bytes(message[8:12], "big")
             audio_length = int.from_bytes(message[12:16], "big")
 
@@ -296,8 +329,8 @@ class ConnectionHandler:
             if audio_length > 0 and len(message) >= 16 + audio_length:
                 # 有指定长度，提取精确的音频数据
                 audio_data = message[16 : 16 + audio_length]
-                # 基于时间戳进行排序处理
-                self._process_websocket_audio(audio_data, timestamp)
+                # 经过抖动缓冲区按序号重排
+                self._process_websocket_audio(audio_data, timestamp, sequence)
                 return True
             elif len(message) > 16:
                 # 没有指定长度或长度无效，去掉头部后处理剩余数据
@@ -310,36 +343,74 @@ class ConnectionHandler:
         # 处理失败，返回False表示需要继续处理
         return False
 
-    def _process_websocket_audio(self, audio_data, timestamp):
-        """处理WebSocket格式的音频包"""
-        # 初始化时间戳序列管理
-        if not hasattr(self, "audio_timestamp_buffer"):
-            self.audio_timestamp_buffer = {}
-            self.last_processed_timestamp = 0
-            self.max_timestamp_buffer_size = 20
+    def _uplink_frame_ms(self):
+        """设备上行音频的帧时长，hello消息中未携带时默认60ms"""
+        audio_params = (self.welcome_msg or {}).get("audio_params") or {}
+        try:
+            return int(audio_params.get("frame_duration", 60))
+        except (TypeError, ValueError):
+            return 60
+
+    def _process_websocket_audio(self, audio_data, timestamp, sequence=0):
+        """处理MQTT网关转发的音频包，经抖动缓冲区重排后放入音频队列"""
+        if self.audio_jitter_buffer is None:
+            # 序号从0开始时第一个包的序号就是0，不能据此判断，先暂存前几个包
+            self.jitter_probe.append((audio_data, timestamp, sequence))
+            if len(self.jitter_probe) < JITTER_PROBE_PACKETS:
+                self._schedule_jitter_flush()
+                return
+            self._create_jitter_buffer()
+            return
 
-        # 如果时间戳是递增的，直接处理
-        if timestamp >= self.last_processed_timestamp:
+        key = sequence if self.jitter_use_sequence else timestamp
+        released = self.audio_jitter_buffer.push(key, audio_data, time.monotonic())
+        self._enqueue_jitter_output(released)
+        self._schedule_jitter_flush()
+
+    def _create_jitter_buffer(self):
+        """根据暂存的包选择排序方式，创建抖动缓冲区并放入暂存的包"""
+        frame_ms = self._uplink_frame_ms()
+        probe, self.jitter_probe = self.jitter_probe, []
+        # 网关携带序号时各包序号不同，按序号排序，否则按毫秒时间戳排序
+        self.jitter_use_sequence = len({sequence for _, _, sequence in probe}) > 1
+        self.audio_jitter_buffer = JitterBuffer(
+            step=1 if self.jitter_use_sequence else frame_ms,
+            frame_ms=frame_ms,
+        )
+        for audio_data, timestamp, sequence in probe:
+            key = sequence if self.jitter_use_sequence else timestamp
+            released = self.audio_jitter_buffer.push(key, audio_data, time.monotonic())
+            self._enqueue_jitter_output(released)
+        self._schedule_jitter_flush()
+
+    def _enqueue_jitter_output(self, released):
+        """把抖动缓冲区释放的包放入音频队列，丢失的帧用PLC包代替"""
+        for audio_data in released:
+            if audio_data is None:
+                audio_data = plc_packet(self.audio_jitter_buffer.frame_ms)
             self.asr_audio_queue.put(audio_data)
-            self.last_processed_timestamp = timestamp
-
-            # 处理缓冲区中的后续包
-            processed_any = True
-            while processed_any:
-                processed_any = False
-                for ts in sorted(self.audio_timestamp_buffer.keys()):
-                    if ts > self.last_processed_timestamp:
-                        buffered_audio = self.audio_timestamp_buffer.pop(ts)
-                        self.asr_audio_queue.put(buffered_audio)
-                        self.last_processed_timestamp = ts
-                        processed_any = True
-                        break
+
+    def _schedule_jitter_flush(self):
+        """队首有空洞时，在播放期限到达后强制释放"""
+        if self.jitter_flush_handle is not None:
+            return
+        if self.audio_jitter_buffer is None:
+            # 等不到足够的包时，到期后按已暂存的包判断
+            delay = self._uplink_frame_ms() * JITTER_PROBE_PACKETS / 1000
         else:
-            # 乱序包，暂存
-            if len(self.audio_timestamp_buffer) < self.max_timestamp_buffer_size:
-                self.audio_timestamp_buffer[timestamp] = audio_data
-            else:
-                self.asr_audio_queue.put(audio_data)
+            delay = self.audio_jitter_buffer.next_deadline(time.monotonic())
+        if delay is None:
+            return
+        self.jitter_flush_handle = self.loop.call_later(delay, self._flush_jitter_buffer)
+
+    def _flush_jitter_buffer(self):
+        self.jitter_flush_handle = None
+        if self.audio_jitter_buffer is None:
+            if self.jitter_probe:
+                self._create_jitter_buffer()
+            return
+        self._enqueue_jitter_output(self.audio_jitter_buffer.poll(time.monotonic()))
+        self._schedule_jitter_flush()
 
     async def handle_restart(self, message):
         """处理服务器重启请求"""
@@ -425,6 +496,11 @@ class ConnectionHandler:
             asyncio.run_coroutine_threadsafe(
                 self.tts.open_audio_channels(self), self.loop
             )
+            # 预合成当前音色的过渡语
+            self.latency_filler = LatencyFiller(
+                self, self.config.get("latency_filler")
+            )
+            self.latency_filler.prepare()
 
             """加载记忆"""
             self._initialize_memory()
@@ -630,6 +706,8 @@ class ConnectionHandler:
         if self.memory is None:
             return
         """初始化记忆模块"""
+        # 设备ID和记忆内容按连接区分，不能设置在共用的实例上
+        self.memory = self.memory.for_connection()
         self.memory.init_memory(
             role_id=self.device_id,
             llm=self.llm,
@@ -645,8 +723,8 @@ class ConnectionHandler:
         # 如果使用 nomen，直接返回
         if memory_type == "nomem":
             return
-        # 使用 mem_local_short 模式
-        elif memory_type == "mem_local_short":
+        # 使用 mem_local_short 或 mem_local_vector 模式
+        elif memory_type in ("mem_local_short", "mem_local_vector"):
             memory_llm_name = memory_config[self.config["selected_module"]["Memory"]][
                 "llm"
             ]
@@ -688,6 +766,8 @@ class ConnectionHandler:
             return
         # 使用 intent_llm 模式
         elif intent_type == "intent_llm":
+            # 每个连接的意图识别LLM可能不同，不能设置在共用的实例上
+            self.intent = self.intent.for_connection()
             intent_llm_name = intent_config[self.config["selected_module"]["Intent"]][
                 "llm"
             ]
@@ -722,7 +802,33 @@ class ConnectionHandler:
         # 更新系统prompt至上下文
         self.dialogue.update_system_message(self.prompt)
 
-    def chat(self, query, depth=0):
+    def _request_llm(self, query, functions):
+        """查询记忆并发起流式大模型请求"""
+        # 使用带记忆的对话
+        # 识别文本时已开始预取，这里通常只需等待剩余的查询时间
+        memory_str = self.memory_prefetch.get(query)
+
+        if self.intent_type == "function_call" and functions is not None:
+            # 使用支持functions的streaming接口
+            return self.llm.response_with_functions(
+                self.session_id,
+                self.dialogue.get_llm_dialogue_with_memory(
+                    memory_str, self.config.get("voiceprint", {})
+                ),
+                functions=functions,
+            )
+        return self.llm.response(
+            self.session_id,
+            self.dialogue.get_llm_dialogue_with_memory(
+                memory_str, self.config.get("voiceprint", {})
+            ),
+        )
+
+    def chat(self, query, depth=0, speculation=None):
+        """
+        Args:
+            speculation: 根据流式识别中间结果提前发起的大模型请求，最终结果一致时直接使用其输出
+        """
         if query is not None:
             self.logger.bind(tag=TAG).info(f"大模型收到用户消息: {query}")
 
@@ -730,6 +836,7 @@ class ConnectionHandler:
         if depth == 0:
             self.llm_finish_task = False
             self.sentence_id = str(uuid.uuid4().hex)
+            self.latency_filler.start_turn()
             self.dialogue.put(Message(role="user", content=query))
             self.tts.tts_text_queue.put(
                 TTSMessageDTO(
@@ -756,36 +863,29 @@ class ConnectionHandler:
         functions = None
         # 达到最大深度时，禁用工具调用，强制 LLM 直接回答
         if self.intent_type == "function_call" and hasattr(self, "func_handler") and not force_final_answer:
-            functions = self.func_handler.get_functions()
+            if depth == 0:
+                # 按用户消息筛选本轮提供的工具，工具调用后的后续请求沿用
+                self.func_handler.start_turn()
+                if speculation is not None and speculation.functions is not None:
+                    self.turn_functions = speculation.functions
+                else:
+                    self.turn_functions = self.func_handler.get_functions(query)
+            functions = self.turn_functions
+            if functions is None:
+                functions = self.func_handler.get_functions()
         response_message = []
 
+        # 大模型首字较慢时播放过渡语
+        self.latency_filler.arm("think")
         try:
-            # 使用带记忆的对话
-            memory_str = None
-            if self.memory is not None:
-                future = asyncio.run_coroutine_threadsafe(
-                    self.memory.query_memory(query), self.loop
-                )
-                memory_str = future.result()
-
-            if self.intent_type == "function_call" and functions is not None:
-                # 使用支持functions的streaming接口
-                llm_responses = self.llm.response_with_functions(
-                    self.session_id,
-                    self.dialogue.get_llm_dialogue_with_memory(
-                        memory_str, self.config.get("voiceprint", {})
-                    ),
-                    functions=functions,
-                )
+            if speculation is not None:
+                # 说话过程中已提前请求，读取缓存的输出（包含记忆查询）
+                llm_responses = speculation.responses()
             else:
-                llm_responses = self.llm.response(
-                    self.session_id,
-                    self.dialogue.get_llm_dialogue_with_memory(
-                        memory_str, self.config.get("voiceprint", {})
-                    ),
-                )
+                llm_responses = self._request_llm(query, functions)
         except Exception as e:
             self.logger.bind(tag=TAG).error(f"LLM 处理出错 {query}: {e}")
+            self.latency_filler.disarm()
             return None
 
         # 处理流式响应
@@ -826,6 +926,8 @@ class ConnectionHandler:
 
             if content is not None and len(content) > 0:
                 if not tool_call_flag:
+                    # 已经有回复文本，不再需要过渡语
+                    self.latency_filler.disarm()
                     response_message.append(content)
                     self.tts.tts_text_queue.put(
                         TTSMessageDTO(
@@ -835,6 +937,9 @@ class ConnectionHandler:
                             content_detail=content,
                         )
                     )
+        if speculation is not None:
+            # 被打断时停止仍在进行的推测请求
+            speculation.cancel()
         # 处理function call
         if tool_call_flag:
             bHasError = False
@@ -860,6 +965,18 @@ class ConnectionHandler:
                         f"function call error: {content_arguments}"
                     )
 
+            if not bHasError and len(tool_calls_list) > 0 and self._expand_functions(
+                tool_calls_list, functions
+            ):
+                # 调用了本轮没有提供的工具，提供全部工具重新请求
+                tool_calls_list = []
+                if len(response_message) > 0:
+                    text_buff = "".join(response_message)
+                    self.tts_MessageText = text_buff
+                    self.dialogue.put(Message(role="assistant", content=text_buff))
+                response_message.clear()
+                self.chat(None, depth=depth + 1)
+
             if not bHasError and len(tool_calls_list) > 0:
                 # 如需要大模型先处理一轮，添加相关处理后的日志情况
                 if len(response_message) > 0:
@@ -871,6 +988,12 @@ class ConnectionHandler:
                 self.logger.bind(tag=TAG).debug(
                     f"检测到 {len(tool_calls_list)} 个工具调用"
                 )
+                # 等待工具返回时播放过渡语
+                self.latency_filler.arm(
+                    self.latency_filler.tool_category(
+                        [c["name"] for c in tool_calls_list]
+                    )
+                )
 
                 # 收集所有工具调用的 Future
                 futures_with_data = []
@@ -901,6 +1024,7 @@ class ConnectionHandler:
             self.tts_MessageText = text_buff
             self.dialogue.put(Message(role="assistant", content=text_buff))
         if depth == 0:
+            self.latency_filler.disarm()
             self.tts.tts_text_queue.put(
                 TTSMessageDTO(
                     sentence_id=self.sentence_id,
@@ -918,6 +1042,26 @@ class ConnectionHandler:
 
         return True
 
+    def _expand_functions(self, tool_calls_list, functions) -> bool:
+        """
+        大模型调用了本轮工具路由没有提供的工具时，之后改为提供全部工具。
+        工具存在时直接执行；不存在（可能是没看到正确的工具而猜测的名称）时返回True，由调用方重新请求
+        """
+        offered = {tool_name(f) for f in functions}
+        unlisted = [c["name"] for c in tool_calls_list if c["name"] not in offered]
+        if not unlisted:
+            return False
+        all_functions = self.func_handler.get_functions()
+        if len(functions) >= len(all_functions):
+            return False
+        self.turn_functions = all_functions
+        unknown = [name for name in unlisted if not self.func_handler.has_tool(name)]
+        self.logger.bind(tag=TAG).info(
+            f"大模型调用了未提供的工具 {unlisted}，改为提供全部工具"
+            + ("，重新请求" if unknown else "")
+        )
+        return bool(unknown)
+
     def _handle_function_result(self, tool_results, depth):
         need_llm_tools = []
 
@@ -1001,6 +1145,9 @@ class ConnectionHandler:
     def clearSpeakStatus(self):
         self.client_is_speaking = False
         self.logger.bind(tag=TAG).debug(f"清除服务端讲话状态")
+        # 播放结束后用户可能马上说话，提前准备流式识别的连接
+        if self.asr is not None:
+            self.asr.prewarm(self)
 
     async def close(self, ws=None):
         """资源清理方法"""
@@ -1009,6 +1156,23 @@ class ConnectionHandler:
             if hasattr(self, "audio_buffer"):
                 self.audio_buffer.clear()
 
+            # 取消进行中的推测请求
+            self.speculation.reset()
+            self.memory_prefetch.reset()
+
+            # 停止抖动缓冲区的定时释放
+            if self.jitter_flush_handle is not None:
+                self.jitter_flush_handle.cancel()
+                self.jitter_flush_handle = None
+            if self.audio_jitter_buffer is not None:
+                jitter = self.audio_jitter_buffer
+                if jitter.lost_frames or jitter.late_packets or jitter.resyncs:
+                    self.logger.bind(tag=TAG).info(
+                        f"上行音频抖动统计: 乱序 {jitter.reordered_packets}，"
+                        f"迟到丢弃 {jitter.late_packets}，丢失补偿 {jitter.lost_frames}，"
+                        f"重新同步 {jitter.resyncs}，缓冲深度 {jitter.depth}"
+                    )
+
             # 取消超时任务
             if self.timeout_task and not self.timeout_task.done():
                 self.timeout_task.cancel()
@@ -1073,6 +1237,10 @@ class ConnectionHandler:
             if self.tts:
                 await self.tts.close()
 
+            # 私有配置创建的ASR进程池只属于当前连接，关闭时结束其工作进程
+            if isinstance(self.asr, ProcessPoolASRProvider) and self.asr is not self._asr:
+                await asyncio.to_thread(self.asr.close)
+
             # 最后关闭线程池（避免阻塞）
             if self.executor:
                 try:
@@ -1098,6 +1266,8 @@ class ConnectionHandler:
                 f"开始清理: TTS队列大小={self.tts.tts_text_queue.qsize()}, 音频队列大小={self.tts.tts_audio_queue.qsize()}"
             )
 
+            # 先取消并行合成中的句子，避免清空后又有音频转入播放队列
+            self.tts.cancel_pending_synthesis()
             # 使用非阻塞方式清空队列
             for q in [
                 self.tts.tts_text_queue,
@@ -1117,7 +1287,8 @@ class ConnectionHandler:
             )
 
     def reset_vad_states(self):
-        self.client_audio_buffer = bytearray()
+        # 丢弃未凑满一帧的采样点，下一帧从最新写入位置开始
+        self.vad_offset = self.audio_ingest.write_offset
         self.client_have_voice = False
         self.client_voice_stop = False
         self.logger.bind(tag=TAG).debug("VAD states reset.")
@@ -1,4 +1,5 @@
 import json
+from core.utils.audio_pacer import audio_pacer
 
 TAG = __name__
 
@@ -8,6 +9,9 @@ async def handleAbortMessage(conn):
     # 设置成打断状态，会自动打断llm、tts任务
     conn.client_abort = True
     conn.clear_queues()
+    # 丢弃尚未发送的音频
+    audio_pacer.clear(conn)
+    conn.speculation.reset()
     # 打断客户端说话状态
     await conn.websocket.send(
         json.dumps({"type": "tts", "state": "stop", "session_id": conn.session_id})
@@ -6,7 +6,11 @@ from core.utils.dialogue import Message
 from core.utils.util import audio_to_data
 from core.providers.tts.dto.dto import SentenceType
 from core.utils.wakeup_word import WakeupWordsConfig
-from core.handle.sendAudioHandle import sendAudioMessage, send_tts_message
+from core.handle.sendAudioHandle import (
+    sendAudioMessage,
+    send_tts_message,
+    negotiate_audio_batch,
+)
 from core.utils.util import remove_punctuation_and_length, opus_datas_to_wav_bytes
 from core.providers.tools.device_mcp import (
     MCPClient,
@@ -57,6 +61,17 @@ async def handleHelloMessage(conn, msg_json):
             asyncio.create_task(send_mcp_initialize_message(conn))
             # 发送mcp消息，获取tools列表
             asyncio.create_task(send_mcp_tools_list_request(conn))
+        audio_batch = negotiate_audio_batch(conn, features)
+        if audio_batch:
+            conn.logger.bind(tag=TAG).debug(f"客户端支持合帧，每条消息最多{audio_batch}帧")
+            # 在回复中确认合帧帧数，未确认时客户端按一帧一条消息解析
+            conn.welcome_msg = {
+                **conn.welcome_msg,
+                "features": {
+                    **(conn.welcome_msg.get("features") or {}),
+                    "audio_batch": audio_batch,
+                },
+            }
 
     await conn.websocket.send(json.dumps(conn.welcome_msg))
 
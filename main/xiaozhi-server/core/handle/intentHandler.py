@@ -136,6 +136,11 @@ async def process_intent_result(conn, intent_result, original_text):
             # 使用executor执行函数调用和结果处理
             def process_function_call():
                 conn.dialogue.put(Message(role="user", content=original_text))
+                # 等待工具返回和生成回复时播放过渡语
+                conn.latency_filler.start_turn()
+                conn.latency_filler.arm(
+                    conn.latency_filler.tool_category([function_name])
+                )
 
                 # 使用统一工具处理器处理所有工具调用
                 try:
@@ -189,6 +194,7 @@ async def process_intent_result(conn, intent_result, original_text):
 
 
 def speak_txt(conn, text):
+    conn.latency_filler.disarm()
     conn.tts.tts_text_queue.put(
         TTSMessageDTO(
             sentence_id=conn.sentence_id,
@@ -11,6 +11,8 @@ TAG = __name__
 
 
 async def handleAudioMessage(conn, audio):
+    # 解码一次写入接入缓冲区，后续VAD、ASR都从缓冲区读取
+    conn.audio_ingest.write(audio, conn.audio_format)
     # 当前片段是否有人说话
     have_voice = conn.vad.is_vad(conn, audio)
     # 如果设备刚刚被唤醒，短暂忽略VAD检测
@@ -63,31 +65,51 @@ async def startToChat(conn, text):
     else:
         conn.current_speaker = None
 
+    # 说话过程中根据中间识别结果提前发起的大模型请求，最终结果一致时直接使用
+    speculation = conn.speculation.take(actual_text)
+
     if conn.need_bind:
+        if speculation:
+            speculation.cancel()
         await check_bind_device(conn)
         return
 
     # 如果当日的输出字数大于限定的字数
     if conn.max_output_size > 0:
-        if check_device_output_limit(
+        if await check_device_output_limit(
             conn.headers.get("device-id"), conn.max_output_size
         ):
+            if speculation:
+                speculation.cancel()
             await max_out_size(conn)
             return
     # manual 模式下不打断正在播放的内容
     if conn.client_is_speaking and conn.client_listen_mode != "manual":
         await handleAbortMessage(conn)
 
+    # 记忆查询与意图识别同时进行，大模型请求时直接使用结果
+    conn.memory_prefetch.prefetch(actual_text)
+
+    if speculation is None:
+        # intent_llm模式下意图识别的同时请求大模型，识别为继续聊天时直接使用其输出
+        speculation = conn.speculation.start_with_intent(actual_text)
+
     # 首先进行意图分析，使用实际文本内容
     intent_handled = await handle_user_intent(conn, actual_text)
 
     if intent_handled:
         # 如果意图已被处理，不再进行聊天
+        if speculation:
+            speculation.cancel()
         return
 
+    if speculation is not None and not speculation.usable:
+        # 提前发起的大模型请求已失败，按实际文本重新请求
+        speculation = None
+
     # 意图未被处理，继续常规聊天流程，使用实际文本内容
     await send_stt_message(conn, actual_text)
-    conn.executor.submit(conn.chat, actual_text)
+    conn.executor.submit(conn.chat, actual_text, 0, speculation)
 
 
 async def no_voice_close_connect(conn, have_voice):
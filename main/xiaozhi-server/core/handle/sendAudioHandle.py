@@ -1,8 +1,8 @@
 import json
-import time
-import asyncio
+import struct
 from core.utils import textUtils
 from core.utils.util import audio_to_data
+from core.utils.audio_pacer import audio_pacer
 from core.providers.tts.dto.dto import SentenceType
 
 TAG = __name__
@@ -14,7 +14,9 @@ async def sendAudioMessage(conn, sentenceType, audios, text):
         conn.tts.tts_audio_first_sentence = False
         await send_tts_message(conn, "start", None)
 
-    if sentenceType == SentenceType.FIRST:
+    if sentenceType in (SentenceType.FIRST, SentenceType.FILLER):
+        # 上一句的音频发完后再发送新句子的字幕
+        await audio_pacer.drain(conn)
         await send_tts_message(conn, "sentence_start", text)
 
     await sendAudio(conn, audios)
@@ -24,35 +26,110 @@ async def sendAudioMessage(conn, sentenceType, audios, text):
 
     # 发送结束消息（如果是最后一个文本）
     if sentenceType == SentenceType.LAST:
+        await audio_pacer.drain(conn)
         await send_tts_message(conn, "stop", None)
         conn.client_is_speaking = False
         if conn.close_after_chat:
             await conn.close()
 
 
-def calculate_timestamp_and_sequence(conn, start_time, packet_index, frame_duration=60):
-    """
-    计算音频数据包的时间戳和序列号
-    Args:
-        conn: 连接对象
-        start_time: 起始时间（性能计数器值）
-        packet_index: 数据包索引
-        frame_duration: 帧时长（毫秒），匹配 Opus 编码
-    Returns:
-        tuple: (timestamp, sequence)
+# MQTT网关音频头部：type(1) 保留(1) payload长度(2) sequence(4) 时间戳(4) opus长度(4)
+MQTT_HEADER = struct.Struct(">BxHIII")
+MQTT_AUDIO_TYPE = 1
+# 合帧音频包，payload为多个带长度前缀的opus帧
+MQTT_AUDIO_BATCH_TYPE = 2
+# 合帧模式下每个opus帧前的2字节大端长度
+FRAME_LENGTH = struct.Struct(">H")
+
+# 客户端在hello的features中声明支持合帧后，一条二进制消息可以包含多个连续的opus帧：
+# 直连设备声明audio_batch，消息体为[长度][opus][长度][opus]...；
+# 经MQTT网关的连接需要网关自己声明gateway_audio_batch，使用类型2的16字节头部加同样的消息体。
+# 未声明的固件和网关仍按一帧一条消息发送
+AUDIO_BATCH_FEATURE = "audio_batch"
+GATEWAY_AUDIO_BATCH_FEATURE = "gateway_audio_batch"
+
+
+class AudioFrameWriter:
+    """每个连接一个预分配的发送缓冲区，用struct.pack_into写入头部，避免逐帧创建头部和拼接
+
+    返回的memoryview只在下一次写入前有效，websocket.send会在返回前复制数据，
+    同一连接的音频由发送节拍器串行发送，可以安全复用。
     """
-    # 计算时间戳（使用播放位置计算）
-    timestamp = int((start_time + packet_index * frame_duration / 1000) * 1000) % (
-        2**32
-    )
 
-    # 计算序列号
-    if hasattr(conn, "audio_flow_control"):
-        sequence = conn.audio_flow_control["sequence"]
-    else:
-        sequence = packet_index  # 如果没有流控状态，直接使用索引
+    def __init__(self, size: int = 4096):
+        self._buffer = bytearray(size)
+
+    def _reserve(self, size: int):
+        if size > len(self._buffer):
+            self._buffer = bytearray(max(size, len(self._buffer) * 2))
+
+    def mqtt_frame(self, opus_packet, timestamp, sequence) -> memoryview:
+        """单帧：16字节头部加opus数据"""
+        length = len(opus_packet)
+        self._reserve(MQTT_HEADER.size + length)
+        MQTT_HEADER.pack_into(
+            self._buffer, 0, MQTT_AUDIO_TYPE, length, sequence, timestamp, length
+        )
+        self._buffer[MQTT_HEADER.size : MQTT_HEADER.size + length] = opus_packet
+        return memoryview(self._buffer)[: MQTT_HEADER.size + length]
+
+    def batch(self, frames, with_mqtt_header: bool) -> memoryview:
+        """多帧：每帧前加2字节长度，经MQTT网关时再加类型2的头部（时间戳和序列号取第一帧）"""
+        offset = MQTT_HEADER.size if with_mqtt_header else 0
+        total = offset + sum(FRAME_LENGTH.size + len(packet) for packet, _, _ in frames)
+        self._reserve(total)
+        pos = offset
+        for packet, _, _ in frames:
+            length = len(packet)
+            FRAME_LENGTH.pack_into(self._buffer, pos, length)
+            pos += FRAME_LENGTH.size
+            self._buffer[pos : pos + length] = packet
+            pos += length
+        if with_mqtt_header:
+            _, timestamp, sequence = frames[0]
+            payload = total - offset
+            MQTT_HEADER.pack_into(
+                self._buffer,
+                0,
+                MQTT_AUDIO_BATCH_TYPE,
+                payload,
+                sequence,
+                timestamp,
+                payload,
+            )
+        return memoryview(self._buffer)[:total]
+
+
+def _frame_writer(conn) -> AudioFrameWriter:
+    writer = getattr(conn, "audio_frame_writer", None)
+    if writer is None:
+        writer = conn.audio_frame_writer = AudioFrameWriter()
+    return writer
 
-    return timestamp, sequence
+
+def negotiate_audio_batch(conn, features) -> int:
+    """根据hello中的features确定合帧数，返回0表示不合帧"""
+    key = (
+        GATEWAY_AUDIO_BATCH_FEATURE
+        if conn.conn_from_mqtt_gateway
+        else AUDIO_BATCH_FEATURE
+    )
+    requested = features.get(key)
+    max_frames = int(conn.config.get("audio_batch_max_frames", 4) or 0)
+    if not requested or max_frames <= 1:
+        conn.audio_batch_frames = 0
+        return 0
+    if requested is True:
+        frames = max_frames
+    else:
+        try:
+            frames = min(int(requested), max_frames)
+        except (TypeError, ValueError):
+            frames = 0
+    # 单条消息的payload长度字段只有2字节，opus帧通常不超过几百字节
+    frames = min(frames, 64)
+    conn.audio_batch_frames = frames if frames > 1 else 0
+    return conn.audio_batch_frames
 
 
 async def _send_to_mqtt_gateway(conn, opus_packet, timestamp, sequence):
@@ -64,148 +141,67 @@ async def _send_to_mqtt_gateway(conn, opus_packet, timestamp, sequence):
         timestamp: 时间戳
         sequence: 序列号
     """
-    # 为opus数据包添加16字节头部
-    header = bytearray(16)
-    header[0] = 1  # type
-    header[2:4] = len(opus_packet).to_bytes(2, "big")  # payload length
-    header[4:8] = sequence.to_bytes(4, "big")  # sequence
-    header[8:12] = timestamp.to_bytes(4, "big")  # 时间戳
-    header[12:16] = len(opus_packet).to_bytes(4, "big")  # opus长度
+    await conn.websocket.send(
+        _frame_writer(conn).mqtt_frame(opus_packet, timestamp, sequence)
+    )
 
-    # 发送包含头部的完整数据包
-    complete_packet = bytes(header) + opus_packet
-    await conn.websocket.send(complete_packet)
 
+async def _send_frames(conn, frames):
+    """由发送节拍器调用，发送一批到期的opus包
 
-# 播放音频
-async def sendAudio(conn, audios, frame_duration=60):
-    """
-    发送单个opus包，支持流控
     Args:
-        conn: 连接对象
-        opus_packet: 单个opus数据包
-        pre_buffer: 快速发送音频
-        frame_duration: 帧时长（毫秒），匹配 Opus 编码
+        frames: [(opus包, 时间戳, 序列号)]
     """
-    if audios is None or len(audios) == 0:
+    batch = conn.audio_batch_frames
+    if batch > 1:
+        # 已协商合帧，多帧打包成一条消息
+        writer = _frame_writer(conn)
+        for i in range(0, len(frames), batch):
+            if conn.client_abort:
+                return
+            await conn.websocket.send(
+                writer.batch(frames[i : i + batch], conn.conn_from_mqtt_gateway)
+            )
         return
 
-    # 获取发送延迟配置
-    send_delay = conn.config.get("tts_audio_send_delay", -1) / 1000.0
-
-    if isinstance(audios, bytes):
-        # 重置流控状态,第一次读取和会话发生转变时
-        if not hasattr(conn, "audio_flow_control") or conn.audio_flow_control.get("sentence_id") != conn.sentence_id:
-            conn.audio_flow_control = {
-                "last_send_time": 0,
-                "packet_count": 0,
-                "start_time": time.perf_counter(),
-                "sequence": 0,  # 添加序列号
-                "sentence_id": conn.sentence_id,
-            }
-
+    for opus_packet, timestamp, sequence in frames:
         if conn.client_abort:
             return
+        if conn.conn_from_mqtt_gateway:
+            # 发送带头部的数据包
+            await _send_to_mqtt_gateway(conn, opus_packet, timestamp, sequence)
+        else:
+            # 直接发送opus数据包，不添加头部
+            await conn.websocket.send(opus_packet)
 
-        conn.last_activity_time = time.time() * 1000
 
-        # 预缓冲：前5个包直接发送，不做延迟
-        pre_buffer_count = 5
-        flow_control = conn.audio_flow_control
-        current_time = time.perf_counter()
+def enqueue_audio(conn, opus_packet, frame_duration=60):
+    """把流式TTS的单个opus包交给发送节拍器，不等待发送，可在TTS线程中直接调用"""
+    if conn.client_abort:
+        return
+    audio_pacer.submit(
+        conn, (opus_packet,), _send_frames, conn.sentence_id, frame_duration
+    )
 
-        if flow_control["packet_count"] < pre_buffer_count:
-            # 预缓冲阶段，直接发送不延迟
-            pass
-        elif send_delay > 0:
-            # 使用固定延迟
-            await asyncio.sleep(send_delay)
-        else:
-            effective_packet = flow_control["packet_count"] - pre_buffer_count
-            expected_time = flow_control["start_time"] + (
-                effective_packet * frame_duration / 1000
-            )
-            delay = expected_time - current_time
-            if delay > 0:
-                await asyncio.sleep(delay)
-            else:
-                # 纠正误差
-                flow_control["start_time"] += abs(delay)
 
-        if conn.conn_from_mqtt_gateway:
-            # 计算时间戳和序列号
-            timestamp, sequence = calculate_timestamp_and_sequence(
-                conn,
-                flow_control["start_time"],
-                flow_control["packet_count"],
-                frame_duration,
-            )
-            # 调用通用函数发送带头部的数据包
-            await _send_to_mqtt_gateway(conn, audios, timestamp, sequence)
-        else:
-            # 直接发送opus数据包，不添加头部
-            await conn.websocket.send(audios)
-        conn.client_is_speaking = True
+# 播放音频
+async def sendAudio(conn, audios, frame_duration=60):
+    """
+    发送音频并等待发送完成，实际的流控由进程级的发送节拍器统一完成
+    Args:
+        conn: 连接对象
+        audios: 单个opus包（流式，同一句内连续计时）或opus包列表（文件型音频，重新计时）
+        frame_duration: 帧时长（毫秒），匹配 Opus 编码
+    """
+    if audios is None or len(audios) == 0:
+        return
 
-        # 更新流控状态
-        flow_control["packet_count"] += 1
-        flow_control["sequence"] += 1
-        flow_control["last_send_time"] = time.perf_counter()
+    if isinstance(audios, bytes):
+        enqueue_audio(conn, audios, frame_duration)
     else:
-        # 文件型音频走普通播放
-        start_time = time.perf_counter()
-        play_position = 0
-
-        # 执行预缓冲
-        pre_buffer_frames = min(5, len(audios))
-        for i in range(pre_buffer_frames):
-            if conn.conn_from_mqtt_gateway:
-                # 计算时间戳和序列号
-                timestamp, sequence = calculate_timestamp_and_sequence(
-                    conn, start_time, i, frame_duration
-                )
-                # 调用通用函数发送带头部的数据包
-                await _send_to_mqtt_gateway(conn, audios[i], timestamp, sequence)
-            else:
-                # 直接发送预缓冲包，不添加头部
-                await conn.websocket.send(audios[i])
-            conn.client_is_speaking = True
-        remaining_audios = audios[pre_buffer_frames:]
-
-        # 播放剩余音频帧
-        for i, opus_packet in enumerate(remaining_audios):
-            if conn.client_abort:
-                break
-
-            # 重置没有声音的状态
-            conn.last_activity_time = time.time() * 1000
-
-            if send_delay > 0:
-                # 固定延迟模式
-                await asyncio.sleep(send_delay)
-            else:
-                 # 计算预期发送时间
-                expected_time = start_time + (play_position / 1000)
-                current_time = time.perf_counter()
-                delay = expected_time - current_time
-                if delay > 0:
-                    await asyncio.sleep(delay)
-
-            if conn.conn_from_mqtt_gateway:
-                # 计算时间戳和序列号（使用当前的数据包索引确保连续性）
-                packet_index = pre_buffer_frames + i
-                timestamp, sequence = calculate_timestamp_and_sequence(
-                    conn, start_time, packet_index, frame_duration
-                )
-                # 调用通用函数发送带头部的数据包
-                await _send_to_mqtt_gateway(conn, opus_packet, timestamp, sequence)
-            else:
-                # 直接发送opus数据包，不添加头部
-                await conn.websocket.send(opus_packet)
-
-            conn.client_is_speaking = True
-
-            play_position += frame_duration
+        # 文件型音频走普通播放，每次调用都重新预缓冲和计时
+        audio_pacer.submit(conn, audios, _send_frames, object(), frame_duration)
+    await audio_pacer.drain(conn)
 
 
 async def send_tts_message(conn, state, text=None):
@@ -62,7 +62,9 @@ class SimpleHttpServer:
             # 运行服务
             runner = web.AppRunner(app)
             await runner.setup()
-            site = web.TCPSite(runner, host, port)
+            # 多进程模式下各工作进程监听同一端口
+            reuse_port = int(server_config.get("workers", 1) or 1) > 1
+            site = web.TCPSite(runner, host, port, reuse_port=reuse_port or None)
             await site.start()
 
             # 保持服务运行
@@ -126,6 +126,21 @@ class ASRProvider(ASRProviderBase):
 
     async def open_audio_channels(self, conn):
         await super().open_audio_channels(conn)
+        # 说话前预先建立连接，开始识别时只需发送StartTranscription
+        self.init_prewarm(conn, self._connect)
+
+    async def _connect(self):
+        if self._is_token_expired():
+            self._refresh_token()
+        headers = {"X-NLS-Token": self.token}
+        return await websockets.connect(
+            self.ws_url,
+            additional_headers=headers,
+            max_size=1000000000,
+            ping_interval=None,
+            ping_timeout=None,
+            close_timeout=5,
+        )
 
     async def receive_audio(self, conn, audio, audio_have_voice):
         # 初始化音频缓存
@@ -150,7 +165,8 @@ class ASRProvider(ASRProviderBase):
 
         if self.asr_ws and self.is_processing and self.server_ready:
             try:
-                pcm_frame = self.decoder.decode(audio, 960)
+                # 当前音频包已在接入缓冲区解码，直接复用
+                pcm_frame = bytes(conn.audio_ingest.last_packet_pcm() or b"")
                 await self.asr_ws.send(pcm_frame)
             except Exception as e:
                 logger.bind(tag=TAG).warning(f"发送音频失败: {str(e)}")
@@ -158,19 +174,10 @@ class ASRProvider(ASRProviderBase):
 
     async def _start_recognition(self, conn):
         """开始识别会话"""
-        if self._is_token_expired():
-            self._refresh_token()
-        
-        # 建立连接
-        headers = {"X-NLS-Token": self.token}
-        self.asr_ws = await websockets.connect(
-            self.ws_url,
-            additional_headers=headers,
-            max_size=1000000000,
-            ping_interval=None,
-            ping_timeout=None,
-            close_timeout=5,
-        )
+        # 优先使用预热好的连接，没有时现场建立
+        self.asr_ws = await self.take_warm_connection()
+        if self.asr_ws is None:
+            self.asr_ws = await self._connect()
 
         self.task_id = uuid.uuid4().hex
 
@@ -249,6 +256,7 @@ class ASRProvider(ASRProviderBase):
                         text = payload.get("result", "")
                         if text:
                             self.text = text
+                            self.report_partial_text(conn, text)
                     elif message_name == "SentenceEnd":
                         # 最终结果
                         text = payload.get("result", "")
@@ -347,4 +355,6 @@ class ASRProvider(ASRProviderBase):
 
     async def close(self):
         """关闭资源"""
+        if self.warm_connection is not None:
+            await self.warm_connection.close()
         await self._cleanup()
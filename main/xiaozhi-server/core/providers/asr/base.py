@@ -15,6 +15,7 @@ from config.logger import setup_logging
 from typing import Optional, Tuple, List
 from core.handle.receiveAudioHandle import startToChat
 from core.handle.reportHandle import enqueue_asr_report
+from core.utils.asr_prewarm import WarmConnection
 from core.utils.util import remove_punctuation_and_length
 from core.handle.receiveAudioHandle import handleAudioMessage
 
@@ -23,6 +24,9 @@ logger = setup_logging()
 
 
 class ASRProviderBase(ABC):
+    # 流式识别的预热连接，由init_prewarm创建
+    warm_connection: Optional[WarmConnection] = None
+
     def __init__(self):
         pass
 
@@ -51,6 +55,34 @@ class ASRProviderBase(ABC):
                 )
                 continue
 
+    def init_prewarm(self, conn, connect):
+        """流式识别在open_audio_channels中调用，connect建立可以直接发送音频的连接"""
+        self.warm_connection = WarmConnection(
+            type(self).__module__.split(".")[-1],
+            connect,
+            conn.config.get("asr_prewarm") or {},
+        )
+        self.warm_connection.prewarm()
+
+    def prewarm(self, conn):
+        """可能马上要说话时调用（播放结束、客户端开始拾音），提前准备流式识别的连接"""
+        if self.warm_connection is not None and not self.is_processing:
+            self.warm_connection.prewarm()
+
+    async def take_warm_connection(self):
+        """开始说话时取用预热的连接，没有时返回None"""
+        if self.warm_connection is None:
+            return None
+        return await self.warm_connection.take()
+
+    @staticmethod
+    def report_partial_text(conn, text):
+        """流式识别的中间结果，供自适应断句判断这句话是否已经说完，以及提前请求大模型"""
+        endpointer = getattr(conn.vad, "endpointer", None)
+        if endpointer is not None:
+            endpointer.update_partial(conn, text)
+        conn.speculation.on_partial(text)
+
     # 接收音频
     async def receive_audio(self, conn, audio, audio_have_voice):
         if conn.client_listen_mode == "auto" or conn.client_listen_mode == "realtime":
@@ -62,6 +94,8 @@ class ASRProviderBase(ABC):
         if not have_voice and not conn.client_have_voice:
             conn.asr_audio = conn.asr_audio[-10:]
             return
+        # 整句音频说完后一次性从接入缓冲区读取，在此之前不能被覆盖
+        conn.audio_ingest.retain_packets(len(conn.asr_audio))
 
         if conn.client_voice_stop:
             asr_audio_task = conn.asr_audio.copy()
@@ -69,19 +103,32 @@ class ASRProviderBase(ABC):
             conn.reset_vad_states()
 
             if len(asr_audio_task) > 15 or conn.client_listen_mode == "manual":
-                await self.handle_voice_stop(conn, asr_audio_task)
+                # 整句PCM直接从接入缓冲区取，不再重复解码
+                pcm_data = conn.audio_ingest.read_recent_packets(len(asr_audio_task))
+                await self.handle_voice_stop(conn, asr_audio_task, pcm_data)
 
     # 处理语音停止
-    async def handle_voice_stop(self, conn, asr_audio_task: List[bytes]):
-        """并行处理ASR和声纹识别"""
+    async def handle_voice_stop(
+        self,
+        conn,
+        asr_audio_task: List[bytes],
+        pcm_data: Optional[List[bytes]] = None,
+    ):
+        """并行处理ASR和声纹识别
+
+        Args:
+            asr_audio_task: 整句的原始音频包，用于上报
+            pcm_data: 已解码的整句PCM，为空时由原始音频包解码
+        """
         try:
             total_start_time = time.monotonic()
             
-            # 准备音频数据
-            if conn.audio_format == "pcm":
-                pcm_data = asr_audio_task
-            else:
-                pcm_data = self.decode_opus(asr_audio_task)
+            # 准备音频数据，ASR和声纹识别共用同一份PCM
+            if pcm_data is None:
+                if conn.audio_format == "pcm":
+                    pcm_data = asr_audio_task
+                else:
+                    pcm_data = self.decode_opus(asr_audio_task)
             
             combined_pcm_data = b"".join(pcm_data)
             
@@ -98,7 +145,7 @@ class ASRProviderBase(ABC):
                     asyncio.set_event_loop(loop)
                     try:
                         result = loop.run_until_complete(
-                            self.speech_to_text(asr_audio_task, conn.session_id, conn.audio_format)
+                            self.speech_to_text(pcm_data, conn.session_id, "pcm")
                         )
                         end_time = time.monotonic()
                         logger.bind(tag=TAG).debug(f"ASR耗时: {end_time - start_time:.3f}s")
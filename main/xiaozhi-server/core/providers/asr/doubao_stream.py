@@ -52,6 +52,53 @@ class ASRProvider(ASRProviderBase):
 
     async def open_audio_channels(self, conn):
         await super().open_audio_channels(conn)
+        # 说话前预先建立连接并完成识别会话初始化
+        self.init_prewarm(conn, self._connect_session)
+
+    async def _connect_session(self):
+        """建立WebSocket连接并发送初始化请求，返回可以直接发送音频的连接"""
+        headers = self.token_auth() if self.auth_method == "token" else None
+        logger.bind(tag=TAG).info(f"正在连接ASR服务，headers: {headers}")
+
+        asr_ws = await websockets.connect(
+            self.ws_url,
+            additional_headers=headers,
+            max_size=1000000000,
+            ping_interval=None,
+            ping_timeout=None,
+            close_timeout=10,
+        )
+
+        # 发送初始化请求
+        request_params = self.construct_request(str(uuid.uuid4()))
+        try:
+            payload_bytes = str.encode(json.dumps(request_params))
+            payload_bytes = gzip.compress(payload_bytes)
+            full_client_request = self.generate_header()
+            full_client_request.extend((len(payload_bytes)).to_bytes(4, "big"))
+            full_client_request.extend(payload_bytes)
+
+            logger.bind(tag=TAG).info(f"发送初始化请求: {request_params}")
+            await asr_ws.send(full_client_request)
+
+            # 等待初始化响应
+            init_res = await asr_ws.recv()
+            result = self.parse_response(init_res)
+            logger.bind(tag=TAG).info(f"收到初始化响应: {result}")
+
+            # 检查初始化响应
+            if "code" in result and result["code"] != 1000:
+                error_msg = f"ASR服务初始化失败: {result.get('payload_msg', {}).get('error', '未知错误')}"
+                logger.bind(tag=TAG).error(error_msg)
+                raise Exception(error_msg)
+
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"发送初始化请求失败: {str(e)}")
+            if hasattr(e, "__cause__") and e.__cause__:
+                logger.bind(tag=TAG).error(f"错误原因: {str(e.__cause__)}")
+            await asr_ws.close()
+            raise e
+        return asr_ws
 
     async def receive_audio(self, conn, audio, audio_have_voice):
         conn.asr_audio.append(audio)
@@ -71,47 +118,10 @@ class ASRProvider(ASRProviderBase):
         if audio_have_voice and self.asr_ws is None and not self.is_processing:
             try:
                 self.is_processing = True
-                # 建立新的WebSocket连接
-                headers = self.token_auth() if self.auth_method == "token" else None
-                logger.bind(tag=TAG).info(f"正在连接ASR服务，headers: {headers}")
-
-                self.asr_ws = await websockets.connect(
-                    self.ws_url,
-                    additional_headers=headers,
-                    max_size=1000000000,
-                    ping_interval=None,
-                    ping_timeout=None,
-                    close_timeout=10,
-                )
-
-                # 发送初始化请求
-                request_params = self.construct_request(str(uuid.uuid4()))
-                try:
-                    payload_bytes = str.encode(json.dumps(request_params))
-                    payload_bytes = gzip.compress(payload_bytes)
-                    full_client_request = self.generate_header()
-                    full_client_request.extend((len(payload_bytes)).to_bytes(4, "big"))
-                    full_client_request.extend(payload_bytes)
-
-                    logger.bind(tag=TAG).info(f"发送初始化请求: {request_params}")
-                    await self.asr_ws.send(full_client_request)
-
-                    # 等待初始化响应
-                    init_res = await self.asr_ws.recv()
-                    result = self.parse_response(init_res)
-                    logger.bind(tag=TAG).info(f"收到初始化响应: {result}")
-
-                    # 检查初始化响应
-                    if "code" in result and result["code"] != 1000:
-                        error_msg = f"ASR服务初始化失败: {result.get('payload_msg', {}).get('error', '未知错误')}"
-                        logger.bind(tag=TAG).error(error_msg)
-                        raise Exception(error_msg)
-
-                except Exception as e:
-                    logger.bind(tag=TAG).error(f"发送初始化请求失败: {str(e)}")
-                    if hasattr(e, "__cause__") and e.__cause__:
-                        logger.bind(tag=TAG).error(f"错误原因: {str(e.__cause__)}")
-                    raise e
+                # 优先使用预热好的连接，没有时现场建立
+                self.asr_ws = await self.take_warm_connection()
+                if self.asr_ws is None:
+                    self.asr_ws = await self._connect_session()
 
                 # 启动接收ASR结果的异步任务
                 self.forward_task = asyncio.create_task(self._forward_asr_results(conn))
@@ -146,7 +156,8 @@ class ASRProvider(ASRProviderBase):
         # 发送当前音频数据
         if self.asr_ws and self.is_processing:
             try:
-                pcm_frame = self.decoder.decode(audio, 960)
+                # 当前音频包已在接入缓冲区解码，直接复用
+                pcm_frame = conn.audio_ingest.last_packet_pcm() or b""
                 payload = gzip.compress(pcm_frame)
                 audio_request = bytearray(self.generate_audio_default_header())
                 audio_request.extend(len(payload).to_bytes(4, "big"))
@@ -187,6 +198,12 @@ class ASRProvider(ASRProviderBase):
                                     await self.handle_voice_stop(conn, audio_data)
                                 break
 
+                            if not any(u.get("definite", False) for u in utterances):
+                                # 中间结果
+                                self.report_partial_text(
+                                    conn, payload["result"].get("text", "")
+                                )
+
                             for utterance in utterances:
                                 if utterance.get("definite", False):
                                     self.text = utterance["text"]
@@ -359,6 +376,8 @@ class ASRProvider(ASRProviderBase):
 
     async def close(self):
         """资源清理方法"""
+        if self.warm_connection is not None:
+            await self.warm_connection.close()
         if self.asr_ws:
             await self.asr_ws.close()
             self.asr_ws = None
@@ -10,6 +10,7 @@ from funasr import AutoModel
 from funasr.utils.postprocess_utils import rich_transcription_postprocess
 import shutil
 from core.providers.asr.dto.dto import InterfaceType
+from core.utils.thread_budget import get_threads
 
 TAG = __name__
 logger = setup_logging()
@@ -49,6 +50,8 @@ class ASRProvider(ASRProviderBase):
         self.model_dir = config.get("model_dir")
         self.output_dir = config.get("output_dir")  # 修正配置键名
         self.delete_audio_file = delete_audio_file
+        # FunASR加载模型时会按ncpu调用torch.set_num_threads，默认为4，这里改为线程预算
+        self.num_threads = int(config.get("num_threads") or get_threads("asr"))
 
         # 确保输出目录存在
         os.makedirs(self.output_dir, exist_ok=True)
@@ -58,6 +61,7 @@ class ASRProvider(ASRProviderBase):
                 vad_kwargs={"max_single_segment_time": 30000},
                 disable_update=True,
                 hub="hf",
+                ncpu=self.num_threads,
                 # device="cuda:0",  # 启用GPU加速
             )
 
@@ -7,6 +7,7 @@ from config.logger import setup_logging
 from typing import Optional, Tuple, List
 from core.providers.asr.dto.dto import InterfaceType
 from core.providers.asr.base import ASRProviderBase
+from core.utils.thread_budget import get_threads
 
 import numpy as np
 import sherpa_onnx
@@ -42,6 +43,7 @@ class ASRProvider(ASRProviderBase):
         self.output_dir = config.get("output_dir")
         self.model_type = config.get("model_type", "sense_voice")  # 支持 paraformer
         self.delete_audio_file = delete_audio_file
+        self.num_threads = int(config.get("num_threads") or get_threads("asr"))
 
         # 确保输出目录存在
         os.makedirs(self.output_dir, exist_ok=True)
@@ -78,7 +80,7 @@ class ASRProvider(ASRProviderBase):
                 self.model = sherpa_onnx.OfflineRecognizer.from_paraformer(
                     paraformer=self.model_path,
                     tokens=self.tokens_path,
-                    num_threads=2,
+                    num_threads=self.num_threads,
                     sample_rate=16000,
                     feature_dim=80,
                     decoding_method="greedy_search",
@@ -88,7 +90,7 @@ class ASRProvider(ASRProviderBase):
                 self.model = sherpa_onnx.OfflineRecognizer.from_sense_voice(
                     model=self.model_path,
                     tokens=self.tokens_path,
-                    num_threads=2,
+                    num_threads=self.num_threads,
                     sample_rate=16000,
                     feature_dim=80,
                     decoding_method="greedy_search",
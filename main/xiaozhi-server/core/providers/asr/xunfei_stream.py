@@ -99,6 +99,19 @@ class ASRProvider(ASRProviderBase):
 
     async def open_audio_channels(self, conn):
         await super().open_audio_channels(conn)
+        # 说话前预先建立连接，识别参数随首帧发送
+        self.init_prewarm(conn, self._connect)
+
+    async def _connect(self):
+        ws_url = self.create_url()
+        logger.bind(tag=TAG).info(f"正在连接ASR服务: {ws_url[:50]}...")
+        return await websockets.connect(
+            ws_url,
+            max_size=1000000000,
+            ping_interval=None,
+            ping_timeout=None,
+            close_timeout=10,
+        )
 
     async def receive_audio(self, conn, audio, audio_have_voice):
         # 先调用父类方法处理基础逻辑
@@ -121,7 +134,8 @@ class ASRProvider(ASRProviderBase):
         # 发送当前音频数据
         if self.asr_ws and self.is_processing and self.server_ready:
             try:
-                pcm_frame = self.decoder.decode(audio, 960)
+                # 当前音频包已在接入缓冲区解码，直接复用
+                pcm_frame = bytes(conn.audio_ingest.last_packet_pcm() or b"")
                 await self._send_audio_frame(pcm_frame, STATUS_CONTINUE_FRAME)
             except Exception as e:
                 logger.bind(tag=TAG).warning(f"发送音频数据时发生错误: {e}")
@@ -131,17 +145,10 @@ class ASRProvider(ASRProviderBase):
         """开始识别会话"""
         try:
             self.is_processing = True
-            # 建立WebSocket连接
-            ws_url = self.create_url()
-            logger.bind(tag=TAG).info(f"正在连接ASR服务: {ws_url[:50]}...")
-
-            self.asr_ws = await websockets.connect(
-                ws_url,
-                max_size=1000000000,
-                ping_interval=None,
-                ping_timeout=None,
-                close_timeout=10,
-            )
+            # 优先使用预热好的连接，没有时现场建立
+            self.asr_ws = await self.take_warm_connection()
+            if self.asr_ws is None:
+                self.asr_ws = await self._connect()
 
             logger.bind(tag=TAG).info("ASR WebSocket连接已建立")
             self.server_ready = False
@@ -318,6 +325,7 @@ class ASRProvider(ASRProviderBase):
                                     else:
                                         # 中间状态替换为新的识别结果
                                         self.text = result_text
+                                        self.report_partial_text(conn, self.text)
 
                                     logger.bind(tag=TAG).info(
                                         f"实时更新识别文本: {self.text} (最终帧已发送: {self.last_frame_sent})"
@@ -501,6 +509,8 @@ class ASRProvider(ASRProviderBase):
 
     async def close(self):
         """资源清理方法"""
+        if self.warm_connection is not None:
+            await self.warm_connection.close()
         if self.asr_ws:
             await self.asr_ws.close()
             self.asr_ws = None
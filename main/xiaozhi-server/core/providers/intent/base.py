@@ -1,3 +1,4 @@
+import copy
 from abc import ABC, abstractmethod
 from typing import List, Dict
 from config.logger import setup_logging
@@ -10,6 +11,13 @@ class IntentProviderBase(ABC):
     def __init__(self, config):
         self.config = config
 
+    def for_connection(self):
+        """
+        提供者实例在所有连接间共用，返回本连接使用的副本，
+        之后设置的LLM等状态只影响本连接
+        """
+        return copy.copy(self)
+
     def set_llm(self, llm):
         self.llm = llm
         # 获取模型名称和类型信息
@@ -3,7 +3,9 @@ from ..base import IntentProviderBase
 from plugins_func.functions.play_music import initialize_music_handler
 from config.logger import setup_logging
 import re
+import copy
 import json
+import asyncio
 import hashlib
 import time
 
@@ -114,6 +116,12 @@ class IntentProvider(IntentProviderBase):
         )
         return prompt
 
+    def for_connection(self):
+        # 意图识别提示词按本连接可用的工具生成，副本重新生成
+        intent = copy.copy(self)
+        intent.promot = ""
+        return intent
+
     def replyResult(self, text: str, original_text: str):
         llm_result = self.llm.response_no_stream(
             system_prompt=text,
@@ -139,7 +147,7 @@ class IntentProvider(IntentProviderBase):
         cache_key = hashlib.md5((conn.device_id + text).encode()).hexdigest()
 
         # 检查缓存
-        cached_intent = self.cache_manager.get(self.CacheType.INTENT, cache_key)
+        cached_intent = await self.cache_manager.aget(self.CacheType.INTENT, cache_key)
         if cached_intent is not None:
             cache_time = time.time() - total_start_time
             logger.bind(tag=TAG).debug(
@@ -194,8 +202,11 @@ class IntentProvider(IntentProviderBase):
         llm_start_time = time.time()
         logger.bind(tag=TAG).debug(f"开始LLM意图识别调用, 模型: {model_info}")
 
-        intent = self.llm.response_no_stream(
-            system_prompt=prompt_music, user_prompt=user_prompt
+        # 在线程中请求，不阻塞事件循环，同时进行的大模型对话请求可以正常查询记忆
+        intent = await asyncio.to_thread(
+            self.llm.response_no_stream,
+            system_prompt=prompt_music,
+            user_prompt=user_prompt,
         )
 
         # 记录LLM调用完成时间
@@ -256,7 +267,7 @@ class IntentProvider(IntentProviderBase):
                     logger.bind(tag=TAG).info(f"检测到函数调用意图: {function_name}")
 
             # 统一缓存处理和返回
-            self.cache_manager.set(self.CacheType.INTENT, cache_key, intent)
+            await self.cache_manager.aset(self.CacheType.INTENT, cache_key, intent)
             postprocess_time = time.time() - postprocess_start_time
             logger.bind(tag=TAG).debug(f"意图后处理耗时: {postprocess_time:.4f}秒")
             return intent
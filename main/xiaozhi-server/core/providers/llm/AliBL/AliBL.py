@@ -11,6 +11,9 @@ logger = setup_logging()
 
 
 class LLMProvider(LLMProviderBase):
+    # 按session_id在服务端保存多轮对话
+    stateless = False
+
     def __init__(self, config):
         self.api_key = config["api_key"]
         self.app_id = config["app_id"]
@@ -5,6 +5,10 @@ TAG = __name__
 logger = setup_logging()
 
 class LLMProviderBase(ABC):
+    # 对话历史只来自每次请求传入的dialogue时为True；服务端按会话保存对话记录的提供者设为False，
+    # 这类提供者不做推测式请求，否则作废的请求也会留在服务端的对话记录中
+    stateless = True
+
     @abstractmethod
     def response(self, session_id, dialogue):
         """LLM response generator"""
@@ -26,6 +30,28 @@ class LLMProviderBase(ABC):
             logger.bind(tag=TAG).error(f"Error in Ollama response generation: {e}")
             return "【LLM服务响应异常】"
     
+    def response_cancellable(self, session_id, dialogue, cancel_event, functions=None):
+        """
+        可取消的流式响应，cancel_event置位后停止读取并关闭底层生成器，释放HTTP流
+
+        functions不为None时按response_with_functions的格式返回
+        """
+        if functions is None:
+            responses = self.response(session_id, dialogue)
+        else:
+            responses = self.response_with_functions(
+                session_id, dialogue, functions=functions
+            )
+        try:
+            for item in responses:
+                if cancel_event.is_set():
+                    break
+                yield item
+        finally:
+            close = getattr(responses, "close", None)
+            if close is not None:
+                close()
+
     def response_with_functions(self, session_id, dialogue, functions=None):
         """
         Default implementation for function calling (streaming)
@@ -18,6 +18,9 @@ logger = setup_logging()
 
 
 class LLMProvider(LLMProviderBase):
+    # 按conversation_id在服务端保存对话
+    stateless = False
+
     def __init__(self, config):
         self.personal_access_token = config.get("personal_access_token")
         self.bot_id = str(config.get("bot_id"))
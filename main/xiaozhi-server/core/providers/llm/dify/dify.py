@@ -10,6 +10,9 @@ logger = setup_logging()
 
 
 class LLMProvider(LLMProviderBase):
+    # 按conversation_id在服务端保存对话
+    stateless = False
+
     def __init__(self, config):
         self.api_key = config["api_key"]
         self.mode = config.get("mode", "chat-messages")
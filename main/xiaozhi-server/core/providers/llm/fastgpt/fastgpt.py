@@ -9,6 +9,9 @@ logger = setup_logging()
 
 
 class LLMProvider(LLMProviderBase):
+    # 按chatId在服务端保存对话
+    stateless = False
+
     def __init__(self, config):
         self.api_key = config["api_key"]
         self.base_url = config.get("base_url")
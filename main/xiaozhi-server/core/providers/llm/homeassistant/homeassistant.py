@@ -8,6 +8,9 @@ logger = setup_logging()
 
 
 class LLMProvider(LLMProviderBase):
+    # 按conversation_id在服务端保存对话
+    stateless = False
+
     def __init__(self, config):
         self.agent_id = config.get("agent_id")  # 对应 agent_id
         self.api_key = config.get("api_key")
@@ -1,3 +1,4 @@
+import copy
 from abc import ABC, abstractmethod
 from config.logger import setup_logging
 
@@ -6,10 +7,20 @@ logger = setup_logging()
 
 
 class MemoryProviderBase(ABC):
+    # 查询结果是否与查询文本有关，无关时每次会话只查询一次
+    query_dependent = True
+
     def __init__(self, config):
         self.config = config
         self.role_id = None
 
+    def for_connection(self):
+        """
+        提供者实例在所有连接间共用，返回本连接使用的副本，
+        之后设置的设备、LLM等状态只影响本连接
+        """
+        return copy.copy(self)
+
     def set_llm(self, llm):
         self.llm = llm
 
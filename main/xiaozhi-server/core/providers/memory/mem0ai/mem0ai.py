@@ -1,3 +1,4 @@
+import asyncio
 import traceback
 
 from ..base import MemoryProviderBase, logger
@@ -41,8 +42,9 @@ class MemoryProvider(MemoryProviderBase):
                 for message in msgs
                 if message.role != "system"
             ]
-            result = self.client.add(
-                messages, user_id=self.role_id
+            # MemoryClient是同步的HTTP客户端，在线程中调用，不阻塞事件循环
+            result = await asyncio.to_thread(
+                self.client.add, messages, user_id=self.role_id
             )
             logger.bind(tag=TAG).debug(f"Save memory result: {result}")
         except Exception as e:
@@ -58,7 +60,9 @@ class MemoryProvider(MemoryProviderBase):
 
             filters = {"user_id": self.role_id}
 
-            results = self.client.search(query, filters=filters)
+            results = await asyncio.to_thread(
+                self.client.search, query, filters=filters
+            )
             if not results or "results" not in results:
                 return ""
 
@@ -107,6 +107,9 @@ TAG = __name__
 
 
 class MemoryProvider(MemoryProviderBase):
+    # 短期记忆是整段总结，与查询文本无关
+    query_dependent = False
+
     def __init__(self, config, summary_memory):
         super().__init__(config)
         self.short_memory = ""
@@ -0,0 +1,118 @@
+"""
+记忆向量的计算方式
+
+- hash：按字词哈希到固定维度，不需要模型，结果确定，适合离线部署和测试
+- sentence_transformers：本地句向量模型，语义相近的说法也能检索到，需安装sentence-transformers
+- 模块路径:函数名：自定义函数，接收文本列表，返回同样条数的向量
+所有方式返回L2归一化的float32矩阵，内积即余弦相似度。
+"""
+
+import hashlib
+import importlib
+import threading
+from typing import Callable, List
+
+import numpy as np
+
+from config.logger import setup_logging
+from core.utils.textUtils import keyword_tokens
+
+TAG = __name__
+logger = setup_logging()
+
+# 单字匹配的权重
+_UNIGRAM_WEIGHT = 0.5
+
+_models = {}
+_models_lock = threading.Lock()
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors.reshape(1, -1)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class HashingEmbedder:
+    """英文按单词、中文按单字和双字切分，哈希到dim维并带符号累加"""
+
+    # 计算很快，可以直接在事件循环中调用
+    fast = True
+
+    def __init__(self, dim: int = 512):
+        self.dim = int(dim)
+        self.name = f"hash-{self.dim}"
+
+    def _embed_one(self, text: str, out: np.ndarray):
+        for token, weight in keyword_tokens(text, _UNIGRAM_WEIGHT).items():
+            digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            sign = 1.0 if value & 1 else -1.0
+            out[(value >> 1) % self.dim] += sign * weight
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            self._embed_one(text, vectors[i])
+        return _normalize(vectors)
+
+
+class SentenceTransformerEmbedder:
+    """本地句向量模型，进程内按模型目录共用"""
+
+    fast = False
+
+    def __init__(self, model_dir: str):
+        from sentence_transformers import SentenceTransformer
+
+        with _models_lock:
+            model = _models.get(model_dir)
+            if model is None:
+                model = SentenceTransformer(model_dir, device="cpu")
+                _models[model_dir] = model
+                logger.bind(tag=TAG).info(f"记忆句向量模型加载完成: {model_dir}")
+        self.model = model
+        self.dim = int(model.get_sentence_embedding_dimension())
+        self.name = f"st-{model_dir}-{self.dim}"
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        return _normalize(self.model.encode(texts, normalize_embeddings=True))
+
+
+class FunctionEmbedder:
+    """配置中指定的自定义函数"""
+
+    fast = False
+
+    def __init__(self, path: str):
+        module_name, _, func_name = path.partition(":")
+        self.func: Callable = getattr(importlib.import_module(module_name), func_name)
+        # 用一条文本探测向量维度
+        self.dim = int(_normalize(self.func(["维度"])).shape[1])
+        self.name = f"func-{path}-{self.dim}"
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        return _normalize(self.func(texts))
+
+
+def create_embedder(config: dict):
+    """按配置创建，sentence_transformers不可用时退回hash"""
+    kind = config.get("embedding") or "hash"
+    dim = int(config.get("dim", 512))
+    if kind == "sentence_transformers":
+        model_dir = config.get("embedding_model") or ""
+        try:
+            return SentenceTransformerEmbedder(model_dir)
+        except ImportError:
+            logger.bind(tag=TAG).warning(
+                "未安装sentence-transformers，记忆检索使用哈希向量"
+            )
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"记忆句向量模型加载失败，使用哈希向量: {e}")
+        return HashingEmbedder(dim)
+    if ":" in kind:
+        return FunctionEmbedder(kind)
+    return HashingEmbedder(dim)
@@ -0,0 +1,173 @@
+"""
+本地向量记忆
+
+会话结束时用LLM从对话中提取关于用户的事实，按设备保存在本地的向量索引中；
+每轮对话只检索与用户当前说的话最相关的top_k条放入提示词，记忆再多提示词也不会变长。
+检索在本地完成，不需要网络请求，数据不会上传到外部服务器。
+"""
+
+import os
+import re
+import json
+import time
+import asyncio
+from typing import List, Tuple
+
+from ..base import MemoryProviderBase, logger
+from config.config_loader import get_project_dir
+from core.utils.util import check_model_key
+from .embedding import create_embedder
+from .vector_store import open_store
+
+TAG = __name__
+
+extract_memory_prompt = """
+你是一个记忆整理助手，从对话记录中提取关于user本人、在以后的对话中有用的事实，遵循以下规则：
+1、每条事实是一句独立、完整的话，以“用户”开头，例如“用户叫小明”“用户养了一只叫豆豆的猫”
+2、只记录用户的身份、喜好、习惯、经历、计划、人际关系等，用户操控设备、播放音乐、查询天气和时间、退出等内容不需要记录
+3、已有记忆中已经包含的事实不要重复添加
+4、已有记忆中与本次对话冲突或已经过时的，在remove中列出其编号，并在add中添加更新后的事实
+5、没有需要记录的内容时返回空列表
+只返回可解析的json，不需要解释、注释和说明，格式如下：
+{"add": ["事实1", "事实2"], "remove": [编号1, 编号2]}
+"""
+
+# 保存记忆时提供给LLM参考的已有记忆条数
+RELATED_MEMORY_COUNT = 20
+
+
+def _safe_name(role_id: str) -> str:
+    """设备ID中的冒号等字符不能用作目录名"""
+    return re.sub(r"[^0-9A-Za-z_-]", "_", str(role_id))
+
+
+def _query_text(query: str) -> str:
+    """带声纹识别结果时，只用说话内容检索"""
+    text = (query or "").strip()
+    if text.startswith("{") and text.endswith("}"):
+        try:
+            data = json.loads(text)
+            if isinstance(data, dict) and "content" in data:
+                return str(data["content"])
+        except json.JSONDecodeError:
+            pass
+    return text
+
+
+class MemoryProvider(MemoryProviderBase):
+    def __init__(self, config, summary_memory=None):
+        super().__init__(config)
+        self.llm = None
+        self.top_k = int(config.get("top_k", 5))
+        self.min_score = float(config.get("min_score", 0.02))
+        self.max_items = int(config.get("max_items", 1000))
+        self.quantize = str(config.get("quantize", False)).lower() in (
+            "true",
+            "1",
+            "yes",
+        )
+        data_dir = config.get("data_dir") or "data/memory_vector"
+        if not os.path.isabs(data_dir):
+            data_dir = os.path.join(get_project_dir(), data_dir)
+        self.data_dir = data_dir
+        self.embedder = create_embedder(config)
+        self.store = None
+
+    def init_memory(self, role_id, llm, **kwargs):
+        super().init_memory(role_id, llm, **kwargs)
+        self.store = None
+        if not role_id:
+            return
+        try:
+            self.store = open_store(
+                os.path.join(self.data_dir, _safe_name(role_id)),
+                self.embedder,
+                self.quantize,
+            )
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"打开本地向量记忆失败: {e}")
+
+    def _search(self, query: str) -> List[Tuple[float, dict]]:
+        return self.store.search(query, self.top_k, self.min_score)
+
+    async def query_memory(self, query: str) -> str:
+        text = _query_text(query)
+        if self.store is None or not text:
+            return ""
+        try:
+            start = time.perf_counter()
+            if self.embedder.fast:
+                results = self._search(text)
+            else:
+                # 句向量模型计算较慢，在线程中进行，不阻塞事件循环
+                results = await asyncio.to_thread(self._search, text)
+            logger.bind(tag=TAG).debug(
+                f"本地向量记忆检索{len(results)}条，"
+                f"耗时{(time.perf_counter() - start) * 1000:.2f}ms"
+            )
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"查询记忆失败: {e}")
+            return ""
+        return "\n".join(f"- [{item['time']}] {item['text']}" for _, item in results)
+
+    async def save_memory(self, msgs):
+        if self.store is None:
+            return None
+        if self.llm is None:
+            logger.bind(tag=TAG).error("LLM is not set for memory provider")
+            return None
+        memory_key_msg = check_model_key(
+            "记忆总结专用LLM", getattr(self.llm, "api_key", None)
+        )
+        if memory_key_msg:
+            logger.bind(tag=TAG).error(memory_key_msg)
+
+        msgStr = ""
+        user_texts = []
+        for msg in msgs:
+            if msg.role == "user":
+                content = _query_text(msg.content)
+                user_texts.append(content)
+                msgStr += f"User: {content}\n"
+            elif msg.role == "assistant" and msg.content:
+                msgStr += f"Assistant: {msg.content}\n"
+        if not user_texts:
+            return None
+
+        # 与本次对话相关的已有记忆，由LLM判断哪些需要更新
+        related = self.store.search(
+            "\n".join(user_texts), RELATED_MEMORY_COUNT, self.min_score
+        )
+        related_ids = {item["id"] for _, item in related}
+        if related:
+            msgStr += "已有记忆：\n"
+            for _, item in related:
+                msgStr += f"{item['id']}. {item['text']}\n"
+        msgStr += f"当前时间：{time.strftime('%Y-%m-%d %H:%M', time.localtime())}"
+
+        result = self.llm.response_no_stream(
+            extract_memory_prompt, msgStr, max_tokens=1000, temperature=0.2
+        )
+        match = re.search(r"\{.*\}", result or "", re.DOTALL)
+        try:
+            data = json.loads(match.group(0)) if match else {}
+        except json.JSONDecodeError:
+            logger.bind(tag=TAG).error(f"无法解析记忆提取结果: {result}")
+            return None
+
+        # 只删除提供给LLM参考的记忆
+        removed = [
+            i
+            for i in data.get("remove") or []
+            if isinstance(i, int) and i in related_ids
+        ]
+        added = [text for text in data.get("add") or [] if isinstance(text, str)]
+        self.store.delete(removed)
+        time_str = time.strftime("%Y-%m-%d %H:%M", time.localtime())
+        count = self.store.add(added, time_str)
+        self.store.compact(self.max_items)
+        logger.bind(tag=TAG).info(
+            f"Save memory successful - Role: {self.role_id}, "
+            f"新增{count}条，删除{len(removed)}条，共{self.store.count}条"
+        )
+        return count
@@ -0,0 +1,375 @@
+"""
+按设备保存的记忆向量索引
+
+每个设备一个目录：
+- meta.json：向量维度、向量计算方式、是否int8量化
+- vectors.bin：按行追加的向量，float32或int8，检索时以memmap方式读取
+- scales.bin：int8量化时每行的缩放系数
+- items.jsonl：与向量逐行对应的记忆文本和时间，删除记忆时追加一行{"deleted": 行号}
+- lock：多进程模式下各服务进程共用同一目录，读写前对其加文件锁
+新记忆只追加写入；删除的记忆较多或超过条数上限时压缩重写。
+向量计算方式变化时用items.jsonl中的文本重新计算全部向量。
+每次检索和写入前在文件锁内检查文件是否被其他进程修改过，修改过则重新加载，保证向量和文本逐行对应。
+"""
+
+import os
+import json
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:
+    # Windows只支持单进程运行，不需要跨进程加锁
+    fcntl = None
+
+import numpy as np
+
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+# 删除的记忆超过这个比例时压缩
+COMPACT_RATIO = 0.25
+# 删除的记忆少于这个条数时不压缩
+COMPACT_MIN_DELETED = 16
+# 进程内缓存的设备索引数，超出时淘汰最久未使用的，仍在使用的连接不受影响
+MAX_OPEN_STORES = 64
+
+_stores: "OrderedDict[str, VectorStore]" = OrderedDict()
+_stores_lock = threading.Lock()
+
+
+def open_store(path: str, embedder, quantize: bool = False) -> "VectorStore":
+    """同一目录在进程内只打开一次，同一设备的多个连接共用"""
+    path = os.path.abspath(path)
+    with _stores_lock:
+        store = _stores.get(path)
+        if (
+            store is None
+            or store.embedder.name != embedder.name
+            or store.quantize != quantize
+        ):
+            store = VectorStore(path, embedder, quantize)
+            _stores[path] = store
+        _stores.move_to_end(path)
+        while len(_stores) > MAX_OPEN_STORES:
+            _stores.popitem(last=False)
+        return store
+
+
+class VectorStore:
+    def __init__(self, path: str, embedder, quantize: bool = False):
+        self.path = path
+        self.embedder = embedder
+        self.dim = embedder.dim
+        self.quantize = quantize
+        self.dtype = np.int8 if quantize else np.float32
+        self._lock = threading.RLock()
+        # 与向量逐行对应的记忆，None表示已删除
+        self._items: List[Optional[dict]] = []
+        self._matrix = None
+        self._scales = None
+        self._deleted = None
+        # 上次加载或写入后的文件状态，与磁盘不一致说明被其他进程修改过
+        self._state = None
+        os.makedirs(path, exist_ok=True)
+        with self._locked(exclusive=True):
+            self._load()
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    @contextmanager
+    def _locked(self, exclusive: bool):
+        """进程内的线程锁加上跨进程的文件锁，检索用共享锁，写入用排他锁"""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self._file("lock"), "a") as f:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _disk_state(self):
+        state = []
+        for name in ("items.jsonl", "vectors.bin", "scales.bin"):
+            try:
+                stat = os.stat(self._file(name))
+                state.append((stat.st_ino, stat.st_size, stat.st_mtime_ns))
+            except FileNotFoundError:
+                state.append(None)
+        return tuple(state)
+
+    def _rewritten(self) -> bool:
+        """items.jsonl被整体替换过（压缩或重新计算），之前的行号已失效"""
+        old = self._state[0] if self._state else None
+        new = self._disk_state()[0]
+        return old is not None and new is not None and old[0] != new[0]
+
+    def _sync(self):
+        """文件被其他进程修改过时重新加载，需要在文件锁内调用"""
+        if self._disk_state() != self._state:
+            self._close()
+            self._load()
+
+    @property
+    def _meta(self) -> dict:
+        return {
+            "dim": self.dim,
+            "embedding": self.embedder.name,
+            "quantize": self.quantize,
+        }
+
+    def _load(self):
+        items = []
+        if os.path.exists(self._file("items.jsonl")):
+            with open(self._file("items.jsonl"), "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # 写入一半时进程退出，丢弃最后一行
+                        break
+                    if "deleted" in record:
+                        index = record["deleted"]
+                        if 0 <= index < len(items):
+                            items[index] = None
+                    else:
+                        items.append(record)
+
+        meta = {}
+        if os.path.exists(self._file("meta.json")):
+            with open(self._file("meta.json"), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+
+        rows = self._rows_on_disk()
+        if meta != self._meta or rows != len(items):
+            if meta and meta != self._meta:
+                logger.bind(tag=TAG).info(
+                    f"记忆向量计算方式变化，重新计算: {meta} -> {self._meta}"
+                )
+            elif rows != len(items):
+                logger.bind(tag=TAG).warning(
+                    f"记忆索引行数不一致（向量{rows}，文本{len(items)}），重新计算"
+                )
+            self._rewrite([item for item in items if item is not None])
+            return
+        self._items = items
+        self._state = self._disk_state()
+
+    def _rows_on_disk(self) -> int:
+        row_bytes = self.dim * np.dtype(self.dtype).itemsize
+        if not os.path.exists(self._file("vectors.bin")):
+            return 0
+        rows = os.path.getsize(self._file("vectors.bin")) // row_bytes
+        if self.quantize:
+            if not os.path.exists(self._file("scales.bin")):
+                return 0
+            rows = min(rows, os.path.getsize(self._file("scales.bin")) // 4)
+        return rows
+
+    def _encode(self, vectors: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """返回按存储类型编码的向量和int8量化的缩放系数"""
+        if not self.quantize:
+            return vectors.astype(np.float32), None
+        scales = np.abs(vectors).max(axis=1)
+        scales[scales == 0] = 1.0
+        quantized = np.round(vectors / scales[:, None] * 127).astype(np.int8)
+        return quantized, (scales / 127).astype(np.float32)
+
+    def _open(self):
+        """以memmap方式打开向量文件，写入后重新打开"""
+        if self._matrix is not None or not self._items:
+            return
+        rows = len(self._items)
+        self._matrix = np.memmap(
+            self._file("vectors.bin"),
+            dtype=self.dtype,
+            mode="r",
+            shape=(rows, self.dim),
+        )
+        if self.quantize:
+            self._scales = np.memmap(
+                self._file("scales.bin"), dtype=np.float32, mode="r", shape=(rows,)
+            )
+
+    def _close(self):
+        self._matrix = None
+        self._scales = None
+        self._deleted = None
+
+    def _rewrite(self, items: List[dict], encoded=None, scales=None):
+        """用给定的记忆重写整个索引，未提供向量时重新计算"""
+        if encoded is None:
+            vectors = np.zeros((len(items), self.dim), dtype=np.float32)
+            if items:
+                vectors = self.embedder.embed([item["text"] for item in items])
+            encoded, scales = self._encode(vectors)
+        self._close()
+        self._replace("vectors.bin", encoded.tobytes())
+        if scales is not None:
+            self._replace("scales.bin", scales.tobytes())
+        lines = "".join(json.dumps(item, ensure_ascii=False) + "\n" for item in items)
+        self._replace("items.jsonl", lines.encode("utf-8"))
+        self._replace(
+            "meta.json", json.dumps(self._meta, ensure_ascii=False).encode("utf-8")
+        )
+        self._items = list(items)
+        self._state = self._disk_state()
+
+    def _replace(self, name: str, data: bytes):
+        tmp = self._file(name + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, self._file(name))
+
+    def _append(self, name: str, data: bytes):
+        with open(self._file(name), "ab") as f:
+            f.write(data)
+
+    def _scores(self, query: np.ndarray) -> np.ndarray:
+        """所有行与查询向量的余弦相似度，已删除的行为-inf"""
+        self._open()
+        if self.quantize:
+            scores = (self._matrix @ query) * self._scales
+        else:
+            scores = self._matrix @ query
+        scores = np.asarray(scores, dtype=np.float32)
+        if self._deleted is None:
+            self._deleted = np.fromiter(
+                (item is None for item in self._items),
+                dtype=bool,
+                count=len(self._items),
+            )
+        scores[self._deleted] = -np.inf
+        return scores
+
+    def search(
+        self, query: str, top_k: int = 5, min_score: float = 0.0
+    ) -> List[Tuple[float, dict]]:
+        """按余弦相似度返回最相关的记忆，从高到低排列"""
+        vector = self.embedder.embed([query])[0]
+        return self.search_vector(vector, top_k, min_score)
+
+    def search_vector(
+        self, vector: np.ndarray, top_k: int = 5, min_score: float = 0.0
+    ) -> List[Tuple[float, dict]]:
+        if top_k <= 0:
+            return []
+        with self._locked(exclusive=False):
+            if self._disk_state() == self._state:
+                return self._search_vector(vector, top_k, min_score)
+        # 被其他进程修改过，重新加载时可能需要重写文件，改用排他锁
+        with self._locked(exclusive=True):
+            self._sync()
+            return self._search_vector(vector, top_k, min_score)
+
+    def _search_vector(
+        self, vector: np.ndarray, top_k: int, min_score: float
+    ) -> List[Tuple[float, dict]]:
+        if not self._items:
+            return []
+        scores = self._scores(vector)
+        if len(scores) > top_k:
+            candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+        else:
+            candidates = np.arange(len(scores))
+        candidates = candidates[np.argsort(-scores[candidates])]
+        return [
+            (float(scores[i]), dict(self._items[i], id=int(i)))
+            for i in candidates
+            if scores[i] >= min_score and self._items[i] is not None
+        ]
+
+    def add(self, texts: List[str], time_str: str, dedup_score: float = 0.92) -> int:
+        """追加记忆，与已有记忆几乎相同时替换旧的一条，返回新增条数"""
+        texts = [text.strip() for text in texts if text and text.strip()]
+        if not texts:
+            return 0
+        vectors = self.embedder.embed(texts)
+        with self._locked(exclusive=True):
+            self._sync()
+            replaced = []
+            for vector in vectors:
+                for _, item in self._search_vector(vector, 1, dedup_score):
+                    replaced.append(item["id"])
+            encoded, scales = self._encode(vectors)
+            self._close()
+            self._append("vectors.bin", encoded.tobytes())
+            if scales is not None:
+                self._append("scales.bin", scales.tobytes())
+            new_items = [{"text": text, "time": time_str} for text in texts]
+            lines = [json.dumps(item, ensure_ascii=False) for item in new_items]
+            self._append("items.jsonl", ("\n".join(lines) + "\n").encode("utf-8"))
+            self._items.extend(new_items)
+            self._delete(replaced)
+            self._state = self._disk_state()
+        return len(texts)
+
+    def delete(self, ids: List[int]):
+        """按行号删除记忆，行号来自检索结果的id"""
+        if not ids:
+            return
+        with self._locked(exclusive=True):
+            # 行号只在文件未被重写时有效，被其他进程压缩过则放弃本次删除
+            rewritten = self._rewritten()
+            self._sync()
+            if rewritten:
+                logger.bind(tag=TAG).warning(
+                    f"记忆索引已被其他进程重写，跳过删除: {self.path}"
+                )
+                return
+            self._delete(ids)
+            self._state = self._disk_state()
+
+    def _delete(self, ids: List[int]):
+        ids = [i for i in set(ids) if 0 <= i < len(self._items) and self._items[i]]
+        if not ids:
+            return
+        for i in ids:
+            self._items[i] = None
+        self._deleted = None
+        lines = "".join(json.dumps({"deleted": i}) + "\n" for i in sorted(ids))
+        self._append("items.jsonl", lines.encode("utf-8"))
+
+    @property
+    def count(self) -> int:
+        return sum(1 for item in self._items if item is not None)
+
+    def compact(self, max_items: int = 0, force: bool = False) -> bool:
+        """删除的记忆较多或超过条数上限时重写索引，超过上限时保留最新的记忆"""
+        with self._locked(exclusive=True):
+            self._sync()
+            rows = [i for i, item in enumerate(self._items) if item is not None]
+            deleted = len(self._items) - len(rows)
+            over_limit = max_items > 0 and len(rows) > max_items
+            if not force and not over_limit:
+                threshold = max(COMPACT_MIN_DELETED, len(self._items) * COMPACT_RATIO)
+                if deleted < threshold:
+                    return False
+            if over_limit:
+                rows = rows[-max_items:]
+            # 直接复制保留的行，不重新计算向量
+            self._open()
+            if rows:
+                encoded = np.array(self._matrix[rows])
+                scales = np.array(self._scales[rows]) if self.quantize else None
+            else:
+                encoded = np.zeros((0, self.dim), dtype=self.dtype)
+                scales = np.zeros(0, dtype=np.float32) if self.quantize else None
+            alive = [self._items[i] for i in rows]
+            self._rewrite(alive, encoded, scales)
+            logger.bind(tag=TAG).debug(
+                f"记忆索引压缩完成: {self.path}，保留{len(alive)}条"
+            )
+            return True
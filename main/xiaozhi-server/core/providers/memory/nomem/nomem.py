@@ -8,6 +8,8 @@ TAG = __name__
 
 
 class MemoryProvider(MemoryProviderBase):
+    query_dependent = False
+
     def __init__(self, config, summary_memory=None):
         super().__init__(config)
 
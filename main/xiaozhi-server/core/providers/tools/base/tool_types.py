@@ -3,8 +3,8 @@
 from enum import Enum
 
 from dataclasses import dataclass
-from typing import Any, Dict, Optional
-from plugins_func.register import Action
+from typing import Any, Dict, Optional, Tuple
+from plugins_func.register import Action, CachePolicy
 
 
 class ToolType(Enum):
@@ -25,3 +25,5 @@ class ToolDefinition:
     description: Dict[str, Any]  # 工具描述（OpenAI函数调用格式）
     tool_type: ToolType  # 工具类型
     parameters: Optional[Dict[str, Any]] = None  # 额外参数
+    cache: Optional[CachePolicy] = None  # 结果缓存声明
+    invalidates: Tuple[str, ...] = ()  # 调用后需要失效缓存的工具
@@ -24,6 +24,11 @@ class MCPClient:
     def has_tool(self, name: str) -> bool:
         return name in self.tools
 
+    def is_read_only(self, name: str) -> bool:
+        """工具是否标注了readOnlyHint（不修改任何状态）"""
+        annotations = self.tools.get(name, {}).get("annotations") or {}
+        return bool(annotations.get("readOnlyHint"))
+
     def get_available_tools(self) -> list:
         # Check if the cache is valid
         if self._cached_available_tools is not None:
@@ -3,6 +3,7 @@
 from typing import Dict, Any
 from ..base import ToolType, ToolDefinition, ToolExecutor
 from plugins_func.register import Action, ActionResponse
+from ..tool_result_cache import read_only_policy
 from .mcp_handler import call_mcp_tool
 
 
@@ -75,8 +76,15 @@ class DeviceMCPExecutor(ToolExecutor):
             tool_name = func_def.get("name", "")
 
             if tool_name:
+                cache = None
+                if self.conn.mcp_client.is_read_only(tool_name):
+                    # 设备端工具的结果与设备有关，按设备区分缓存
+                    cache = read_only_policy(self.conn.config, "device")
                 tools[tool_name] = ToolDefinition(
-                    name=tool_name, description=tool, tool_type=ToolType.DEVICE_MCP
+                    name=tool_name,
+                    description=tool,
+                    tool_type=ToolType.DEVICE_MCP,
+                    cache=cache,
                 )
 
         return tools
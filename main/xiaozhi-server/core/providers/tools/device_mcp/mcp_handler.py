@@ -176,6 +176,8 @@ async def handle_mcp_message(conn, mcp_client: MCPClient, payload: dict):
                         "description": description,
                         "inputSchema": input_schema,
                     }
+                    if isinstance(tool.get("annotations"), dict):
+                        new_tool["annotations"] = tool["annotations"]
                     await mcp_client.add_tool(new_tool)
                     logger.bind(tag=TAG).debug(f"客户端工具 #{i+1}: {name}")
 
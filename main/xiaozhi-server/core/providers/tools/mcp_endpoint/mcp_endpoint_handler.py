@@ -141,6 +141,8 @@ async def handle_mcp_endpoint_message(mcp_client: MCPEndpointClient, message: st
                             "description": description,
                             "inputSchema": input_schema,
                         }
+                        if isinstance(tool.get("annotations"), dict):
+                            new_tool["annotations"] = tool["annotations"]
                         await mcp_client.add_tool(new_tool)
                         logger.bind(tag=TAG).debug(f"MCP接入点工具 #{i+1}: {name}")
 
@@ -79,6 +79,12 @@ class ServerMCPClient:
         """
         return name in self.tools_dict
 
+    def is_read_only(self, name: str) -> bool:
+        """工具是否标注了readOnlyHint（不修改任何状态）"""
+        tool = self.tools_dict.get(name)
+        annotations = getattr(tool, "annotations", None)
+        return bool(getattr(annotations, "readOnlyHint", False))
+
     def get_available_tools(self) -> List[Dict[str, Any]]:
         """获取所有可用工具的定义
 
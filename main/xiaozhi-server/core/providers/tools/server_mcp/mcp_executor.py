@@ -4,6 +4,7 @@ from typing import Dict, Any, Optional
 from ..base import ToolType, ToolDefinition, ToolExecutor
 from plugins_func.register import Action, ActionResponse
 from .mcp_manager import ServerMCPManager
+from ..tool_result_cache import read_only_policy
 
 
 class ServerMCPExecutor(ToolExecutor):
@@ -65,8 +66,14 @@ class ServerMCPExecutor(ToolExecutor):
             tool_name = func_def.get("name", "")
             if tool_name == "":
                 continue
+            cache = None
+            if self.mcp_manager.is_read_only_tool(tool_name):
+                cache = read_only_policy(self.conn.config, "global")
             tools[tool_name] = ToolDefinition(
-                name=tool_name, description=tool, tool_type=ToolType.SERVER_MCP
+                name=tool_name,
+                description=tool,
+                tool_type=ToolType.SERVER_MCP,
+                cache=cache,
             )
 
         return tools
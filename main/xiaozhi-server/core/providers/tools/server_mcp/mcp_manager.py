@@ -87,6 +87,13 @@ class ServerMCPManager:
                 return True
         return False
 
+    def is_read_only_tool(self, tool_name: str) -> bool:
+        """检查MCP工具是否标注为只读"""
+        return any(
+            client.has_tool(tool_name) and client.is_read_only(tool_name)
+            for client in self.clients.values()
+        )
+
     async def execute_tool(self, tool_name: str, arguments: Dict[str, Any]) -> Any:
         """执行工具调用，失败时会尝试重新连接"""
         logger.bind(tag=TAG).info(f"执行服务端MCP工具 {tool_name}，参数: {arguments}")
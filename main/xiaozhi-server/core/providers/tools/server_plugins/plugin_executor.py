@@ -88,6 +88,8 @@ class ServerPluginExecutor(ToolExecutor):
                     name=func_name,
                     description=func_item.description,
                     tool_type=ToolType.SERVER_PLUGIN,
+                    cache=func_item.cache,
+                    invalidates=func_item.invalidates,
                 )
 
         return tools
@@ -0,0 +1,181 @@
+"""
+工具结果缓存
+
+天气、农历、新闻详情、只读的MCP工具等，相同参数在一段时间内的结果不变，
+每次都调用外部接口会让用户多等一次网络往返。工具在注册时声明CachePolicy后：
+- ttl内相同参数（key_args指定的参数）的调用直接返回缓存的结果
+- 同时进行的相同调用只执行一次，其余调用等待并共用结果
+- 声明了invalidates的工具（如设置设备状态）执行后失效对应工具的缓存
+只缓存REQLLM和RESPONSE结果，出错、需要执行动作、没有内容或工具标记为cacheable=False的结果不缓存。
+"""
+
+import json
+import asyncio
+import hashlib
+from typing import Any, Dict, Optional
+
+from config.logger import setup_logging
+from core.utils.cache.config import CacheType
+from core.utils.cache.manager import cache_manager
+from plugins_func.register import Action, ActionResponse, CachePolicy
+from .base import ToolDefinition
+
+TAG = __name__
+logger = setup_logging()
+
+_CACHEABLE_ACTIONS = (Action.REQLLM, Action.RESPONSE)
+
+# 进行中的调用，key -> Future，同一个事件循环中的相同调用共用结果
+_in_flight: Dict[str, asyncio.Future] = {}
+
+
+def read_only_policy(config: Dict[str, Any], scope: str) -> Optional[CachePolicy]:
+    """MCP工具标注了readOnlyHint时的默认缓存声明，mcp_read_only_ttl为0时不缓存"""
+    options = config.get("tool_cache") or {}
+    ttl = float(options.get("mcp_read_only_ttl", 30))
+    return CachePolicy(ttl=ttl, scope=scope) if ttl > 0 else None
+
+
+def _jsonable(value) -> bool:
+    try:
+        json.dumps(value, ensure_ascii=False)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
+class ToolResultCache:
+    """按工具的缓存声明读写工具结果，每个连接一个实例"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        options = conn.config.get("tool_cache") or {}
+        self.enabled = str(options.get("enabled", True)).lower() in (
+            "true",
+            "1",
+            "yes",
+        )
+        # 配置中按工具名称覆盖缓存声明，ttl为0表示不缓存
+        self.overrides = options.get("tools") or {}
+
+    def policy(self, tool: Optional[ToolDefinition]) -> Optional[CachePolicy]:
+        if not self.enabled or tool is None:
+            return None
+        if tool.name in self.overrides:
+            return CachePolicy.from_config(self.overrides[tool.name])
+        return tool.cache
+
+    def make_key(
+        self, tool_name: str, policy: CachePolicy, arguments: Dict[str, Any]
+    ) -> Optional[str]:
+        """生成缓存key，返回None时本次调用不缓存"""
+        if not isinstance(arguments, dict):
+            return None
+        extra = ""
+        if policy.key is not None:
+            try:
+                extra = policy.key(self.conn, arguments)
+            except Exception as e:
+                logger.bind(tag=TAG).debug(f"工具{tool_name}缓存key生成失败: {e}")
+                return None
+            if extra is None:
+                return None
+        if policy.key_args is None:
+            selected = arguments
+        else:
+            selected = {
+                name: arguments[name]
+                for name in policy.key_args
+                if arguments.get(name) not in (None, "")
+            }
+        try:
+            material = json.dumps(
+                [selected, extra], ensure_ascii=False, sort_keys=True, default=str
+            )
+        except (TypeError, ValueError):
+            return None
+        digest = hashlib.sha1(material.encode("utf-8")).hexdigest()
+        if policy.scope == "device":
+            return f"{tool_name}:{self.conn.device_id}:{digest}"
+        return f"{tool_name}:{digest}"
+
+    async def get(self, key: str) -> Optional[ActionResponse]:
+        cached = await cache_manager.aget(CacheType.TOOL_RESULT, key)
+        if cached is None:
+            return None
+        action_name, result, response = cached
+        return ActionResponse(
+            action=Action[action_name], result=result, response=response
+        )
+
+    async def set(self, key: str, policy: CachePolicy, response: ActionResponse):
+        if not isinstance(response, ActionResponse):
+            return
+        if response.action not in _CACHEABLE_ACTIONS or not response.cacheable:
+            return
+        content = (
+            response.result if response.action == Action.REQLLM else response.response
+        )
+        if content is None:
+            return
+        if not (_jsonable(response.result) and _jsonable(response.response)):
+            return
+        await cache_manager.aset(
+            CacheType.TOOL_RESULT,
+            key,
+            (response.action.name, response.result, response.response),
+            ttl=policy.ttl,
+        )
+
+    async def invalidate(self, tool: Optional[ToolDefinition]):
+        """工具执行后失效其声明的其他工具的缓存"""
+        if tool is None:
+            return
+        for name in tool.invalidates:
+            count = await cache_manager.ainvalidate_pattern(
+                CacheType.TOOL_RESULT, f"{name}:"
+            )
+            if count:
+                logger.bind(tag=TAG).debug(
+                    f"{tool.name}执行后失效{name}的{count}条缓存"
+                )
+
+    async def execute(self, tool: Optional[ToolDefinition], arguments, run):
+        """
+        执行工具调用，run为实际执行的协程函数
+        命中缓存时不执行；相同的调用正在进行时等待其结果
+        """
+        policy = self.policy(tool)
+        key = self.make_key(tool.name, policy, arguments) if policy else None
+        if key is None:
+            result = await run()
+            await self.invalidate(tool)
+            return result
+
+        cached = await self.get(key)
+        if cached is not None:
+            logger.bind(tag=TAG).info(f"工具{tool.name}命中结果缓存")
+            return cached
+
+        loop = asyncio.get_running_loop()
+        pending = _in_flight.get(key)
+        if pending is not None and pending.get_loop() is loop:
+            logger.bind(tag=TAG).info(f"工具{tool.name}相同的调用进行中，等待其结果")
+            result = await asyncio.shield(pending)
+            if result is not None:
+                return result
+            # 进行中的调用被取消，改为自己执行
+            return await run()
+
+        future = loop.create_future()
+        _in_flight[key] = future
+        result = None
+        try:
+            result = await run()
+            await self.set(key, policy, result)
+            return result
+        finally:
+            if _in_flight.get(key) is future:
+                del _in_flight[key]
+            future.set_result(result)
+            await self.invalidate(tool)
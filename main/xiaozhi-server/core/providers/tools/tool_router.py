@@ -0,0 +1,172 @@
+"""工具路由：每轮对话只向大模型提供与用户消息相关的工具"""
+
+import math
+import threading
+from typing import Any, Dict, List, Optional
+
+from config.logger import setup_logging
+from core.utils.textUtils import keyword_tokens
+
+TAG = __name__
+logger = setup_logging()
+
+# 单字匹配的权重，双字词更能代表意图
+_UNIGRAM_WEIGHT = 0.3
+
+_embedding_models = {}
+_embedding_lock = threading.Lock()
+
+
+def _tool_text(description: Dict[str, Any]) -> str:
+    """工具名称、描述和参数说明拼成的检索文本"""
+    function = description.get("function", description)
+    parts = [function.get("name", ""), function.get("description", "")]
+    properties = (function.get("parameters") or {}).get("properties") or {}
+    for name, prop in properties.items():
+        parts.append(name)
+        if isinstance(prop, dict):
+            parts.append(str(prop.get("description", "")))
+    return " ".join(parts)
+
+
+def tool_name(description: Dict[str, Any]) -> str:
+    return description.get("function", description).get("name", "")
+
+
+def _load_embedding_model(model_dir: str):
+    """加载本地句向量模型，进程内共用；未安装sentence-transformers时返回None"""
+    with _embedding_lock:
+        if model_dir in _embedding_models:
+            return _embedding_models[model_dir]
+        model = None
+        try:
+            from sentence_transformers import SentenceTransformer
+
+            model = SentenceTransformer(model_dir, device="cpu")
+            logger.bind(tag=TAG).info(f"工具路由句向量模型加载完成: {model_dir}")
+        except ImportError:
+            logger.bind(tag=TAG).warning(
+                "未安装sentence-transformers，工具路由只使用关键词匹配"
+            )
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"工具路由句向量模型加载失败: {e}")
+        _embedding_models[model_dir] = model
+        return model
+
+
+class _ToolIndex:
+    """一组工具描述的检索索引，工具列表变化时重建"""
+
+    def __init__(self, functions: List[Dict[str, Any]], model=None):
+        self.functions = functions
+        self.names = [tool_name(f) for f in functions]
+        texts = [_tool_text(f) for f in functions]
+        self.docs = [keyword_tokens(text, _UNIGRAM_WEIGHT) for text in texts]
+        df = {}
+        for doc in self.docs:
+            for token in doc:
+                df[token] = df.get(token, 0) + 1
+        count = len(self.docs)
+        self.idf = {token: math.log(1 + count / n) for token, n in df.items()}
+        self.model = model
+        self.vectors = None
+        if model is not None:
+            self.vectors = model.encode(texts, normalize_embeddings=True)
+
+    def scores(self, query: str, embedding_weight: float) -> List[float]:
+        query_tokens = keyword_tokens(query, _UNIGRAM_WEIGHT)
+        lexical = []
+        for doc in self.docs:
+            score = 0.0
+            for token, weight in query_tokens.items():
+                if token in doc:
+                    score += weight * doc[token] * self.idf[token]
+            lexical.append(score)
+        top = max(lexical, default=0.0)
+        if top > 0:
+            lexical = [score / top for score in lexical]
+        if self.vectors is None or embedding_weight <= 0:
+            return lexical
+        query_vector = self.model.encode([query], normalize_embeddings=True)[0]
+        semantic = (self.vectors @ query_vector).tolist()
+        return [
+            (1 - embedding_weight) * lex + embedding_weight * max(0.0, sem)
+            for lex, sem in zip(lexical, semantic)
+        ]
+
+
+class ToolRouter:
+    """
+    按用户消息挑选本轮提供给大模型的工具：
+    - 工具总数不超过min_tools时不筛选
+    - pinned中的工具和最近recent_turns轮调用过的工具始终提供
+    - 其余工具按与用户消息的相关度（关键词匹配，配置了本地句向量模型时加上语义相似度）取前top_k个
+    """
+
+    def __init__(self, options: Optional[dict]):
+        options = options or {}
+        self.enabled = str(options.get("enabled", False)).lower() in (
+            "true",
+            "1",
+            "yes",
+        )
+        self.min_tools = int(options.get("min_tools", 12))
+        self.top_k = int(options.get("top_k", 8))
+        self.min_score = float(options.get("min_score", 0.2))
+        self.pinned = set(options.get("pinned") or [])
+        self.recent_turns = int(options.get("recent_turns", 2))
+        self.embedding_model = options.get("embedding_model") or ""
+        self.embedding_weight = float(options.get("embedding_weight", 0.5))
+        self._index: Optional[_ToolIndex] = None
+        self._turn = 0
+        self._recent: Dict[str, int] = {}
+
+    def start_turn(self):
+        """新的一轮对话开始"""
+        self._turn += 1
+
+    def note_used(self, name: str):
+        """记录调用过的工具，接下来几轮的追问（如“再大一点”）仍然提供"""
+        self._recent[name] = self._turn
+
+    def _get_index(self, functions: List[Dict[str, Any]]) -> _ToolIndex:
+        # 工具管理器在工具变化时生成新的列表，列表对象不变时复用索引
+        if self._index is None or self._index.functions is not functions:
+            model = None
+            if self.embedding_model and self.embedding_weight > 0:
+                model = _load_embedding_model(self.embedding_model)
+            self._index = _ToolIndex(functions, model)
+        return self._index
+
+    def select(
+        self, query: str, functions: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """返回本轮提供的工具，保持原有顺序"""
+        if not self.enabled or not query or len(functions) <= self.min_tools:
+            return functions
+        try:
+            index = self._get_index(functions)
+            scores = index.scores(query, self.embedding_weight)
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"工具路由失败，提供全部工具: {e}")
+            return functions
+
+        keep = set()
+        for i, name in enumerate(index.names):
+            used = self._recent.get(name)
+            if name in self.pinned or (
+                used is not None and self._turn - used <= self.recent_turns
+            ):
+                keep.add(i)
+        ranked = sorted(
+            (i for i in range(len(functions)) if i not in keep),
+            key=lambda i: scores[i],
+            reverse=True,
+        )
+        keep.update(i for i in ranked[: self.top_k] if scores[i] >= self.min_score)
+        selected = [functions[i] for i in sorted(keep)]
+        logger.bind(tag=TAG).debug(
+            f"工具路由: 提供{len(selected)}/{len(functions)}个工具 "
+            f"{[index.names[i] for i in sorted(keep)]}"
+        )
+        return selected
@@ -8,6 +8,8 @@ from plugins_func.loadplugins import auto_import_modules
 from .base import ToolType
 from plugins_func.register import Action, ActionResponse
 from .unified_tool_manager import ToolManager
+from .tool_router import ToolRouter
+from .tool_result_cache import ToolResultCache
 from .server_plugins import ServerPluginExecutor
 from .server_mcp import ServerMCPExecutor
 from .device_iot import DeviceIoTExecutor
@@ -50,6 +52,12 @@ class UnifiedToolHandler:
             ToolType.MCP_ENDPOINT, self.mcp_endpoint_executor
         )
 
+        # 按用户消息筛选每轮提供的工具
+        self.tool_router = ToolRouter(self.config.get("tool_routing"))
+
+        # 按工具的缓存声明复用调用结果
+        self.result_cache = ToolResultCache(conn)
+
         # 初始化标志
         self.finish_init = False
 
@@ -116,9 +124,16 @@ class UnifiedToolHandler:
         except Exception as e:
             self.logger.error(f"初始化Home Assistant失败: {e}")
 
-    def get_functions(self) -> List[Dict[str, Any]]:
-        """获取所有工具的函数描述"""
-        return self.tool_manager.get_function_descriptions()
+    def get_functions(self, query: Optional[str] = None) -> List[Dict[str, Any]]:
+        """获取工具的函数描述，传入用户消息且开启了工具路由时只返回与其相关的工具"""
+        functions = self.tool_manager.get_function_descriptions()
+        if query is None:
+            return functions
+        return self.tool_router.select(query, functions)
+
+    def start_turn(self):
+        """新的一轮对话开始"""
+        self.tool_router.start_turn()
 
     def current_support_functions(self) -> List[str]:
         """获取当前支持的函数名称列表"""
@@ -144,7 +159,8 @@ class UnifiedToolHandler:
             if "function_calls" in function_call_data:
                 responses = []
                 for call in function_call_data["function_calls"]:
-                    result = await self.tool_manager.execute_tool(
+                    self.tool_router.note_used(call["name"])
+                    result = await self._execute_tool(
                         call["name"], call.get("arguments", {})
                     )
                     responses.append(result)
@@ -153,6 +169,7 @@ class UnifiedToolHandler:
             # 处理单函数调用
             function_name = function_call_data["name"]
             arguments = function_call_data.get("arguments", {})
+            self.tool_router.note_used(function_name)
 
             # 如果arguments是字符串，尝试解析为JSON
             if isinstance(arguments, str):
@@ -168,13 +185,24 @@ class UnifiedToolHandler:
             self.logger.debug(f"调用函数: {function_name}, 参数: {arguments}")
 
             # 执行工具调用
-            result = await self.tool_manager.execute_tool(function_name, arguments)
+            result = await self._execute_tool(function_name, arguments)
             return result
 
         except Exception as e:
             self.logger.error(f"处理function call错误: {e}")
             return ActionResponse(action=Action.ERROR, response=str(e))
 
+    async def _execute_tool(
+        self, function_name: str, arguments: Dict[str, Any]
+    ) -> ActionResponse:
+        """执行工具调用，声明了缓存的工具优先使用缓存的结果"""
+        tool = self.tool_manager.get_all_tools().get(function_name)
+        return await self.result_cache.execute(
+            tool,
+            arguments,
+            lambda: self.tool_manager.execute_tool(function_name, arguments),
+        )
+
     def _combine_responses(self, responses: List[ActionResponse]) -> ActionResponse:
         """合并多个函数调用的响应"""
         if not responses:
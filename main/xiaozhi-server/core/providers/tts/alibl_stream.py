@@ -18,6 +18,15 @@ logger = setup_logging()
 
 
 class TTSProvider(TTSProviderBase):
+    cache_key_params = (
+        "model",
+        "voice",
+        "format",
+        "sample_rate",
+        "volume",
+        "rate",
+        "pitch",
+    )
     def __init__(self, config, delete_audio_file):
         super().__init__(config, delete_audio_file)
 
@@ -86,6 +86,16 @@ class AccessToken:
 
 
 class TTSProvider(TTSProviderBase):
+    cache_key_params = (
+        "appkey",
+        "host",
+        "voice",
+        "format",
+        "sample_rate",
+        "volume",
+        "speech_rate",
+        "pitch_rate",
+    )
     def __init__(self, config, delete_audio_file):
         super().__init__(config, delete_audio_file)
 
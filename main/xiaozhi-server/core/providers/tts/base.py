@@ -9,13 +9,16 @@ import traceback
 from core.utils import p3
 from datetime import datetime
 from core.utils import textUtils
-from typing import Callable, Any
+from typing import AsyncIterator, Callable, Any
 from abc import ABC, abstractmethod
 from config.logger import setup_logging
 from core.utils.tts import MarkdownCleaner
+from core.utils.tts_cache import get_tts_cache
+from core.utils.audio_stream_decoder import StreamingAudioDecoder
+from core.utils.tts_pipeline import OrderedSynthesisPipeline, provider_limiter
 from core.utils.output_counter import add_device_output
 from core.handle.reportHandle import enqueue_tts_report
-from core.handle.sendAudioHandle import sendAudioMessage
+from core.handle.sendAudioHandle import sendAudioMessage, enqueue_audio
 from core.utils.util import audio_bytes_to_data_stream, audio_to_data_stream
 from core.providers.tts.dto.dto import (
     TTSMessageDTO,
@@ -27,8 +30,17 @@ from core.providers.tts.dto.dto import (
 TAG = __name__
 logger = setup_logging()
 
+# 强制切分时优先选择的边界
+SOFT_BOUNDARIES = set("，。！？、；：,.!?;:~ \n\t）)」』》")
+
 
 class TTSProviderBase(ABC):
+    # 实现了audio_chunks（分块返回合成的音频）的提供者设为True
+    supports_audio_chunks = False
+    # 影响合成结果的属性名，用于计算合成语音缓存的key，不要包含鉴权信息；
+    # 为None时不使用合成语音缓存
+    cache_key_params = None
+
     def __init__(self, config, delete_audio_file):
         self.interface_type = InterfaceType.NON_STREAM
         self.conn = None
@@ -39,6 +51,9 @@ class TTSProviderBase(ABC):
         self.tts_audio_queue = queue.Queue()
         self.tts_audio_first_sentence = True
         self.before_stop_play_files = []
+        # 有序并行合成，同一提供者在进程内的最大并发请求数，未配置时使用tts_parallel的默认值
+        self.max_concurrency = config.get("max_concurrency")
+        self.synthesis_pipeline = None
 
         self.tts_text_buff = []
         self.punctuations = (
@@ -68,6 +83,21 @@ class TTSProviderBase(ABC):
         self.tts_stop_request = False
         self.processed_chars = 0
         self.is_first_sentence = True
+        # 分段策略：首段累计到一定字数或等待超时后，在最合适的边界提前切分，首句音频的延迟有上限；
+        # 之后的分段逐步加长，以逗号切分需要的最小字数每段翻倍，直到只按句末标点切分
+        self.first_segment_min_chars = 20
+        self.first_segment_max_wait_ms = 800
+        self.segment_max_chars = 80
+        self.segment_index = 0
+        self.first_text_time = None
+        # 合成语音缓存：不为None时，handle_opus收到的音频帧同时记录下来，合成成功后写入缓存
+        self._speech_capture = None
+        # 提供者支持分块返回音频时边下载边解码，设为false时仍下载完整音频后再解码
+        self.stream_decode = str(config.get("stream_decode", True)).lower() in (
+            "true",
+            "1",
+            "yes",
+        )
 
     def generate_filename(self, extension=".wav"):
         return os.path.join(
@@ -76,22 +106,79 @@ class TTSProviderBase(ABC):
         )
 
     def handle_opus(self, opus_data: bytes):
+        if self._speech_capture is not None:
+            self._speech_capture.append(opus_data)
         logger.bind(tag=TAG).debug(f"推送数据到队列里面帧数～～ {len(opus_data)}")
         self.tts_audio_queue.put((SentenceType.MIDDLE, opus_data, None))
 
     def handle_audio_file(self, file_audio: bytes, text):
         self.before_stop_play_files.append((file_audio, text))
 
-    def to_tts_stream(self, text, opus_handler: Callable[[bytes], None] = None) -> None:
+    def _lookup_speech_cache(self, text, audio_format=None):
+        """查询合成语音缓存，返回(缓存, key, 音频帧)，文本不可缓存时缓存为None"""
+        if self.conn is None:
+            return None, None, None
+        cache = get_tts_cache(self.conn.config)
+        if cache is None or not cache.cacheable(self, text):
+            return None, None, None
+        key = cache.make_key(self, text, audio_format or self.conn.audio_format)
+        return cache, key, cache.get(key)
+
+    def _replay_cached_speech(self, text, frames, opus_handler, audio_queue=None):
+        """缓存命中，直接推送缓存的音频帧"""
+        logger.bind(tag=TAG).info(f"语音缓存命中: {text}")
+        (audio_queue or self.tts_audio_queue).put((SentenceType.FIRST, None, text))
+        for frame in frames:
+            opus_handler(frame)
+
+    @staticmethod
+    def _capture_frames(handler, frames):
+        """包装音频帧回调，同时记录推送的帧"""
+
+        def capture(opus_data):
+            frames.append(opus_data)
+            handler(opus_data)
+
+        return capture
+
+    def _start_speech_capture(self, cache):
+        self._speech_capture = [] if cache is not None else None
+
+    def _finish_speech_capture(self, cache, key, success=True):
+        """结束记录音频帧，合成成功时写入缓存"""
+        frames, self._speech_capture = self._speech_capture, None
+        if cache is not None and success and frames:
+            cache.put(key, frames)
+
+    def to_tts_stream(
+        self, text, opus_handler: Callable[[bytes], None] = None, audio_queue=None
+    ) -> None:
         text = MarkdownCleaner.clean_markdown(text)
+        # 并行合成时句子开始标记写入该句的输出槽位，由流水线按顺序转入播放队列
+        audio_queue = audio_queue or self.tts_audio_queue
+        cache, cache_key, cached_frames = self._lookup_speech_cache(text)
+        if cached_frames:
+            self._replay_cached_speech(text, cached_frames, opus_handler, audio_queue)
+            return None
+        captured = []
+        if cache is not None:
+            # 合成过程中记录推送的音频帧
+            opus_handler = self._capture_frames(opus_handler, captured)
+
         max_repeat_time = 5
+        if self.delete_audio_file and self._supports_audio_chunks():
+            # 边下载边解码
+            if self._stream_speech(text, opus_handler, audio_queue):
+                if cache is not None and captured:
+                    cache.put(cache_key, captured)
+            return None
         if self.delete_audio_file:
             # 需要删除文件的直接转为音频数据
             while max_repeat_time > 0:
                 try:
                     audio_bytes = asyncio.run(self.text_to_speak(text, None))
                     if audio_bytes:
-                        self.tts_audio_queue.put((SentenceType.FIRST, None, text))
+                        audio_queue.put((SentenceType.FIRST, None, text))
                         audio_bytes_to_data_stream(
                             audio_bytes,
                             file_type=self.audio_file_type,
@@ -110,6 +197,8 @@ class TTSProviderBase(ABC):
                 logger.bind(tag=TAG).info(
                     f"语音生成成功: {text}，重试{5 - max_repeat_time}次"
                 )
+                if cache is not None and captured:
+                    cache.put(cache_key, captured)
             else:
                 logger.bind(tag=TAG).error(
                     f"语音生成失败: {text}，请检查网络或服务是否正常"
@@ -138,16 +227,75 @@ class TTSProviderBase(ABC):
                     logger.bind(tag=TAG).error(
                         f"语音生成失败: {text}，请检查网络或服务是否正常"
                     )
-                    self.tts_audio_queue.put((SentenceType.FIRST, None, text))
+                    audio_queue.put((SentenceType.FIRST, None, text))
                 self._process_audio_file_stream(tmp_file, callback=opus_handler)
+                if cache is not None and max_repeat_time > 0 and captured:
+                    cache.put(cache_key, captured)
             except Exception as e:
                 logger.bind(tag=TAG).error(f"Failed to generate TTS file: {e}")
                 return None
     
+    def _supports_audio_chunks(self) -> bool:
+        return self.stream_decode and self.supports_audio_chunks
+
+    def audio_chunks(self, text) -> AsyncIterator[bytes]:
+        """按到达顺序逐块返回合成的音频（格式为audio_file_type）
+
+        支持分块下载的提供者以异步生成器重写，并把supports_audio_chunks设为True。
+        """
+        raise NotImplementedError
+
+    async def _feed_audio_chunks(self, text, decoder, on_first_chunk):
+        async for chunk in self.audio_chunks(text):
+            if not chunk:
+                continue
+            if decoder.bytes_fed == 0:
+                on_first_chunk()
+            decoder.feed(chunk)
+
+    def _stream_speech(self, text, opus_handler, audio_queue) -> bool:
+        """下载的同时解码，每解出60ms音频就推送一帧；还没收到音频时失败才重试，返回是否成功"""
+        for attempt in range(1, 6):
+            decoder = StreamingAudioDecoder(
+                self.audio_file_type, opus_handler, is_opus=True
+            )
+            try:
+                asyncio.run(
+                    self._feed_audio_chunks(
+                        text,
+                        decoder,
+                        lambda: audio_queue.put((SentenceType.FIRST, None, text)),
+                    )
+                )
+                if decoder.bytes_fed == 0:
+                    logger.bind(tag=TAG).warning(
+                        f"语音生成失败{attempt}次: {text}，未返回音频"
+                    )
+                    continue
+                decoder.finish()
+                logger.bind(tag=TAG).info(
+                    f"语音生成成功: {text}，重试{attempt - 1}次，共{decoder.frames}帧"
+                )
+                return True
+            except Exception as e:
+                decoder.abort()
+                logger.bind(tag=TAG).warning(
+                    f"语音生成失败{attempt}次: {text}，错误: {e}"
+                )
+                if decoder.bytes_fed > 0:
+                    # 已经开始播放，重试会重复播放开头
+                    break
+        logger.bind(tag=TAG).error(f"语音生成失败: {text}，请检查网络或服务是否正常")
+        return False
+
     def to_tts(self, text):
         text = MarkdownCleaner.clean_markdown(text)
         max_repeat_time = 5
         if self.delete_audio_file:
+            # 返回opus帧列表时可以使用语音缓存
+            cache, cache_key, cached_frames = self._lookup_speech_cache(text, "opus")
+            if cached_frames:
+                return list(cached_frames)
             # 需要删除文件的直接转为音频数据
             while max_repeat_time > 0:
                 try:
@@ -160,6 +308,8 @@ class TTSProviderBase(ABC):
                             is_opus=True,
                             callback=lambda data: audio_datas.append(data)
                         )
+                        if cache is not None:
+                            cache.put(cache_key, audio_datas)
                         return audio_datas
                     else:
                         max_repeat_time -= 1
@@ -264,43 +414,128 @@ class TTSProviderBase(ABC):
         )
         self.audio_play_priority_thread.start()
 
+        parallel = conn.config.get("tts_parallel") or {}
+        max_concurrency = self.max_concurrency
+        if max_concurrency in (None, ""):
+            max_concurrency = parallel.get("provider_max_concurrency", 8)
+        self.synthesis_pipeline = OrderedSynthesisPipeline(
+            self.tts_audio_queue,
+            int(parallel.get("max_pending", 3)),
+            provider_limiter(type(self).__module__, int(max_concurrency)),
+        )
+
+    def _synthesize_segment(self, text):
+        """把一段文本交给合成流水线，音频按提交顺序进入播放队列"""
+
+        def synthesize(sink):
+            self.to_tts_stream(
+                text,
+                opus_handler=lambda opus_data: sink.put(
+                    (SentenceType.MIDDLE, opus_data, None)
+                ),
+                audio_queue=sink,
+            )
+
+        self.synthesis_pipeline.submit(synthesize)
+
+    def _play_file_in_order(self, tts_file):
+        """音频文件排在已提交的句子之后播放"""
+
+        def play(sink):
+            self._process_audio_file_stream(
+                tts_file,
+                callback=lambda opus_data: sink.put(
+                    (SentenceType.MIDDLE, opus_data, None)
+                ),
+            )
+
+        self.synthesis_pipeline.submit(play)
+
+    def cancel_pending_synthesis(self):
+        """打断时取消流水线中未播放的句子"""
+        if self.synthesis_pipeline is not None:
+            self.synthesis_pipeline.cancel()
+
+    def _reset_segmenter(self):
+        """开始新的一轮回复时重置分段状态"""
+        self.is_first_sentence = True
+        self.segment_index = 0
+        self.first_text_time = None
+        options = (self.conn.config.get("tts_segment") or {}) if self.conn else {}
+        self.first_segment_min_chars = int(options.get("first_segment_min_chars", 20))
+        self.first_segment_max_wait_ms = int(
+            options.get("first_segment_max_wait_ms", 800)
+        )
+        self.segment_max_chars = int(options.get("segment_max_chars", 80))
+
+    def _first_segment_pending(self) -> bool:
+        """首段是否还有等待切分的文本"""
+        if (
+            self.tts_stop_request
+            or not self.is_first_sentence
+            or self.first_text_time is None
+        ):
+            return False
+        if "".join(self.tts_text_buff)[self.processed_chars :].strip():
+            return True
+        # 剩余文本已在LAST/FILE时整体送去合成，不再按首段超时轮询
+        self.first_text_time = None
+        return False
+
+    def _segment_wait_timeout(self) -> float:
+        """文本队列的等待时间，首段有未合成的文本时最多等到首段超时"""
+        if self._first_segment_pending():
+            deadline = self.first_text_time + self.first_segment_max_wait_ms / 1000
+            return min(1.0, max(0.01, deadline - time.monotonic()))
+        return 1.0
+
+    def _get_deadline_segment(self):
+        """文本队列等待超时时调用，首段超过最长等待时间则提前切分"""
+        if not self._first_segment_pending():
+            return None
+        return self._get_segment_text()
+
     # 这里默认是非流式的处理方式
     # 流式处理方式请在子类中重写
     def tts_text_priority_thread(self):
         while not self.conn.stop_event.is_set():
             try:
-                message = self.tts_text_queue.get(timeout=1)
+                message = self.tts_text_queue.get(timeout=self._segment_wait_timeout())
                 if message.sentence_type == SentenceType.FIRST:
                     self.conn.client_abort = False
                 if self.conn.client_abort:
                     logger.bind(tag=TAG).info("收到打断信息，终止TTS文本处理线程")
                     continue
                 if message.sentence_type == SentenceType.FIRST:
+                    # 上一轮未播放完的句子不再输出
+                    self.cancel_pending_synthesis()
                     # 初始化参数
                     self.tts_stop_request = False
                     self.processed_chars = 0
                     self.tts_text_buff = []
-                    self.is_first_sentence = True
+                    self._reset_segmenter()
                     self.tts_audio_first_sentence = True
                 elif ContentType.TEXT == message.content_type:
                     self.tts_text_buff.append(message.content_detail)
                     segment_text = self._get_segment_text()
                     if segment_text:
-                        self.to_tts_stream(segment_text, opus_handler=self.handle_opus)
+                        self._synthesize_segment(segment_text)
                 elif ContentType.FILE == message.content_type:
-                    self._process_remaining_text_stream(opus_handler=self.handle_opus)
+                    self._process_remaining_text_stream()
                     tts_file = message.content_file
                     if tts_file and os.path.exists(tts_file):
-                        self._process_audio_file_stream(
-                            tts_file, callback=self.handle_opus
-                        )
+                        self._play_file_in_order(tts_file)
                 if message.sentence_type == SentenceType.LAST:
-                    self._process_remaining_text_stream(opus_handler=self.handle_opus)
-                    self.tts_audio_queue.put(
+                    self._process_remaining_text_stream()
+                    self.synthesis_pipeline.put(
                         (message.sentence_type, [], message.content_detail)
                     )
 
             except queue.Empty:
+                # 首段等待超时，按当前最合适的边界提前合成
+                segment_text = self._get_deadline_segment()
+                if segment_text:
+                    self._synthesize_segment(segment_text)
                 continue
             except Exception as e:
                 logger.bind(tag=TAG).error(
@@ -310,8 +545,8 @@ class TTSProviderBase(ABC):
 
     def _audio_play_priority_thread(self):
         # 需要上报的文本和音频列表
-        enqueue_text = None
-        enqueue_audio = None
+        report_text = None
+        report_audio = None
         while not self.conn.stop_event.is_set():
             text = None
             try:
@@ -326,31 +561,52 @@ class TTSProviderBase(ABC):
 
                 if self.conn.client_abort:
                     logger.bind(tag=TAG).debug("收到打断信号，跳过当前音频数据")
-                    enqueue_text, enqueue_audio = None, []
+                    report_text, report_audio = None, []
                     continue
 
                 # 收到下一个文本开始或会话结束时进行上报
                 if sentence_type is not SentenceType.MIDDLE:
                     # 上报TTS数据
-                    if enqueue_text is not None and enqueue_audio is not None:
-                        enqueue_tts_report(self.conn, enqueue_text, enqueue_audio)
-                    enqueue_audio = []
-                    enqueue_text = text
+                    if report_text is not None and report_audio is not None:
+                        enqueue_tts_report(self.conn, report_text, report_audio)
+                    if sentence_type is SentenceType.FILLER:
+                        report_text, report_audio = None, None
+                    else:
+                        report_audio = []
+                        report_text = text
 
                 # 收集上报音频数据
-                if isinstance(audio_datas, bytes) and enqueue_audio is not None:
-                    enqueue_audio.append(audio_datas)
+                if isinstance(audio_datas, bytes) and report_audio is not None:
+                    report_audio.append(audio_datas)
 
                 # 发送音频
-                future = asyncio.run_coroutine_threadsafe(
-                    sendAudioMessage(self.conn, sentence_type, audio_datas, text),
-                    self.conn.loop,
-                )
-                future.result()
+                if (
+                    sentence_type == SentenceType.MIDDLE
+                    and isinstance(audio_datas, bytes)
+                    and not self.tts_audio_first_sentence
+                ):
+                    # 流式音频包直接交给发送节拍器，不逐包等待事件循环
+                    enqueue_audio(self.conn, audio_datas)
+                else:
+                    future = asyncio.run_coroutine_threadsafe(
+                        sendAudioMessage(self.conn, sentence_type, audio_datas, text),
+                        self.conn.loop,
+                    )
+                    future.result()
 
                 # 记录输出和报告
-                if self.conn.max_output_size > 0 and text:
-                    add_device_output(self.conn.headers.get("device-id"), len(text))
+                if (
+                    self.conn.max_output_size > 0
+                    and text
+                    and sentence_type is not SentenceType.FILLER
+                ):
+                    # 计数在事件循环中进行，不等待结果，避免共享后端的网络往返拖慢播放
+                    asyncio.run_coroutine_threadsafe(
+                        add_device_output(
+                            self.conn.headers.get("device-id"), len(text)
+                        ),
+                        self.conn.loop,
+                    )
 
             except Exception as e:
                 logger.bind(tag=TAG).error(f"audio_play_priority_thread: {text} {e}")
@@ -363,6 +619,8 @@ class TTSProviderBase(ABC):
 
     async def close(self):
         """资源清理方法"""
+        if self.synthesis_pipeline is not None:
+            self.synthesis_pipeline.close()
         if hasattr(self, "ws") and self.ws:
             await self.ws.close()
 
@@ -370,6 +628,8 @@ class TTSProviderBase(ABC):
         # 合并当前全部文本并处理未分割部分
         full_text = "".join(self.tts_text_buff)
         current_text = full_text[self.processed_chars :]  # 从未处理的位置开始
+        if current_text and self.first_text_time is None:
+            self.first_text_time = time.monotonic()
         last_punct_pos = -1
 
         # 根据是否是第一句话选择不同的标点符号集合
@@ -386,6 +646,14 @@ class TTSProviderBase(ABC):
             ):
                 last_punct_pos = pos
 
+        if last_punct_pos == -1 and not self.is_first_sentence:
+            # 后续分段逐步加长：够长时也可以在逗号处切分
+            last_punct_pos = self._growing_segment_pos(current_text)
+
+        if last_punct_pos == -1 and not self.tts_stop_request:
+            # 没有合适的标点：首段字数或等待时间超限、后续分段过长时，在最合适的边界切分
+            last_punct_pos = self._forced_segment_pos(current_text)
+
         if last_punct_pos != -1:
             segment_text_raw = current_text[: last_punct_pos + 1]
             segment_text = textUtils.get_string_no_punctuation_or_emoji(
@@ -396,15 +664,60 @@ class TTSProviderBase(ABC):
             # 如果是第一句话，在找到第一个逗号后，将标志设置为False
             if self.is_first_sentence:
                 self.is_first_sentence = False
+            self.segment_index += 1
 
             return segment_text
         elif self.tts_stop_request and current_text:
             segment_text = current_text
-            self.is_first_sentence = True  # 重置标志
+            self._reset_segmenter()  # 重置标志
             return segment_text
         else:
             return None
 
+    def _growing_segment_pos(self, text: str) -> int:
+        """第k段（k>=1）在逗号处切分需要的最小字数为首段字数的2^k倍，超过单段上限后只按句末标点切分"""
+        min_chars = self.first_segment_min_chars * (2**self.segment_index)
+        if min_chars >= self.segment_max_chars or len(text) < min_chars:
+            return -1
+        pos = max(text.rfind(p) for p in self.first_sentence_punctuations)
+        return pos if pos + 1 >= min_chars else -1
+
+    def _forced_segment_pos(self, text: str) -> int:
+        """超过字数或等待时间上限时的切分位置，不需要切分时返回-1"""
+        if not text.strip():
+            return -1
+        if self.is_first_sentence:
+            waited_ms = (time.monotonic() - self.first_text_time) * 1000
+            if (
+                len(text) < self.first_segment_min_chars
+                and waited_ms < self.first_segment_max_wait_ms
+            ):
+                return -1
+            limit = min(len(text), self.first_segment_min_chars)
+            if waited_ms >= self.first_segment_max_wait_ms:
+                limit = len(text)
+        elif len(text) >= self.segment_max_chars:
+            limit = self.segment_max_chars
+        else:
+            return -1
+        return self._best_boundary(text, limit) - 1
+
+    @staticmethod
+    def _best_boundary(text: str, limit: int) -> int:
+        """在text[:limit]中找最合适的切分长度：优先标点和空格，其次英文单词边界，中文可以在任意字之后切分"""
+        head = text[:limit]
+        for i in range(len(head) - 1, len(head) // 2 - 1, -1):
+            if head[i] in SOFT_BOUNDARIES:
+                return i + 1
+        if head[-1].isascii() and head[-1].isalnum() and limit < len(text):
+            next_char = text[limit]
+            if next_char.isascii() and next_char.isalnum():
+                # 不在英文单词中间切开
+                space = head.rfind(" ")
+                if space > 0:
+                    return space + 1
+        return len(head)
+
     def _process_audio_file_stream(
         self, tts_file, callback: Callable[[Any], Any]
     ) -> None:
@@ -435,9 +748,7 @@ class TTSProviderBase(ABC):
         self.before_stop_play_files.clear()
         self.tts_audio_queue.put((SentenceType.LAST, [], None))
 
-    def _process_remaining_text_stream(
-        self, opus_handler: Callable[[bytes], None] = None
-    ):
+    def _process_remaining_text_stream(self):
         """处理剩余的文本并生成语音
 
         Returns:
@@ -448,7 +759,7 @@ class TTSProviderBase(ABC):
         if remaining_text:
             segment_text = textUtils.get_string_no_punctuation_or_emoji(remaining_text)
             if segment_text:
-                self.to_tts_stream(segment_text, opus_handler=opus_handler)
+                self._synthesize_segment(segment_text)
                 self.processed_chars += len(full_text)
                 return True
         return False
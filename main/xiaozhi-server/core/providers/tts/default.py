@@ -7,6 +7,7 @@ logger = setup_logging()
 
 
 class DefaultTTS(TTSProviderBase):
+    cache_key_params = ()
     def __init__(self, config, delete_audio_file=True):
         super().__init__(config, delete_audio_file)
         self.output_dir = config.get("output_dir", "tmp")
@@ -11,6 +11,15 @@ logger = setup_logging()
 
 
 class TTSProvider(TTSProviderBase):
+    cache_key_params = (
+        "api_url",
+        "appid",
+        "cluster",
+        "voice",
+        "speed_ratio",
+        "volume_ratio",
+        "pitch_ratio",
+    )
     def __init__(self, config, delete_audio_file):
         super().__init__(config, delete_audio_file)
         if config.get("appid"):
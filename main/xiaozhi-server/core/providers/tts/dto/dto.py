@@ -7,6 +7,7 @@ class SentenceType(Enum):
     FIRST = "FIRST"  # 首句话
     MIDDLE = "MIDDLE"  # 说话中
     LAST = "LAST"  # 最后一句
+    FILLER = "FILLER"  # 等待时的过渡语，不计入输出字数，也不上报
 
 
 class ContentType(Enum):
@@ -78,6 +78,22 @@ def read_ref_text(ref_text):
 
 
 class TTSProvider(TTSProviderBase):
+    cache_key_params = (
+        "api_url",
+        "reference_id",
+        "reference_audio",
+        "reference_text",
+        "format",
+        "channels",
+        "rate",
+        "normalize",
+        "chunk_length",
+        "max_new_tokens",
+        "top_p",
+        "repetition_penalty",
+        "temperature",
+        "seed",
+    )
 
     def __init__(self, config, delete_audio_file):
         super().__init__(config, delete_audio_file)
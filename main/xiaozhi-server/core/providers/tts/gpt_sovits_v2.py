@@ -8,6 +8,25 @@ logger = setup_logging()
 
 
 class TTSProvider(TTSProviderBase):
+    cache_key_params = (
+        "url",
+        "text_lang",
+        "ref_audio_path",
+        "aux_ref_audio_paths",
+        "prompt_text",
+        "prompt_lang",
+        "top_k",
+        "top_p",
+        "temperature",
+        "text_split_method",
+        "batch_size",
+        "batch_threshold",
+        "split_bucket",
+        "speed_factor",
+        "seed",
+        "parallel_infer",
+        "repetition_penalty",
+    )
     def __init__(self, config, delete_audio_file):
         super().__init__(config, delete_audio_file)
         self.url = config.get("url")
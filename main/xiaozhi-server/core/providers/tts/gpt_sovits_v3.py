@@ -8,6 +8,21 @@ logger = setup_logging()
 
 
 class TTSProvider(TTSProviderBase):
+    cache_key_params = (
+        "url",
+        "refer_wav_path",
+        "prompt_text",
+        "prompt_language",
+        "text_language",
+        "top_k",
+        "top_p",
+        "temperature",
+        "cut_punc",
+        "speed",
+        "inp_refs",
+        "sample_steps",
+        "if_sr",
+    )
     def __init__(self, config, delete_audio_file):
         super().__init__(config, delete_audio_file)
         self.url = config.get("url")
@@ -10,6 +10,7 @@ from core.utils.tts import MarkdownCleaner
 from config.logger import setup_logging
 from core.utils import opus_encoder_utils
 from core.utils.util import check_model_key
+from core.utils.ws_pool import get_ws_pool, WebSocketPool
 from core.providers.tts.base import TTSProviderBase
 from core.providers.tts.dto.dto import SentenceType, ContentType, InterfaceType
 from asyncio import Task
@@ -140,11 +141,23 @@ class Response:
 
 
 class TTSProvider(TTSProviderBase):
+    cache_key_params = (
+        "ws_url",
+        "appId",
+        "cluster",
+        "resource_id",
+        "voice",
+        "speech_rate",
+        "loudness_rate",
+        "pitch",
+    )
     def __init__(self, config, delete_audio_file):
         super().__init__(config, delete_audio_file)
+        # 当前会话使用的连接，来自进程内共用的连接池
         self.ws = None
+        self.pool_socket = None
+        self.pool_session_id = None
         self.interface_type = InterfaceType.DUAL_STREAM
-        self._monitor_task = None  # 监听任务引用
         self.appId = config.get("appid")
         self.access_token = config.get("access_token")
         self.cluster = config.get("cluster")
@@ -175,40 +188,57 @@ class TTSProvider(TTSProviderBase):
     async def open_audio_channels(self, conn):
         try:
             await super().open_audio_channels(conn)
+            # 设备连上后在后台预热到TTS服务的连接，第一次回复不再等待建连
+            self._get_pool().warm()
         except Exception as e:
             logger.bind(tag=TAG).error(f"Failed to open audio channels: {str(e)}")
             self.ws = None
             raise
 
-    async def _ensure_connection(self):
-        """建立新的WebSocket连接，并启动监听任务（仅第一次）"""
+    def _get_pool(self) -> WebSocketPool:
+        """鉴权信息相同的TTS配置共用一个连接池"""
+        options = (self.conn.config.get("tts_ws_pool") or {}) if self.conn else {}
+        # 连接池比单个设备连接存活得久，只引用鉴权参数，不引用provider实例
+        params = (self.ws_url, self.appId, self.access_token, self.resource_id)
+        return get_ws_pool(
+            (TAG,) + params,
+            lambda: WebSocketPool(
+                "huoshan_double_stream",
+                lambda: open_connection(*params),
+                route_response,
+                options,
+            ),
+        )
+
+    async def _ensure_connection(self, session_id):
+        """从连接池取一条连接，下行消息按会话ID交给当前连接处理"""
         try:
-            if self.ws:
-                logger.bind(tag=TAG).info(f"使用已有链接...")
+            if self.ws and self.pool_session_id == session_id:
                 return self.ws
-            logger.bind(tag=TAG).debug("开始建立新连接...")
-            ws_header = {
-                "X-Api-App-Key": self.appId,
-                "X-Api-Access-Key": self.access_token,
-                "X-Api-Resource-Id": self.resource_id,
-                "X-Api-Connect-Id": uuid.uuid4(),
-            }
-            self.ws = await websockets.connect(
-                self.ws_url, additional_headers=ws_header, max_size=1000000000
-            )
-            logger.bind(tag=TAG).debug("WebSocket连接建立成功")
-            
-            # 连接建立成功后，启动监听任务
-            if self._monitor_task is None or self._monitor_task.done():
-                logger.bind(tag=TAG).debug("启动监听任务...")
-                self._monitor_task = asyncio.create_task(self._start_monitor_tts_response())
-            
+            self._release_connection()
+            pool = self._get_pool()
+            self.pool_socket = await pool.acquire(session_id, self._on_response)
+            self.pool_session_id = session_id
+            self.ws = self.pool_socket.ws
             return self.ws
         except Exception as e:
             logger.bind(tag=TAG).error(f"建立连接失败: {str(e)}")
             self.ws = None
             raise
 
+    def _release_connection(self, discard=False):
+        """会话结束后把连接放回连接池，会话状态异常时丢弃连接"""
+        sock, session_id = self.pool_socket, self.pool_session_id
+        self.pool_socket = None
+        self.pool_session_id = None
+        self.ws = None
+        if sock is None:
+            return
+        if discard:
+            sock.pool.discard(sock)
+        else:
+            sock.pool.release(sock, session_id)
+
     def tts_text_priority_thread(self):
         """火山引擎双流式TTS的文本处理线程"""
         while not self.conn.stop_event.is_set():
@@ -311,12 +341,7 @@ class TTSProvider(TTSProviderBase):
             return
         except Exception as e:
             logger.bind(tag=TAG).error(f"发送TTS文本失败: {str(e)}")
-            if self.ws:
-                try:
-                    await self.ws.close()
-                except:
-                    pass
-                self.ws = None
+            self._release_connection(discard=True)
             raise
 
     async def start_session(self, session_id):
@@ -336,8 +361,8 @@ class TTSProvider(TTSProviderBase):
             # 设置会话激活标志
             self.activate_session = True
             
-            # 确保连接建立
-            await self._ensure_connection()
+            # 从连接池取得连接
+            await self._ensure_connection(session_id)
 
             header = Header(
                 message_type=FULL_CLIENT_REQUEST,
@@ -403,86 +428,66 @@ class TTSProvider(TTSProviderBase):
 
     async def close(self):
         """资源清理方法"""
+        # 会话未结束时服务端仍在合成，丢弃连接，否则放回连接池
+        self._release_connection(discard=self.activate_session)
         self.activate_session = False
-        # 取消监听任务
-        if self._monitor_task:
-            try:
-                self._monitor_task.cancel()
-                await self._monitor_task
-            except asyncio.CancelledError:
-                pass
-            except Exception as e:
-                logger.bind(tag=TAG).warning(f"关闭时取消监听任务错误: {e}")
-            self._monitor_task = None
 
-        if self.ws:
-            try:
-                await self.ws.close()
-            except:
-                pass
+    def _on_response(self, res):
+        """处理当前会话的下行消息，连接断开时res为None"""
+        if res is None:
+            logger.bind(tag=TAG).warning("WebSocket连接已关闭")
+            self.activate_session = False
+            self.pool_socket = None
+            self.pool_session_id = None
             self.ws = None
+            return
 
-    async def _start_monitor_tts_response(self):
-        """监听TTS响应 - 长期运行"""
-        try:
-            while not self.conn.stop_event.is_set():
-                try:
-                    # 确保 `recv()` 运行在同一个 event loop
-                    msg = await self.ws.recv()
-                    res = self.parser_response(msg)
-                    self.print_response(res, "send_text res:")
-
-                    # 只处理当前活跃会话的响应
-                    if res.optional.sessionId and self.conn.sentence_id != res.optional.sessionId:
-                        # 如果是会话结束相关事件，即使会话ID不匹配也要重置状态
-                        if res.optional.event in [EVENT_SessionCanceled, EVENT_SessionFailed, EVENT_SessionFinished]:
-                            logger.bind(tag=TAG).debug(f"收到残余下行结束响应重置会话状态～～")
-                            self.activate_session = False
-                        continue
+        self.print_response(res, "send_text res:")
+        if res.header.message_type == ERROR_INFORMATION:
+            logger.bind(tag=TAG).error(
+                f"TTS服务返回错误: {res.optional.errorCode} {res.payload}"
+            )
+            return
 
-                    if res.optional.event == EVENT_SessionCanceled:
-                        logger.bind(tag=TAG).debug(f"释放服务端资源成功～～")
-                        self.activate_session = False
-                    elif res.optional.event == EVENT_TTSSentenceStart:
-                        json_data = json.loads(res.payload.decode("utf-8"))
-                        self.tts_text = json_data.get("text", "")
-                        logger.bind(tag=TAG).debug(f"句子语音生成开始: {self.tts_text}")
-                        self.tts_audio_queue.put(
-                            (SentenceType.FIRST, [], self.tts_text)
-                        )
-                    elif (
-                        res.optional.event == EVENT_TTSResponse
-                        and res.header.message_type == AUDIO_ONLY_RESPONSE
-                    ):
-                        self.wav_to_opus_data_audio_raw_stream(res.payload, callback=self.handle_opus)
-                    elif res.optional.event == EVENT_TTSSentenceEnd:
-                        logger.bind(tag=TAG).info(f"句子语音生成成功：{self.tts_text}")
-                    elif res.optional.event == EVENT_SessionFinished:
-                        logger.bind(tag=TAG).debug(f"会话结束～～")
-                        self.activate_session = False
-                        self._process_before_stop_play_files()
-                except websockets.ConnectionClosed:
-                    logger.bind(tag=TAG).warning("WebSocket连接已关闭")
-                    break
-                except Exception as e:
-                    logger.bind(tag=TAG).error(
-                        f"Error in _start_monitor_tts_response: {e}"
-                    )
-                    traceback.print_exc()
-                    break
-            # 连接异常时关闭WebSocket
-            if self.ws:
-                try:
-                    await self.ws.close()
-                except:
-                    pass
-                self.ws = None
-        # 监听任务退出时清理引用
-        finally:
-            self._monitor_task = None
+        # 只处理当前活跃会话的响应
+        if res.optional.sessionId and self.conn.sentence_id != res.optional.sessionId:
+            # 如果是会话结束相关事件，即使会话ID不匹配也要重置状态
+            if res.optional.event in [EVENT_SessionCanceled, EVENT_SessionFailed, EVENT_SessionFinished]:
+                logger.bind(tag=TAG).debug(f"收到残余下行结束响应重置会话状态～～")
+                self.activate_session = False
+                self._release_connection()
+            return
 
+        if res.optional.event == EVENT_SessionCanceled:
+            logger.bind(tag=TAG).debug(f"释放服务端资源成功～～")
+            self.activate_session = False
+            self._release_connection()
+        elif res.optional.event == EVENT_SessionFailed:
+            logger.bind(tag=TAG).error(f"会话失败: {res.optional.response_meta_json}")
+            self.activate_session = False
+            self._release_connection()
+        elif res.optional.event == EVENT_TTSSentenceStart:
+            json_data = json.loads(res.payload.decode("utf-8"))
+            self.tts_text = json_data.get("text", "")
+            logger.bind(tag=TAG).debug(f"句子语音生成开始: {self.tts_text}")
+            self.tts_audio_queue.put(
+                (SentenceType.FIRST, [], self.tts_text)
+            )
+        elif (
+            res.optional.event == EVENT_TTSResponse
+            and res.header.message_type == AUDIO_ONLY_RESPONSE
+        ):
+            self.wav_to_opus_data_audio_raw_stream(res.payload, callback=self.handle_opus)
+        elif res.optional.event == EVENT_TTSSentenceEnd:
+            logger.bind(tag=TAG).info(f"句子语音生成成功：{self.tts_text}")
+        elif res.optional.event == EVENT_SessionFinished:
+            logger.bind(tag=TAG).debug(f"会话结束～～")
+            self.activate_session = False
+            self._release_connection()
+            self._process_before_stop_play_files()
+
+    @staticmethod
     async def send_event(
-        self,
         ws: websockets.WebSocketClientProtocol,
         header: bytes,
         optional: bytes | None = None,
@@ -514,7 +519,8 @@ class TTSProvider(TTSProviderBase):
         return await self.send_event(self.ws, header, optional, payload)
 
     # 读取 res 数组某段 字符串内容
-    def read_res_content(self, res: bytes, offset: int):
+    @staticmethod
+    def read_res_content(res: bytes, offset: int):
         content_size = int.from_bytes(res[offset : offset + 4], "big", signed=True)
         offset += 4
         content = res[offset : offset + content_size].decode('utf-8')
@@ -522,14 +528,16 @@ class TTSProvider(TTSProviderBase):
         return content, offset
 
     # 读取 payload
-    def read_res_payload(self, res: bytes, offset: int):
+    @staticmethod
+    def read_res_payload(res: bytes, offset: int):
         payload_size = int.from_bytes(res[offset : offset + 4], "big", signed=True)
         offset += 4
         payload = res[offset : offset + payload_size]
         offset += payload_size
         return payload, offset
 
-    def parser_response(self, res) -> Response:
+    @classmethod
+    def parser_response(cls, res) -> Response:
         if isinstance(res, str):
             raise RuntimeError(res)
         response = Response(Header(), Optional())
@@ -556,9 +564,9 @@ class TTSProvider(TTSProviderBase):
                     return response
                 # read connectionId
                 elif optional.event == EVENT_ConnectionStarted:
-                    optional.connectionId, offset = self.read_res_content(res, offset)
+                    optional.connectionId, offset = cls.read_res_content(res, offset)
                 elif optional.event == EVENT_ConnectionFailed:
-                    optional.response_meta_json, offset = self.read_res_content(
+                    optional.response_meta_json, offset = cls.read_res_content(
                         res, offset
                     )
                 elif (
@@ -566,20 +574,20 @@ class TTSProvider(TTSProviderBase):
                     or optional.event == EVENT_SessionFailed
                     or optional.event == EVENT_SessionFinished
                 ):
-                    optional.sessionId, offset = self.read_res_content(res, offset)
-                    optional.response_meta_json, offset = self.read_res_content(
+                    optional.sessionId, offset = cls.read_res_content(res, offset)
+                    optional.response_meta_json, offset = cls.read_res_content(
                         res, offset
                     )
                 else:
-                    optional.sessionId, offset = self.read_res_content(res, offset)
-                    response.payload, offset = self.read_res_payload(res, offset)
+                    optional.sessionId, offset = cls.read_res_content(res, offset)
+                    response.payload, offset = cls.read_res_payload(res, offset)
 
         elif header.message_type == ERROR_INFORMATION:
             optional.errorCode = int.from_bytes(
                 res[offset : offset + 4], "big", signed=True
             )
             offset += 4
-            response.payload, offset = self.read_res_payload(res, offset)
+            response.payload, offset = cls.read_res_payload(res, offset)
         return response
 
     async def start_connection(self):
@@ -633,6 +641,75 @@ class TTSProvider(TTSProviderBase):
     def wav_to_opus_data_audio_raw_stream(self, raw_data_var, is_end=False, callback: Callable[[Any], Any]=None):
         return self.opus_encoder.encode_pcm_to_opus_stream(raw_data_var, is_end, callback=callback)
 
+    def _pool_loop_available(self) -> bool:
+        """连接池只能在设备连接的事件循环中使用，且当前线程不能是该事件循环所在的线程"""
+        if self.conn is None or not self.conn.loop.is_running():
+            return False
+        try:
+            return asyncio.get_running_loop() is not self.conn.loop
+        except RuntimeError:
+            return True
+
+    async def _pooled_to_tts(self, text: str) -> list:
+        session_id = uuid.uuid4().hex
+        audio_data = []
+        finished = asyncio.Event()
+
+        def on_response(res):
+            if res is None or res.header.message_type == ERROR_INFORMATION:
+                finished.set()
+            elif res.optional.event in (
+                EVENT_SessionFinished,
+                EVENT_SessionFailed,
+                EVENT_SessionCanceled,
+            ):
+                finished.set()
+            elif (
+                res.optional.event == EVENT_TTSResponse
+                and res.header.message_type == AUDIO_ONLY_RESPONSE
+            ):
+                self.wav_to_opus_data_audio_raw_stream(
+                    res.payload, callback=audio_data.append
+                )
+
+        pool = self._get_pool()
+        sock = await pool.acquire(session_id, on_response)
+        try:
+            header = Header(
+                message_type=FULL_CLIENT_REQUEST,
+                message_type_specific_flags=MsgTypeFlagWithEvent,
+                serial_method=JSON,
+            ).as_bytes()
+            await self.send_event(
+                sock.ws,
+                header,
+                Optional(event=EVENT_StartSession, sessionId=session_id).as_bytes(),
+                self.get_payload_bytes(event=EVENT_StartSession, speaker=self.voice),
+            )
+            await self.send_event(
+                sock.ws,
+                header,
+                Optional(event=EVENT_TaskRequest, sessionId=session_id).as_bytes(),
+                self.get_payload_bytes(
+                    event=EVENT_TaskRequest,
+                    text=MarkdownCleaner.clean_markdown(text),
+                    speaker=self.voice,
+                ),
+            )
+            await self.send_event(
+                sock.ws,
+                header,
+                Optional(event=EVENT_FinishSession, sessionId=session_id).as_bytes(),
+                str.encode("{}"),
+            )
+            await asyncio.wait_for(finished.wait(), timeout=60)
+        except BaseException:
+            # 会话状态未知（包括被取消），丢弃连接，不再放回连接池
+            pool.discard(sock)
+            raise
+        pool.release(sock, session_id)
+        return audio_data
+
     def to_tts(self, text: str) -> list:
         """非流式生成音频数据，用于生成音频及测试场景
         Args:
@@ -640,6 +717,16 @@ class TTSProvider(TTSProviderBase):
         Returns:
             list: 音频数据列表
         """
+        if self._pool_loop_available():
+            # 在连接所在的事件循环中使用连接池，不再单独建立连接
+            try:
+                future = asyncio.run_coroutine_threadsafe(
+                    self._pooled_to_tts(text), self.conn.loop
+                )
+                return future.result(timeout=60)
+            except Exception as e:
+                logger.bind(tag=TAG).error(f"生成音频数据失败: {str(e)}")
+                return []
         try:
             # 创建事件循环
             loop = asyncio.new_event_loop()
@@ -733,3 +820,38 @@ class TTSProvider(TTSProviderBase):
         except Exception as e:
             logger.bind(tag=TAG).error(f"生成音频数据失败: {str(e)}")
             return []
+
+
+async def open_connection(ws_url, app_id, access_token, resource_id):
+    """建立到火山引擎的WebSocket连接并完成StartConnection握手"""
+    ws_header = {
+        "X-Api-App-Key": app_id,
+        "X-Api-Access-Key": access_token,
+        "X-Api-Resource-Id": resource_id,
+        "X-Api-Connect-Id": str(uuid.uuid4()),
+    }
+    ws = await websockets.connect(
+        ws_url, additional_headers=ws_header, max_size=1000000000
+    )
+    try:
+        header = Header(
+            message_type=FULL_CLIENT_REQUEST,
+            message_type_specific_flags=MsgTypeFlagWithEvent,
+        ).as_bytes()
+        optional = Optional(event=EVENT_Start_Connection).as_bytes()
+        await TTSProvider.send_event(ws, header, optional, str.encode("{}"))
+        res = TTSProvider.parser_response(await asyncio.wait_for(ws.recv(), timeout=10))
+        if res.optional.event != EVENT_ConnectionStarted:
+            raise RuntimeError(
+                f"建连失败: {res.optional.response_meta_json or res.payload}"
+            )
+        return ws
+    except Exception:
+        await ws.close()
+        raise
+
+
+def route_response(message):
+    """连接池按会话ID分发下行消息"""
+    res = TTSProvider.parser_response(message)
+    return res.optional.sessionId, res
@@ -16,6 +16,7 @@ logger = setup_logging()
 
 
 class TTSProvider(TTSProviderBase):
+    cache_key_params = ("api_url", "voice", "audio_format")
     def __init__(self, config, delete_audio_file):
         super().__init__(config, delete_audio_file)
         self.interface_type = InterfaceType.SINGLE_STREAM
@@ -28,9 +29,9 @@ class TTSProvider(TTSProviderBase):
         self.audio_format = "pcm"
         self.before_stop_play_files = []
 
-        # 创建Opus编码器 需注意接口返回的采样率为24000
+        # 创建Opus编码器 需注意接口返回的采样率为24000，在进程内重采样为16kHz后编码
         self.opus_encoder = opus_encoder_utils.OpusEncoderUtils(
-            sample_rate=24000, channels=1, frame_size_ms=60
+            sample_rate=16000, channels=1, frame_size_ms=60, input_sample_rate=24000
         )
 
         # PCM缓冲区
@@ -40,12 +41,15 @@ class TTSProvider(TTSProviderBase):
         """流式文本处理线程"""
         while not self.conn.stop_event.is_set():
             try:
-                message = self.tts_text_queue.get(timeout=1)
+                message = self.tts_text_queue.get(
+                    timeout=self._segment_wait_timeout()
+                )
                 if message.sentence_type == SentenceType.FIRST:
                     # 初始化参数
                     self.tts_stop_request = False
                     self.processed_chars = 0
                     self.tts_text_buff = []
+                    self._reset_segmenter()
                     self.before_stop_play_files.clear()
                 elif ContentType.TEXT == message.content_type:
                     self.tts_text_buff.append(message.content_detail)
@@ -66,6 +70,10 @@ class TTSProvider(TTSProviderBase):
                     self._process_remaining_text_stream(True)
 
             except queue.Empty:
+                # 首段等待超时，按当前最合适的边界提前合成
+                segment_text = self._get_deadline_segment()
+                if segment_text:
+                    self.to_tts_single_stream(segment_text)
                 continue
             except Exception as e:
                 logger.bind(tag=TAG).error(
@@ -93,6 +101,13 @@ class TTSProvider(TTSProviderBase):
         try:
             max_repeat_time = 5
             text = MarkdownCleaner.clean_markdown(text)
+            cache, cache_key, cached_frames = self._lookup_speech_cache(text)
+            if cached_frames:
+                self._replay_cached_speech(text, cached_frames, self.handle_opus)
+                if is_last:
+                    self._process_before_stop_play_files()
+                return None
+            self._start_speech_capture(cache)
             try:
                 asyncio.run(self.text_to_speak(text, is_last))
             except Exception as e:
@@ -100,6 +115,7 @@ class TTSProvider(TTSProviderBase):
                     f"语音生成失败{5 - max_repeat_time + 1}次: {text}，错误: {e}"
                 )
                 max_repeat_time -= 1
+            self._finish_speech_capture(cache, cache_key, max_repeat_time > 0)
 
             if max_repeat_time > 0:
                 logger.bind(tag=TAG).info(
@@ -119,7 +135,7 @@ class TTSProvider(TTSProviderBase):
         payload = {"text": text, "character": self.voice}
 
         frame_bytes = int(
-            self.opus_encoder.sample_rate
+            self.opus_encoder.input_sample_rate
             * self.opus_encoder.channels  # 1
             * self.opus_encoder.frame_size_ms
             / 1000
@@ -133,10 +149,13 @@ class TTSProvider(TTSProviderBase):
                         logger.bind(tag=TAG).error(
                             f"TTS请求失败: {resp.status}, {await resp.text()}"
                         )
+                        # 合成失败，不写入语音缓存
+                        self._speech_capture = None
                         self.tts_audio_queue.put((SentenceType.LAST, [], None))
                         return
 
                     self.pcm_buffer.clear()
+                    self.opus_encoder.start_sentence()
                     self.tts_audio_queue.put((SentenceType.FIRST, [], text))
 
                     # 处理音频流数据
@@ -157,14 +176,12 @@ class TTSProvider(TTSProviderBase):
                                 callback=self.handle_opus
                             )
 
-                    # flush 剩余不足一帧的数据
-                    if self.pcm_buffer:
-                        self.opus_encoder.encode_pcm_to_opus_stream(
-                            bytes(self.pcm_buffer),
-                            end_of_stream=True,
-                            callback=self.handle_opus
-                        )
-                        self.pcm_buffer.clear()
+                    # 每句结束都输出剩余不足一帧的数据和重采样器中的尾部，
+                    # 数据正好是整帧时也一样，不会带到下一句
+                    self.opus_encoder.finish_sentence(
+                        bytes(self.pcm_buffer), callback=self.handle_opus
+                    )
+                    self.pcm_buffer.clear()
 
                     # 如果是最后一段，输出音频获取完毕
                     if is_last:
@@ -172,6 +189,8 @@ class TTSProvider(TTSProviderBase):
 
         except Exception as e:
             logger.bind(tag=TAG).error(f"TTS请求异常: {e}")
+            # 合成失败，不写入语音缓存
+            self._speech_capture = None
             self.tts_audio_queue.put((SentenceType.LAST, [], None))
 
     async def close(self):
@@ -208,7 +227,7 @@ class TTSProvider(TTSProviderBase):
 
                 # 计算每帧的字节数
                 frame_bytes = int(
-                    self.opus_encoder.sample_rate
+                    self.opus_encoder.input_sample_rate
                     * self.opus_encoder.channels
                     * self.opus_encoder.frame_size_ms
                     / 1000
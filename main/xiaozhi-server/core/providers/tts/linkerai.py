@@ -16,6 +16,7 @@ logger = setup_logging()
 
 
 class TTSProvider(TTSProviderBase):
+    cache_key_params = ("api_url", "voice", "audio_format")
     def __init__(self, config, delete_audio_file):
         super().__init__(config, delete_audio_file)
         self.interface_type = InterfaceType.SINGLE_STREAM
@@ -37,12 +38,15 @@ class TTSProvider(TTSProviderBase):
         """流式文本处理线程"""
         while not self.conn.stop_event.is_set():
             try:
-                message = self.tts_text_queue.get(timeout=1)
+                message = self.tts_text_queue.get(
+                    timeout=self._segment_wait_timeout()
+                )
                 if message.sentence_type == SentenceType.FIRST:
                     # 初始化参数
                     self.tts_stop_request = False
                     self.processed_chars = 0
                     self.tts_text_buff = []
+                    self._reset_segmenter()
                     self.before_stop_play_files.clear()
                 elif ContentType.TEXT == message.content_type:
                     self.tts_text_buff.append(message.content_detail)
@@ -62,6 +66,10 @@ class TTSProvider(TTSProviderBase):
                     self._process_remaining_text_stream(True)
 
             except queue.Empty:
+                # 首段等待超时，按当前最合适的边界提前合成
+                segment_text = self._get_deadline_segment()
+                if segment_text:
+                    self.to_tts_single_stream(segment_text)
                 continue
             except Exception as e:
                 logger.bind(tag=TAG).error(
@@ -90,6 +98,13 @@ class TTSProvider(TTSProviderBase):
         try:
             max_repeat_time = 5
             text = MarkdownCleaner.clean_markdown(text)
+            cache, cache_key, cached_frames = self._lookup_speech_cache(text)
+            if cached_frames:
+                self._replay_cached_speech(text, cached_frames, self.handle_opus)
+                if is_last:
+                    self._process_before_stop_play_files()
+                return None
+            self._start_speech_capture(cache)
             try:
                 asyncio.run(self.text_to_speak(text, is_last))
             except Exception as e:
@@ -97,6 +112,7 @@ class TTSProvider(TTSProviderBase):
                     f"语音生成失败{5 - max_repeat_time + 1}次: {text}，错误: {e}"
                 )
                 max_repeat_time -= 1
+            self._finish_speech_capture(cache, cache_key, max_repeat_time > 0)
 
             if max_repeat_time > 0:
                 logger.bind(tag=TAG).info(
@@ -155,6 +171,8 @@ class TTSProvider(TTSProviderBase):
                         logger.bind(tag=TAG).error(
                             f"TTS请求失败: {resp.status}, {await resp.text()}"
                         )
+                        # 合成失败，不写入语音缓存
+                        self._speech_capture = None
                         self.tts_audio_queue.put((SentenceType.LAST, [], None))
                         return
 
@@ -196,6 +214,8 @@ class TTSProvider(TTSProviderBase):
 
         except Exception as e:
             logger.bind(tag=TAG).error(f"TTS请求异常: {e}")
+            # 合成失败，不写入语音缓存
+            self._speech_capture = None
             self.tts_audio_queue.put((SentenceType.LAST, [], None))
 
     def to_tts(self, text: str) -> list:
@@ -8,6 +8,9 @@ logger = setup_logging()
 
 
 class TTSProvider(TTSProviderBase):
+    supports_audio_chunks = True
+    cache_key_params = ("api_url", "model", "voice", "speed", "response_format")
+
     def __init__(self, config, delete_audio_file):
         super().__init__(config, delete_audio_file)
         self.api_key = config.get("api_key")
@@ -29,7 +32,7 @@ class TTSProvider(TTSProviderBase):
         if model_key_msg:
             logger.bind(tag=TAG).error(model_key_msg)
 
-    async def text_to_speak(self, text, output_file):
+    def _request(self, text, stream=False):
         headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
@@ -41,7 +44,19 @@ class TTSProvider(TTSProviderBase):
             "response_format": "wav",
             "speed": self.speed,
         }
-        response = requests.post(self.api_url, json=data, headers=headers)
+        return requests.post(self.api_url, json=data, headers=headers, stream=stream)
+
+    async def audio_chunks(self, text):
+        with self._request(text, stream=True) as response:
+            if response.status_code != 200:
+                raise Exception(
+                    f"OpenAI TTS请求失败: {response.status_code} - {response.text}"
+                )
+            for chunk in response.iter_content(chunk_size=None):
+                yield chunk
+
+    async def text_to_speak(self, text, output_file):
+        response = self._request(text)
         if response.status_code == 200:
             if output_file:
                 with open(output_file, "wb") as audio_file:
@@ -3,6 +3,17 @@ from core.providers.tts.base import TTSProviderBase
 
 
 class TTSProvider(TTSProviderBase):
+    supports_audio_chunks = True
+    cache_key_params = (
+        "api_url",
+        "model",
+        "voice",
+        "speed",
+        "gain",
+        "sample_rate",
+        "response_format",
+    )
+
     def __init__(self, config, delete_audio_file):
         super().__init__(config, delete_audio_file)
         self.model = config.get("model")
@@ -20,7 +31,7 @@ class TTSProvider(TTSProviderBase):
         self.host = "api.siliconflow.cn"
         self.api_url = f"https://{self.host}/v1/audio/speech"
 
-    async def text_to_speak(self, text, output_file):
+    def _request(self, text, stream=False):
         request_json = {
             "model": self.model,
             "input": text,
@@ -31,10 +42,22 @@ class TTSProvider(TTSProviderBase):
             "Authorization": f"Bearer {self.access_token}",
             "Content-Type": "application/json",
         }
+        return requests.request(
+            "POST", self.api_url, json=request_json, headers=headers, stream=stream
+        )
+
+    async def audio_chunks(self, text):
+        try:
+            with self._request(text, stream=True) as response:
+                response.raise_for_status()
+                for chunk in response.iter_content(chunk_size=None):
+                    yield chunk
+        except Exception as e:
+            raise Exception(f"{__name__} error: {e}")
+
+    async def text_to_speak(self, text, output_file):
         try:
-            response = requests.request(
-                "POST", self.api_url, json=request_json, headers=headers
-            )
+            response = self._request(text)
             data = response.content
             if output_file:
                 with open(output_file, "wb") as file_to_save:
@@ -10,6 +10,7 @@ from core.providers.tts.base import TTSProviderBase
 
 
 class TTSProvider(TTSProviderBase):
+    cache_key_params = ("api_url", "region", "appid", "voice")
     def __init__(self, config, delete_audio_file):
         super().__init__(config, delete_audio_file)
         self.appid = config.get("appid")
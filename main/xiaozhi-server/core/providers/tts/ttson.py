@@ -12,6 +12,16 @@ logger = setup_logging()
 
 
 class TTSProvider(TTSProviderBase):
+    cache_key_params = (
+        "url",
+        "voice",
+        "speed_factor",
+        "pitch_factor",
+        "volume_change_dB",
+        "to_lang",
+        "emotion",
+        "format",
+    )
     def __init__(self, config, delete_audio_file):
         super().__init__(config, delete_audio_file)
         self.url = config.get(
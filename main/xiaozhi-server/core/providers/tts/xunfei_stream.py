@@ -59,6 +59,20 @@ class XunfeiWSAuth:
 
 
 class TTSProvider(TTSProviderBase):
+    cache_key_params = (
+        "api_url",
+        "app_id",
+        "voice",
+        "format",
+        "sample_rate",
+        "volume",
+        "speed",
+        "pitch",
+        "oral_level",
+        "spark_assist",
+        "stop_split",
+        "remain",
+    )
     def __init__(self, config, delete_audio_file):
         super().__init__(config, delete_audio_file)
 
@@ -1,9 +1,194 @@
+import time
+import numpy as np
 from abc import ABC, abstractmethod
 from typing import Optional
+from core.utils.endpointing import Endpointer
+
+# 不超过该字节数的opus包是DTX/舒适噪声包，不包含语音
+DTX_PACKET_BYTES = 3
 
 
 class VADProviderBase(ABC):
+    # 双阈值：高于vad_threshold判为有声，低于vad_threshold_low判为无声，中间延续上一个状态
+    vad_threshold = 0.5
+    vad_threshold_low = 0.2
+    # 静默超过该时长认为一句话说完
+    silence_threshold_ms = 1000
+    # 至少要多少帧才算有语音
+    frame_window_threshold = 3
+
+    # 能量预判：明显静音的帧直接跳过模型推理
+    pre_gate_enabled = True
+    # 低于该绝对能量（dBFS）一定是静音
+    pre_gate_min_dbfs = -55.0
+    # 低于噪声底噪多少倍且过零率不高时视为静音（清辅音能量低但过零率高，不能跳过）
+    pre_gate_noise_ratio = 1.5
+    pre_gate_max_zcr = 0.3
+    # 底噪的跟踪速度
+    noise_floor_alpha = 0.05
+    _pre_gate_min_rms = 10 ** (-55.0 / 20)
+    gated_chunks = 0
+    total_chunks = 0
+
+    # 自适应断句，为None时固定使用silence_threshold_ms
+    endpointer = None
+
     @abstractmethod
     def is_vad(self, conn, data) -> bool:
         """检测音频数据中的语音活动"""
         pass
+
+    def init_pre_gate(self, config: dict):
+        """读取能量预判配置"""
+        self.pre_gate_enabled = str(config.get("pre_gate", True)).lower() in (
+            "true",
+            "1",
+            "yes",
+        )
+        self.pre_gate_min_dbfs = float(
+            config.get("pre_gate_min_dbfs", self.pre_gate_min_dbfs)
+        )
+        self.pre_gate_noise_ratio = float(
+            config.get("pre_gate_noise_ratio", self.pre_gate_noise_ratio)
+        )
+        self.pre_gate_max_zcr = float(
+            config.get("pre_gate_max_zcr", self.pre_gate_max_zcr)
+        )
+        self._pre_gate_min_rms = 10 ** (self.pre_gate_min_dbfs / 20)
+        # 统计跳过推理的帧数，便于评估效果
+        self.gated_chunks = 0
+        self.total_chunks = 0
+
+    def init_endpointing(self, config: dict):
+        """初始化自适应断句，min_silence_duration_ms作为静默时长的上限"""
+        self.endpointer = Endpointer(config, self.silence_threshold_ms)
+        if not self.endpointer.enabled:
+            self.endpointer = None
+
+    @staticmethod
+    def is_dtx_packet(conn, packet) -> bool:
+        """设备在静音时可能只发送极小的DTX包，解码前就能判断"""
+        return conn.audio_format != "pcm" and len(packet) <= DTX_PACKET_BYTES
+
+    @abstractmethod
+    def speech_probability(self, conn, chunk) -> float:
+        """计算一帧的语音概率，由具体模型实现"""
+        pass
+
+    def reset_model_state(self, conn):
+        """重置连接上的模型状态，带循环状态的模型需要实现"""
+        pass
+
+    def chunk_probability(self, conn, chunk, dtx: bool = False) -> float:
+        """先做能量预判，明显静音的帧返回0，否则调用模型
+
+        底噪按连接分别跟踪，只在判为静音的帧上更新。
+        """
+        self.total_chunks += 1
+        if not self.pre_gate_enabled:
+            return self.speech_probability(conn, chunk)
+
+        samples = np.frombuffer(chunk, dtype=np.int16).astype(np.float32) / 32768.0
+        rms = float(np.sqrt(np.mean(samples * samples)))
+        noise_floor = getattr(conn, "vad_noise_floor", None)
+        if noise_floor is None:
+            # 从最低值开始，只随静音帧缓慢上升，避免首帧就是语音时把底噪估得过高
+            noise_floor = self._pre_gate_min_rms
+
+        # 上一帧还在说话时不跳过，避免句尾被提前截断
+        silent = dtx and not conn.last_is_voice
+        if not silent and not conn.last_is_voice:
+            if rms < self._pre_gate_min_rms:
+                silent = True
+            elif rms < noise_floor * self.pre_gate_noise_ratio:
+                signs = np.signbit(samples)
+                zcr = float(np.count_nonzero(signs[1:] != signs[:-1])) / len(samples)
+                silent = zcr < self.pre_gate_max_zcr
+
+        if silent:
+            self.gated_chunks += 1
+            speech_prob = 0.0
+            if not getattr(conn, "vad_gated", False):
+                # 跳过推理期间模型的循环状态不会更新，开始跳过时重置，恢复推理时从静音状态开始
+                self.reset_model_state(conn)
+                conn.vad_gated = True
+        else:
+            conn.vad_gated = False
+            speech_prob = self.speech_probability(conn, chunk)
+
+        if speech_prob <= self.vad_threshold_low:
+            noise_floor += self.noise_floor_alpha * (rms - noise_floor)
+            conn.vad_noise_floor = max(noise_floor, self._pre_gate_min_rms)
+        else:
+            conn.vad_noise_floor = noise_floor
+        return speech_prob
+
+    @staticmethod
+    def iter_chunks(conn, chunk_samples: int = 512):
+        """从连接的音频接入缓冲区中依次取出未处理的完整帧（零拷贝）"""
+        ingest = conn.audio_ingest
+        if conn.vad_offset < ingest.oldest_offset:
+            conn.vad_offset = ingest.oldest_offset
+        while ingest.write_offset - conn.vad_offset >= chunk_samples:
+            chunk = ingest.read(conn.vad_offset, conn.vad_offset + chunk_samples)
+            conn.vad_offset += chunk_samples
+            yield chunk
+
+    def update_voice_state(
+        self, conn, speech_prob: float, now_ms: Optional[float] = None
+    ) -> bool:
+        """根据一帧的语音概率更新连接上的VAD状态，返回当前是否有语音
+
+        Args:
+            conn: 连接对象，使用last_is_voice、client_voice_window、client_have_voice、
+                client_voice_stop、last_activity_time
+            speech_prob: 模型输出的语音概率
+            now_ms: 当前时间（毫秒），为空时取系统时间，离线回放时可传入音频时间轴
+        """
+        if now_ms is None:
+            now_ms = time.time() * 1000
+
+        # 双阈值判断
+        if speech_prob >= self.vad_threshold:
+            is_voice = True
+        elif speech_prob <= self.vad_threshold_low:
+            is_voice = False
+        else:
+            is_voice = conn.last_is_voice
+
+        # 声音没低于最低值则延续前一个状态，判断为有声音
+        conn.last_is_voice = is_voice
+
+        # 更新滑动窗口
+        conn.client_voice_window.append(is_voice)
+        client_have_voice = (
+            conn.client_voice_window.count(True) >= self.frame_window_threshold
+        )
+
+        endpointer = self.endpointer
+        if endpointer is not None and client_have_voice:
+            endpointer.on_voice(conn, now_ms, conn.client_have_voice)
+
+        # 如果之前有声音，但本次没有声音，且与上次有声音的时间差已经超过了静默阈值，则认为已经说完一句话
+        if conn.client_have_voice and not client_have_voice:
+            stop_duration = now_ms - conn.last_activity_time
+            speculation = getattr(conn, "speculation", None)
+            if speculation is not None:
+                # 句中停顿，中间识别结果稳定时可以提前请求大模型
+                speculation.on_pause(stop_duration)
+            if endpointer is not None:
+                endpointer.on_silence(conn, conn.last_activity_time)
+                silence_threshold_ms = endpointer.required_silence_ms(
+                    conn, conn.last_activity_time
+                )
+            else:
+                silence_threshold_ms = self.silence_threshold_ms
+            if stop_duration >= silence_threshold_ms and not conn.client_voice_stop:
+                conn.client_voice_stop = True
+                if endpointer is not None:
+                    endpointer.on_stop(conn, now_ms)
+        if client_have_voice:
+            conn.client_have_voice = True
+            conn.last_activity_time = now_ms
+
+        return client_have_voice
@@ -1,9 +1,8 @@
-import time
 import numpy as np
 import torch
-import opuslib_next
 from config.logger import setup_logging
 from core.providers.vad.base import VADProviderBase
+from core.utils.thread_budget import apply_torch_threads
 
 TAG = __name__
 logger = setup_logging()
@@ -12,6 +11,8 @@ logger = setup_logging()
 class VADProvider(VADProviderBase):
     def __init__(self, config):
         logger.bind(tag=TAG).info("SileroVAD", config)
+        # 按线程预算限制torch线程池，避免多连接并发推理时线程数超出核数
+        apply_torch_threads()
         self.model, _ = torch.hub.load(
             repo_or_dir=config["model_dir"],
             source="local",
@@ -19,8 +20,6 @@ class VADProvider(VADProviderBase):
             force_reload=False,
         )
 
-        self.decoder = opuslib_next.Decoder(16000, 1)
-
         # 处理空字符串的情况
         threshold = config.get("threshold", "0.5")
         threshold_low = config.get("threshold_low", "0.2")
@@ -36,55 +35,35 @@ class VADProvider(VADProviderBase):
         # 至少要多少帧才算有语音
         self.frame_window_threshold = 3
 
-    def is_vad(self, conn, opus_packet):
-        try:
-            pcm_frame = self.decoder.decode(opus_packet, 960)
-            conn.client_audio_buffer.extend(pcm_frame)  # 将新数据加入缓冲区
-
-            # 处理缓冲区中的完整帧（每次处理512采样点）
-            client_have_voice = False
-            while len(conn.client_audio_buffer) >= 512 * 2:
-                # 提取前512个采样点（1024字节）
-                chunk = conn.client_audio_buffer[: 512 * 2]
-                conn.client_audio_buffer = conn.client_audio_buffer[512 * 2 :]
-
-                # 转换为模型需要的张量格式
-                audio_int16 = np.frombuffer(chunk, dtype=np.int16)
-                audio_float32 = audio_int16.astype(np.float32) / 32768.0
-                audio_tensor = torch.from_numpy(audio_float32)
-
-                # 检测语音活动
-                with torch.no_grad():
-                    speech_prob = self.model(audio_tensor, 16000).item()
+        # 能量和DTX预判，静音帧跳过模型推理
+        self.init_pre_gate(config)
+        # 根据停顿习惯和识别结果动态缩短断句静默时长
+        self.init_endpointing(config)
 
-                # 双阈值判断
-                if speech_prob >= self.vad_threshold:
-                    is_voice = True
-                elif speech_prob <= self.vad_threshold_low:
-                    is_voice = False
-                else:
-                    is_voice = conn.last_is_voice
+    def reset_model_state(self, conn):
+        """torch模型的循环状态保存在模型内部，由进程内的所有连接共用"""
+        self.model.reset_states()
 
-                # 声音没低于最低值则延续前一个状态，判断为有声音
-                conn.last_is_voice = is_voice
+    def speech_probability(self, conn, chunk: bytes) -> float:
+        """计算512个采样点（16kHz、16bit）的语音概率"""
+        # 转换为模型需要的张量格式
+        audio_int16 = np.frombuffer(chunk, dtype=np.int16)
+        audio_float32 = audio_int16.astype(np.float32) / 32768.0
+        audio_tensor = torch.from_numpy(audio_float32)
 
-                # 更新滑动窗口
-                conn.client_voice_window.append(is_voice)
-                client_have_voice = (
-                    conn.client_voice_window.count(True) >= self.frame_window_threshold
-                )
+        # 检测语音活动
+        with torch.no_grad():
+            return self.model(audio_tensor, 16000).item()
 
-                # 如果之前有声音，但本次没有声音，且与上次有声音的时间差已经超过了静默阈值，则认为已经说完一句话
-                if conn.client_have_voice and not client_have_voice:
-                    stop_duration = time.time() * 1000 - conn.last_activity_time
-                    if stop_duration >= self.silence_threshold_ms:
-                        conn.client_voice_stop = True
-                if client_have_voice:
-                    conn.client_have_voice = True
-                    conn.last_activity_time = time.time() * 1000
+    def is_vad(self, conn, opus_packet):
+        try:
+            # 音频包已在接入缓冲区解码，这里按512采样点一帧读取未处理的部分
+            client_have_voice = False
+            dtx = self.is_dtx_packet(conn, opus_packet)
+            for chunk in self.iter_chunks(conn, 512):
+                speech_prob = self.chunk_probability(conn, chunk, dtx)
+                client_have_voice = self.update_voice_state(conn, speech_prob)
 
             return client_have_voice
-        except opuslib_next.OpusError as e:
-            logger.bind(tag=TAG).info(f"解码错误: {e}")
         except Exception as e:
             logger.bind(tag=TAG).error(f"Error processing audio packet: {e}")
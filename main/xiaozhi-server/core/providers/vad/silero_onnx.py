@@ -0,0 +1,89 @@
+import numpy as np
+import onnxruntime
+from config.logger import setup_logging
+from core.providers.vad.base import VADProviderBase
+from core.utils.thread_budget import onnx_session_options
+
+TAG = __name__
+logger = setup_logging()
+
+# 16kHz下每帧512个采样点，模型还需要拼接上一帧末尾的64个采样点作为上下文
+CHUNK_SAMPLES = 512
+CONTEXT_SAMPLES = 64
+SAMPLE_RATE = 16000
+
+
+class VADProvider(VADProviderBase):
+    """使用onnxruntime运行的Silero VAD，与silero模型相同，不依赖torch"""
+
+    def __init__(self, config):
+        logger.bind(tag=TAG).info("SileroVAD(onnx)", config)
+        model_path = config.get(
+            "model_path",
+            "models/snakers4_silero-vad/src/silero_vad/data/silero_vad.onnx",
+        )
+        self.session = onnxruntime.InferenceSession(
+            model_path,
+            sess_options=onnx_session_options("vad"),
+            providers=["CPUExecutionProvider"],
+        )
+        self.sample_rate = np.array(SAMPLE_RATE, dtype=np.int64)
+
+        # 处理空字符串的情况
+        threshold = config.get("threshold", "0.5")
+        threshold_low = config.get("threshold_low", "0.2")
+        min_silence_duration_ms = config.get("min_silence_duration_ms", "1000")
+
+        self.vad_threshold = float(threshold) if threshold else 0.5
+        self.vad_threshold_low = float(threshold_low) if threshold_low else 0.2
+
+        self.silence_threshold_ms = (
+            int(min_silence_duration_ms) if min_silence_duration_ms else 1000
+        )
+
+        # 至少要多少帧才算有语音
+        self.frame_window_threshold = 3
+
+        # 能量和DTX预判，静音帧跳过模型推理
+        self.init_pre_gate(config)
+        # 根据停顿习惯和识别结果动态缩短断句静默时长
+        self.init_endpointing(config)
+
+    @staticmethod
+    def reset_model_state(conn):
+        """重置连接上的模型状态（RNN状态和上下文采样点）"""
+        conn.silero_state = np.zeros((2, 1, 128), dtype=np.float32)
+        conn.silero_context = np.zeros((1, CONTEXT_SAMPLES), dtype=np.float32)
+
+    def speech_probability(self, conn, chunk: bytes) -> float:
+        """计算512个采样点（16kHz、16bit）的语音概率，模型状态保存在各自的连接上"""
+        if getattr(conn, "silero_state", None) is None:
+            self.reset_model_state(conn)
+
+        audio = np.frombuffer(chunk, dtype=np.int16).astype(np.float32) / 32768.0
+        model_input = np.concatenate(
+            (conn.silero_context, audio.reshape(1, CHUNK_SAMPLES)), axis=1
+        )
+        out, conn.silero_state = self.session.run(
+            None,
+            {
+                "input": model_input,
+                "state": conn.silero_state,
+                "sr": self.sample_rate,
+            },
+        )
+        conn.silero_context = model_input[:, -CONTEXT_SAMPLES:]
+        return float(out[0][0])
+
+    def is_vad(self, conn, opus_packet):
+        try:
+            # 音频包已在接入缓冲区解码，这里按512采样点一帧读取未处理的部分
+            client_have_voice = False
+            dtx = self.is_dtx_packet(conn, opus_packet)
+            for chunk in self.iter_chunks(conn, CHUNK_SAMPLES):
+                speech_prob = self.chunk_probability(conn, chunk, dtx)
+                client_have_voice = self.update_voice_state(conn, speech_prob)
+
+            return client_have_voice
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"Error processing audio packet: {e}")
@@ -0,0 +1,130 @@
+"""
+流式ASR连接预热
+
+流式ASR原先在VAD检测到说话后才建立到识别服务的WebSocket，DNS、TCP、TLS和识别会话的初始化请求
+都发生在用户已经开始说话之后，开头的音频帧排队等待握手完成。
+这里在可能马上要说话的时刻（设备连上、播放结束、客户端开始拾音）预先建立连接，说话时直接取用：
+- 预热连接在服务端空闲超时之前关闭并重建（max_idle_s）
+- 只在触发后的window_s秒内保持预热，长时间不说话的设备不占用识别服务的连接
+- 预热中的连接在说话时直接等待其完成，不另外建立
+每个设备连接一个实例，所有方法都在事件循环线程中调用。
+"""
+
+import time
+import asyncio
+from typing import Any, Awaitable, Callable, Optional
+
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+
+class WarmConnection:
+    """单个设备连接的流式ASR预热连接"""
+
+    def __init__(self, name: str, connect: Callable[[], Awaitable[Any]], options: dict):
+        """
+        Args:
+            connect: 建立连接（以及识别服务允许提前完成的初始化），返回可以直接发送音频的websocket
+        """
+        options = options or {}
+        self.name = name
+        self.connect = connect
+        self.enabled = str(options.get("enabled", True)).lower() in ("true", "1", "yes")
+        self.max_idle_s = float(options.get("max_idle_s", 8))
+        self.window_s = float(options.get("window_s", 30))
+        self._ready = None
+        self._ready_at = 0.0
+        self._pending: Optional[asyncio.Task] = None
+        self._rotate_handle = None
+        self._window_until = 0.0
+        self._closed = False
+        # 统计
+        self.hits = 0
+        self.misses = 0
+
+    def prewarm(self):
+        """可能马上要说话时调用，在后台准备连接"""
+        if not self.enabled or self._closed:
+            return
+        self._window_until = time.monotonic() + self.window_s
+        if self._ready is not None or self._pending is not None:
+            return
+        self._pending = asyncio.create_task(self._open())
+
+    async def take(self):
+        """开始说话时取用预热的连接，没有可用连接时返回None，由调用方自行建立"""
+        if self._pending is not None:
+            try:
+                await asyncio.shield(self._pending)
+            except Exception:
+                pass
+        ws, self._ready = self._ready, None
+        self._cancel_rotate()
+        if ws is None:
+            if self.enabled:
+                self.misses += 1
+            return None
+        if time.monotonic() - self._ready_at > self.max_idle_s:
+            # 轮换任务没来得及执行，连接可能已被服务端关闭
+            await self._close_ws(ws)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return ws
+
+    async def _open(self):
+        try:
+            start = time.monotonic()
+            ws = await self.connect()
+            if self._closed:
+                await self._close_ws(ws)
+                return
+            self._ready = ws
+            self._ready_at = time.monotonic()
+            self._rotate_handle = asyncio.get_running_loop().call_later(
+                self.max_idle_s, self._rotate
+            )
+            logger.bind(tag=TAG).debug(
+                f"{self.name} 预热连接就绪，耗时 {self._ready_at - start:.3f}s"
+            )
+        except Exception as e:
+            logger.bind(tag=TAG).warning(f"{self.name} 预热连接失败: {e}")
+        finally:
+            self._pending = None
+
+    def _rotate(self):
+        """在服务端空闲超时之前关闭预热连接，仍在预热窗口内时重新建立"""
+        self._rotate_handle = None
+        ws, self._ready = self._ready, None
+        if ws is not None:
+            asyncio.create_task(self._close_ws(ws))
+        if not self._closed and time.monotonic() < self._window_until:
+            self._pending = asyncio.create_task(self._open())
+
+    def _cancel_rotate(self):
+        if self._rotate_handle is not None:
+            self._rotate_handle.cancel()
+            self._rotate_handle = None
+
+    @staticmethod
+    async def _close_ws(ws):
+        try:
+            await ws.close()
+        except Exception:
+            pass
+
+    async def close(self):
+        self._closed = True
+        self._cancel_rotate()
+        if self._pending is not None:
+            self._pending.cancel()
+            self._pending = None
+        ws, self._ready = self._ready, None
+        if ws is not None:
+            await self._close_ws(ws)
+        if self.hits or self.misses:
+            logger.bind(tag=TAG).info(
+                f"{self.name} 预热连接命中 {self.hits}/{self.hits + self.misses}"
+            )
@@ -0,0 +1,306 @@
+"""
+本地ASR独立进程池
+
+本地ASR（fun_local、sherpa_onnx_local、vosk）的前后处理大量运行在Python层，与事件循环争抢GIL，
+识别负载高时会让下发音频的节奏出现抖动。开启process_workers后，模型运行在独立的工作进程中：
+- 每个工作进程持有一块共享内存，父进程把整句PCM写入共享内存，只通过管道传递偏移和长度；
+- 识别结果通过管道返回；
+- 工作进程崩溃或超时只影响当前这一句，进程池会自动拉起新的工作进程。
+进程池只在实际识别的服务进程中启动：多进程模式下父进程在fork前创建本对象但不启动，
+由各服务进程启动后各自拉起，父进程中不会有闲置的模型。
+"""
+
+import os
+import atexit
+import signal
+import asyncio
+import itertools
+import threading
+import queue
+import multiprocessing
+from multiprocessing import shared_memory, resource_tracker
+from typing import List, Optional, Tuple
+
+from config.logger import setup_logging
+from core.providers.asr.base import ASRProviderBase
+from core.providers.asr.dto.dto import InterfaceType
+from core.utils.thread_budget import get_threads
+
+TAG = __name__
+logger = setup_logging()
+
+# 支持放到独立进程中运行的本地ASR类型
+LOCAL_ASR_TYPES = {"fun_local", "sherpa_onnx_local", "vosk"}
+
+# 16kHz、16bit单声道PCM每秒字节数
+PCM_BYTES_PER_SECOND = 16000 * 2
+
+
+def _asr_worker_main(asr_type, asr_config, delete_audio_file, shm_name, conn, cpu_set):
+    """ASR工作进程入口"""
+    # Ctrl-C由主进程统一处理，工作进程随主进程关闭管道退出
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if cpu_set and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpu_set)
+
+    from core.utils import asr
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    # 共享内存由主进程创建和释放，工作进程只是挂载，避免退出时被资源跟踪器提前回收
+    resource_tracker.unregister(shm._name, "shared_memory")
+
+    try:
+        provider = asr.create_instance(asr_type, asr_config, delete_audio_file)
+    except Exception as e:
+        conn.send(("error", str(e)))
+        return
+    conn.send(("ready", os.getpid()))
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                break
+            if message is None:
+                break
+            request_id, offset, length, payload, session_id = message
+            pcm = payload if payload is not None else bytes(shm.buf[offset : offset + length])
+            try:
+                text, file_path = loop.run_until_complete(
+                    provider.speech_to_text([pcm], session_id, "pcm")
+                )
+                conn.send((request_id, text, file_path, None))
+            except Exception as e:
+                conn.send((request_id, "", None, str(e)))
+    finally:
+        loop.close()
+        shm.close()
+
+
+class ASRWorker:
+    """一个ASR工作进程及其共享内存和管道"""
+
+    def __init__(self, index: int, cpu_set: Optional[List[int]], shm_size: int):
+        self.index = index
+        self.cpu_set = cpu_set
+        self.shm_size = shm_size
+        self.shm: Optional[shared_memory.SharedMemory] = None
+        self.process = None
+        self.conn = None
+        self.request_ids = itertools.count(1)
+
+    def start(self, ctx, asr_type, asr_config, delete_audio_file, startup_timeout):
+        if self.shm is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=self.shm_size)
+        parent_conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_asr_worker_main,
+            args=(
+                asr_type,
+                asr_config,
+                delete_audio_file,
+                self.shm.name,
+                child_conn,
+                self.cpu_set,
+            ),
+            name=f"asr-worker-{self.index}",
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        self.conn = parent_conn
+
+        if not self.conn.poll(startup_timeout):
+            self.stop()
+            raise TimeoutError(f"ASR工作进程{self.index}启动超时")
+        status, detail = self.conn.recv()
+        if status != "ready":
+            self.stop()
+            raise RuntimeError(f"ASR工作进程{self.index}加载模型失败: {detail}")
+        logger.bind(tag=TAG).info(
+            f"ASR工作进程{self.index}已就绪，pid={detail}，CPU绑定={self.cpu_set or '不限'}"
+        )
+
+    def recognize(self, pcm: bytes, session_id: str, timeout: float) -> Tuple[str, Optional[str]]:
+        request_id = next(self.request_ids)
+        if len(pcm) <= self.shm_size:
+            self.shm.buf[: len(pcm)] = pcm
+            self.conn.send((request_id, 0, len(pcm), None, session_id))
+        else:
+            # 超长语音放不进共享内存，退化为通过管道传输
+            self.conn.send((request_id, 0, 0, pcm, session_id))
+
+        if not self.conn.poll(timeout):
+            raise TimeoutError(f"ASR工作进程{self.index}识别超时")
+        response_id, text, file_path, error = self.conn.recv()
+        if response_id != request_id:
+            raise RuntimeError(f"ASR工作进程{self.index}返回了错误的请求结果")
+        if error:
+            logger.bind(tag=TAG).error(f"ASR工作进程{self.index}识别失败: {error}")
+        return text, file_path
+
+    def stop(self):
+        if self.conn is not None:
+            try:
+                self.conn.send(None)
+            except (OSError, ValueError):
+                pass
+            self.conn.close()
+            self.conn = None
+        if self.process is not None:
+            self.process.join(timeout=1)
+            if self.process.is_alive():
+                self.process.kill()
+                self.process.join(timeout=1)
+            self.process = None
+
+    def release(self):
+        self.stop()
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+
+class ProcessPoolASRProvider(ASRProviderBase):
+    """把本地ASR放到独立进程池中运行的代理，对连接而言与普通本地ASR一致"""
+
+    def __init__(self, asr_type: str, config: dict, delete_audio_file: bool):
+        super().__init__()
+        self.interface_type = InterfaceType.LOCAL
+        self.asr_type = asr_type
+        # 线程预算已按ASR进程数平分核数，显式传给工作进程中的模型
+        self.config = dict(config)
+        self.config.setdefault("num_threads", get_threads("asr"))
+        self.delete_audio_file = delete_audio_file
+        self.output_dir = config.get("output_dir", "tmp/")
+
+        self.worker_count = max(1, int(config.get("process_workers", 1)))
+        self.request_timeout = float(config.get("process_timeout", 15))
+        self.startup_timeout = float(config.get("process_startup_timeout", 300))
+        max_seconds = float(config.get("process_max_audio_seconds", 60))
+        self.shm_size = int(max_seconds * PCM_BYTES_PER_SECOND)
+        self.cpu_sets = self._parse_cpu_affinity(config.get("process_cpu_affinity"))
+
+        # 使用spawn启动，工作进程不继承主进程的线程和torch状态
+        self._ctx = multiprocessing.get_context("spawn")
+        self._lock = threading.Lock()
+        self._owner_pid = None
+        self._workers: List[ASRWorker] = []
+        self._idle: "queue.Queue[ASRWorker]" = queue.Queue()
+
+    def _parse_cpu_affinity(self, affinity) -> List[Optional[List[int]]]:
+        """process_cpu_affinity支持两种写法：
+        - [0, 1, 2, 3]：按顺序给每个工作进程绑定一个核
+        - [[0, 1], [2, 3]]：给每个工作进程绑定一组核
+        """
+        if not affinity:
+            return [None] * self.worker_count
+        cpu_sets = []
+        for i in range(self.worker_count):
+            item = affinity[i % len(affinity)]
+            cpu_sets.append(list(item) if isinstance(item, (list, tuple)) else [int(item)])
+        return cpu_sets
+
+    def _start_workers(self):
+        if self._owner_pid is None:
+            # 多进程模式下服务进程以os._exit退出，不执行atexit，由WebSocketServer退出时调用close
+            atexit.register(self.close)
+        self._owner_pid = os.getpid()
+        self._workers = []
+        self._idle = queue.Queue()
+        for i in range(self.worker_count):
+            worker = ASRWorker(i, self.cpu_sets[i], self.shm_size)
+            self._workers.append(worker)
+            try:
+                worker.start(
+                    self._ctx,
+                    self.asr_type,
+                    self.config,
+                    self.delete_audio_file,
+                    self.startup_timeout,
+                )
+            except Exception:
+                # 部分启动失败时全部释放，下次识别时重新启动
+                self.close()
+                raise
+            self._idle.put(worker)
+
+    def _ensure_started(self):
+        # 多进程模式下本对象在fork前创建，只在使用它的服务进程中启动，父进程不持有工作进程
+        if self._owner_pid == os.getpid():
+            return
+        with self._lock:
+            if self._owner_pid != os.getpid():
+                logger.bind(tag=TAG).info(f"在进程{os.getpid()}中启动ASR工作进程池")
+                self._start_workers()
+
+    def start(self):
+        """在当前进程中预先启动进程池，失败时在第一次识别时重试"""
+        try:
+            self._ensure_started()
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"启动ASR工作进程池失败: {e}")
+
+    def _restart_worker(self, worker: ASRWorker):
+        worker.stop()
+        while self._owner_pid == os.getpid():
+            try:
+                worker.start(
+                    self._ctx,
+                    self.asr_type,
+                    self.config,
+                    self.delete_audio_file,
+                    self.startup_timeout,
+                )
+                self._idle.put(worker)
+                return
+            except Exception as e:
+                logger.bind(tag=TAG).error(f"重启ASR工作进程{worker.index}失败: {e}")
+                threading.Event().wait(5)
+
+    def _recognize(self, pcm: bytes, session_id: str) -> Tuple[str, Optional[str]]:
+        self._ensure_started()
+        try:
+            worker = self._idle.get(timeout=self.request_timeout)
+        except queue.Empty:
+            logger.bind(tag=TAG).error("ASR工作进程全部繁忙，本次识别丢弃")
+            return "", None
+
+        try:
+            result = worker.recognize(pcm, session_id, self.request_timeout)
+        except (EOFError, OSError, TimeoutError, RuntimeError) as e:
+            logger.bind(tag=TAG).error(f"ASR工作进程{worker.index}异常，正在重启: {e}")
+            threading.Thread(
+                target=self._restart_worker, args=(worker,), daemon=True
+            ).start()
+            return "", None
+        self._idle.put(worker)
+        return result
+
+    async def speech_to_text(
+        self, opus_data: List[bytes], session_id: str, audio_format="opus"
+    ) -> Tuple[Optional[str], Optional[str]]:
+        if audio_format == "pcm":
+            pcm_data = opus_data
+        else:
+            pcm_data = self.decode_opus(opus_data)
+        combined_pcm_data = b"".join(pcm_data)
+        if not combined_pcm_data:
+            return "", None
+        return await asyncio.to_thread(self._recognize, combined_pcm_data, session_id)
+
+    def close(self):
+        """关闭所有工作进程并释放共享内存"""
+        if self._owner_pid != os.getpid():
+            return
+        # 先清除所属进程，正在重启的工作进程不再重试
+        self._owner_pid = None
+        # 连接私有的进程池随连接关闭，不再保留在退出回调中
+        atexit.unregister(self.close)
+        for worker in self._workers:
+            worker.release()
+        self._workers = []
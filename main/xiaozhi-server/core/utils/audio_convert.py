@@ -0,0 +1,244 @@
+"""
+进程内的PCM格式转换
+
+原先改变采样率、声道数和位深都通过pydub调用ffmpeg，每段音频都要启动一个子进程。
+这里用numpy在进程内完成转换：
+- WAV头部解析（PCM、浮点和WAVE_FORMAT_EXTENSIBLE）
+- 8/16/24/32位整数和32/64位浮点转为16位，多声道混为单声道
+- 多相滤波重采样，跨数据块保留滤波器状态，流式输入的结果与一次性输入一致
+"""
+
+import struct
+from fractions import Fraction
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+TARGET_SAMPLE_RATE = 16000
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+class WavInfo(NamedTuple):
+    format_tag: int
+    channels: int
+    sample_rate: int
+    bits: int
+    data_offset: int
+    # 流式生成的WAV头部中数据长度可能为0或0xFFFFFFFF，此时以实际数据为准
+    data_size: int
+
+    @property
+    def supported(self) -> bool:
+        """是否为可以在进程内转换的未压缩格式"""
+        if self.format_tag == WAVE_FORMAT_PCM:
+            return self.bits in (8, 16, 24, 32)
+        if self.format_tag == WAVE_FORMAT_IEEE_FLOAT:
+            return self.bits in (32, 64)
+        return False
+
+
+def parse_wav_header(data: bytes) -> Optional[WavInfo]:
+    """解析WAV头部，头部不完整时返回None"""
+    if len(data) < 12:
+        return None
+    if data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        raise ValueError("不是有效的WAV数据")
+    offset = 12
+    fmt = None
+    while offset + 8 <= len(data):
+        chunk_id = data[offset : offset + 4]
+        (chunk_size,) = struct.unpack("<I", data[offset + 4 : offset + 8])
+        body = offset + 8
+        if chunk_id == b"data":
+            if fmt is None:
+                raise ValueError("WAV缺少fmt块")
+            return WavInfo(*fmt, body, chunk_size)
+        if body + chunk_size > len(data):
+            return None
+        if chunk_id == b"fmt ":
+            format_tag, channels, sample_rate = struct.unpack(
+                "<HHI", data[body : body + 8]
+            )
+            (bits,) = struct.unpack("<H", data[body + 14 : body + 16])
+            if format_tag == WAVE_FORMAT_EXTENSIBLE and chunk_size >= 26:
+                # 实际格式是SubFormat GUID的前两个字节
+                (format_tag,) = struct.unpack("<H", data[body + 24 : body + 26])
+            fmt = (format_tag, channels, sample_rate, bits)
+        offset = body + chunk_size + (chunk_size & 1)
+    return None
+
+
+def _to_float(data: bytes, bits: int, is_float: bool) -> np.ndarray:
+    """交错的采样数据转为以16位整数为量程的浮点数组"""
+    if is_float:
+        dtype = np.float32 if bits == 32 else np.float64
+        return np.frombuffer(data, dtype=dtype).astype(np.float64) * 32767.0
+    if bits == 8:
+        # 8位WAV是无符号数
+        return (np.frombuffer(data, dtype=np.uint8).astype(np.float64) - 128.0) * 256.0
+    if bits == 16:
+        return np.frombuffer(data, dtype="<i2").astype(np.float64)
+    if bits == 24:
+        raw = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        samples = raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)
+        samples = np.where(samples & 0x800000, samples - 0x1000000, samples)
+        return samples.astype(np.float64) / 256.0
+    if bits == 32:
+        return np.frombuffer(data, dtype="<i4").astype(np.float64) / 65536.0
+    raise ValueError(f"不支持的位深: {bits}")
+
+
+def _to_int16(samples: np.ndarray) -> bytes:
+    return np.clip(np.rint(samples), -32768, 32767).astype("<i2").tobytes()
+
+
+@lru_cache(maxsize=16)
+def _polyphase_filter(up: int, down: int, taps_per_phase: int) -> np.ndarray:
+    """Kaiser窗的低通原型滤波器，按相位拆分为(up, taps_per_phase)的滤波器组"""
+    # 奇数长度的对称滤波器群延迟为整数个采样点，末尾补一个0凑满滤波器组
+    length = up * taps_per_phase - 1
+    # 截止频率取输入和输出奈奎斯特频率中较低的一个，留少量过渡带
+    cutoff = 0.95 * 0.5 / max(up, down)
+    n = np.arange(length) - (length - 1) // 2
+    h = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(length, 8.6)
+    h = np.append(h * up / h.sum(), 0.0)
+    # phases[p, j] = h[p + up * j]
+    return h.reshape(taps_per_phase, up).T.copy()
+
+
+class StreamingResampler:
+    """有理数比例的多相滤波重采样，process可以按任意大小的数据块多次调用"""
+
+    def __init__(self, src_rate: int, dst_rate: int, taps_per_phase: int = 24):
+        ratio = Fraction(int(dst_rate), int(src_rate))
+        self.up = ratio.numerator
+        self.down = ratio.denominator
+        # 降采样时截止频率更低，滤波器按比例加长才能保持同样的阻带衰减
+        self.taps = -(-taps_per_phase * max(self.up, self.down) // self.up)
+        self.phases = _polyphase_filter(self.up, self.down, self.taps)
+        # 滤波器的群延迟（上采样后的采样点），输出对齐到输入的起点
+        self.delay = (self.up * self.taps - 2) // 2
+        self.reset()
+
+    @property
+    def passthrough(self) -> bool:
+        return self.up == self.down
+
+    def reset(self):
+        # buffer[0]对应输入的第buffer_start个采样点，起点之前视为0
+        self.buffer = np.zeros(self.taps - 1)
+        self.buffer_start = -(self.taps - 1)
+        self.total_in = 0
+        self.next_out = 0
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        if self.passthrough:
+            return samples
+        self.buffer = np.concatenate((self.buffer, samples))
+        self.total_in += len(samples)
+        # 第n个输出点需要的最新输入点为 (n * down + delay) // up
+        end = (self.up * self.total_in - 1 - self.delay) // self.down + 1
+        if end <= self.next_out:
+            return np.zeros(0)
+        t = np.arange(self.next_out, end, dtype=np.int64) * self.down + self.delay
+        newest = t // self.up - self.buffer_start
+        window = self.buffer[newest[:, None] - np.arange(self.taps)[None, :]]
+        out = np.einsum("ij,ij->i", self.phases[t % self.up], window)
+        self.next_out = end
+        # 只保留后续输出还需要的输入
+        keep_from = (end * self.down + self.delay) // self.up - (self.taps - 1)
+        drop = keep_from - self.buffer_start
+        if drop > 0:
+            self.buffer = self.buffer[drop:]
+            self.buffer_start = keep_from
+        return out
+
+    def flush(self) -> np.ndarray:
+        """输入结束，输出滤波器中剩余的采样点，之后可以开始新的一段"""
+        if self.passthrough:
+            return np.zeros(0)
+        expected = -(-self.total_in * self.up // self.down)
+        remaining = expected - self.next_out
+        out = np.zeros(0)
+        if remaining > 0:
+            out = self.process(np.zeros(self.delay // self.up + 2))[:remaining]
+        self.reset()
+        return out
+
+
+class PcmConverter:
+    """把任意采样率、声道数和位深的PCM数据块转为单声道16位PCM，数据块不需要按采样点对齐"""
+
+    def __init__(
+        self,
+        src_rate: int,
+        channels: int = 1,
+        bits: int = 16,
+        is_float: bool = False,
+        dst_rate: int = TARGET_SAMPLE_RATE,
+    ):
+        self.channels = max(1, int(channels))
+        self.bits = int(bits)
+        self.is_float = is_float
+        self.block_align = self.channels * self.bits // 8
+        self.resampler = StreamingResampler(src_rate, dst_rate)
+        self.identity = (
+            self.resampler.passthrough
+            and self.channels == 1
+            and self.bits == 16
+            and not is_float
+        )
+        self.pending = b""
+
+    @classmethod
+    def from_wav(cls, info: WavInfo, dst_rate: int = TARGET_SAMPLE_RATE):
+        return cls(
+            info.sample_rate,
+            info.channels,
+            info.bits,
+            info.format_tag == WAVE_FORMAT_IEEE_FLOAT,
+            dst_rate,
+        )
+
+    def convert(self, data: bytes) -> bytes:
+        if self.pending:
+            data = self.pending + data
+        usable = len(data) - len(data) % self.block_align
+        self.pending = data[usable:]
+        if not usable:
+            return b""
+        if self.identity:
+            return data[:usable]
+        samples = _to_float(data[:usable], self.bits, self.is_float)
+        if self.channels > 1:
+            samples = samples.reshape(-1, self.channels).mean(axis=1)
+        return _to_int16(self.resampler.process(samples))
+
+    def flush(self) -> bytes:
+        """输入结束，丢弃不完整的采样点并输出剩余数据"""
+        self.pending = b""
+        if self.identity:
+            return b""
+        return _to_int16(self.resampler.flush())
+
+    def reset(self):
+        self.pending = b""
+        self.resampler.reset()
+
+
+def wav_bytes_to_pcm(
+    wav_bytes: bytes, dst_rate: int = TARGET_SAMPLE_RATE
+) -> Optional[bytes]:
+    """WAV转为单声道16位PCM，压缩编码的WAV（如ADPCM）返回None，由调用方改用ffmpeg"""
+    info = parse_wav_header(wav_bytes)
+    if info is None or not info.supported:
+        return None
+    data = wav_bytes[info.data_offset :]
+    if 0 < info.data_size < len(data):
+        data = data[: info.data_size]
+    converter = PcmConverter.from_wav(info, dst_rate)
+    return converter.convert(data) + converter.flush()
@@ -0,0 +1,153 @@
+"""
+上行音频接入环形缓冲区
+
+每个连接一个实例：收到的音频包（opus或pcm）只在这里解码一次，写入PCM环形缓冲区，
+并按单调递增的采样点偏移量编址。VAD、ASR、声纹识别按偏移区间读取，不再各自解码、拼接和切片。
+缓冲区初始只有几秒，整句识别需要保留更长的音频时按需扩大，最大不超过capacity_seconds。
+
+读写都发生在连接的音频处理流程中（handleAudioMessage串行执行），不需要加锁。
+"""
+
+from collections import deque
+from typing import List, Optional, Tuple, Union
+
+import opuslib_next
+
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2
+# 60ms一帧的opus解码后采样点数
+OPUS_FRAME_SAMPLES = 960
+# 缓冲区的初始大小（秒），VAD和流式识别只读取最近一两个包
+INITIAL_SECONDS = 4
+
+
+class AudioIngest:
+    """单连接的上行PCM环形缓冲区，偏移量单位为采样点"""
+
+    def __init__(self, capacity_seconds: float = 60):
+        # 缓冲区最大采样点数
+        self.capacity = int(capacity_seconds * SAMPLE_RATE)
+        # 当前缓冲区采样点数
+        self.size = min(self.capacity, INITIAL_SECONDS * SAMPLE_RATE)
+        self._buffer = bytearray(self.size * SAMPLE_WIDTH)
+        self._view = memoryview(self._buffer)
+        # 已写入的总采样点数，只增不减
+        self.write_offset = 0
+        # 最近音频包对应的采样点区间，用于按包数回取整句音频
+        self._packets = deque(maxlen=self.capacity // OPUS_FRAME_SAMPLES + 1)
+        self._decoder = None
+
+    @property
+    def oldest_offset(self) -> int:
+        """仍保留在缓冲区中的最早采样点偏移"""
+        return max(0, self.write_offset - self.size)
+
+    def write(self, packet: bytes, audio_format: str = "opus") -> Tuple[int, int]:
+        """解码并写入一个音频包，返回该包对应的采样点区间[start, end)"""
+        if audio_format == "pcm":
+            pcm = packet
+        else:
+            if self._decoder is None:
+                self._decoder = opuslib_next.Decoder(SAMPLE_RATE, 1)
+            try:
+                pcm = self._decoder.decode(packet, OPUS_FRAME_SAMPLES) if packet else b""
+            except opuslib_next.OpusError as e:
+                logger.bind(tag=TAG).info(f"解码错误: {e}")
+                pcm = b""
+
+        start = self.write_offset
+        self._write_pcm(pcm)
+        self._packets.append((start, self.write_offset))
+        return start, self.write_offset
+
+    def _write_pcm(self, pcm: bytes):
+        size = len(pcm) - len(pcm) % SAMPLE_WIDTH
+        if size <= 0:
+            return
+        if size > len(self._buffer):
+            self._grow(size // SAMPLE_WIDTH)
+        total = len(self._buffer)
+        if size > total:
+            # 单包超过最大缓冲区时只保留末尾
+            skipped = (size - total) // SAMPLE_WIDTH
+            self.write_offset += skipped
+            pcm = memoryview(pcm)[size - total : size]
+            size = total
+        self._place(self.write_offset, pcm[:size])
+        self.write_offset += size // SAMPLE_WIDTH
+
+    def _place(self, offset: int, pcm):
+        """把PCM写到采样点偏移offset对应的位置，跨越末尾时分两段"""
+        total = len(self._buffer)
+        size = len(pcm)
+        pos = (offset * SAMPLE_WIDTH) % total
+        first = min(size, total - pos)
+        self._view[pos : pos + first] = pcm[:first]
+        if size > first:
+            self._view[: size - first] = pcm[first:size]
+
+    def _grow(self, samples: int):
+        """扩大缓冲区到至少samples个采样点（按倍数增长，不超过capacity），保留已有数据"""
+        samples = min(self.capacity, max(samples, self.size * 2))
+        if samples <= self.size:
+            return
+        start = self.oldest_offset
+        retained = bytes(self.read(start, self.write_offset) or b"")
+        self.size = samples
+        self._buffer = bytearray(samples * SAMPLE_WIDTH)
+        self._view = memoryview(self._buffer)
+        self._place(start, retained)
+
+    def retain_packets(self, count: int):
+        """保证最近count个音频包在下一个包写入后仍在缓冲区中，整句识别前按句子长度调用"""
+        if count <= 0 or not self._packets:
+            return
+        count = min(count, len(self._packets))
+        start, end = self._packets[-count][0], self._packets[-1][1]
+        # 为下一个包预留与最近一个包相同的空间
+        needed = end - start + (end - self._packets[-1][0])
+        if needed > self.size:
+            self._grow(needed)
+
+    def read(self, start: int, end: int) -> Optional[Union[memoryview, bytes]]:
+        """读取采样点区间[start, end)的PCM
+
+        区间在缓冲区内连续时返回零拷贝的memoryview（仅在下一次写入前有效），
+        跨越环形缓冲区末尾时返回拼接后的bytes；数据已被覆盖时返回None。
+        """
+        if start < self.oldest_offset or end > self.write_offset or start > end:
+            return None
+        total = len(self._buffer)
+        begin = (start * SAMPLE_WIDTH) % total
+        length = (end - start) * SAMPLE_WIDTH
+        if begin + length <= total:
+            return self._view[begin : begin + length]
+        return bytes(self._view[begin:]) + bytes(self._view[: begin + length - total])
+
+    def recent_packets_range(self, count: int) -> Optional[Tuple[int, int]]:
+        """最近count个音频包对应的采样点区间"""
+        if count <= 0 or count > len(self._packets):
+            return None
+        return self._packets[-count][0], self._packets[-1][1]
+
+    def read_recent_packets(self, count: int) -> Optional[List[bytes]]:
+        """读取最近count个音频包解码后的PCM，已被覆盖时返回None"""
+        packet_range = self.recent_packets_range(count)
+        if packet_range is None:
+            return None
+        pcm = self.read(*packet_range)
+        if pcm is None:
+            return None
+        # 整句音频会交给其他线程处理，这里复制一份，避免被后续写入覆盖
+        return [bytes(pcm)]
+
+    def last_packet_pcm(self) -> Optional[Union[memoryview, bytes]]:
+        """最近一个音频包解码后的PCM"""
+        if not self._packets:
+            return None
+        return self.read(*self._packets[-1])
@@ -0,0 +1,274 @@
+"""
+下行音频统一节拍发送器
+
+原先每个连接每发一帧音频都要asyncio.sleep一次，TTS音频线程还要逐包run_coroutine_threadsafe并等待结果，
+同时说话的设备越多，定时器唤醒和跨线程切换就越多。
+这里每个进程只有一个节拍任务（时间轮，默认20ms一格）：各连接把编码好的音频帧放入自己的队列，
+节拍到达时统一发送所有到期的帧，开销不随说话设备数增加而增加定时器。
+
+保持原有的发送语义：每句开头5帧预缓冲直接发送，之后按帧时长匀速发送；
+音频晚于预期到达时顺延起始时间（误差纠正）；配置了固定延迟时按固定间隔发送。
+"""
+
+import time
+import asyncio
+from collections import deque
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+# 每句开头直接发送的帧数
+PRE_BUFFER_FRAMES = 5
+
+
+class PacedStream:
+    """单个连接的下行音频队列，frames可以在其他线程中追加"""
+
+    def __init__(self, conn, send_frames):
+        self.conn = conn
+        self.send_frames = send_frames
+        # (opus包, 句子标识, 入队时间, 帧时长秒, 固定延迟秒)
+        self.frames = deque()
+        self.sentence_key = None
+        self.start_time = 0.0
+        self.packet_count = 0
+        self.sequence = 0
+        # 时间轮中的位置，scheduled为True时保证会被节拍处理
+        self.next_tick = None
+        self.scheduled = False
+        self.sending = None
+        self.waiters = []
+
+
+class AudioPacer:
+    """进程级的音频发送节拍器"""
+
+    def __init__(self, tick_ms: int = 20, wheel_slots: int = 256):
+        self.tick = tick_ms / 1000
+        self._wheel = [[] for _ in range(wheel_slots)]
+        self._scheduled_count = 0
+        self._cursor = None
+        # 其他线程新激活的队列，由节拍任务统一放入时间轮
+        self._incoming = deque()
+        self._loop = None
+        self._task = None
+        self._wakeup = None
+
+    def _ensure_started(self, conn):
+        if self._task is not None and not self._task.done():
+            return
+        tick_ms = conn.config.get("audio_pacer_tick_ms", 20)
+        self.tick = (int(tick_ms) if tick_ms else 20) / 1000
+        self._loop = conn.loop
+        self._wakeup = asyncio.Event()
+        self._task = self._loop.create_task(self._run())
+
+    def _in_loop_thread(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    def submit(self, conn, packets, send_frames, sentence_key, frame_duration=60):
+        """放入一组opus帧，可在任意线程调用，不等待发送
+
+        Args:
+            send_frames: 发送一批帧的协程函数(conn, [(opus包, 时间戳, 序列号)])
+            sentence_key: 句子标识，变化时重新开始预缓冲和计时
+        """
+        stream = getattr(conn, "paced_stream", None)
+        if stream is None:
+            stream = PacedStream(conn, send_frames)
+            conn.paced_stream = stream
+        stream.send_frames = send_frames
+
+        send_delay = conn.config.get("tts_audio_send_delay", -1) / 1000.0
+        now = time.perf_counter()
+        frame_s = frame_duration / 1000
+        for packet in packets:
+            stream.frames.append((packet, sentence_key, now, frame_s, send_delay))
+
+        if stream.scheduled:
+            return
+        stream.scheduled = True
+        self._incoming.append(stream)
+        if self._in_loop_thread():
+            self._ensure_started(conn)
+            self._wakeup.set()
+        else:
+            conn.loop.call_soon_threadsafe(self._activate, conn)
+
+    def _activate(self, conn):
+        self._ensure_started(conn)
+        self._wakeup.set()
+
+    async def drain(self, conn):
+        """等待连接已入队的音频全部发送完成"""
+        stream = getattr(conn, "paced_stream", None)
+        if stream is None or (not stream.frames and stream.sending is None):
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        stream.waiters.append(waiter)
+        await waiter
+
+    def busy(self, conn) -> bool:
+        """连接是否还有未发送完的音频"""
+        stream = getattr(conn, "paced_stream", None)
+        return stream is not None and (
+            bool(stream.frames) or stream.sending is not None
+        )
+
+    def clear(self, conn):
+        """丢弃连接尚未发送的音频（打断时调用）"""
+        stream = getattr(conn, "paced_stream", None)
+        if stream is None:
+            return
+        stream.frames.clear()
+        if stream.sending is None:
+            self._notify_drained(stream)
+
+    @staticmethod
+    def _notify_drained(stream):
+        waiters, stream.waiters = stream.waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def _schedule(self, stream, tick):
+        stream.next_tick = tick
+        self._wheel[tick % len(self._wheel)].append((tick, stream))
+        self._scheduled_count += 1
+
+    async def _run(self):
+        while True:
+            try:
+                if not self._scheduled_count and not self._incoming:
+                    # 没有需要发送的音频时挂起，不产生空转的定时唤醒
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    self._cursor = None
+
+                now = time.perf_counter()
+                current = int(now / self.tick)
+                if self._cursor is None or current - self._cursor > len(self._wheel):
+                    self._cursor = current - 1
+
+                while self._incoming:
+                    self._schedule(self._incoming.popleft(), current)
+
+                while self._cursor < current:
+                    self._cursor += 1
+                    self._process_slot(self._cursor, now)
+
+                await asyncio.sleep(
+                    max(0.0, (current + 1) * self.tick - time.perf_counter())
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.bind(tag=TAG).error(f"音频发送节拍处理失败: {e}")
+                await asyncio.sleep(self.tick)
+
+    def _process_slot(self, tick, now):
+        slot_index = tick % len(self._wheel)
+        entries = self._wheel[slot_index]
+        self._wheel[slot_index] = []
+        for entry_tick, stream in entries:
+            self._scheduled_count -= 1
+            if entry_tick != stream.next_tick:
+                # 已重新排期的旧条目
+                continue
+            if entry_tick > tick:
+                # 超出时间轮一圈的条目，放回等待下一圈
+                self._schedule(stream, entry_tick)
+                continue
+            self._service(stream, tick, now)
+
+    def _head_target(self, stream) -> float:
+        """计算队首帧的目标发送时间，句子切换时重置计时，晚到的帧顺延起始时间"""
+        _, sentence_key, enqueued_at, frame_s, send_delay = stream.frames[0]
+        if sentence_key != stream.sentence_key:
+            stream.sentence_key = sentence_key
+            stream.start_time = enqueued_at
+            stream.packet_count = 0
+            stream.sequence = 0
+
+        effective_packet = stream.packet_count - PRE_BUFFER_FRAMES
+        if effective_packet < 0:
+            # 预缓冲阶段，直接发送
+            return 0.0
+        if send_delay > 0:
+            # 固定延迟模式
+            return stream.start_time + (effective_packet + 1) * send_delay
+        target = stream.start_time + effective_packet * frame_s
+        if enqueued_at > target:
+            # 纠正误差
+            stream.start_time += enqueued_at - target
+            target = enqueued_at
+        return target
+
+    def _service(self, stream, tick, now):
+        conn = stream.conn
+        if stream.sending is not None:
+            # 上一批还没发完（客户端接收慢），下个节拍再试
+            self._schedule(stream, tick + 1)
+            return
+        if conn.client_abort or conn.stop_event.is_set():
+            stream.frames.clear()
+
+        # 提前半个节拍以内的帧也在本节拍发送，平均误差不超过半个节拍
+        deadline = now + self.tick / 2
+        # 协商了合帧的连接，有帧到期时把之后已就绪的几帧一起提前发送
+        batch = getattr(conn, "audio_batch_frames", 0)
+        due = []
+        target = None
+        while stream.frames:
+            target = self._head_target(stream)
+            if target > deadline:
+                if not due or batch <= 1 or len(due) % batch == 0:
+                    break
+                if target > deadline + (batch - 1) * stream.frames[0][3]:
+                    break
+            packet, _, _, frame_s, _ = stream.frames.popleft()
+            timestamp = int(
+                (stream.start_time + stream.packet_count * frame_s) * 1000
+            ) % (2**32)
+            due.append((packet, timestamp, stream.sequence))
+            stream.packet_count += 1
+            stream.sequence += 1
+            target = None
+
+        if due:
+            stream.sending = self._loop.create_task(self._send(stream, due))
+
+        if target is not None:
+            self._schedule(stream, max(tick + 1, int(target / self.tick)))
+            return
+
+        stream.scheduled = False
+        if stream.frames:
+            # 其他线程刚追加了帧
+            stream.scheduled = True
+            self._schedule(stream, tick + 1)
+        elif stream.sending is None:
+            self._notify_drained(stream)
+
+    async def _send(self, stream, due):
+        conn = stream.conn
+        try:
+            if not conn.client_abort:
+                await stream.send_frames(conn, due)
+                conn.client_is_speaking = True
+            # 重置没有声音的状态
+            conn.last_activity_time = time.time() * 1000
+        except Exception as e:
+            logger.bind(tag=TAG).warning(f"发送音频失败，丢弃剩余音频: {e}")
+            stream.frames.clear()
+        finally:
+            stream.sending = None
+            if not stream.frames:
+                self._notify_drained(stream)
+
+
+audio_pacer = AudioPacer()
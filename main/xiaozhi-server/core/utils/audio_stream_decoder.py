@@ -0,0 +1,207 @@
+"""
+压缩音频的增量解码
+
+HTTP接口的TTS原先下载完整个MP3/WAV响应后，再整体交给pydub/ffmpeg解码，每句话的第一帧音频要等到最后一个字节。
+这里把响应的数据块依次送入常驻的解码器，解出的PCM每满60ms就编码成一帧opus交给回调：
+- PCM和未压缩的WAV：在进程内转换采样率、声道数和位深后切帧，不启动ffmpeg
+- 其他格式（MP3、OGG、AAC等）：启动一个ffmpeg进程，从标准输入读取数据块，标准输出的PCM由读取线程切帧
+最后一帧不足60ms时补零，与audio_bytes_to_data_stream一致。
+"""
+
+import threading
+import subprocess
+
+import opuslib_next
+
+from config.logger import setup_logging
+from core.utils.audio_convert import PcmConverter, parse_wav_header
+
+TAG = __name__
+logger = setup_logging()
+
+SAMPLE_RATE = 16000
+FRAME_DURATION_MS = 60
+FRAME_SAMPLES = SAMPLE_RATE * FRAME_DURATION_MS // 1000
+FRAME_BYTES = FRAME_SAMPLES * 2
+
+# 流式生成的WAV不知道总长度时，data块长度填0或0xFFFFFFFF
+_WAV_UNKNOWN_SIZES = (0, 0xFFFFFFFF)
+
+# 文件类型对应的ffmpeg输入格式
+FFMPEG_FORMATS = {
+    "mp3": "mp3",
+    "wav": "wav",
+    "ogg": "ogg",
+    "opus": "ogg",
+    "aac": "aac",
+    "flac": "flac",
+    "m4a": "mp4",
+}
+
+
+class PcmFramer:
+    """按60ms切分16kHz单声道PCM，编码为opus后交给回调"""
+
+    def __init__(self, callback, is_opus=True):
+        self.callback = callback
+        self.encoder = (
+            opuslib_next.Encoder(SAMPLE_RATE, 1, opuslib_next.APPLICATION_AUDIO)
+            if is_opus
+            else None
+        )
+        self.buffer = bytearray()
+        self.frames = 0
+
+    def push(self, pcm: bytes):
+        self.buffer.extend(pcm)
+        while len(self.buffer) >= FRAME_BYTES:
+            self._emit(bytes(self.buffer[:FRAME_BYTES]))
+            del self.buffer[:FRAME_BYTES]
+
+    def flush(self):
+        if self.buffer:
+            self._emit(bytes(self.buffer) + b"\x00" * (FRAME_BYTES - len(self.buffer)))
+            self.buffer.clear()
+
+    def _emit(self, frame: bytes):
+        self.frames += 1
+        if self.encoder is not None:
+            frame = self.encoder.encode(frame, FRAME_SAMPLES)
+        self.callback(frame)
+
+
+class StreamingAudioDecoder:
+    """边下载边解码，feed在下载线程中依次调用，finish等待所有音频帧交给回调后返回"""
+
+    def __init__(self, file_type: str, callback, is_opus: bool = True):
+        self.file_type = (file_type or "").lower().lstrip(".")
+        self.framer = PcmFramer(callback, is_opus)
+        self.process = None
+        self.reader = None
+        self.reader_error = None
+        self.bytes_fed = 0
+        # WAV需要先看到头部才能决定是否需要ffmpeg
+        self.header_buffer = bytearray() if self.file_type == "wav" else None
+        # 在进程内转换的PCM，为None时交给ffmpeg
+        self.converter = PcmConverter(SAMPLE_RATE) if self.file_type == "pcm" else None
+        # WAV的data块还剩多少字节，None表示不限，之后的LIST等块不是音频
+        self.wav_remaining = None
+
+    @property
+    def frames(self) -> int:
+        return self.framer.frames
+
+    def feed(self, data: bytes):
+        if not data:
+            return
+        self.bytes_fed += len(data)
+        if self.converter is not None:
+            self._push_pcm(data)
+            return
+        if self.header_buffer is not None:
+            self._feed_wav_header(data)
+            return
+        if self.process is None:
+            self._start_ffmpeg(FFMPEG_FORMATS.get(self.file_type, self.file_type))
+        self._write(data)
+
+    def _feed_wav_header(self, data: bytes):
+        self.header_buffer.extend(data)
+        header = parse_wav_header(bytes(self.header_buffer))
+        if header is None:
+            return
+        buffered, self.header_buffer = bytes(self.header_buffer), None
+        if header.supported:
+            self.converter = PcmConverter.from_wav(header, SAMPLE_RATE)
+            if header.data_size not in _WAV_UNKNOWN_SIZES:
+                self.wav_remaining = header.data_size
+            self._push_pcm(buffered[header.data_offset :])
+            return
+        self._start_ffmpeg("wav")
+        self._write(buffered)
+
+    def _push_pcm(self, data: bytes):
+        if self.wav_remaining is not None:
+            data = data[: self.wav_remaining]
+            self.wav_remaining -= len(data)
+        if data:
+            self.framer.push(self.converter.convert(data))
+
+    def _start_ffmpeg(self, input_format: str):
+        self.process = subprocess.Popen(
+            [
+                "ffmpeg",
+                "-nostdin",
+                "-hide_banner",
+                "-loglevel",
+                "error",
+                # 不做长时间的格式探测，收到第一个数据块就开始解码
+                "-probesize",
+                "2048",
+                "-analyzeduration",
+                "0",
+                "-f",
+                input_format,
+                "-i",
+                "pipe:0",
+                "-f",
+                "s16le",
+                "-ac",
+                "1",
+                "-ar",
+                str(SAMPLE_RATE),
+                "-flush_packets",
+                "1",
+                "pipe:1",
+            ],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        self.reader = threading.Thread(target=self._read_pcm, daemon=True)
+        self.reader.start()
+
+    def _write(self, data: bytes):
+        try:
+            self.process.stdin.write(data)
+            self.process.stdin.flush()
+        except BrokenPipeError:
+            raise RuntimeError(f"ffmpeg解码进程已退出: {self.reader_error}")
+
+    def _read_pcm(self):
+        try:
+            while True:
+                pcm = self.process.stdout.read1(FRAME_BYTES)
+                if not pcm:
+                    break
+                self.framer.push(pcm)
+        except Exception as e:
+            self.reader_error = e
+            logger.bind(tag=TAG).error(f"读取解码后的音频失败: {e}")
+
+    def finish(self):
+        """数据已全部送入，等待剩余音频解码完成"""
+        if self.header_buffer is not None:
+            # 数据太短，连WAV头部都不完整
+            self.header_buffer = None
+            raise ValueError("WAV数据不完整")
+        if self.process is not None:
+            try:
+                self.process.stdin.close()
+            except BrokenPipeError:
+                pass
+            self.reader.join()
+            self.process.wait()
+            if self.reader_error is not None:
+                raise RuntimeError(f"音频解码失败: {self.reader_error}")
+        if self.converter is not None:
+            self.framer.push(self.converter.flush())
+        self.framer.flush()
+
+    def abort(self):
+        """下载失败时结束解码进程，已解出的音频帧不再补齐"""
+        if self.process is not None and self.process.poll() is None:
+            self.process.kill()
+            self.process.wait()
+        if self.reader is not None:
+            self.reader.join()
@@ -0,0 +1,324 @@
+"""
+缓存后端定义
+
+默认只使用进程内缓存（GlobalCacheManager自身的本地存储），
+多进程/多节点部署时可切换到Redis协议的共享缓存后端，
+此时本地存储退化为近端缓存（near-cache），通过失效消息保持各节点一致。
+"""
+
+import json
+import time
+import uuid
+import pickle
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Optional
+
+
+class CacheBackend(ABC):
+    """共享缓存后端基类"""
+
+    @abstractmethod
+    def get(self, cache_name: str, key: str) -> Optional[Any]:
+        """获取缓存值，不存在时返回None"""
+        pass
+
+    @abstractmethod
+    def set(
+        self, cache_name: str, key: str, value: Any, ttl: Optional[float] = None
+    ) -> None:
+        """设置缓存值，ttl为None表示不过期"""
+        pass
+
+    @abstractmethod
+    def delete(self, cache_name: str, key: str) -> bool:
+        """删除缓存条目"""
+        pass
+
+    @abstractmethod
+    def clear(self, cache_name: str) -> None:
+        """清空指定缓存空间"""
+        pass
+
+    @abstractmethod
+    def invalidate_pattern(self, cache_name: str, pattern: str) -> int:
+        """按子串模式失效缓存条目"""
+        pass
+
+    @abstractmethod
+    def incr(
+        self, cache_name: str, key: str, amount: int = 1, ttl: Optional[float] = None
+    ) -> int:
+        """原子自增计数器，返回自增后的值"""
+        pass
+
+    def publish_invalidation(
+        self, cache_name: str, key: Optional[str] = None, pattern: Optional[str] = None
+    ) -> None:
+        """广播失效消息，通知其他节点清理近端缓存"""
+        pass
+
+    def subscribe_invalidation(self, callback: Callable[[Dict[str, Any]], None]):
+        """订阅其他节点的失效消息"""
+        pass
+
+    def close(self) -> None:
+        """释放后端资源"""
+        pass
+
+
+class RedisCacheBackend(CacheBackend):
+    """基于Redis协议的共享缓存后端，兼容Redis/Valkey/KeyDB等服务"""
+
+    def __init__(self, config: Dict[str, Any]):
+        try:
+            import redis
+        except ImportError as e:
+            raise ImportError("使用redis缓存后端需要先安装redis：pip install redis") from e
+
+        self.key_prefix = config.get("key_prefix", "xiaozhi:")
+        self.channel = f"{self.key_prefix}__invalidate__"
+        # 每个进程一个节点ID，用于忽略自己发出的失效消息
+        self.node_id = uuid.uuid4().hex
+        self._pubsub = None
+        self._pubsub_thread = None
+
+        url = config.get("url") or "redis://127.0.0.1:6379/0"
+        self.client = redis.Redis.from_url(
+            url,
+            socket_timeout=float(config.get("socket_timeout", 1.0)),
+            socket_connect_timeout=float(config.get("connect_timeout", 1.0)),
+            health_check_interval=30,
+        )
+        # 启动时检查连通性，配置错误尽早暴露
+        self.client.ping()
+
+    def _full_key(self, cache_name: str, key: str) -> str:
+        return f"{self.key_prefix}{cache_name}:{key}"
+
+    @staticmethod
+    def _dumps(value: Any) -> bytes:
+        if isinstance(value, int) and not isinstance(value, bool):
+            # 整数以明文存储，保证与INCRBY兼容
+            return str(value).encode()
+        return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def _loads(raw: bytes) -> Any:
+        # pickle协议2及以上以0x80开头，不会与明文整数冲突
+        if raw[:1] != b"\x80":
+            return int(raw)
+        return pickle.loads(raw)
+
+    def get(self, cache_name: str, key: str) -> Optional[Any]:
+        raw = self.client.get(self._full_key(cache_name, key))
+        if raw is None:
+            return None
+        return self._loads(raw)
+
+    def set(
+        self, cache_name: str, key: str, value: Any, ttl: Optional[float] = None
+    ) -> None:
+        full_key = self._full_key(cache_name, key)
+        if ttl:
+            self.client.set(full_key, self._dumps(value), px=int(ttl * 1000))
+        else:
+            self.client.set(full_key, self._dumps(value))
+
+    def delete(self, cache_name: str, key: str) -> bool:
+        return self.client.delete(self._full_key(cache_name, key)) > 0
+
+    def _delete_matching(self, match: str) -> int:
+        deleted = 0
+        batch = []
+        for full_key in self.client.scan_iter(match=match, count=500):
+            batch.append(full_key)
+            if len(batch) >= 500:
+                deleted += self.client.delete(*batch)
+                batch.clear()
+        if batch:
+            deleted += self.client.delete(*batch)
+        return deleted
+
+    def clear(self, cache_name: str) -> None:
+        self._delete_matching(f"{self._escape(self.key_prefix + cache_name)}:*")
+
+    def invalidate_pattern(self, cache_name: str, pattern: str) -> int:
+        return self._delete_matching(
+            f"{self._escape(self.key_prefix + cache_name)}:*{self._escape(pattern)}*"
+        )
+
+    def incr(
+        self, cache_name: str, key: str, amount: int = 1, ttl: Optional[float] = None
+    ) -> int:
+        full_key = self._full_key(cache_name, key)
+        if not ttl:
+            return self.client.incrby(full_key, amount)
+        # 在同一个事务中创建带过期时间的计数器再自增，进程中途退出也不会留下永不过期的key
+        pipe = self.client.pipeline(transaction=True)
+        pipe.set(full_key, 0, nx=True, px=int(ttl * 1000))
+        pipe.incrby(full_key, amount)
+        _, value = pipe.execute()
+        return value
+
+    def publish_invalidation(
+        self, cache_name: str, key: Optional[str] = None, pattern: Optional[str] = None
+    ) -> None:
+        message = {
+            "node": self.node_id,
+            "cache": cache_name,
+            "key": key,
+            "pattern": pattern,
+        }
+        self.client.publish(self.channel, json.dumps(message, ensure_ascii=False))
+
+    def subscribe_invalidation(self, callback: Callable[[Dict[str, Any]], None]):
+        def _handler(raw_message):
+            try:
+                message = json.loads(raw_message["data"])
+            except (TypeError, ValueError):
+                return
+            if message.get("node") == self.node_id:
+                return
+            callback(message)
+
+        self._pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.subscribe(**{self.channel: _handler})
+        self._pubsub_thread = self._pubsub.run_in_thread(
+            sleep_time=1.0, daemon=True
+        )
+
+    def close(self) -> None:
+        if self._pubsub_thread is not None:
+            self._pubsub_thread.stop()
+            self._pubsub_thread = None
+        if self._pubsub is not None:
+            self._pubsub.close()
+            self._pubsub = None
+        self.client.close()
+
+    @staticmethod
+    def _escape(text: str) -> str:
+        """转义SCAN MATCH中的通配符"""
+        for ch in ("\\", "*", "?", "[", "]"):
+            text = text.replace(ch, "\\" + ch)
+        return text
+
+
+class InMemorySharedBackend(CacheBackend):
+    """进程内共享后端，语义与RedisCacheBackend一致，用于单机调试和测试近端缓存逻辑
+
+    同一进程内创建的多个实例共享同一份存储和失效通道，可以模拟多节点部署。
+    """
+
+    _store: Dict[str, Any] = {}
+    _expire_at: Dict[str, float] = {}
+    _subscribers: Dict[str, Callable[[Dict[str, Any]], None]] = {}
+    _lock = threading.RLock()
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        self.key_prefix = config.get("key_prefix", "xiaozhi:")
+        self.node_id = uuid.uuid4().hex
+
+    def _full_key(self, cache_name: str, key: str) -> str:
+        return f"{self.key_prefix}{cache_name}:{key}"
+
+    def _alive(self, full_key: str) -> bool:
+        expire_at = self._expire_at.get(full_key)
+        if expire_at is not None and time.time() > expire_at:
+            self._store.pop(full_key, None)
+            self._expire_at.pop(full_key, None)
+            return False
+        return full_key in self._store
+
+    def get(self, cache_name: str, key: str) -> Optional[Any]:
+        full_key = self._full_key(cache_name, key)
+        with self._lock:
+            if not self._alive(full_key):
+                return None
+            return pickle.loads(self._store[full_key])
+
+    def set(
+        self, cache_name: str, key: str, value: Any, ttl: Optional[float] = None
+    ) -> None:
+        full_key = self._full_key(cache_name, key)
+        with self._lock:
+            self._store[full_key] = pickle.dumps(value)
+            if ttl:
+                self._expire_at[full_key] = time.time() + ttl
+            else:
+                self._expire_at.pop(full_key, None)
+
+    def delete(self, cache_name: str, key: str) -> bool:
+        full_key = self._full_key(cache_name, key)
+        with self._lock:
+            self._expire_at.pop(full_key, None)
+            return self._store.pop(full_key, None) is not None
+
+    def clear(self, cache_name: str) -> None:
+        self.invalidate_pattern(cache_name, "")
+
+    def invalidate_pattern(self, cache_name: str, pattern: str) -> int:
+        prefix = f"{self.key_prefix}{cache_name}:"
+        with self._lock:
+            keys = [
+                k
+                for k in self._store
+                if k.startswith(prefix) and pattern in k[len(prefix) :]
+            ]
+            for k in keys:
+                self._store.pop(k, None)
+                self._expire_at.pop(k, None)
+        return len(keys)
+
+    def incr(
+        self, cache_name: str, key: str, amount: int = 1, ttl: Optional[float] = None
+    ) -> int:
+        full_key = self._full_key(cache_name, key)
+        with self._lock:
+            if not self._alive(full_key):
+                # 与Redis一致：只在创建计数器时设置过期时间
+                self.set(cache_name, key, amount, ttl)
+                return amount
+            value = pickle.loads(self._store[full_key]) + amount
+            self._store[full_key] = pickle.dumps(value)
+            return value
+
+    def publish_invalidation(
+        self, cache_name: str, key: Optional[str] = None, pattern: Optional[str] = None
+    ) -> None:
+        message = {
+            "node": self.node_id,
+            "cache": cache_name,
+            "key": key,
+            "pattern": pattern,
+        }
+        for node_id, callback in list(self._subscribers.items()):
+            if node_id != self.node_id:
+                callback(message)
+
+    def subscribe_invalidation(self, callback: Callable[[Dict[str, Any]], None]):
+        self._subscribers[self.node_id] = callback
+
+    def close(self) -> None:
+        self._subscribers.pop(self.node_id, None)
+
+
+def create_backend(config: Optional[Dict[str, Any]]) -> Optional[CacheBackend]:
+    """根据配置创建共享缓存后端
+
+    - memory（默认）：返回None，只使用进程内缓存
+    - redis：Redis协议的共享缓存
+    - inprocess：进程内模拟的共享后端，只用于调试近端缓存和失效消息
+    """
+    if not config:
+        return None
+    backend_type = str(config.get("backend", "memory")).lower()
+    if backend_type == "memory":
+        return None
+    if backend_type == "redis":
+        return RedisCacheBackend(config.get("redis", {}) or {})
+    if backend_type == "inprocess":
+        return InMemorySharedBackend(config.get("redis", {}) or {})
+    raise ValueError(f"不支持的缓存后端类型: {backend_type}")
@@ -19,6 +19,9 @@ class CacheType(Enum):
     CONFIG = "config"
     DEVICE_PROMPT = "device_prompt"
     VOICEPRINT_HEALTH = "voiceprint_health"  # 声纹识别健康检查
+    DEVICE_OUTPUT = "device_output"  # 设备每日输出字数
+    ENDPOINT_PAUSES = "endpoint_pauses"  # 设备说话停顿分布，用于自适应断句
+    TOOL_RESULT = "tool_result"  # 工具调用结果，按工具声明的ttl过期
 
 
 @dataclass
@@ -29,6 +32,8 @@ class CacheConfig:
     ttl: Optional[float] = 300  # 默认5分钟
     max_size: Optional[int] = 1000  # 默认最大1000条
     cleanup_interval: float = 60  # 清理间隔（秒）
+    shared: bool = True  # 配置了共享缓存后端时，是否跨进程/节点共享
+    near_cache: bool = True  # 共享时是否在本地保留近端副本
 
     @classmethod
     def for_type(cls, cache_type: CacheType) -> "CacheConfig":
@@ -50,7 +55,10 @@ class CacheConfig:
                 strategy=CacheStrategy.TTL_LRU, ttl=600, max_size=1000  # 10分钟
             ),
             CacheType.CONFIG: cls(
-                strategy=CacheStrategy.FIXED_SIZE, ttl=None, max_size=20  # 手动失效
+                strategy=CacheStrategy.FIXED_SIZE,
+                ttl=None,
+                max_size=20,  # 手动失效
+                shared=False,  # 进程配置，每次读取日志配置都会访问，只保留在本地
             ),
             CacheType.DEVICE_PROMPT: cls(
                 strategy=CacheStrategy.TTL, ttl=None, max_size=1000  # 手动失效
@@ -58,5 +66,17 @@ class CacheConfig:
             CacheType.VOICEPRINT_HEALTH: cls(
                 strategy=CacheStrategy.TTL, ttl=600, max_size=100  # 10分钟过期
             ),
+            CacheType.DEVICE_OUTPUT: cls(
+                strategy=CacheStrategy.TTL,
+                ttl=90000,  # 25小时，key中已包含日期
+                max_size=100000,
+                near_cache=False,  # 计数需要准确，始终读取共享后端
+            ),
+            CacheType.ENDPOINT_PAUSES: cls(
+                strategy=CacheStrategy.TTL, ttl=604800, max_size=10000  # 7天
+            ),
+            CacheType.TOOL_RESULT: cls(
+                strategy=CacheStrategy.TTL, ttl=300, max_size=2000  # 5分钟
+            ),
         }
         return configs.get(cache_type, cls())
@@ -3,11 +3,13 @@
 """
 
 import time
+import asyncio
 import threading
 from typing import Any, Optional, Dict
 from collections import OrderedDict
 from .strategies import CacheStrategy, CacheEntry
 from .config import CacheConfig, CacheType
+from .backends import CacheBackend, create_backend
 
 
 class GlobalCacheManager:
@@ -21,6 +23,10 @@ class GlobalCacheManager:
         self._global_lock = threading.RLock()
         self._last_cleanup = time.time()
         self._stats = {"hits": 0, "misses": 0, "evictions": 0, "cleanups": 0}
+        # 共享缓存后端，None表示只使用进程内缓存
+        self._backend: Optional[CacheBackend] = None
+        # 使用共享后端时，本地近端缓存的最长保留时间（秒）
+        self._near_cache_ttl: float = 30
 
     @property
     def logger(self):
@@ -31,6 +37,49 @@ class GlobalCacheManager:
             self._logger = setup_logging()
         return self._logger
 
+    def configure(self, cache_config: Optional[Dict[str, Any]]) -> None:
+        """根据配置启用共享缓存后端，未配置或配置为memory时保持进程内缓存"""
+        try:
+            backend = create_backend(cache_config)
+        except Exception as e:
+            self.logger.error(f"共享缓存后端初始化失败，继续使用进程内缓存: {e}")
+            return
+        if backend is None:
+            return
+
+        redis_config = (cache_config or {}).get("redis", {}) or {}
+        self._near_cache_ttl = float(redis_config.get("near_cache_ttl", 30))
+        if self._backend is not None:
+            self._backend.close()
+        self._backend = backend
+        self._backend.subscribe_invalidation(self._on_remote_invalidation)
+        self.logger.info(
+            f"已启用共享缓存后端: {type(backend).__name__}，近端缓存{self._near_cache_ttl}秒"
+        )
+
+    def _shared_backend(self, config: CacheConfig) -> Optional[CacheBackend]:
+        """返回该缓存空间使用的共享后端"""
+        if self._backend is not None and config.shared:
+            return self._backend
+        return None
+
+    def _on_remote_invalidation(self, message: Dict[str, Any]) -> None:
+        """处理其他节点发出的失效消息，只清理本地近端副本"""
+        cache_name = message.get("cache")
+        if not cache_name or cache_name not in self._caches:
+            return
+        key = message.get("key")
+        pattern = message.get("pattern")
+        with self._locks[cache_name]:
+            cache = self._caches[cache_name]
+            if key is not None:
+                cache.pop(key, None)
+            elif pattern is not None:
+                for k in [k for k in cache.keys() if pattern in k]:
+                    del cache[k]
+            else:
+                cache.clear()
+
     def _get_cache_name(self, cache_type: CacheType, namespace: str = "") -> str:
         """生成缓存名称"""
         if namespace:
@@ -63,11 +112,40 @@ class GlobalCacheManager:
         """设置缓存值"""
         cache_name = self._get_cache_name(cache_type, namespace)
         config = self._configs.get(cache_name) or CacheConfig.for_type(cache_type)
-        cache = self._get_or_create_cache(cache_name, config)
 
         # 使用配置的TTL或传入的TTL
         effective_ttl = ttl if ttl is not None else config.ttl
 
+        backend = self._shared_backend(config)
+        if backend is not None:
+            try:
+                backend.set(cache_name, key, value, effective_ttl)
+                backend.publish_invalidation(cache_name, key=key)
+            except Exception as e:
+                self.logger.warning(f"写入共享缓存失败 {cache_name}: {e}")
+            if not config.near_cache:
+                return
+            effective_ttl = self._near_ttl(effective_ttl)
+
+        self._set_local(cache_name, config, key, value, effective_ttl)
+
+    def _near_ttl(self, ttl: Optional[float]) -> float:
+        """近端副本的TTL不超过near_cache_ttl，保证失效消息丢失时也能最终一致"""
+        if ttl is None:
+            return self._near_cache_ttl
+        return min(ttl, self._near_cache_ttl)
+
+    def _set_local(
+        self,
+        cache_name: str,
+        config: CacheConfig,
+        key: str,
+        value: Any,
+        effective_ttl: Optional[float],
+    ) -> None:
+        """写入进程内缓存"""
+        cache = self._get_or_create_cache(cache_name, config)
+
         with self._locks[cache_name]:
             # 创建缓存条目
             entry = CacheEntry(value=value, timestamp=time.time(), ttl=effective_ttl)
@@ -79,32 +157,90 @@ class GlobalCacheManager:
                     del cache[key]
                 cache[key] = entry
 
-                # 检查大小限制
-                if config.max_size and len(cache) > config.max_size:
-                    # 移除最旧的条目
-                    oldest_key = next(iter(cache))
-                    del cache[oldest_key]
-                    self._stats["evictions"] += 1
-
             else:
                 cache[key] = entry
 
-                # 检查大小限制
-                if config.max_size and len(cache) > config.max_size:
-                    # 简单策略：随机移除一个条目
-                    victim_key = next(iter(cache))
-                    del cache[victim_key]
-                    self._stats["evictions"] += 1
+            self._evict_if_full(cache, config)
 
         # 定期清理过期条目
         self._maybe_cleanup(cache_name)
 
+    def _evict_if_full(self, cache: Dict[str, CacheEntry], config: CacheConfig):
+        """超出大小限制时移除条目，LRU策略移除最旧的，其他策略随机移除一个"""
+        if config.max_size and len(cache) > config.max_size:
+            victim_key = next(iter(cache))
+            del cache[victim_key]
+            self._stats["evictions"] += 1
+
     def get(
         self, cache_type: CacheType, key: str, namespace: str = ""
     ) -> Optional[Any]:
         """获取缓存值"""
         cache_name = self._get_cache_name(cache_type, namespace)
+        config = self._configs.get(cache_name) or CacheConfig.for_type(cache_type)
+        backend = self._shared_backend(config)
+
+        if backend is None:
+            return self._get_local(cache_name, key)
+
+        if config.near_cache:
+            value = self._get_local(cache_name, key)
+            if value is not None:
+                return value
+
+        return self._get_remote(backend, cache_name, config, key)
+
+    def _get_remote(
+        self, backend: CacheBackend, cache_name: str, config: CacheConfig, key: str
+    ) -> Optional[Any]:
+        """从共享后端读取，并写入近端副本"""
+        try:
+            value = backend.get(cache_name, key)
+        except Exception as e:
+            self.logger.warning(f"读取共享缓存失败 {cache_name}: {e}")
+            return None
+        if value is not None and config.near_cache:
+            self._set_local(cache_name, config, key, value, self._near_ttl(config.ttl))
+        return value
+
+    async def aget(
+        self, cache_type: CacheType, key: str, namespace: str = ""
+    ) -> Optional[Any]:
+        """协程中使用的get，需要访问共享后端时在线程中进行，不阻塞事件循环"""
+        cache_name = self._get_cache_name(cache_type, namespace)
+        config = self._configs.get(cache_name) or CacheConfig.for_type(cache_type)
+        backend = self._shared_backend(config)
+
+        if backend is None:
+            return self._get_local(cache_name, key)
+
+        if config.near_cache:
+            value = self._get_local(cache_name, key)
+            if value is not None:
+                return value
+
+        return await asyncio.to_thread(
+            self._get_remote, backend, cache_name, config, key
+        )
+
+    async def aset(
+        self,
+        cache_type: CacheType,
+        key: str,
+        value: Any,
+        ttl: Optional[float] = None,
+        namespace: str = "",
+    ) -> None:
+        """协程中使用的set，写入共享后端时在线程中进行"""
+        cache_name = self._get_cache_name(cache_type, namespace)
+        config = self._configs.get(cache_name) or CacheConfig.for_type(cache_type)
+        if self._shared_backend(config) is None:
+            self.set(cache_type, key, value, ttl, namespace)
+            return
+        await asyncio.to_thread(self.set, cache_type, key, value, ttl, namespace)
 
+    def _get_local(self, cache_name: str, key: str) -> Optional[Any]:
+        """读取进程内缓存"""
         if cache_name not in self._caches:
             self._stats["misses"] += 1
             return None
@@ -140,8 +276,18 @@ class GlobalCacheManager:
         """删除缓存条目"""
         cache_name = self._get_cache_name(cache_type, namespace)
 
+        remote_deleted = False
+        config = self._configs.get(cache_name) or CacheConfig.for_type(cache_type)
+        backend = self._shared_backend(config)
+        if backend is not None:
+            try:
+                remote_deleted = backend.delete(cache_name, key)
+                backend.publish_invalidation(cache_name, key=key)
+            except Exception as e:
+                self.logger.warning(f"删除共享缓存失败 {cache_name}: {e}")
+
         if cache_name not in self._caches:
-            return False
+            return remote_deleted
 
         cache = self._caches[cache_name]
 
@@ -149,12 +295,21 @@ class GlobalCacheManager:
             if key in cache:
                 del cache[key]
                 return True
-            return False
+            return remote_deleted
 
     def clear(self, cache_type: CacheType, namespace: str = "") -> None:
         """清空指定缓存"""
         cache_name = self._get_cache_name(cache_type, namespace)
 
+        config = self._configs.get(cache_name) or CacheConfig.for_type(cache_type)
+        backend = self._shared_backend(config)
+        if backend is not None:
+            try:
+                backend.clear(cache_name)
+                backend.publish_invalidation(cache_name)
+            except Exception as e:
+                self.logger.warning(f"清空共享缓存失败 {cache_name}: {e}")
+
         if cache_name not in self._caches:
             return
 
@@ -167,20 +322,92 @@ class GlobalCacheManager:
         """按模式失效缓存条目"""
         cache_name = self._get_cache_name(cache_type, namespace)
 
+        deleted_count = 0
+        config = self._configs.get(cache_name) or CacheConfig.for_type(cache_type)
+        backend = self._shared_backend(config)
+        if backend is not None:
+            try:
+                deleted_count = backend.invalidate_pattern(cache_name, pattern)
+                backend.publish_invalidation(cache_name, pattern=pattern)
+            except Exception as e:
+                self.logger.warning(f"按模式失效共享缓存失败 {cache_name}: {e}")
+
         if cache_name not in self._caches:
-            return 0
+            return deleted_count
 
         cache = self._caches[cache_name]
-        deleted_count = 0
 
         with self._locks[cache_name]:
             keys_to_delete = [key for key in cache.keys() if pattern in key]
             for key in keys_to_delete:
                 del cache[key]
-                deleted_count += 1
+            if backend is None:
+                deleted_count = len(keys_to_delete)
 
         return deleted_count
 
+    async def ainvalidate_pattern(
+        self, cache_type: CacheType, pattern: str, namespace: str = ""
+    ) -> int:
+        """协程中使用的invalidate_pattern，共享后端的扫描删除在线程中进行"""
+        cache_name = self._get_cache_name(cache_type, namespace)
+        config = self._configs.get(cache_name) or CacheConfig.for_type(cache_type)
+        if self._shared_backend(config) is None:
+            return self.invalidate_pattern(cache_type, pattern, namespace)
+        return await asyncio.to_thread(
+            self.invalidate_pattern, cache_type, pattern, namespace
+        )
+
+    def incr(
+        self,
+        cache_type: CacheType,
+        key: str,
+        amount: int = 1,
+        ttl: Optional[float] = None,
+        namespace: str = "",
+    ) -> int:
+        """原子自增计数器，返回自增后的值；配置了共享后端时跨进程/节点累加"""
+        cache_name = self._get_cache_name(cache_type, namespace)
+        config = self._configs.get(cache_name) or CacheConfig.for_type(cache_type)
+        effective_ttl = ttl if ttl is not None else config.ttl
+
+        backend = self._shared_backend(config)
+        if backend is not None:
+            try:
+                return backend.incr(cache_name, key, amount, effective_ttl)
+            except Exception as e:
+                self.logger.warning(f"共享计数器自增失败，改用本地计数 {cache_name}: {e}")
+
+        cache = self._get_or_create_cache(cache_name, config)
+        with self._locks[cache_name]:
+            entry = cache.get(key)
+            if entry is None or entry.is_expired():
+                entry = CacheEntry(value=0, timestamp=time.time(), ttl=effective_ttl)
+                cache.pop(key, None)
+                cache[key] = entry
+                self._evict_if_full(cache, config)
+            elif config.strategy in [CacheStrategy.LRU, CacheStrategy.TTL_LRU]:
+                cache.move_to_end(key)
+            entry.value += amount
+            return entry.value
+
+    async def aincr(
+        self,
+        cache_type: CacheType,
+        key: str,
+        amount: int = 1,
+        ttl: Optional[float] = None,
+        namespace: str = "",
+    ) -> int:
+        """协程中使用的incr，访问共享后端时在线程中进行"""
+        cache_name = self._get_cache_name(cache_type, namespace)
+        config = self._configs.get(cache_name) or CacheConfig.for_type(cache_type)
+        if self._shared_backend(config) is None:
+            return self.incr(cache_type, key, amount, ttl, namespace)
+        return await asyncio.to_thread(
+            self.incr, cache_type, key, amount, ttl, namespace
+        )
+
     def _cleanup_expired(self, cache_name: str) -> int:
         """清理过期条目"""
         if cache_name not in self._caches:
@@ -0,0 +1,220 @@
+"""
+自适应断句
+
+原先一句话是否说完只看固定的静默时长（min_silence_duration_ms，默认1000ms），
+每次回复都要先等满这段静默。这里按设备和每句话动态计算需要的静默时长：
+- 说话人的停顿分布：记录句中停顿（静默后又继续说话），取高分位数加余量，说话干脆的人阈值更短；
+  断句后很快又继续说话视为误断，计入停顿样本，阈值随之回升
+- 句子长短：很短的语音（如“嗯”“那个”）多是犹豫，不提前断句
+- 流式ASR的中间结果：以句末标点或语气词结尾时更可能已说完，以连词、犹豫词结尾时等满上限
+结果限制在[下限, 上限]之间，上限即原来的min_silence_duration_ms，下限为endpoint_floor_ms。
+两者冲突时以上限为准：min_silence_duration_ms不大于endpoint_floor_ms时没有可以缩短的余地，
+不启用自适应断句，固定使用min_silence_duration_ms。
+默认不启用，开启时需要同时把min_silence_duration_ms调大作为上限。
+停顿分布在事件循环中异步读写缓存，不阻塞VAD。
+"""
+
+import asyncio
+from collections import deque
+from typing import Optional
+
+from core.utils.cache.manager import cache_manager, CacheType
+
+# 句末标点，出现在中间结果末尾时基本可以确定说完
+SENTENCE_END_PUNCTUATIONS = "。？！?!.~～…"
+# 句末语气词
+SENTENCE_FINAL_PARTICLES = "吗呢吧啊呀嘛哦啦哈了"
+# 以这些词结尾说明话还没说完
+CONTINUATION_WORDS = (
+    "然后",
+    "还有",
+    "就是",
+    "那个",
+    "这个",
+    "因为",
+    "所以",
+    "但是",
+    "而且",
+    "或者",
+    "如果",
+    "和",
+    "跟",
+    "的",
+    "嗯",
+    "呃",
+    "额",
+    "，",
+    ",",
+    "、",
+)
+
+# 至少有多少个停顿样本才使用停顿分布
+MIN_PAUSE_SAMPLES = 5
+# 短于该时长的静默不算停顿（帧间抖动）
+MIN_PAUSE_MS = 150
+
+
+def text_completeness(text: Optional[str]) -> Optional[float]:
+    """根据中间识别结果的结尾判断一句话是否完整，返回0~1，没有文本时返回None"""
+    if not text:
+        return None
+    text = text.strip()
+    if not text:
+        return None
+    if text.endswith(CONTINUATION_WORDS):
+        return 0.0
+    if text[-1] in SENTENCE_END_PUNCTUATIONS:
+        return 1.0
+    if text[-1] in SENTENCE_FINAL_PARTICLES:
+        return 0.8
+    return 0.5
+
+
+class EndpointState:
+    """单个连接（设备）的断句状态"""
+
+    def __init__(self, history_size: int):
+        self.pauses = deque(maxlen=history_size)
+        self.utterance_start_ms = None
+        self.voice_end_ms = None
+        self.last_stop_ms = None
+        self.partial_text = ""
+        self.loaded = False
+        self.dirty = False
+
+
+class Endpointer:
+    """根据停顿分布、句长和中间识别结果计算断句需要的静默时长"""
+
+    def __init__(self, config: dict, ceiling_ms: int):
+        self.enabled = str(config.get("adaptive_endpoint", False)).lower() in (
+            "true",
+            "1",
+            "yes",
+        )
+        self.ceiling_ms = ceiling_ms
+        floor_ms = config.get("endpoint_floor_ms", 300)
+        self.floor_ms = min(int(floor_ms) if floor_ms else 300, ceiling_ms)
+        if self.enabled and self.floor_ms >= ceiling_ms:
+            # 上限已经不高于下限，按固定静默时长断句
+            self.enabled = False
+        # 停顿分布取的分位数和额外余量
+        self.pause_percentile = float(config.get("endpoint_pause_percentile", 0.9))
+        self.pause_margin_ms = int(config.get("endpoint_pause_margin_ms", 150))
+        self.history_size = int(config.get("endpoint_history_size", 50))
+        # 有效语音短于该时长时不提前断句
+        self.min_utterance_ms = int(config.get("endpoint_min_utterance_ms", 400))
+
+    def state(self, conn) -> EndpointState:
+        state = getattr(conn, "endpoint_state", None)
+        if state is None:
+            state = conn.endpoint_state = EndpointState(self.history_size)
+        if not state.loaded:
+            # 同一设备的停顿分布保存在缓存中，重连或连到其他节点后继续使用
+            state.loaded = True
+            device_id = self._device_id(conn)
+            if device_id:
+                self._schedule(conn, self._load_pauses(state, device_id))
+        return state
+
+    @staticmethod
+    def _schedule(conn, coro):
+        """在连接的事件循环中执行缓存读写"""
+        loop = getattr(conn, "loop", None)
+        if loop is None:
+            coro.close()
+            return
+        asyncio.run_coroutine_threadsafe(coro, loop)
+
+    @staticmethod
+    async def _load_pauses(state: EndpointState, device_id: str):
+        pauses = await cache_manager.aget(CacheType.ENDPOINT_PAUSES, device_id)
+        if pauses:
+            # 读取期间新记录的停顿排在后面，超出长度时先丢弃旧的
+            merged = list(pauses) + list(state.pauses)
+            state.pauses.clear()
+            state.pauses.extend(merged)
+
+    @staticmethod
+    def _device_id(conn) -> Optional[str]:
+        headers = getattr(conn, "headers", None)
+        return headers.get("device-id") if headers else None
+
+    def on_voice(self, conn, now_ms: float, utterance_active: bool):
+        """检测到有声帧时调用，记录句中停顿和误断"""
+        state = self.state(conn)
+        if not utterance_active:
+            if state.last_stop_ms is not None and state.voice_end_ms is not None:
+                # 断句后很快又开始说话，说明上一次断得太早，把这段静默计入停顿样本
+                gap = now_ms - state.voice_end_ms
+                if gap < self.ceiling_ms + self.pause_margin_ms:
+                    self._add_pause(state, gap)
+            state.last_stop_ms = None
+            state.utterance_start_ms = now_ms
+            state.partial_text = ""
+        elif state.voice_end_ms is not None:
+            gap = now_ms - state.voice_end_ms
+            if gap >= MIN_PAUSE_MS:
+                self._add_pause(state, gap)
+        state.voice_end_ms = None
+
+    def on_silence(self, conn, last_voice_ms: float):
+        """有声转为无声时调用，记录最后一次有声的时间"""
+        state = self.state(conn)
+        if state.voice_end_ms is None:
+            state.voice_end_ms = last_voice_ms
+
+    def on_stop(self, conn, now_ms: float):
+        """判定一句话说完时调用，并保存停顿分布"""
+        state = self.state(conn)
+        state.last_stop_ms = now_ms
+        state.utterance_start_ms = None
+        state.partial_text = ""
+        if state.dirty:
+            state.dirty = False
+            device_id = self._device_id(conn)
+            if device_id:
+                self._schedule(
+                    conn,
+                    cache_manager.aset(
+                        CacheType.ENDPOINT_PAUSES, device_id, list(state.pauses)
+                    ),
+                )
+
+    def update_partial(self, conn, text: str):
+        """流式ASR收到中间结果时调用"""
+        if self.enabled:
+            self.state(conn).partial_text = text or ""
+
+    def _add_pause(self, state: EndpointState, pause_ms: float):
+        state.pauses.append(int(pause_ms))
+        state.dirty = True
+
+    def _pause_threshold(self, state: EndpointState) -> float:
+        if len(state.pauses) < MIN_PAUSE_SAMPLES:
+            return self.ceiling_ms
+        pauses = sorted(state.pauses)
+        index = min(len(pauses) - 1, int(len(pauses) * self.pause_percentile))
+        return pauses[index] + self.pause_margin_ms
+
+    def required_silence_ms(self, conn, last_voice_ms: float) -> float:
+        """当前这句话判定为说完需要的静默时长"""
+        if not self.enabled:
+            return self.ceiling_ms
+        state = self.state(conn)
+
+        utterance_ms = 0
+        if state.utterance_start_ms is not None:
+            utterance_ms = last_voice_ms - state.utterance_start_ms
+        if utterance_ms < self.min_utterance_ms:
+            # 很短的语音多是犹豫或语气词，按上限等待
+            return self.ceiling_ms
+
+        required = self._pause_threshold(state)
+        completeness = text_completeness(state.partial_text)
+        if completeness is not None:
+            if completeness == 0.0:
+                return self.ceiling_ms
+            # 越完整需要的静默越短，最多缩短到一半
+            required *= 1 - 0.5 * completeness
+        return max(self.floor_ms, min(self.ceiling_ms, required))
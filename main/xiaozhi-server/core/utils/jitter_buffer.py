@@ -0,0 +1,186 @@
+"""
+上行音频抖动缓冲区
+
+MQTT网关转发的UDP音频可能乱序、丢包。这里用最小堆按32位序号（或时间戳）重排，
+序号比较考虑回绕；缓冲深度根据观测到的乱序程度自适应调整；
+等待超过播放期限仍未到达的帧视为丢失，交给Opus PLC补偿，迟到的包直接丢弃；
+序号回退超过最大缓冲深度时视为设备重连或序号被重置，重新同步。
+按毫秒时间戳排序时，相邻包的间隔按帧时长四舍五入为帧数，网关时间戳有几毫秒的偏差也不会被当作丢包或迟到。
+"""
+
+import heapq
+from typing import List, Optional
+
+# 32位序号空间
+_SEQ_MOD = 1 << 32
+_SEQ_HALF = 1 << 31
+
+# 连续多少个顺序到达的包后尝试降低缓冲深度
+_DEPTH_DECAY_PACKETS = 50
+
+
+def seq_diff(a: int, b: int) -> int:
+    """考虑32位回绕的a-b"""
+    return ((a - b + _SEQ_HALF) % _SEQ_MOD) - _SEQ_HALF
+
+
+def plc_packet(frame_ms: int = 60) -> bytes:
+    """构造一个只有TOC字节的opus包，解码器遇到长度为0的帧会执行丢包补偿（PLC）
+
+    使用SILK宽带配置，10/20/40/60ms分别对应config 8/9/10/11。
+    """
+    config = {10: 8, 20: 9, 40: 10, 60: 11}.get(frame_ms, 11)
+    return bytes([config << 3])
+
+
+class JitterBuffer:
+    """按序号重排的抖动缓冲区，push/poll的复杂度为O(log n)
+
+    释放结果是按顺序排列的音频包列表，None表示该位置的帧已丢失需要补偿。
+    """
+
+    def __init__(
+        self,
+        step: int = 1,
+        frame_ms: int = 60,
+        min_depth: int = 1,
+        max_depth: int = 8,
+        max_conceal: int = 3,
+    ):
+        """
+        Args:
+            step: 相邻两帧的序号差，按序号排序时为1，按毫秒时间戳排序时为帧时长
+            frame_ms: 帧时长，用于计算播放期限
+            min_depth/max_depth: 缓冲深度（帧数）的范围
+            max_conceal: 一次最多补偿的丢失帧数，更长的空洞直接跳过
+        """
+        self.step = step
+        self.frame_ms = frame_ms
+        self.min_depth = min_depth
+        self.max_depth = max_depth
+        self.max_conceal = max_conceal
+        self.depth = min_depth
+
+        self._heap = []
+        self._pending = set()
+        self._last_key = None
+        self._last_ext = 0
+        self._last_slot = None
+        self._next_ext = None
+        self._highest_ext = None
+        self._in_order_run = 0
+
+        # 统计
+        self.late_packets = 0
+        self.lost_frames = 0
+        self.reordered_packets = 0
+        self.resyncs = 0
+
+    def __len__(self):
+        return len(self._heap)
+
+    def _unwrap(self, key: int) -> int:
+        """把32位序号展开为单调的整数"""
+        if self._last_key is None:
+            ext = key
+        else:
+            ext = self._last_ext + seq_diff(key, self._last_key)
+        self._last_key = key
+        self._last_ext = ext
+        return ext
+
+    def _to_slot(self, ext: int) -> int:
+        """把展开后的序号或时间戳换算为帧位置，与上一个包的间隔按step四舍五入"""
+        if self.step == 1:
+            return ext
+        if self._last_slot is None:
+            slot = ext // self.step
+        else:
+            last_ext, last_slot = self._last_slot
+            slot = last_slot + (2 * (ext - last_ext) + self.step) // (2 * self.step)
+        self._last_slot = (ext, slot)
+        return slot
+
+    def playout_delay(self) -> float:
+        """队首空洞最多等待的时间（秒）"""
+        return self.depth * self.frame_ms / 1000
+
+    def push(self, key: int, payload: bytes, now: float) -> List[Optional[bytes]]:
+        """放入一个包，返回可以按顺序释放的包"""
+        ext = self._to_slot(self._unwrap(key))
+        released = []
+        if self._next_ext is None:
+            self._next_ext = ext
+        elif self._next_ext - ext > self.max_depth:
+            # 回退距离超出缓冲窗口，不可能是迟到包：先释放旧序号的包，再从当前包重新开始
+            released = self.flush()
+            self.resyncs += 1
+            self._next_ext = ext
+            self._highest_ext = None
+            self._in_order_run = 0
+
+        if ext < self._next_ext:
+            # 该位置已经释放或补偿过，迟到包丢弃，并加深缓冲
+            self.late_packets += 1
+            self.depth = min(self.max_depth, self.depth + 1)
+            self._in_order_run = 0
+            return []
+        if ext in self._pending:
+            return []
+
+        if self._highest_ext is not None and ext < self._highest_ext:
+            # 乱序到达，缓冲深度至少要覆盖本次的乱序距离
+            self.reordered_packets += 1
+            displacement = self._highest_ext - ext
+            self.depth = max(self.depth, min(self.max_depth, displacement + 1))
+            self._in_order_run = 0
+        else:
+            self._highest_ext = ext
+            self._in_order_run += 1
+            if self._in_order_run >= _DEPTH_DECAY_PACKETS and self.depth > self.min_depth:
+                self.depth -= 1
+                self._in_order_run = 0
+
+        heapq.heappush(self._heap, (ext, now, payload))
+        self._pending.add(ext)
+        return released + self._release(now)
+
+    def poll(self, now: float) -> List[Optional[bytes]]:
+        """播放期限到达时调用，释放队首空洞之后的包"""
+        return self._release(now)
+
+    def next_deadline(self, now: float) -> Optional[float]:
+        """距离队首空洞到期还有多少秒，没有等待中的包时返回None"""
+        if not self._heap:
+            return None
+        _, arrival, _ = self._heap[0]
+        return max(0.0, arrival + self.playout_delay() - now)
+
+    def flush(self) -> List[Optional[bytes]]:
+        """释放全部等待中的包"""
+        return self._release(0, force=True)
+
+    def _release(self, now: float, force: bool = False) -> List[Optional[bytes]]:
+        released = []
+        while self._heap:
+            ext, arrival, payload = self._heap[0]
+            if ext == self._next_ext:
+                heapq.heappop(self._heap)
+                self._pending.discard(ext)
+                released.append(payload)
+                self._next_ext = ext + 1
+                continue
+
+            # 队首之前有空洞：缓冲已满或等待超过期限时，补偿丢失的帧并跳过空洞
+            if (
+                force
+                or len(self._heap) > self.depth
+                or now - arrival >= self.playout_delay()
+            ):
+                missing = ext - self._next_ext
+                self.lost_frames += missing
+                released.extend([None] * min(missing, self.max_conceal))
+                self._next_ext = ext
+                continue
+            break
+        return released
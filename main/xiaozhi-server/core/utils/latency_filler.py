@@ -0,0 +1,239 @@
+"""
+等待时的过渡语音
+
+大模型调用工具（天气、新闻、知识库、MCP等）时，要等工具返回和第二轮大模型回复后才有声音，常有1~3秒的静默；
+大模型首字慢时也一样。这里在设备一段时间没有声音时，播放一句预先合成好的过渡语（如“稍等，我查一下”）：
+- 过渡语按音色（TTS提供者和其声明的影响合成结果的参数）在进程内预先合成并编码，播放时不调用TTS
+- 按等待原因（大模型思考、查询类工具、设备控制等）和音色选择不同的过渡语
+- 只在播放队列和合成流水线都空闲时整句放入，正式回复排在其后播放，不会交错
+"""
+
+import os
+import time
+import random
+import asyncio
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from config.logger import setup_logging
+from core.utils.tts_cache import TTSCache
+from core.utils.audio_pacer import audio_pacer
+from core.providers.tts.dto.dto import SentenceType
+
+TAG = __name__
+logger = setup_logging()
+
+# 未配置时的过渡语，按等待原因分类
+DEFAULT_PHRASES = {
+    "think": ["嗯，让我想想"],
+    "query": ["稍等，我查一下", "好的，我查一下"],
+    "device": ["好的，马上"],
+    "tool": ["稍等一下"],
+}
+
+# 轮询设备是否静默的间隔（秒）
+POLL_INTERVAL_S = 0.05
+
+
+class FillerLibrary:
+    """进程内共用的预合成过渡语，所有使用同一音色的连接共用"""
+
+    def __init__(self):
+        self._frames: Dict[str, List[bytes]] = {}
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(tts, phrase: str) -> str:
+        return TTSCache.make_key(tts, phrase, "opus")
+
+    def get(self, tts, phrase: str) -> Optional[List[bytes]]:
+        if tts.cache_key_params is None:
+            return None
+        return self._frames.get(self._key(tts, phrase))
+
+    def prepare(self, tts, phrases: List[str]):
+        """合成尚未缓存的过渡语，在后台线程中调用"""
+        # 未声明cache_key_params的提供者无法区分音色，不使用过渡语
+        if tts.cache_key_params is None:
+            return
+        for phrase in phrases:
+            key = self._key(tts, phrase)
+            with self._lock:
+                if key in self._frames or key in self._pending:
+                    continue
+                self._pending.add(key)
+            try:
+                frames = self._synthesize(tts, phrase)
+                if frames:
+                    self._frames[key] = frames
+                    logger.bind(tag=TAG).debug(
+                        f"过渡语预合成完成: {phrase}，共{len(frames)}帧"
+                    )
+            except Exception as e:
+                logger.bind(tag=TAG).warning(f"过渡语预合成失败: {phrase}, {e}")
+            finally:
+                with self._lock:
+                    self._pending.discard(key)
+
+    @staticmethod
+    def _synthesize(tts, phrase: str) -> Optional[List[bytes]]:
+        result = tts.to_tts(phrase)
+        if isinstance(result, list):
+            return result
+        if isinstance(result, str) and os.path.exists(result):
+            # 不删除文件的提供者返回音频文件路径
+            from core.utils.util import audio_to_data
+
+            try:
+                return audio_to_data(result, is_opus=True)
+            finally:
+                os.remove(result)
+        return None
+
+
+filler_library = FillerLibrary()
+
+
+class LatencyFiller:
+    """
+    单个连接的过渡语播放控制，arm/disarm在大模型线程中调用，静默检测在事件循环中进行。
+    arm后设备连续静默超过设定时间就播放一句过渡语，直到disarm（收到大模型的回复文本或本轮结束）
+    """
+
+    def __init__(self, conn, options: Optional[dict] = None):
+        self.conn = conn
+        options = options or {}
+        self.enabled = str(options.get("enabled", False)).lower() in (
+            "true",
+            "1",
+            "yes",
+        )
+        # 请求大模型后静默多久播放（大模型首字慢）
+        self.llm_delay = int(options.get("llm_delay_ms", 1500)) / 1000
+        # 调用工具后静默多久播放
+        self.tool_delay = int(options.get("tool_delay_ms", 700)) / 1000
+        # 每轮对话最多播放几句
+        self.max_per_turn = int(options.get("max_per_turn", 2))
+        self.tool_categories = options.get("tool_categories") or {}
+        phrases = dict(DEFAULT_PHRASES)
+        phrases.update(options.get("phrases") or {})
+        # 按TTS模块覆盖过渡语，不同音色可以用不同的说法
+        voice = (conn.config.get("selected_module") or {}).get("TTS", "")
+        phrases.update((options.get("voices") or {}).get(voice) or {})
+        self.phrases = {k: list(v) for k, v in phrases.items() if v}
+
+        self._token = None
+        self._played = 0
+        self._last_phrase = None
+
+    def prepare(self):
+        """在后台预合成当前音色的过渡语"""
+        if not self.enabled or self.conn.tts is None:
+            return
+        all_phrases = [p for group in self.phrases.values() for p in group]
+        threading.Thread(
+            target=filler_library.prepare,
+            args=(self.conn.tts, all_phrases),
+            daemon=True,
+        ).start()
+
+    def tool_category(self, tool_names: List[str]) -> str:
+        """按调用的工具确定等待原因，配置中没有的工具按工具类型区分，none表示不播放"""
+        for name in tool_names:
+            if name in self.tool_categories:
+                return self.tool_categories[name]
+        func_handler = getattr(self.conn, "func_handler", None)
+        if func_handler is not None:
+            from core.providers.tools.base import ToolType
+
+            tool_manager = func_handler.tool_manager
+            for name in tool_names:
+                if tool_manager.get_tool_type(name) in (
+                    ToolType.DEVICE_IOT,
+                    ToolType.DEVICE_MCP,
+                ):
+                    return "device"
+        return "tool"
+
+    def start_turn(self):
+        """新的一轮对话开始"""
+        self._token = None
+        self._played = 0
+
+    def arm(self, category: str):
+        """
+        开始等待。已在等待中时沿用原来的开始时间，只更新等待原因：
+        工具调用和之后的第二轮大模型请求算作同一段等待
+        """
+        if not self.enabled or self.conn.loop is None or category == "none":
+            return
+        if self._played >= self.max_per_turn:
+            return
+        delay = self.llm_delay if category == "think" else self.tool_delay
+        token = self._token
+        if token is not None:
+            token["category"] = category
+            token["delay"] = min(token["delay"], delay)
+            return
+        token = {"category": category, "delay": delay}
+        self._token = token
+        asyncio.run_coroutine_threadsafe(self._watch(token), self.conn.loop)
+
+    def disarm(self):
+        self._token = None
+
+    def _audio_idle(self) -> bool:
+        """设备当前没有在播放，也没有待发送的音频"""
+        tts = self.conn.tts
+        return tts.tts_audio_queue.empty() and not audio_pacer.busy(self.conn)
+
+    async def _watch(self, token):
+        quiet_since = time.monotonic()
+        while self._token is token and not self.conn.client_abort:
+            await asyncio.sleep(POLL_INTERVAL_S)
+            now = time.monotonic()
+            if not self._audio_idle():
+                quiet_since = now
+                continue
+            # 本轮已播放过过渡语时，下一句需要等待更久，避免连续播放
+            if now - quiet_since < token["delay"] * (self._played + 1):
+                continue
+            if self._token is not token or self.conn.client_abort:
+                break
+            if self._play(token["category"]):
+                self._played += 1
+                if self._played >= self.max_per_turn:
+                    break
+            # 播放后重新计算静默时间，没有可用的过渡语时也不再频繁尝试
+            quiet_since = time.monotonic()
+        if self._token is token:
+            self._token = None
+
+    def _choose(self, category: str) -> Optional[Tuple[str, List[bytes]]]:
+        phrases = self.phrases.get(category) or self.phrases.get("tool") or []
+        candidates = [p for p in phrases if p != self._last_phrase] or phrases
+        random.shuffle(candidates)
+        for phrase in candidates:
+            frames = filler_library.get(self.conn.tts, phrase)
+            if frames:
+                return phrase, frames
+        return None
+
+    def _play(self, category: str) -> bool:
+        chosen = self._choose(category)
+        if chosen is None:
+            return False
+        phrase, frames = chosen
+        # 整句作为一个条目放入播放队列，之后的正式回复排在其后；
+        # 过渡语不是回复内容，不计入输出字数和上报
+        item = (SentenceType.FILLER, list(frames), phrase)
+        pipeline = self.conn.tts.synthesis_pipeline
+        if pipeline is not None:
+            if not pipeline.put_if_idle(item):
+                return False
+        else:
+            self.conn.tts.tts_audio_queue.put(item)
+        self._last_phrase = phrase
+        logger.bind(tag=TAG).info(f"等待中播放过渡语: {phrase}")
+        return True
@@ -0,0 +1,143 @@
+"""
+记忆查询预取
+
+原流程在chat中同步等待query_memory，记忆查询的耗时直接加在每轮对话的首字延迟上。
+这里在拿到识别文本时就在事件循环中开始查询，与意图识别、推测请求同时进行：
+- 流式ASR的中间结果稳定并出现停顿时开始预取，收到最终结果时再预取一次（文本一致时复用）
+- 查询结果在本次会话内按文本缓存，记忆保存后失效
+- 大模型请求前等待查询完成，超过timeout_ms时本轮不带记忆，结果仍会缓存
+与查询文本无关的记忆（如本地短期记忆）每次会话只查询一次。
+"""
+
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Dict, Optional, Set
+
+from config.logger import setup_logging
+from core.utils.speculative import normalize_text
+
+TAG = __name__
+logger = setup_logging()
+
+# 每个会话最多缓存的查询结果数
+MAX_RESULTS = 32
+
+
+class MemoryPrefetcher:
+    """单个连接的记忆查询，prefetch在事件循环中调用，get在大模型线程中调用"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        options = conn.config.get("memory_prefetch") or {}
+        self.enabled = str(options.get("enabled", True)).lower() in (
+            "true",
+            "1",
+            "yes",
+        )
+        self.ttl = float(options.get("ttl_s", 300))
+        self.timeout = int(options.get("timeout_ms", 3000)) / 1000
+        # key -> (查询时间, 结果)
+        self._results: "OrderedDict[str, tuple]" = OrderedDict()
+        self._tasks: Dict[str, asyncio.Task] = {}
+        # 有大模型请求在等待的查询，不会因为新的预取被取消
+        self._waited: Set[str] = set()
+        # 记忆保存后递增，保存前发起的查询结果不再缓存
+        self._generation = 0
+
+    def _key(self, text: str) -> str:
+        if not getattr(self.conn.memory, "query_dependent", True):
+            return ""
+        return normalize_text(text)
+
+    def prefetch(self, text: str):
+        """收到识别文本，开始查询记忆，之前尚未被使用的预取作废"""
+        if not self.enabled or self.conn.memory is None or not text:
+            return
+        key = self._key(text)
+        for other, task in list(self._tasks.items()):
+            if other != key and other not in self._waited:
+                task.cancel()
+        self._start(key, text)
+
+    def _cached(self, key: str) -> Optional[str]:
+        entry = self._results.get(key)
+        if entry is None:
+            return None
+        queried_at, result = entry
+        if time.monotonic() - queried_at > self.ttl:
+            del self._results[key]
+            return None
+        return result
+
+    def _start(self, key: str, text: str) -> asyncio.Future:
+        cached = self._cached(key)
+        if cached is not None:
+            future = asyncio.get_running_loop().create_future()
+            future.set_result(cached)
+            return future
+        task = self._tasks.get(key)
+        if task is None or task.cancelled():
+            task = asyncio.ensure_future(self._query(key, text, self._generation))
+            self._tasks[key] = task
+        return task
+
+    async def _query(self, key: str, text: str, generation: int) -> Optional[str]:
+        start = time.monotonic()
+        try:
+            result = await self.conn.memory.query_memory(text)
+        finally:
+            if self._tasks.get(key) is asyncio.current_task():
+                del self._tasks[key]
+        logger.bind(tag=TAG).debug(f"记忆查询耗时: {time.monotonic() - start:.3f}s")
+        if result is not None and generation == self._generation:
+            self._results[key] = (time.monotonic(), result)
+            self._results.move_to_end(key)
+            while len(self._results) > MAX_RESULTS:
+                self._results.popitem(last=False)
+        return result
+
+    async def _wait(self, text: str) -> Optional[str]:
+        key = self._key(text)
+        task = self._start(key, text)
+        self._waited.add(key)
+        try:
+            if self.timeout > 0:
+                return await asyncio.wait_for(asyncio.shield(task), self.timeout)
+            return await task
+        except asyncio.TimeoutError:
+            logger.bind(tag=TAG).warning(
+                f"记忆查询超过{self.timeout:.1f}s，本轮不带记忆"
+            )
+        except asyncio.CancelledError:
+            logger.bind(tag=TAG).warning("记忆查询已取消，本轮不带记忆")
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"记忆查询失败: {e}")
+        finally:
+            self._waited.discard(key)
+        return None
+
+    def get(self, text: str) -> Optional[str]:
+        """在大模型线程中调用，返回记忆查询结果，已预取时直接使用"""
+        memory = self.conn.memory
+        if memory is None:
+            return None
+        if not self.enabled:
+            return asyncio.run_coroutine_threadsafe(
+                memory.query_memory(text), self.conn.loop
+            ).result()
+        return asyncio.run_coroutine_threadsafe(
+            self._wait(text), self.conn.loop
+        ).result()
+
+    def invalidate(self):
+        """记忆保存后调用，丢弃缓存的查询结果"""
+        self._generation += 1
+        self._results.clear()
+
+    def reset(self):
+        """关闭连接时取消进行中的查询"""
+        for task in self._tasks.values():
+            task.cancel()
+        self._tasks.clear()
+        self._results.clear()
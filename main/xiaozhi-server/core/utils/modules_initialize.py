@@ -1,6 +1,7 @@
 from typing import Dict, Any
 from config.logger import setup_logging
 from core.utils import tts, llm, intent, memory, vad, asr
+from core.utils.asr_worker_pool import LOCAL_ASR_TYPES, ProcessPoolASRProvider
 
 TAG = __name__
 logger = setup_logging()
@@ -120,11 +121,22 @@ def initialize_asr(config):
         if "type" not in config["ASR"][select_asr_module]
         else config["ASR"][select_asr_module]["type"]
     )
-    new_asr = asr.create_instance(
-        asr_type,
-        config["ASR"][select_asr_module],
-        str(config.get("delete_audio", True)).lower() in ("true", "1", "yes"),
+    asr_config = config["ASR"][select_asr_module]
+    delete_audio_file = str(config.get("delete_audio", True)).lower() in (
+        "true",
+        "1",
+        "yes",
     )
+    if int(asr_config.get("process_workers", 0) or 0) > 0:
+        if asr_type in LOCAL_ASR_TYPES:
+            # 本地模型放到独立进程中运行，避免与事件循环争抢GIL
+            new_asr = ProcessPoolASRProvider(asr_type, asr_config, delete_audio_file)
+            logger.bind(tag=TAG).info("ASR模块初始化完成（独立进程模式）")
+            return new_asr
+        logger.bind(tag=TAG).warning(
+            f"{asr_type}不是本地ASR，忽略process_workers配置"
+        )
+    new_asr = asr.create_instance(asr_type, asr_config, delete_audio_file)
     logger.bind(tag=TAG).info("ASR模块初始化完成")
     return new_asr
 
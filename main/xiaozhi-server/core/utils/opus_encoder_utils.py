@@ -9,11 +9,18 @@ import numpy as np
 from opuslib_next import Encoder
 from opuslib_next import constants
 from typing import Optional, Callable, Any
+from core.utils.audio_convert import PcmConverter
 
 class OpusEncoderUtils:
     """PCM到Opus的编码器"""
 
-    def __init__(self, sample_rate: int, channels: int, frame_size_ms: int):
+    def __init__(
+        self,
+        sample_rate: int,
+        channels: int,
+        frame_size_ms: int,
+        input_sample_rate: Optional[int] = None,
+    ):
         """
         初始化Opus编码器
 
@@ -21,8 +28,15 @@ class OpusEncoderUtils:
             sample_rate: 采样率 (Hz)
             channels: 通道数 (1=单声道, 2=立体声)
             frame_size_ms: 帧大小 (毫秒)
+            input_sample_rate: 输入PCM的采样率，与sample_rate不同时先在进程内重采样（仅单声道）
         """
         self.sample_rate = sample_rate
+        self.input_sample_rate = input_sample_rate or sample_rate
+        self.resampler = (
+            PcmConverter(self.input_sample_rate, dst_rate=sample_rate)
+            if self.input_sample_rate != sample_rate
+            else None
+        )
         self.channels = channels
         self.frame_size_ms = frame_size_ms
         # 计算每帧样本数 = 采样率 * 帧大小(毫秒) / 1000
@@ -53,6 +67,18 @@ class OpusEncoderUtils:
         """重置编码器状态"""
         self.encoder.reset_state()
         self.buffer = np.array([], dtype=np.int16)
+        if self.resampler is not None:
+            self.resampler.reset()
+
+    def start_sentence(self):
+        """新的一句开始，丢弃上一句（如被打断时）残留在重采样器和缓冲区中的数据"""
+        self.buffer = np.array([], dtype=np.int16)
+        if self.resampler is not None:
+            self.resampler.reset()
+
+    def finish_sentence(self, pcm_data: bytes, callback: Callable[[Any], Any]):
+        """一句结束，编码剩余的PCM数据，并输出重采样器中的尾部和不足一帧的数据"""
+        self.encode_pcm_to_opus_stream(pcm_data, end_of_stream=True, callback=callback)
 
     def encode_pcm_to_opus_stream(self, pcm_data: bytes, end_of_stream: bool, callback: Callable[[Any], Any]):
         """
@@ -66,6 +92,11 @@ class OpusEncoderUtils:
         Returns:
             Opus数据包列表
         """
+        if self.resampler is not None:
+            pcm_data = self.resampler.convert(pcm_data)
+            if end_of_stream:
+                pcm_data += self.resampler.flush()
+
         # 将字节数据转换为short数组
         new_samples = self._convert_bytes_to_shorts(pcm_data)
 
@@ -56,4 +56,15 @@ def decode_opus_from_bytes(input_bytes):
         total_frames += 1
 
     total_duration = (total_frames * frame_duration_ms) / 1000.0
-    return opus_datas, total_duration
\ No newline at end of file
+    return opus_datas, total_duration
+
+def encode_opus_to_bytes(opus_datas):
+    """
+    将 Opus 数据包列表编码为p3格式的二进制数据，每个包前加4字节头部：[1字节类型，1字节保留，2字节长度]
+    """
+    header = struct.Struct('>BBH')
+    output = bytearray()
+    for opus_data in opus_datas:
+        output += header.pack(0, 0, len(opus_data))
+        output += opus_data
+    return bytes(output)
@@ -0,0 +1,254 @@
+"""
+推测式对话
+
+流式ASR在用户说话过程中就会给出中间结果，但原流程要等最终结果经过handle_voice_stop后才开始意图识别和大模型请求。
+这里在中间结果稳定且用户出现短暂停顿时，用中间结果提前请求大模型（intent_llm模式下同时预热意图识别缓存），
+生成的内容先缓存不发送；最终识别结果与中间结果一致（去掉标点、空格后比较）时直接使用缓存的输出，
+否则取消推测请求，按最终结果重新开始。
+
+推测只覆盖大模型请求本身：工具调用、TTS合成和下发都在确认后才进行，不会产生副作用。
+代价是不一致时浪费一次大模型调用，换取首句回复更快。
+
+intent_llm模式下收到最终识别结果后，意图识别和大模型对话原本先后请求，两次大模型耗时相加。
+同样用推测请求在意图识别的同时请求大模型：识别为继续聊天时直接使用缓存的输出，识别为函数调用时取消。
+"""
+
+import time
+import asyncio
+import threading
+from typing import Optional
+
+from config.logger import setup_logging
+from core.utils.dialogue import Message, Dialogue
+from core.utils.util import remove_punctuation_and_length
+
+TAG = __name__
+logger = setup_logging()
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """比较用的文本：去掉标点和空格，统一小写"""
+    if not text:
+        return ""
+    _, result = remove_punctuation_and_length(text)
+    return result.replace("、", "").replace("…", "").lower()
+
+
+class SpeculativeTurn:
+    """一次推测请求，在线程池中运行，输出缓存在内存中，确认后由chat按顺序读取"""
+
+    def __init__(self, conn, text: str, prewarm_intent: bool = True):
+        self.conn = conn
+        self.text = text
+        # 调用方自己进行意图识别时不再预热
+        self.prewarm_intent = prewarm_intent
+        self.key = normalize_text(text)
+        self.cancel_event = threading.Event()
+        self.started_at = time.monotonic()
+        self.first_output_at = None
+        self.error = None
+        # 推测请求提供的工具，确认后本轮沿用
+        self.functions = None
+        self._items = []
+        self._done = False
+        self._cond = threading.Condition()
+
+    def run(self):
+        conn = self.conn
+        try:
+            if (
+                self.prewarm_intent
+                and conn.intent_type == "intent_llm"
+                and conn.intent is not None
+            ):
+                # 意图识别结果按文本缓存，提前识别一次，确认后直接命中缓存
+                asyncio.run_coroutine_threadsafe(
+                    conn.intent.detect_intent(conn, conn.dialogue.dialogue, self.text),
+                    conn.loop,
+                )
+
+            memory_str = conn.memory_prefetch.get(self.text)
+            if self.cancel_event.is_set():
+                return
+
+            # 在对话的副本上追加用户消息，确认前不改动真实的对话历史
+            dialogue = Dialogue()
+            dialogue.dialogue = list(conn.dialogue.dialogue)
+            if conn.intent_type == "intent_llm":
+                # 与识别为继续聊天时一致，不带工具相关的消息
+                dialogue.dialogue = [
+                    msg
+                    for msg in dialogue.dialogue
+                    if msg.role not in ["tool", "function"]
+                ]
+            dialogue.put(Message(role="user", content=self.text))
+
+            functions = None
+            if conn.intent_type == "function_call" and hasattr(conn, "func_handler"):
+                functions = conn.func_handler.get_functions(self.text)
+                self.functions = functions
+
+            for item in conn.llm.response_cancellable(
+                conn.session_id,
+                dialogue.get_llm_dialogue_with_memory(
+                    memory_str, conn.config.get("voiceprint", {})
+                ),
+                self.cancel_event,
+                functions=functions,
+            ):
+                with self._cond:
+                    if self.first_output_at is None:
+                        self.first_output_at = time.monotonic()
+                    self._items.append(item)
+                    self._cond.notify_all()
+        except Exception as e:
+            self.error = e
+            logger.bind(tag=TAG).warning(f"推测请求失败: {e}")
+        finally:
+            with self._cond:
+                self._done = True
+                self._cond.notify_all()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    @property
+    def usable(self) -> bool:
+        return not self.cancel_event.is_set() and self.error is None
+
+    def responses(self):
+        """按顺序返回大模型输出：先返回已缓存的部分，之后等待推测请求继续生成"""
+        index = 0
+        while True:
+            with self._cond:
+                while index >= len(self._items) and not self._done:
+                    self._cond.wait()
+                if index >= len(self._items):
+                    return
+                item = self._items[index]
+            index += 1
+            yield item
+
+
+class SpeculationManager:
+    """单个连接的推测式对话管理，所有方法都在连接的事件循环中调用"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.partial_text = ""
+        self.partial_key = ""
+        self.partial_since = 0.0
+        self.turn: Optional[SpeculativeTurn] = None
+        # 统计
+        self.started = 0
+        self.committed = 0
+
+    @property
+    def options(self) -> dict:
+        return self.conn.config.get("speculative_turn") or {}
+
+    @property
+    def enabled(self) -> bool:
+        return str(self.options.get("enabled", False)).lower() in ("true", "1", "yes")
+
+    def on_partial(self, text: str):
+        """流式ASR收到中间结果"""
+        key = normalize_text(text)
+        if key == self.partial_key:
+            return
+        self.partial_text = text
+        self.partial_key = key
+        self.partial_since = time.monotonic()
+        if self.turn is not None and self.turn.key != key:
+            # 用户还在继续说，之前的推测作废
+            self._cancel()
+
+    def on_pause(self, silence_ms: float):
+        """VAD检测到句中停顿"""
+        if not self.partial_key:
+            return
+        if self.turn is not None and self.turn.key == self.partial_key:
+            return
+        options = self.options
+        if silence_ms < int(options.get("pause_ms", 300)):
+            return
+        if len(self.partial_key) < int(options.get("min_chars", 4)):
+            return
+        stable_s = int(options.get("stable_ms", 200)) / 1000
+        if time.monotonic() - self.partial_since < stable_s:
+            return
+        # 中间结果已稳定，先开始查询记忆，不需要开启推测式对话
+        self.conn.memory_prefetch.prefetch(self.partial_text)
+        if not self.enabled or not self._allowed():
+            return
+
+        self._cancel()
+        self.turn = SpeculativeTurn(self.conn, self.partial_text)
+        self.started += 1
+        logger.bind(tag=TAG).debug(f"根据中间结果提前请求大模型: {self.partial_text}")
+        self.conn.executor.submit(self.turn.run)
+
+    def _allowed(self) -> bool:
+        conn = self.conn
+        # 声纹识别会改写输入文本，绑定和限额检查会中断对话，这些情况下不做推测；
+        # 服务端保存对话记录的大模型无法撤回作废的请求，也不做推测
+        return (
+            conn.llm is not None
+            and conn.llm.stateless
+            and conn.voiceprint_provider is None
+            and not conn.need_bind
+            and conn.max_output_size <= 0
+            and conn.intent_type in ("nointent", "function_call", "intent_llm")
+        )
+
+    @property
+    def intent_concurrent(self) -> bool:
+        options = self.conn.config.get("intent_concurrent") or {}
+        return str(options.get("enabled", True)).lower() in ("true", "1", "yes")
+
+    def start_with_intent(self, text: str) -> Optional[SpeculativeTurn]:
+        """
+        intent_llm模式下，在意图识别的同时按最终识别结果请求大模型。
+        识别为继续聊天时把返回的请求交给chat，否则调用方取消
+        """
+        conn = self.conn
+        # 与推测式请求的条件相同：改写文本、会中断对话或服务端保存对话记录时不提前请求
+        if (
+            conn.intent_type != "intent_llm"
+            or not self.intent_concurrent
+            or not self._allowed()
+        ):
+            return None
+        turn = SpeculativeTurn(conn, text, prewarm_intent=False)
+        logger.bind(tag=TAG).debug(f"意图识别的同时请求大模型: {text}")
+        conn.executor.submit(turn.run)
+        return turn
+
+    def take(self, final_text: str) -> Optional[SpeculativeTurn]:
+        """收到最终识别结果，一致时返回推测请求，由调用方接管；不一致时取消"""
+        turn, self.turn = self.turn, None
+        self.partial_text = ""
+        self.partial_key = ""
+        if turn is None:
+            return None
+        if turn.usable and normalize_text(final_text) == turn.key:
+            self.committed += 1
+            saved = time.monotonic() - turn.started_at
+            logger.bind(tag=TAG).info(
+                f"使用推测结果，提前 {saved:.3f}s 开始请求大模型"
+                f"（命中 {self.committed}/{self.started}）"
+            )
+            return turn
+        turn.cancel()
+        return None
+
+    def _cancel(self):
+        if self.turn is not None:
+            self.turn.cancel()
+            self.turn = None
+
+    def reset(self):
+        """打断或关闭连接时取消进行中的推测"""
+        self._cancel()
+        self.partial_text = ""
+        self.partial_key = ""
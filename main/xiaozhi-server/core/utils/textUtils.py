@@ -1,4 +1,6 @@
+import re
 import json
+from typing import Dict
 
 TAG = __name__
 EMOJI_MAP = {
@@ -111,3 +113,23 @@ def is_emoji(char):
 def check_emoji(text):
     """去除文本中的所有emoji表情"""
     return ''.join(char for char in text if not is_emoji(char) and char != "\n")
+
+
+_ASCII_WORD = re.compile(r"[a-z0-9]+")
+_CJK_RUN = re.compile(r"[\u4e00-\u9fff]+")
+_CAMEL = re.compile(r"(?<=[a-z0-9])(?=[A-Z])")
+# 不参与单字匹配的虚词和常见口语用字
+_STOP_CHARS = set("的一了是我你他她它们个这那么吗呢吧啊呀把帮给在有和就也都要会能想说请让下点些用时")
+
+
+def keyword_tokens(text: str, unigram_weight: float = 0.3) -> Dict[str, float]:
+    """英文按单词、中文按单字和双字切分，返回词及其权重，双字词更能代表意图"""
+    text = _CAMEL.sub(" ", text or "").replace("_", " ").lower()
+    tokens = {word: 1.0 for word in _ASCII_WORD.findall(text)}
+    for run in _CJK_RUN.findall(text):
+        for char in run:
+            if char not in _STOP_CHARS:
+                tokens.setdefault(char, unigram_weight)
+        for i in range(len(run) - 1):
+            tokens[run[i : i + 2]] = 1.0
+    return tokens
@@ -0,0 +1,145 @@
+"""
+推理线程预算
+
+torch、onnxruntime、sherpa-onnx默认各自按CPU核数创建线程池，多个连接并发推理时线程数会成倍超出核数，
+频繁的上下文切换反而让吞吐下降。这里根据可用核数、服务进程数和ASR进程数统一计算各组件的线程数，
+启动时应用到全局，并由各个provider在创建模型时读取。
+"""
+
+import os
+import sys
+from typing import Any, Dict, Optional
+
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+# 在torch、numpy等库初始化线程池前生效的环境变量
+_THREAD_ENV_VARS = (
+    "OMP_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+)
+
+# 进程内ASR预计的并发识别数（未配置asr_concurrency时）
+DEFAULT_ASR_CONCURRENCY = 2
+# 进程内ASR单次识别的线程数上限，更多线程对单句识别几乎没有提速
+MAX_INPROCESS_ASR_THREADS = 4
+
+_budget: Dict[str, int] = {}
+
+
+def available_cpu_count() -> int:
+    """当前进程可用的CPU核数，考虑了CPU亲和性设置"""
+    if hasattr(os, "sched_getaffinity"):
+        try:
+            return max(1, len(os.sched_getaffinity(0)))
+        except OSError:
+            pass
+    return max(1, os.cpu_count() or 1)
+
+
+def compute_thread_budget(config: Dict[str, Any]) -> Dict[str, int]:
+    """根据配置计算线程预算
+
+    Returns:
+        dict: cores/server_workers/per_process/intra_op/inter_op/vad/asr
+    """
+    budget_config = config.get("thread_budget", {}) or {}
+    cores = int(budget_config.get("total_threads", 0) or 0) or available_cpu_count()
+    server_workers = max(1, int(config.get("server", {}).get("workers", 1) or 1))
+    per_process = max(1, cores // server_workers)
+
+    asr_workers = 0
+    selected_asr = config.get("selected_module", {}).get("ASR")
+    if selected_asr:
+        asr_config = config.get("ASR", {}).get(selected_asr, {}) or {}
+        asr_workers = int(asr_config.get("process_workers", 0) or 0)
+
+    asr_threads = int(budget_config.get("asr_threads", 0) or 0)
+    if not asr_threads:
+        if asr_workers > 0:
+            # 独立ASR进程平分全部核数
+            asr_threads = max(1, cores // (asr_workers * server_workers))
+        else:
+            # 进程内的模型由所有连接共用，每个连接的识别各占一组线程，按预计并发数平分并设置上限
+            concurrency = max(
+                1,
+                int(budget_config.get("asr_concurrency", 0) or 0)
+                or DEFAULT_ASR_CONCURRENCY,
+            )
+            asr_threads = max(
+                1, min(MAX_INPROCESS_ASR_THREADS, per_process // concurrency)
+            )
+
+    return {
+        "cores": cores,
+        "server_workers": server_workers,
+        "per_process": per_process,
+        "intra_op": int(budget_config.get("intra_op_threads", 0) or 0) or per_process,
+        "inter_op": int(budget_config.get("inter_op_threads", 1) or 1),
+        # VAD模型很小，每次只推理512个采样点，单线程最快（用于独立的onnx会话，torch线程数为进程级设置）
+        "vad": int(budget_config.get("vad_threads", 1) or 1),
+        "asr": asr_threads,
+    }
+
+
+def apply_thread_budget(config: Dict[str, Any]) -> Dict[str, int]:
+    """计算并应用线程预算，需要在加载任何模型之前调用"""
+    global _budget
+    _budget = compute_thread_budget(config)
+
+    # 用户显式设置的环境变量优先
+    for name in _THREAD_ENV_VARS:
+        os.environ.setdefault(name, str(_budget["intra_op"]))
+
+    # torch已被导入时直接设置；未导入时由provider在导入后调用apply_torch_threads
+    if "torch" in sys.modules:
+        apply_torch_threads()
+
+    logger.bind(tag=TAG).info(
+        f"推理线程预算: 可用核数={_budget['cores']}，服务进程数={_budget['server_workers']}，"
+        f"每进程推理线程={_budget['intra_op']}，inter-op线程={_budget['inter_op']}，"
+        f"VAD线程={_budget['vad']}，ASR线程={_budget['asr']}"
+    )
+    return _budget
+
+
+def get_threads(kind: str, default: Optional[int] = None) -> int:
+    """获取某类组件的线程数，kind取值：intra_op/inter_op/vad/asr"""
+    if kind in _budget:
+        return _budget[kind]
+    if default is not None:
+        return default
+    # 未调用apply_thread_budget时（例如独立ASR进程中），按环境变量或可用核数估算
+    env_threads = os.environ.get("OMP_NUM_THREADS")
+    if env_threads and env_threads.isdigit():
+        return max(1, int(env_threads))
+    return available_cpu_count()
+
+
+def apply_torch_threads(intra_op: Optional[int] = None):
+    """设置torch的intra-op/inter-op线程数"""
+    import torch
+
+    threads = intra_op or get_threads("intra_op")
+    if torch.get_num_threads() != threads:
+        torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(get_threads("inter_op", 1))
+    except RuntimeError:
+        # inter-op线程池一旦开始工作就不能再修改
+        pass
+
+
+def onnx_session_options(kind: str):
+    """按线程预算创建onnxruntime的SessionOptions"""
+    import onnxruntime
+
+    options = onnxruntime.SessionOptions()
+    options.intra_op_num_threads = get_threads(kind)
+    options.inter_op_num_threads = get_threads("inter_op", 1)
+    options.execution_mode = onnxruntime.ExecutionMode.ORT_SEQUENTIAL
+    return options
@@ -0,0 +1,198 @@
+"""
+合成语音缓存
+
+唤醒回复、“好的”、意图处理的提示语、退出语、字数限制提示和常见的简短回答，在大量设备上用同一个音色反复合成。
+这里按(TTS提供者, 提供者声明的影响合成结果的参数, 规范化后的文本, 音频格式)计算key，缓存编码好的音频帧列表：
+- 内存层：按字节数限制的LRU
+- 磁盘层：p3格式文件，总大小超过上限时按最近访问时间淘汰，同一节点的多个进程共用
+命中时不再调用TTS服务，音频可以立即下发。
+"""
+
+import os
+import re
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+
+from config.logger import setup_logging
+from core.utils import p3
+
+TAG = __name__
+logger = setup_logging()
+
+
+def synthesis_params(provider) -> dict:
+    """按TTS提供者声明的cache_key_params收集影响合成结果的参数"""
+    return {
+        name: getattr(provider, name, None) for name in provider.cache_key_params
+    }
+
+
+def normalize_text(text: str) -> str:
+    """合并空白字符，其余保持不变（标点会影响语调）"""
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class TTSCache:
+    """两级合成语音缓存，线程安全"""
+
+    def __init__(self, config: dict):
+        self.enabled = str(config.get("enabled", True)).lower() in ("true", "1", "yes")
+        self.max_text_chars = int(config.get("max_text_chars", 40))
+        self.memory_max_bytes = int(config.get("memory_max_mb", 32)) * 1024 * 1024
+        self.disk_dir = config.get("disk_dir", "tmp/tts_cache")
+        self.disk_max_bytes = int(config.get("disk_max_mb", 512)) * 1024 * 1024
+
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_bytes = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(provider, text: str, audio_format: str) -> str:
+        identity = {
+            "provider": type(provider).__module__,
+            "params": synthesis_params(provider),
+            "text": normalize_text(text),
+            "format": audio_format,
+        }
+        raw = json.dumps(identity, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def cacheable(self, provider, text: str) -> bool:
+        """只缓存短句，长句很少重复；未声明cache_key_params的提供者不缓存"""
+        if not self.enabled or provider.cache_key_params is None:
+            return False
+        return 0 < len(normalize_text(text)) <= self.max_text_chars
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], f"{key}.p3")
+
+    def get(self, key: str) -> Optional[List[bytes]]:
+        with self._lock:
+            frames = self._memory.get(key)
+            if frames is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return frames
+
+        path = self._disk_path(key)
+        try:
+            frames, _ = p3.decode_opus_from_file(path)
+            # 更新访问时间，磁盘淘汰按最近访问排序
+            os.utime(path)
+        except FileNotFoundError:
+            frames = None
+        except Exception as e:
+            logger.bind(tag=TAG).warning(f"读取语音缓存失败: {path}, {e}")
+            frames = None
+
+        with self._lock:
+            if not frames:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._put_memory(key, frames)
+        return frames
+
+    def put(self, key: str, frames: List[bytes]):
+        if not frames:
+            return
+        frames = list(frames)
+        with self._lock:
+            self._put_memory(key, frames)
+        self._put_disk(key, frames)
+
+    def _put_memory(self, key: str, frames: List[bytes]):
+        size = sum(len(frame) for frame in frames)
+        if size > self.memory_max_bytes:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= sum(len(frame) for frame in old)
+        self._memory[key] = frames
+        self._memory_bytes += size
+        while self._memory_bytes > self.memory_max_bytes and self._memory:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= sum(len(frame) for frame in evicted)
+
+    def _put_disk(self, key: str, frames: List[bytes]):
+        if self.disk_max_bytes <= 0:
+            return
+        path = self._disk_path(key)
+        data = p3.encode_opus_to_bytes(frames)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # 先写临时文件再改名，其他进程不会读到写了一半的文件
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.bind(tag=TAG).warning(f"写入语音缓存失败: {path}, {e}")
+            return
+
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = self._scan_disk_bytes()
+            else:
+                self._disk_bytes += len(data)
+            over_limit = self._disk_bytes > self.disk_max_bytes
+        if over_limit:
+            self._evict_disk()
+
+    def _iter_disk_files(self):
+        for root, _, files in os.walk(self.disk_dir):
+            for name in files:
+                if name.endswith(".p3"):
+                    yield os.path.join(root, name)
+
+    def _scan_disk_bytes(self) -> int:
+        total = 0
+        for path in self._iter_disk_files():
+            try:
+                total += os.path.getsize(path)
+            except OSError:
+                pass
+        return total
+
+    def _evict_disk(self):
+        """按最近访问时间删除最旧的文件，直到总大小降到上限的90%"""
+        entries = []
+        for path in self._iter_disk_files():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        target = self.disk_max_bytes * 0.9
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        with self._lock:
+            self._disk_bytes = total
+
+
+_tts_cache = None
+_tts_cache_lock = threading.Lock()
+
+
+def get_tts_cache(config: dict) -> Optional[TTSCache]:
+    """进程内共享的语音缓存，按第一次调用时的配置创建，未启用时返回None"""
+    global _tts_cache
+    if _tts_cache is None:
+        with _tts_cache_lock:
+            if _tts_cache is None:
+                _tts_cache = TTSCache(config.get("tts_cache") or {})
+    return _tts_cache if _tts_cache.enabled else None
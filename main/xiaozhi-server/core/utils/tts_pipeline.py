@@ -0,0 +1,166 @@
+"""
+有序并行合成
+
+非流式TTS每句话都要等整段音频合成完才能播放，原先逐句串行合成，第二句在第一句合成完之后才开始。
+合成耗时接近音频时长时，长回复的句子之间会出现明显的停顿。
+这里最多同时合成max_pending句，每句的输出先缓存在自己的槽位中，队首句子的输出直接进入播放队列，
+队首合成完成后依次转出后面已经合成好的句子，播放顺序与提交顺序严格一致。
+- 同一TTS提供者在进程内的并发请求数受max_concurrency限制
+- 打断或开始新一轮回复时取消未完成的句子，已在合成中的请求结束后丢弃输出
+"""
+
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+_provider_limits = {}
+_provider_limits_lock = threading.Lock()
+
+
+def provider_limiter(name: str, limit: int) -> Optional[threading.BoundedSemaphore]:
+    """同一TTS提供者在进程内共用的并发限制，limit<=0时不限制"""
+    if limit <= 0:
+        return None
+    with _provider_limits_lock:
+        limiter = _provider_limits.get(name)
+        if limiter is None:
+            limiter = _provider_limits[name] = threading.BoundedSemaphore(limit)
+        return limiter
+
+
+class _Slot:
+    """一句话的输出槽位"""
+
+    __slots__ = ("generation", "items", "done", "future")
+
+    def __init__(self, generation: int):
+        self.generation = generation
+        self.items = []
+        self.done = False
+        self.future = None
+
+
+class SentenceSink:
+    """单句的输出，接口与播放队列的put一致"""
+
+    def __init__(self, pipeline: "OrderedSynthesisPipeline", slot: _Slot):
+        self._pipeline = pipeline
+        self._slot = slot
+
+    def put(self, item):
+        self._pipeline._emit(self._slot, item)
+
+
+class OrderedSynthesisPipeline:
+    """单个连接的有序合成流水线，submit和put在TTS文本线程中调用，cancel可在任意线程调用"""
+
+    def __init__(self, output_queue, max_pending: int, limiter=None):
+        self.output = output_queue
+        self.max_pending = max(1, int(max_pending))
+        self.limiter = limiter
+        self.generation = 0
+        self._slots = deque()
+        self._cond = threading.Condition()
+        self._executor = None
+
+    def submit(self, task: Callable):
+        """提交一句话的合成任务，task(sink)把输出写入sink；同时合成的句子达到上限时等待"""
+        if self.max_pending <= 1:
+            # 不并行时在当前线程合成，与原来的逐句处理一致
+            self._call(task, self.output)
+            return
+        with self._cond:
+            generation = self.generation
+            while len(self._slots) >= self.max_pending and generation == self.generation:
+                self._cond.wait()
+            if generation != self.generation:
+                # 等待期间被打断
+                return
+            slot = _Slot(generation)
+            self._slots.append(slot)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_pending, thread_name_prefix="tts-synthesis"
+                )
+            slot.future = self._executor.submit(self._run, slot, task)
+
+    def put(self, item):
+        """按顺序追加一条不需要合成的输出（如会话结束标记）"""
+        with self._cond:
+            if not self._slots:
+                self.output.put(item)
+                return
+            slot = _Slot(self.generation)
+            slot.items.append(item)
+            slot.done = True
+            self._slots.append(slot)
+
+    def put_if_idle(self, item) -> bool:
+        """没有正在合成或等待播放的句子时直接输出，返回是否已输出"""
+        with self._cond:
+            if self._slots:
+                return False
+            self.output.put(item)
+            return True
+
+    def cancel(self):
+        """取消未完成的句子，已缓存的输出全部丢弃"""
+        with self._cond:
+            self.generation += 1
+            for slot in self._slots:
+                if slot.future is not None:
+                    slot.future.cancel()
+            self._slots.clear()
+            self._cond.notify_all()
+
+    def close(self):
+        self.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def _call(self, task: Callable, sink):
+        if self.limiter is None:
+            task(sink)
+            return
+        with self.limiter:
+            task(sink)
+
+    def _run(self, slot: _Slot, task: Callable):
+        try:
+            if slot.generation == self.generation:
+                self._call(task, SentenceSink(self, slot))
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"并行合成失败: {e}")
+        finally:
+            self._finish(slot)
+
+    def _emit(self, slot: _Slot, item):
+        with self._cond:
+            if slot.generation != self.generation:
+                return
+            if self._slots and self._slots[0] is slot:
+                self.output.put(item)
+            else:
+                slot.items.append(item)
+
+    def _finish(self, slot: _Slot):
+        with self._cond:
+            slot.done = True
+            if slot.generation != self.generation:
+                return
+            # 队首合成完成后，依次转出后面已缓存的输出
+            while self._slots and self._slots[0].done:
+                self._slots.popleft()
+                if self._slots:
+                    head = self._slots[0]
+                    for item in head.items:
+                        self.output.put(item)
+                    head.items.clear()
+            self._cond.notify_all()
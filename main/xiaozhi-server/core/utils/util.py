@@ -10,6 +10,7 @@ import numpy as np
 import opuslib_next
 from io import BytesIO
 from core.utils import p3
+from core.utils.audio_convert import wav_bytes_to_pcm
 from pydub import AudioSegment
 from typing import Callable, Any
 
@@ -248,23 +249,44 @@ def extract_json_from_string(input_string):
     return None
 
 
-def audio_to_data_stream(
-    audio_file_path, is_opus=True, callback: Callable[[Any], Any] = None
-) -> None:
+def _decode_with_ffmpeg(source, file_type) -> bytes:
+    # 读取音频，-nostdin 参数：不要从标准输入读取数据，否则FFmpeg会阻塞
+    audio = AudioSegment.from_file(source, format=file_type, parameters=["-nostdin"])
+    # 转换为单声道/16kHz采样率/16位小端编码（确保与编码器匹配）
+    audio = audio.set_channels(1).set_frame_rate(16000).set_sample_width(2)
+    return audio.raw_data
+
+
+def load_pcm_from_bytes(audio_bytes: bytes, file_type: str) -> bytes:
+    """音频数据转为单声道/16kHz/16位PCM，未压缩的WAV在进程内转换，其他格式用ffmpeg解码"""
+    if file_type == "wav":
+        try:
+            raw_data = wav_bytes_to_pcm(audio_bytes)
+        except ValueError:
+            # 头部异常的数据交给ffmpeg处理
+            raw_data = None
+        if raw_data is not None:
+            return raw_data
+    return _decode_with_ffmpeg(BytesIO(audio_bytes), file_type)
+
+
+def load_pcm_from_file(audio_file_path: str) -> bytes:
+    """音频文件转为单声道/16kHz/16位PCM"""
     # 获取文件后缀名
     file_type = os.path.splitext(audio_file_path)[1]
     if file_type:
-        file_type = file_type.lstrip(".")
-    # 读取音频文件，-nostdin 参数：不要从标准输入读取数据，否则FFmpeg会阻塞
-    audio = AudioSegment.from_file(
-        audio_file_path, format=file_type, parameters=["-nostdin"]
-    )
+        file_type = file_type.lstrip(".").lower()
+    if file_type == "wav":
+        with open(audio_file_path, "rb") as f:
+            return load_pcm_from_bytes(f.read(), file_type)
+    return _decode_with_ffmpeg(audio_file_path, file_type)
 
-    # 转换为单声道/16kHz采样率/16位小端编码（确保与编码器匹配）
-    audio = audio.set_channels(1).set_frame_rate(16000).set_sample_width(2)
 
-    # 获取原始PCM数据（16位小端）
-    raw_data = audio.raw_data
+def audio_to_data_stream(
+    audio_file_path, is_opus=True, callback: Callable[[Any], Any] = None
+) -> None:
+    # 获取原始PCM数据（单声道/16kHz采样率/16位小端）
+    raw_data = load_pcm_from_file(audio_file_path)
     pcm_to_data_stream(raw_data, is_opus, callback)
 
 
@@ -275,20 +297,8 @@ def audio_to_data(audio_file_path: str, is_opus: bool = True) -> list[bytes]:
         audio_file_path: 音频文件路径
         is_opus: 是否进行Opus编码
     """
-    # 获取文件后缀名
-    file_type = os.path.splitext(audio_file_path)[1]
-    if file_type:
-        file_type = file_type.lstrip(".")
-    # 读取音频文件，-nostdin 参数：不要从标准输入读取数据，否则FFmpeg会阻塞
-    audio = AudioSegment.from_file(
-        audio_file_path, format=file_type, parameters=["-nostdin"]
-    )
-
-    # 转换为单声道/16kHz采样率/16位小端编码（确保与编码器匹配）
-    audio = audio.set_channels(1).set_frame_rate(16000).set_sample_width(2)
-
-    # 获取原始PCM数据（16位小端）
-    raw_data = audio.raw_data
+    # 获取原始PCM数据（单声道/16kHz采样率/16位小端）
+    raw_data = load_pcm_from_file(audio_file_path)
 
     # 初始化Opus编码器
     encoder = opuslib_next.Encoder(16000, 1, opuslib_next.APPLICATION_AUDIO)
@@ -325,17 +335,13 @@ def audio_bytes_to_data_stream(
 ) -> None:
     """
     直接用音频二进制数据转为opus/pcm数据，支持wav、mp3、p3
+    wav在进程内转换，其他格式用pydub
     """
     if file_type == "p3":
         # 直接用p3解码
         return p3.decode_opus_from_bytes_stream(audio_bytes, callback)
     else:
-        # 其他格式用pydub
-        audio = AudioSegment.from_file(
-            BytesIO(audio_bytes), format=file_type, parameters=["-nostdin"]
-        )
-        audio = audio.set_channels(1).set_frame_rate(16000).set_sample_width(2)
-        raw_data = audio.raw_data
+        raw_data = load_pcm_from_bytes(audio_bytes, file_type)
         pcm_to_data_stream(raw_data, is_opus, callback)
 
 
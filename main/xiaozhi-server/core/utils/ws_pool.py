@@ -0,0 +1,247 @@
+"""
+TTS服务WebSocket连接池
+
+双向流式TTS原先每个设备连接各自建立一条到TTS服务的WebSocket，DNS、TCP、TLS和服务端的建连握手
+都落在设备连上后第一次回复的关键路径上，设备多时到TTS服务的连接数也随之增长。
+这里在进程内按(服务地址, 鉴权信息)共用一组已完成握手的连接，按会话ID分发下行消息：
+- 设备连接打开时在后台预热，保持min_idle条空闲连接，第一次回复直接使用
+- 每条连接同时承载的会话数不超过max_sessions_per_socket
+- 定期对空闲连接做ping检查，空闲超过idle_refresh_s或存活超过max_age_s的连接关闭重建
+- 连接断开时通知其上的会话，下次取用时自动重新建立
+所有方法都在事件循环线程中调用。
+"""
+
+import time
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import websockets
+
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+# 下行消息回调，连接断开时以None调用
+MessageHandler = Callable[[Optional[Any]], None]
+
+
+class PooledSocket:
+    """连接池中的一条连接"""
+
+    def __init__(self, pool: "WebSocketPool", ws):
+        self.pool = pool
+        self.ws = ws
+        self.handlers: Dict[str, MessageHandler] = {}
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.sessions_served = 0
+        self.closed = False
+        self.reader = asyncio.create_task(self._read())
+
+    @property
+    def idle(self) -> bool:
+        return not self.handlers
+
+    async def send(self, data):
+        await self.ws.send(data)
+
+    async def _read(self):
+        try:
+            async for message in self.ws:
+                try:
+                    session_id, item = self.pool.parse(message)
+                except Exception as e:
+                    logger.bind(tag=TAG).warning(f"{self.pool.name} 下行消息解析失败: {e}")
+                    continue
+                if session_id and session_id in self.handlers:
+                    handlers = [self.handlers[session_id]]
+                elif session_id:
+                    # 已释放的会话的残余消息
+                    continue
+                else:
+                    # 不带会话ID的消息（如错误信息）通知连接上的所有会话
+                    handlers = list(self.handlers.values())
+                for handler in handlers:
+                    try:
+                        handler(item)
+                    except Exception as e:
+                        logger.bind(tag=TAG).error(f"{self.pool.name} 处理下行消息失败: {e}")
+        except websockets.ConnectionClosed:
+            pass
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.bind(tag=TAG).warning(f"{self.pool.name} 连接读取异常: {e}")
+        finally:
+            self.pool._forget(self)
+
+    async def close(self):
+        self.pool._forget(self)
+        try:
+            await self.ws.close()
+        except Exception:
+            pass
+
+
+class WebSocketPool:
+    """按会话分发的WebSocket连接池"""
+
+    def __init__(
+        self,
+        name: str,
+        connect: Callable[[], Awaitable[Any]],
+        parse: Callable[[Any], Tuple[Optional[str], Any]],
+        options: Optional[dict] = None,
+    ):
+        """
+        Args:
+            connect: 建立连接并完成服务端握手，返回websocket连接
+            parse: 解析下行消息，返回(会话ID, 解析结果)，没有会话ID时返回None
+        """
+        options = options or {}
+        self.name = name
+        self.connect = connect
+        self.parse = parse
+        self.min_idle = int(options.get("min_idle", 1))
+        self.max_idle = max(self.min_idle, int(options.get("max_idle", 4)))
+        self.max_sessions_per_socket = max(
+            1, int(options.get("max_sessions_per_socket", 1))
+        )
+        self.idle_refresh_s = float(options.get("idle_refresh_s", 240))
+        self.max_age_s = float(options.get("max_age_s", 3600))
+        self.health_check_s = float(options.get("health_check_s", 20))
+        self.sockets = []
+        self._warm_task: Optional[asyncio.Task] = None
+        self._maintain_task: Optional[asyncio.Task] = None
+        # 统计
+        self.opened = 0
+        self.reused = 0
+
+    def _available(self) -> Optional[PooledSocket]:
+        """选择还能承载会话的连接，优先使用已有会话最多的，空闲连接留给后来的会话"""
+        candidates = [
+            sock
+            for sock in self.sockets
+            if not sock.closed and len(sock.handlers) < self.max_sessions_per_socket
+        ]
+        if not candidates:
+            return None
+        return max(candidates, key=lambda sock: len(sock.handlers))
+
+    async def acquire(self, session_id: str, handler: MessageHandler) -> PooledSocket:
+        """为会话取一条连接，下行消息按会话ID交给handler"""
+        self._start_maintenance()
+        sock = self._available()
+        if sock is None and self._warm_task is not None and not self._warm_task.done():
+            # 预热中的连接马上就能用，不再另外建立
+            try:
+                await asyncio.shield(self._warm_task)
+            except Exception:
+                pass
+            sock = self._available()
+        if sock is None:
+            sock = await self._open()
+        else:
+            self.reused += 1
+        sock.handlers[session_id] = handler
+        sock.last_used = time.monotonic()
+        sock.sessions_served += 1
+        self.warm()
+        return sock
+
+    def release(self, sock: PooledSocket, session_id: str):
+        """会话结束，连接放回池中"""
+        if sock.handlers.pop(session_id, None) is None:
+            return
+        sock.last_used = time.monotonic()
+        if sock.closed or not sock.idle:
+            return
+        idle = sum(1 for s in self.sockets if not s.closed and s.idle)
+        if idle > self.max_idle or time.monotonic() - sock.created_at > self.max_age_s:
+            asyncio.create_task(sock.close())
+
+    def discard(self, sock: PooledSocket):
+        """会话状态异常时丢弃连接，其他会话会收到断开通知"""
+        asyncio.create_task(sock.close())
+
+    def warm(self):
+        """在后台补足空闲连接"""
+        if self._warm_task is not None and not self._warm_task.done():
+            return
+        idle = sum(1 for s in self.sockets if not s.closed and s.idle)
+        if idle >= self.min_idle:
+            return
+        self._warm_task = asyncio.create_task(self._warm(self.min_idle - idle))
+
+    async def _warm(self, count: int):
+        for _ in range(count):
+            try:
+                await self._open()
+            except Exception as e:
+                logger.bind(tag=TAG).warning(f"{self.name} 预热连接失败: {e}")
+                return
+
+    async def _open(self) -> PooledSocket:
+        start = time.monotonic()
+        ws = await self.connect()
+        sock = PooledSocket(self, ws)
+        self.sockets.append(sock)
+        self.opened += 1
+        logger.bind(tag=TAG).debug(
+            f"{self.name} 新建连接，耗时 {time.monotonic() - start:.3f}s，"
+            f"当前连接数 {len(self.sockets)}"
+        )
+        return sock
+
+    def _forget(self, sock: PooledSocket):
+        if sock.closed:
+            return
+        sock.closed = True
+        if sock in self.sockets:
+            self.sockets.remove(sock)
+        if not sock.reader.done() and sock.reader is not asyncio.current_task():
+            sock.reader.cancel()
+        handlers, sock.handlers = list(sock.handlers.values()), {}
+        for handler in handlers:
+            try:
+                handler(None)
+            except Exception as e:
+                logger.bind(tag=TAG).error(f"{self.name} 通知连接断开失败: {e}")
+
+    def _start_maintenance(self):
+        if self._maintain_task is None or self._maintain_task.done():
+            self._maintain_task = asyncio.create_task(self._maintain())
+
+    async def _maintain(self):
+        while True:
+            await asyncio.sleep(self.health_check_s)
+            now = time.monotonic()
+            for sock in list(self.sockets):
+                if sock.closed or not sock.idle:
+                    continue
+                if (
+                    now - sock.last_used > self.idle_refresh_s
+                    or now - sock.created_at > self.max_age_s
+                ):
+                    # 服务端通常会断开长时间空闲的连接，提前关闭重建
+                    await sock.close()
+                    continue
+                try:
+                    pong = await sock.ws.ping()
+                    await asyncio.wait_for(pong, timeout=5)
+                except Exception:
+                    logger.bind(tag=TAG).info(f"{self.name} 空闲连接健康检查失败，重新建立")
+                    await sock.close()
+            self.warm()
+
+
+_pools: Dict[Any, WebSocketPool] = {}
+
+
+def get_ws_pool(key, factory: Callable[[], WebSocketPool]) -> WebSocketPool:
+    """进程内共用的连接池，key相同时返回同一个连接池"""
+    pool = _pools.get(key)
+    if pool is None:
+        pool = _pools[key] = factory()
+    return pool
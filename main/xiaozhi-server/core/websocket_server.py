@@ -7,26 +7,33 @@ from core.connection import ConnectionHandler
 from config.config_loader import get_config_from_api
 from core.auth import AuthManager, AuthenticationError
 from core.utils.modules_initialize import initialize_modules
+from core.utils.asr_worker_pool import ProcessPoolASRProvider
 from core.utils.util import check_vad_update, check_asr_update
 
 TAG = __name__
 
 
+def load_server_modules(logger, config: dict) -> dict:
+    """加载服务端共享的组件，多进程模式下由父进程在fork前调用一次"""
+    return initialize_modules(
+        logger,
+        config,
+        "VAD" in config["selected_module"],
+        "ASR" in config["selected_module"],
+        "LLM" in config["selected_module"],
+        False,
+        "Memory" in config["selected_module"],
+        "Intent" in config["selected_module"],
+    )
+
+
 class WebSocketServer:
-    def __init__(self, config: dict):
+    def __init__(self, config: dict, modules: dict = None):
         self.config = config
         self.logger = setup_logging()
         self.config_lock = asyncio.Lock()
-        modules = initialize_modules(
-            self.logger,
-            self.config,
-            "VAD" in self.config["selected_module"],
-            "ASR" in self.config["selected_module"],
-            "LLM" in self.config["selected_module"],
-            False,
-            "Memory" in self.config["selected_module"],
-            "Intent" in self.config["selected_module"],
-        )
+        if modules is None:
+            modules = load_server_modules(self.logger, self.config)
         self._vad = modules["vad"] if "vad" in modules else None
         self._asr = modules["asr"] if "asr" in modules else None
         self._llm = modules["llm"] if "llm" in modules else None
@@ -47,11 +54,26 @@ class WebSocketServer:
         server_config = self.config["server"]
         host = server_config.get("ip", "0.0.0.0")
         port = int(server_config.get("port", 8000))
+        # 多进程模式下各工作进程监听同一端口，由内核分配连接
+        reuse_port = int(server_config.get("workers", 1) or 1) > 1
 
-        async with websockets.serve(
-            self._handle_connection, host, port, process_request=self._http_response
-        ):
-            await asyncio.Future()
+        if isinstance(self._asr, ProcessPoolASRProvider):
+            # 独立ASR进程池在本进程中后台启动，加载模型期间不影响心跳上报
+            asyncio.create_task(asyncio.to_thread(self._asr.start))
+
+        try:
+            async with websockets.serve(
+                self._handle_connection,
+                host,
+                port,
+                process_request=self._http_response,
+                reuse_port=reuse_port,
+            ):
+                await asyncio.Future()
+        finally:
+            # 多进程模式下工作进程以os._exit退出，不会执行atexit，在这里释放ASR进程和共享内存
+            if isinstance(self._asr, ProcessPoolASRProvider):
+                self._asr.close()
 
     async def _handle_connection(self, websocket):
         headers = dict(websocket.request.headers)
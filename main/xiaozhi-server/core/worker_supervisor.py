@@ -0,0 +1,289 @@
+"""
+多进程工作模式
+
+父进程先加载VAD、ASR等模型，再fork出多个工作进程，模型权重以写时复制（copy-on-write）的方式共享，
+各工作进程通过SO_REUSEPORT监听同一端口，由内核分配连接。
+父进程只负责监控：收集心跳与统计信息、重启崩溃或失去响应的工作进程、转发退出信号。
+"""
+
+import os
+import gc
+import sys
+import json
+import time
+import errno
+import select
+import signal
+import asyncio
+from typing import Any, Callable, Dict, Optional
+
+from config.logger import setup_logging
+
+TAG = __name__
+
+# 工作进程心跳上报间隔（秒）
+HEARTBEAT_INTERVAL = 5
+
+
+class WorkerInfo:
+    """单个工作进程的状态"""
+
+    def __init__(self, worker_id: int):
+        self.worker_id = worker_id
+        self.pid: Optional[int] = None
+        self.read_fd: Optional[int] = None
+        self.buffer = b""
+        self.started_at = 0.0
+        self.last_heartbeat = 0.0
+        self.stats: Dict[str, Any] = {}
+        self.restarts = 0
+        self.next_start_at = 0.0
+        self.backoff = 1.0
+
+
+class WorkerSupervisor:
+    """工作进程监控器"""
+
+    def __init__(self, config: dict, worker_count: int):
+        self.config = config
+        self.logger = setup_logging()
+        self.worker_count = worker_count
+        worker_config = config["server"].get("worker", {}) or {}
+        self.heartbeat_timeout = float(worker_config.get("heartbeat_timeout", 30))
+        self.stats_interval = float(worker_config.get("stats_interval", 60))
+        self.workers = [WorkerInfo(i) for i in range(worker_count)]
+        self.stopping = False
+
+    def run(self, worker_main: Callable[[int, int], None]):
+        """启动并监控所有工作进程，直到收到退出信号
+
+        Args:
+            worker_main: 工作进程入口，参数为(worker_id, 心跳管道写端fd)，在子进程中执行，不会返回
+        """
+        # 冻结当前所有对象，避免子进程GC扫描时写入对象头导致共享页被复制
+        gc.collect()
+        gc.freeze()
+
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+
+        for worker in self.workers:
+            self._spawn(worker, worker_main)
+
+        last_stats_time = time.monotonic()
+        try:
+            while not self.stopping:
+                self._read_heartbeats(timeout=1.0)
+                self._reap_workers()
+                self._check_health()
+                self._respawn_dead(worker_main)
+
+                now = time.monotonic()
+                if now - last_stats_time >= self.stats_interval:
+                    last_stats_time = now
+                    self._log_stats()
+        finally:
+            self._shutdown()
+
+    def _spawn(self, worker: WorkerInfo, worker_main: Callable[[int, int], None]):
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            # 子进程：关闭本进程和其他工作进程管道的读端，只保留自己的写端
+            os.close(read_fd)
+            for sibling in self.workers:
+                self._close_pipe(sibling)
+            # 恢复默认信号处理，交给工作进程自己的事件循环处理
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            exit_code = 0
+            try:
+                worker_main(worker.worker_id, write_fd)
+            except BaseException as e:
+                print(f"工作进程{worker.worker_id}异常退出: {e}", file=sys.stderr)
+                exit_code = 1
+            finally:
+                os._exit(exit_code)
+
+        os.close(write_fd)
+        os.set_blocking(read_fd, False)
+        now = time.monotonic()
+        worker.pid = pid
+        worker.read_fd = read_fd
+        worker.buffer = b""
+        worker.started_at = now
+        worker.last_heartbeat = now
+        worker.stats = {}
+        self.logger.bind(tag=TAG).info(
+            f"工作进程{worker.worker_id}已启动，pid={pid}"
+        )
+
+    def _read_heartbeats(self, timeout: float):
+        fds = {w.read_fd: w for w in self.workers if w.read_fd is not None}
+        if not fds:
+            time.sleep(timeout)
+            return
+        try:
+            readable, _, _ = select.select(list(fds.keys()), [], [], timeout)
+        except InterruptedError:
+            return
+        for fd in readable:
+            worker = fds[fd]
+            try:
+                data = os.read(fd, 65536)
+            except BlockingIOError:
+                continue
+            except OSError:
+                data = b""
+            if not data:
+                # 写端关闭，进程已退出或即将退出，由_reap_workers处理
+                self._close_pipe(worker)
+                continue
+            worker.buffer += data
+            while b"\n" in worker.buffer:
+                line, worker.buffer = worker.buffer.split(b"\n", 1)
+                try:
+                    worker.stats = json.loads(line)
+                    worker.last_heartbeat = time.monotonic()
+                except ValueError:
+                    continue
+
+    def _reap_workers(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            for worker in self.workers:
+                if worker.pid != pid:
+                    continue
+                self._close_pipe(worker)
+                worker.pid = None
+                if self.stopping:
+                    break
+                uptime = time.monotonic() - worker.started_at
+                # 运行时间很短就退出，说明启动即失败，指数退避重启，避免疯狂fork
+                if uptime < 10:
+                    worker.backoff = min(worker.backoff * 2, 60)
+                else:
+                    worker.backoff = 1.0
+                worker.next_start_at = time.monotonic() + worker.backoff
+                self.logger.bind(tag=TAG).error(
+                    f"工作进程{worker.worker_id}(pid={pid})已退出，状态码{status}，"
+                    f"{worker.backoff:.0f}秒后重启"
+                )
+                break
+
+    def _check_health(self):
+        now = time.monotonic()
+        for worker in self.workers:
+            if worker.pid is None:
+                continue
+            if now - worker.last_heartbeat > self.heartbeat_timeout:
+                self.logger.bind(tag=TAG).error(
+                    f"工作进程{worker.worker_id}(pid={worker.pid})"
+                    f"{self.heartbeat_timeout:.0f}秒未上报心跳，强制结束"
+                )
+                self._kill(worker.pid, signal.SIGKILL)
+                # 防止在被回收前重复触发
+                worker.last_heartbeat = now
+
+    def _respawn_dead(self, worker_main: Callable[[int, int], None]):
+        now = time.monotonic()
+        for worker in self.workers:
+            if worker.pid is None and not self.stopping and now >= worker.next_start_at:
+                worker.restarts += 1
+                self._spawn(worker, worker_main)
+
+    def _log_stats(self):
+        total_connections = 0
+        details = []
+        for worker in self.workers:
+            connections = int(worker.stats.get("connections", 0))
+            total_connections += connections
+            rss_mb = worker.stats.get("rss_mb", 0)
+            details.append(
+                f"#{worker.worker_id}(pid={worker.pid},连接={connections},"
+                f"内存={rss_mb}MB,重启={worker.restarts})"
+            )
+        self.logger.bind(tag=TAG).info(
+            f"工作进程统计: 总连接数={total_connections} " + " ".join(details)
+        )
+
+    def _handle_stop(self, signum, frame):
+        self.stopping = True
+
+    def _shutdown(self):
+        self.stopping = True
+        alive = [w for w in self.workers if w.pid is not None]
+        for worker in alive:
+            self._kill(worker.pid, signal.SIGTERM)
+
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline and any(w.pid is not None for w in alive):
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                time.sleep(0.1)
+                continue
+            for worker in alive:
+                if worker.pid == pid:
+                    worker.pid = None
+
+        for worker in alive:
+            if worker.pid is not None:
+                self._kill(worker.pid, signal.SIGKILL)
+            self._close_pipe(worker)
+        self.logger.bind(tag=TAG).info("所有工作进程已退出")
+
+    @staticmethod
+    def _kill(pid: int, sig):
+        try:
+            os.kill(pid, sig)
+        except OSError as e:
+            if e.errno != errno.ESRCH:
+                raise
+
+    @staticmethod
+    def _close_pipe(worker: WorkerInfo):
+        if worker.read_fd is not None:
+            try:
+                os.close(worker.read_fd)
+            except OSError:
+                pass
+            worker.read_fd = None
+
+
+async def report_worker_stats(write_fd: int, ws_server, worker_id: int):
+    """工作进程内定期向父进程上报心跳和统计信息"""
+    import psutil
+
+    process = psutil.Process(os.getpid())
+    os.set_blocking(write_fd, False)
+    try:
+        while True:
+            stats = {
+                "worker_id": worker_id,
+                "pid": os.getpid(),
+                "connections": len(ws_server.active_connections),
+                "rss_mb": round(process.memory_info().rss / 1024 / 1024, 1),
+            }
+            try:
+                os.write(write_fd, (json.dumps(stats) + "\n").encode())
+            except BlockingIOError:
+                # 父进程读取不及时，丢弃本次心跳
+                pass
+            except BrokenPipeError:
+                # 父进程已退出，工作进程也没有继续运行的必要
+                os.kill(os.getpid(), signal.SIGTERM)
+                return
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+    finally:
+        try:
+            os.close(write_fd)
+        except OSError:
+            pass
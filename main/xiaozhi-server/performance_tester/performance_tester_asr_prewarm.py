@@ -0,0 +1,148 @@
+import time
+import json
+import asyncio
+import logging
+import statistics
+
+import websockets
+from tabulate import tabulate
+
+from core.utils.asr_prewarm import WarmConnection
+from core.providers.asr.doubao_stream import ASRProvider as DoubaoStreamASR
+
+# 设置全局日志级别为WARNING，抑制INFO级别日志
+logging.basicConfig(level=logging.WARNING)
+
+description = "流式ASR连接预热测试（本地模拟火山流式识别服务，对比说话后首帧音频的发送延迟）"
+
+MOCK_HOST = "127.0.0.1"
+MOCK_PORT = 18765
+# 模拟的网络和服务端耗时：建连（DNS、TCP、TLS）和初始化请求的响应
+HANDSHAKE_DELAY_S = 0.12
+INIT_DELAY_S = 0.08
+TEST_COUNT = 5
+# 预热连接的轮换周期，测试中缩短以覆盖轮换
+MAX_IDLE_S = 0.5
+
+
+class MockStreamingASRServer:
+    """模拟火山流式识别服务：握手和初始化请求带延迟，记录收到第一帧音频的时间"""
+
+    def __init__(self):
+        self.first_audio_at = {}
+        self.server = None
+
+    async def _process_request(self, connection, request):
+        await asyncio.sleep(HANDSHAKE_DELAY_S)
+        return None
+
+    async def _handler(self, ws):
+        try:
+            await ws.recv()  # 初始化请求
+            await asyncio.sleep(INIT_DELAY_S)
+            body = json.dumps({"result": {"text": ""}}).encode("utf-8")
+            await ws.send(
+                bytes([0x11, 0x90, 0x10, 0x00])
+                + (1).to_bytes(4, "big")
+                + len(body).to_bytes(4, "big")
+                + body
+            )
+            async for message in ws:
+                self.first_audio_at.setdefault(id(ws), time.monotonic())
+        except websockets.ConnectionClosed:
+            pass
+
+    async def start(self):
+        self.server = await websockets.serve(
+            self._handler, MOCK_HOST, MOCK_PORT, process_request=self._process_request
+        )
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+
+def create_provider():
+    provider = DoubaoStreamASR(
+        {"appid": "mock", "access_token": "mock", "cluster": "mock"}, True
+    )
+    provider.ws_url = f"ws://{MOCK_HOST}:{MOCK_PORT}"
+    return provider
+
+
+async def send_first_frame(provider, ws):
+    audio_request = bytearray(provider.generate_audio_default_header())
+    payload = b"\x00" * 32
+    audio_request.extend(len(payload).to_bytes(4, "big"))
+    audio_request.extend(payload)
+    await ws.send(audio_request)
+
+
+async def cold_start(provider) -> float:
+    """原流程：检测到说话后才建立连接"""
+    start = time.monotonic()
+    ws = await provider._connect_session()
+    await send_first_frame(provider, ws)
+    latency = time.monotonic() - start
+    await ws.close()
+    return latency
+
+
+async def warm_start(provider, speak_after_s: float):
+    """预热流程：播放结束时预热，speak_after_s秒后开始说话"""
+    warm = WarmConnection(
+        "doubao_stream", provider._connect_session, {"max_idle_s": MAX_IDLE_S}
+    )
+    warm.prewarm()
+    await asyncio.sleep(speak_after_s)
+    start = time.monotonic()
+    ws = await warm.take()
+    hit = ws is not None
+    if ws is None:
+        ws = await provider._connect_session()
+    await send_first_frame(provider, ws)
+    latency = time.monotonic() - start
+    await ws.close()
+    await warm.close()
+    return latency, hit
+
+
+async def main():
+    server = MockStreamingASRServer()
+    await server.start()
+    provider = create_provider()
+    rows = []
+    try:
+        cold = [await cold_start(provider) for _ in range(TEST_COUNT)]
+        rows.append(["说话后建立连接", f"{statistics.mean(cold) * 1000:.0f}", "-"])
+
+        # 说话时预热还未完成、预热连接空闲中、预热连接经过轮换
+        for label, speak_after in (
+            ("预热中开始说话", HANDSHAKE_DELAY_S / 2),
+            ("预热完成后说话", MAX_IDLE_S / 2),
+            ("轮换后说话", MAX_IDLE_S * 2.5),
+        ):
+            results = [
+                await warm_start(provider, speak_after) for _ in range(TEST_COUNT)
+            ]
+            latencies = [latency for latency, _ in results]
+            hits = sum(1 for _, hit in results if hit)
+            rows.append(
+                [label, f"{statistics.mean(latencies) * 1000:.0f}", f"{hits}/{TEST_COUNT}"]
+            )
+    finally:
+        await server.stop()
+
+    print(
+        f"\n模拟建连耗时 {HANDSHAKE_DELAY_S * 1000:.0f}ms，"
+        f"初始化响应耗时 {INIT_DELAY_S * 1000:.0f}ms"
+    )
+    print(
+        tabulate(
+            rows, headers=["场景", "首帧音频发送延迟(ms)", "预热命中"], tablefmt="github"
+        )
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
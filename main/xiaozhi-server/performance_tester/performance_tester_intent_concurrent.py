@@ -0,0 +1,152 @@
+import time
+import asyncio
+import logging
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor
+
+from tabulate import tabulate
+
+from core.utils.dialogue import Dialogue
+from core.utils.speculative import SpeculativeTurn
+from core.utils.memory_prefetch import MemoryPrefetcher
+
+# 设置全局日志级别为WARNING，抑制INFO级别日志
+logging.basicConfig(level=logging.WARNING)
+
+description = "意图识别并行测试（模拟intent_llm模式，对比意图识别与大模型对话先后/同时请求的首字延迟）"
+
+CONTINUE_CHAT = '{"function_call": {"name": "continue_chat"}}'
+GET_WEATHER = '{"function_call": {"name": "get_weather", "arguments": {}}}'
+
+# (场景, 意图识别耗时, 大模型首字耗时, 意图识别结果)
+SCENARIOS = [
+    ("闲聊-意图模型快", 0.4, 0.8, CONTINUE_CHAT),
+    ("闲聊-意图模型慢", 1.2, 0.8, CONTINUE_CHAT),
+    ("闲聊-同一模型", 0.8, 0.8, CONTINUE_CHAT),
+    ("查询天气", 0.8, 0.8, GET_WEATHER),
+]
+
+TOKENS = ["今天", "天气", "不错", "。"]
+
+
+class StubLLM:
+    """首字前等待固定时长，之后逐个返回文本，可取消"""
+
+    def __init__(self, first_token_s):
+        self.first_token_s = first_token_s
+        self.calls = 0
+
+    def response_cancellable(self, session_id, dialogue, cancel_event, functions=None):
+        self.calls += 1
+        if cancel_event.wait(self.first_token_s):
+            return
+        for token in TOKENS:
+            if cancel_event.is_set():
+                return
+            yield token
+            time.sleep(0.02)
+
+
+class StubIntent:
+    """意图识别在线程中请求，与intent_llm一致，不阻塞事件循环"""
+
+    def __init__(self, delay_s, result):
+        self.delay_s = delay_s
+        self.result = result
+
+    async def detect_intent(self, conn, dialogue_history, text):
+        await asyncio.to_thread(time.sleep, self.delay_s)
+        return self.result
+
+
+def make_conn(loop, executor, scenario):
+    _, intent_s, llm_s, result = scenario
+    conn = SimpleNamespace(
+        intent_type="intent_llm",
+        intent=StubIntent(intent_s, result),
+        llm=StubLLM(llm_s),
+        memory=None,
+        dialogue=Dialogue(),
+        session_id="",
+        config={},
+        loop=loop,
+        executor=executor,
+    )
+    conn.memory_prefetch = MemoryPrefetcher(conn)
+    return conn
+
+
+def first_token(responses):
+    for item in responses:
+        if item:
+            return time.monotonic()
+    return None
+
+
+async def sequential(conn, text):
+    """原流程：意图识别完成后再请求大模型"""
+    start = time.monotonic()
+    intent = await conn.intent.detect_intent(conn, conn.dialogue.dialogue, text)
+    intent_done = time.monotonic() - start
+    if intent != CONTINUE_CHAT:
+        return intent_done, None
+    turn = SpeculativeTurn(conn, text, prewarm_intent=False)
+    conn.executor.submit(turn.run)
+    first = await asyncio.to_thread(first_token, turn.responses())
+    return intent_done, first - start
+
+
+async def concurrent(conn, text):
+    """并行流程：意图识别的同时请求大模型，识别为继续聊天时使用其输出"""
+    start = time.monotonic()
+    turn = SpeculativeTurn(conn, text, prewarm_intent=False)
+    conn.executor.submit(turn.run)
+    intent = await conn.intent.detect_intent(conn, conn.dialogue.dialogue, text)
+    intent_done = time.monotonic() - start
+    if intent != CONTINUE_CHAT:
+        turn.cancel()
+        return intent_done, None
+    first = await asyncio.to_thread(first_token, turn.responses())
+    return intent_done, first - start
+
+
+async def main():
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=4)
+    rows = []
+    for scenario in SCENARIOS:
+        base_conn = make_conn(loop, executor, scenario)
+        base_intent, base_first = await sequential(base_conn, "今天天气怎么样")
+        conn = make_conn(loop, executor, scenario)
+        intent_done, first = await concurrent(conn, "今天天气怎么样")
+        rows.append(
+            [
+                scenario[0],
+                f"{base_intent * 1000:.0f}",
+                f"{intent_done * 1000:.0f}",
+                f"{base_first * 1000:.0f}" if base_first is not None else "-",
+                f"{first * 1000:.0f}" if first is not None else "-",
+                conn.llm.calls - base_conn.llm.calls,
+            ]
+        )
+    executor.shutdown(wait=True)
+
+    print()
+    print(
+        tabulate(
+            rows,
+            headers=[
+                "场景",
+                "原意图完成(ms)",
+                "并行意图完成(ms)",
+                "原首字(ms)",
+                "并行首字(ms)",
+                "多消耗的大模型调用",
+            ],
+            tablefmt="github",
+        )
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,186 @@
+import time
+import queue
+import asyncio
+import logging
+import threading
+from collections import deque
+from types import SimpleNamespace
+
+from tabulate import tabulate
+
+from core.utils.latency_filler import LatencyFiller, filler_library
+from core.utils.tts_pipeline import OrderedSynthesisPipeline
+from core.providers.tts.dto.dto import SentenceType
+
+# 设置全局日志级别为WARNING，抑制INFO级别日志
+logging.basicConfig(level=logging.WARNING)
+
+description = "等待过渡语测试（模拟大模型和工具耗时，对比说完话后设备的静默时长）"
+
+FRAME_S = 0.06
+# 过渡语约1秒，正式回复约3秒
+FILLER_FRAMES = 17
+ANSWER_FRAMES = 50
+# 模拟的非流式TTS合成耗时
+TTS_S = 0.3
+
+# (场景, 首轮大模型耗时, 调用的工具, 工具耗时, 第二轮大模型耗时)
+SCENARIOS = [
+    ("快速回答", 0.4, None, 0, 0),
+    ("大模型首字慢", 2.2, None, 0, 0),
+    ("查询天气", 0.6, "get_weather", 1.5, 0.6),
+    ("新闻详情", 0.6, "get_news_from_newsnow", 2.8, 0.8),
+    ("设备控制", 0.5, "hass_set_state", 0.3, 0.4),
+]
+
+OPTIONS = {
+    "enabled": True,
+    "llm_delay_ms": 1500,
+    "tool_delay_ms": 700,
+    "max_per_turn": 2,
+    "tool_categories": {
+        "get_weather": "query",
+        "get_news_from_newsnow": "query",
+        "hass_set_state": "device",
+    },
+}
+
+
+class StubTTS:
+    """只用于预合成过渡语，返回固定长度的假opus帧"""
+
+    voice = "stub"
+
+    def __init__(self):
+        self.tts_audio_queue = queue.Queue()
+        self.synthesis_pipeline = OrderedSynthesisPipeline(self.tts_audio_queue, 3)
+
+    def to_tts(self, text):
+        return [b"\x00" * 40] * FILLER_FRAMES
+
+
+class MockDevice:
+    """按帧时长依次播放音频队列中的条目，记录每段音频的起止时间"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.timeline = []
+        self.running = True
+
+    async def run(self):
+        tts = self.conn.tts
+        while self.running:
+            try:
+                sentence_type, frames, text = tts.tts_audio_queue.get_nowait()
+            except queue.Empty:
+                await asyncio.sleep(0.005)
+                continue
+            if not frames:
+                continue
+            # 播放期间发送节拍器中有待发送的帧
+            self.conn.paced_stream = SimpleNamespace(frames=deque([0]), sending=None)
+            start = time.monotonic()
+            await asyncio.sleep(len(frames) * FRAME_S)
+            self.conn.paced_stream.frames.clear()
+            self.timeline.append((start, time.monotonic(), text))
+
+
+def run_turn(conn, scenario, answer_ready):
+    """模拟connection.chat的调用顺序：请求大模型、调用工具、第二轮请求、合成正式回复"""
+    _, first_llm_s, tool, tool_s, second_llm_s = scenario
+    filler = conn.latency_filler
+    filler.start_turn()
+    filler.arm("think")
+    time.sleep(first_llm_s)
+    if tool is not None:
+        filler.arm(filler.tool_category([tool]))
+        time.sleep(tool_s)
+        filler.arm("think")
+        time.sleep(second_llm_s)
+    filler.disarm()
+
+    def synthesize(sink):
+        time.sleep(TTS_S)
+        sink.put((SentenceType.FIRST, [b"\x00" * 40] * ANSWER_FRAMES, "正式回复"))
+
+    conn.tts.synthesis_pipeline.submit(synthesize)
+    answer_ready.set()
+
+
+async def measure(scenario, enabled):
+    loop = asyncio.get_running_loop()
+    conn = SimpleNamespace(
+        config={"selected_module": {"TTS": "stub"}},
+        loop=loop,
+        client_abort=False,
+        func_handler=None,
+        tts=StubTTS(),
+    )
+    conn.latency_filler = LatencyFiller(conn, dict(OPTIONS, enabled=enabled))
+    phrases = [p for group in conn.latency_filler.phrases.values() for p in group]
+    filler_library.prepare(conn.tts, phrases)
+
+    device = MockDevice(conn)
+    device_task = loop.create_task(device.run())
+    answer_ready = threading.Event()
+    start = time.monotonic()
+    await asyncio.to_thread(run_turn, conn, scenario, answer_ready)
+    while not any(text == "正式回复" for _, _, text in device.timeline):
+        await asyncio.sleep(0.01)
+    device.running = False
+    await device_task
+    conn.tts.synthesis_pipeline.close()
+
+    # 从说完话到正式回复开始之间最长的一段静默
+    longest, cursor = 0.0, start
+    for seg_start, seg_end, text in device.timeline:
+        longest = max(longest, seg_start - cursor)
+        cursor = seg_end
+        if text == "正式回复":
+            answer_at = seg_start - start
+            break
+    first_audio = device.timeline[0][0] - start
+    fillers = sum(1 for _, _, text in device.timeline if text != "正式回复")
+    return first_audio, longest, answer_at, fillers
+
+
+async def main():
+    rows = []
+    for scenario in SCENARIOS:
+        base_first, base_gap, base_answer, _ = await measure(scenario, False)
+        first, gap, answer, fillers = await measure(scenario, True)
+        rows.append(
+            [
+                scenario[0],
+                f"{base_first * 1000:.0f}",
+                f"{first * 1000:.0f}",
+                f"{base_gap * 1000:.0f}",
+                f"{gap * 1000:.0f}",
+                f"{(answer - base_answer) * 1000:+.0f}",
+                fillers,
+            ]
+        )
+
+    print(
+        f"\n过渡语延迟: 大模型{OPTIONS['llm_delay_ms']}ms，工具{OPTIONS['tool_delay_ms']}ms；"
+        f"模拟TTS合成耗时{TTS_S * 1000:.0f}ms"
+    )
+    print(
+        tabulate(
+            rows,
+            headers=[
+                "场景",
+                "原首段音频(ms)",
+                "过渡语首段音频(ms)",
+                "原最长静默(ms)",
+                "过渡语最长静默(ms)",
+                "正式回复推迟(ms)",
+                "过渡语句数",
+            ],
+            tablefmt="github",
+        )
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,130 @@
+import time
+import asyncio
+import logging
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor
+
+from tabulate import tabulate
+
+from core.utils.memory_prefetch import MemoryPrefetcher
+
+# 设置全局日志级别为WARNING，抑制INFO级别日志
+logging.basicConfig(level=logging.WARNING)
+
+description = "记忆预取测试（模拟记忆查询和意图识别耗时，对比大模型请求前等待记忆的时间）"
+
+# 模拟的意图识别耗时（记忆查询与其同时进行）
+INTENT_S = 0.5
+
+# (场景, 记忆查询耗时, 最终结果前多久出现稳定的中间结果, 是否与上一轮文本相同)
+SCENARIOS = [
+    ("仅最终结果", 0.6, None, False),
+    ("中间结果预取", 0.6, 0.4, False),
+    ("查询较慢", 1.5, 0.4, False),
+    ("重复提问", 0.6, None, True),
+]
+
+
+class StubMemory:
+    """线程中查询的记忆，与mem0ai一致，不阻塞事件循环"""
+
+    query_dependent = True
+
+    def __init__(self, delay_s):
+        self.delay_s = delay_s
+        self.queries = 0
+
+    async def query_memory(self, query):
+        self.queries += 1
+        await asyncio.to_thread(time.sleep, self.delay_s)
+        return f"- 用户喜欢{query}"
+
+
+async def loop_stall(duration_s):
+    """测量期间事件循环的最大调度延迟，反映其他连接的音频是否被卡住"""
+    worst = 0.0
+    end = time.monotonic() + duration_s
+    while time.monotonic() < end:
+        start = time.monotonic()
+        await asyncio.sleep(0.01)
+        worst = max(worst, time.monotonic() - start - 0.01)
+    return worst
+
+
+async def turn(conn, text, partial_before_s, prefetch):
+    """一轮对话：(中间结果预取) -> 最终结果 -> 意图识别 -> 大模型线程等待记忆"""
+    if prefetch and partial_before_s is not None:
+        conn.memory_prefetch.prefetch(text)
+        await asyncio.sleep(partial_before_s)
+    final_at = time.monotonic()
+    if prefetch:
+        conn.memory_prefetch.prefetch(text)
+    await asyncio.sleep(INTENT_S)
+    waiting_from = time.monotonic()
+    if prefetch:
+        await asyncio.to_thread(conn.memory_prefetch.get, text)
+    else:
+        await asyncio.to_thread(
+            lambda: asyncio.run_coroutine_threadsafe(
+                conn.memory.query_memory(text), conn.loop
+            ).result()
+        )
+    done = time.monotonic()
+    return (done - waiting_from), (done - final_at)
+
+
+async def measure(scenario, prefetch):
+    _, memory_s, partial_before_s, repeated = scenario
+    loop = asyncio.get_running_loop()
+    conn = SimpleNamespace(
+        config={"memory_prefetch": {"enabled": True}},
+        memory=StubMemory(memory_s),
+        loop=loop,
+    )
+    conn.memory_prefetch = MemoryPrefetcher(conn)
+    if repeated:
+        await turn(conn, "今天天气怎么样", None, prefetch)
+    stall = asyncio.ensure_future(loop_stall(memory_s + INTENT_S + 0.5))
+    wait_s, total_s = await turn(conn, "今天天气怎么样", partial_before_s, prefetch)
+    return wait_s, total_s, await stall, conn.memory.queries
+
+
+async def main():
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=8))
+    rows = []
+    for scenario in SCENARIOS:
+        base_wait, base_total, base_stall, base_queries = await measure(scenario, False)
+        wait, total, stall, queries = await measure(scenario, True)
+        rows.append(
+            [
+                scenario[0],
+                f"{base_wait * 1000:.0f}",
+                f"{wait * 1000:.0f}",
+                f"{base_total * 1000:.0f}",
+                f"{total * 1000:.0f}",
+                f"{max(base_stall, stall) * 1000:.0f}",
+                f"{base_queries}/{queries}",
+            ]
+        )
+
+    print(f"\n意图识别耗时: {INTENT_S * 1000:.0f}ms")
+    print(
+        tabulate(
+            rows,
+            headers=[
+                "场景",
+                "原等待记忆(ms)",
+                "预取等待记忆(ms)",
+                "原最终结果到请求(ms)",
+                "预取最终结果到请求(ms)",
+                "事件循环最大延迟(ms)",
+                "查询次数(原/预取)",
+            ],
+            tablefmt="github",
+        )
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
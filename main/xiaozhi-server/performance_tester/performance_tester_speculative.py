@@ -0,0 +1,168 @@
+import time
+import asyncio
+import logging
+import threading
+from typing import List, Optional, Tuple
+
+from tabulate import tabulate
+from config.settings import load_config
+from core.utils.llm import create_instance as create_llm_instance
+from core.utils.speculative import normalize_text
+
+# 设置全局日志级别为WARNING，抑制INFO级别日志
+logging.basicConfig(level=logging.WARNING)
+
+description = "推测式对话测试（模拟流式ASR中间结果，对比提前请求大模型的首字延迟）"
+
+# 模拟流式ASR的识别过程：(相对时间ms, 中间结果, 该时刻之后是否出现停顿)，最后一项为最终结果
+SCENARIOS = [
+    (
+        "结果一致",
+        [(0, "今天", False), (400, "今天天气", False), (800, "今天天气怎么样", True)],
+        (1300, "今天天气怎么样？"),
+    ),
+    (
+        "停顿后继续说",
+        [(0, "帮我", False), (400, "帮我讲个故事", True), (1200, "帮我讲个故事吧关于小猫的", True)],
+        (1700, "帮我讲个故事吧，关于小猫的。"),
+    ),
+    (
+        "最终结果修正",
+        [(0, "播放", False), (400, "播放周杰伦", True)],
+        (900, "播放周杰伦的歌。"),
+    ),
+]
+
+
+class MockStreamingASR:
+    """按脚本回放中间结果和最终结果的流式ASR"""
+
+    def __init__(self, partials: List[Tuple[int, str, bool]], final: Tuple[int, str]):
+        self.partials = partials
+        self.final = final
+
+    async def events(self):
+        start = time.monotonic()
+        for at_ms, text, paused in self.partials:
+            await asyncio.sleep(max(0.0, start + at_ms / 1000 - time.monotonic()))
+            yield "partial", text, paused
+        at_ms, text = self.final
+        await asyncio.sleep(max(0.0, start + at_ms / 1000 - time.monotonic()))
+        yield "final", text, False
+
+
+class SpeculativeRun:
+    """在线程中执行可取消的大模型请求，记录首字时间"""
+
+    def __init__(self, llm, text: str):
+        self.text = text
+        self.key = normalize_text(text)
+        self.cancel_event = threading.Event()
+        self.first_token_at: Optional[float] = None
+        self.done = threading.Event()
+        dialogue = [
+            {"role": "system", "content": "你是小智，一个聪明可爱的AI助手，回答尽量简短。"},
+            {"role": "user", "content": text},
+        ]
+        self.thread = threading.Thread(
+            target=self._run, args=(llm, dialogue), daemon=True
+        )
+        self.thread.start()
+
+    def _run(self, llm, dialogue):
+        try:
+            for token in llm.response_cancellable("", dialogue, self.cancel_event):
+                if token and self.first_token_at is None:
+                    self.first_token_at = time.monotonic()
+        except Exception as e:
+            print(f"大模型请求失败: {e}")
+        finally:
+            self.done.set()
+
+    async def wait_first_token(self, timeout: float = 30) -> Optional[float]:
+        deadline = time.monotonic() + timeout
+        while self.first_token_at is None and not self.done.is_set():
+            if time.monotonic() > deadline:
+                return None
+            await asyncio.sleep(0.005)
+        return self.first_token_at
+
+
+class SpeculativeTurnTester:
+    def __init__(self):
+        self.config = load_config()
+        llm_name = self.config["selected_module"]["LLM"]
+        llm_config = self.config["LLM"][llm_name]
+        self.llm = create_llm_instance(llm_config.get("type", llm_name), llm_config)
+        self.llm_name = llm_name
+
+    async def _baseline(self, scenario) -> Optional[float]:
+        """原流程：收到最终结果后才请求大模型，返回首字延迟（秒）"""
+        _, partials, final = scenario
+        async for kind, text, _ in MockStreamingASR(partials, final).events():
+            if kind == "final":
+                final_at = time.monotonic()
+                run = SpeculativeRun(self.llm, text)
+                first = await run.wait_first_token()
+                return None if first is None else first - final_at
+        return None
+
+    async def _speculative(self, scenario):
+        """推测流程：停顿时用中间结果提前请求，返回(首字延迟, 是否命中, 作废的请求数)"""
+        _, partials, final = scenario
+        run = None
+        wasted = 0
+        async for kind, text, paused in MockStreamingASR(partials, final).events():
+            if kind == "partial":
+                if run is not None and run.key != normalize_text(text):
+                    run.cancel_event.set()
+                    wasted += 1
+                    run = None
+                if paused and run is None:
+                    run = SpeculativeRun(self.llm, text)
+                continue
+
+            final_at = time.monotonic()
+            hit = run is not None and run.key == normalize_text(text)
+            if not hit:
+                if run is not None:
+                    run.cancel_event.set()
+                    wasted += 1
+                run = SpeculativeRun(self.llm, text)
+            first = await run.wait_first_token()
+            latency = None if first is None else max(0.0, first - final_at)
+            return latency, hit, wasted
+        return None, False, wasted
+
+    async def run(self):
+        rows = []
+        for scenario in SCENARIOS:
+            baseline = await self._baseline(scenario)
+            latency, hit, wasted = await self._speculative(scenario)
+            rows.append(
+                [
+                    scenario[0],
+                    "命中" if hit else "未命中",
+                    wasted,
+                    f"{baseline * 1000:.0f}" if baseline is not None else "失败",
+                    f"{latency * 1000:.0f}" if latency is not None else "失败",
+                ]
+            )
+
+        print(f"\n大模型: {self.llm_name}")
+        print(
+            tabulate(
+                rows,
+                headers=["场景", "推测结果", "作废请求数", "原流程首字(ms)", "推测流程首字(ms)"],
+                tablefmt="github",
+            )
+        )
+
+
+async def main():
+    tester = SpeculativeTurnTester()
+    await tester.run()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,176 @@
+import os
+import time
+import logging
+from collections import deque
+from typing import Dict, List
+
+import numpy as np
+from pydub import AudioSegment
+from tabulate import tabulate
+from core.utils.vad import create_instance as create_vad_instance
+
+# 设置全局日志级别为WARNING，抑制INFO级别日志
+logging.basicConfig(level=logging.WARNING)
+
+description = "VAD一致性与性能测试（torch与onnx后端对比、能量预判准确率）"
+
+CHUNK_BYTES = 512 * 2
+CHUNK_MS = 32
+
+
+class ReplayConnection:
+    """离线回放用的最小连接状态"""
+
+    def __init__(self):
+        self.audio_format = "pcm"
+        self.client_voice_window = deque(maxlen=5)
+        self.last_is_voice = False
+        self.client_have_voice = False
+        self.client_voice_stop = False
+        self.last_activity_time = 0.0
+
+
+class VADParityTester:
+    def __init__(self):
+        self.base_config = {
+            "threshold": 0.5,
+            "threshold_low": 0.3,
+            "min_silence_duration_ms": 200,
+            "model_dir": "models/snakers4_silero-vad",
+        }
+        self.test_audio = self._load_test_audio()
+
+    def _load_test_audio(self) -> Dict[str, bytes]:
+        """加载config/assets下的音频，统一转换为16kHz单声道16bit PCM"""
+        wav_root = os.path.join(os.getcwd(), "config", "assets")
+        audio = {}
+        for root, _, files in os.walk(wav_root):
+            for file_name in sorted(files):
+                if not file_name.endswith(".wav"):
+                    continue
+                segment = AudioSegment.from_file(os.path.join(root, file_name))
+                segment = (
+                    segment.set_channels(1).set_frame_rate(16000).set_sample_width(2)
+                )
+                audio[os.path.relpath(os.path.join(root, file_name), wav_root)] = (
+                    segment.raw_data
+                )
+        return audio
+
+    def _replay(self, vad, pcm: bytes, use_gate: bool = False):
+        """逐帧回放，返回每帧的语音概率、是否有声以及断句位置
+
+        Args:
+            use_gate: 是否先经过能量预判，为False时每帧都调用模型
+        """
+        conn = ReplayConnection()
+        vad.reset_model_state(conn)
+
+        probs, voices, stops = [], [], []
+        start = time.perf_counter()
+        for i in range(0, len(pcm) - CHUNK_BYTES + 1, CHUNK_BYTES):
+            chunk = pcm[i : i + CHUNK_BYTES]
+            if use_gate:
+                prob = vad.chunk_probability(conn, chunk)
+            else:
+                prob = vad.speech_probability(conn, chunk)
+            now_ms = (i // CHUNK_BYTES) * CHUNK_MS
+            voices.append(vad.update_voice_state(conn, prob, now_ms=now_ms))
+            if conn.client_voice_stop:
+                stops.append(now_ms)
+                conn.client_voice_stop = False
+                conn.client_have_voice = False
+            probs.append(prob)
+        elapsed = time.perf_counter() - start
+        return np.array(probs), voices, stops, elapsed
+
+    def run(self):
+        torch_vad = create_vad_instance("silero", self.base_config)
+        onnx_vad = create_vad_instance("silero_onnx", self.base_config)
+
+        rows: List[list] = []
+        for name, pcm in self.test_audio.items():
+            t_probs, t_voices, t_stops, t_time = self._replay(torch_vad, pcm)
+            o_probs, o_voices, o_stops, o_time = self._replay(onnx_vad, pcm)
+            if len(t_probs) == 0:
+                continue
+            max_diff = float(np.max(np.abs(t_probs - o_probs)))
+            agree = sum(a == b for a, b in zip(t_voices, o_voices)) / len(t_voices)
+            rows.append(
+                [
+                    name,
+                    len(t_probs),
+                    f"{max_diff:.5f}",
+                    f"{agree * 100:.2f}%",
+                    "一致" if t_stops == o_stops else f"{t_stops} / {o_stops}",
+                    f"{t_time * 1000 / len(t_probs):.3f}",
+                    f"{o_time * 1000 / len(o_probs):.3f}",
+                ]
+            )
+
+        print(
+            tabulate(
+                rows,
+                headers=[
+                    "音频",
+                    "帧数",
+                    "最大概率差",
+                    "有声判断一致率",
+                    "断句位置(ms)",
+                    "torch每帧(ms)",
+                    "onnx每帧(ms)",
+                ],
+                tablefmt="github",
+            )
+        )
+
+
+    def run_pre_gate(self):
+        """对比能量预判前后的判断结果，评估预判的准确率和跳过的推理比例"""
+        for vad_type in ("silero", "silero_onnx"):
+            vad = create_vad_instance(vad_type, self.base_config)
+            rows: List[list] = []
+            for name, pcm in self.test_audio.items():
+                _, m_voices, m_stops, m_time = self._replay(vad, pcm)
+                if not m_voices:
+                    continue
+                vad.gated_chunks = vad.total_chunks = 0
+                _, g_voices, g_stops, g_time = self._replay(vad, pcm, use_gate=True)
+                agree = sum(a == b for a, b in zip(m_voices, g_voices)) / len(m_voices)
+                rows.append(
+                    [
+                        name,
+                        len(m_voices),
+                        f"{vad.gated_chunks * 100 / max(vad.total_chunks, 1):.1f}%",
+                        f"{agree * 100:.2f}%",
+                        "一致" if m_stops == g_stops else f"{m_stops} / {g_stops}",
+                        f"{m_time * 1000:.1f}",
+                        f"{g_time * 1000:.1f}",
+                    ]
+                )
+            print(f"\n{vad_type} 能量预判")
+            print(
+                tabulate(
+                    rows,
+                    headers=[
+                        "音频",
+                        "帧数",
+                        "跳过推理",
+                        "有声判断一致率",
+                        "断句位置(ms)",
+                        "纯模型耗时(ms)",
+                        "预判后耗时(ms)",
+                    ],
+                    tablefmt="github",
+                )
+            )
+
+
+def main():
+    tester = VADParityTester()
+    tester.run()
+    tester.run_pre_gate()
+
+
+if __name__ == "__main__":
+    main()
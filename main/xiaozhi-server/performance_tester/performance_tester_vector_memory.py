@@ -0,0 +1,126 @@
+import time
+import random
+import asyncio
+import logging
+import tempfile
+import statistics
+
+from tabulate import tabulate
+
+from core.providers.memory.mem_local_vector.embedding import HashingEmbedder
+from core.providers.memory.mem_local_vector.vector_store import VectorStore
+
+# 设置全局日志级别为WARNING，抑制INFO级别日志
+logging.basicConfig(level=logging.WARNING)
+
+description = "本地向量记忆测试（哈希向量，对比float32和int8索引的写入、检索耗时和检索结果一致率）"
+
+SIZES = [100, 1000, 10000]
+QUERIES = 200
+TOP_K = 5
+
+SUBJECTS = ["猫", "狗", "咖啡", "篮球", "钢琴", "川菜", "跑步", "围棋", "摄影", "旅行", "编程", "画画"]
+TEMPLATES = [
+    "用户喜欢{}",
+    "用户不喜欢{}",
+    "用户周末经常和朋友一起{}",
+    "用户的女儿正在学习{}",
+    "用户打算明年开始接触{}",
+]
+QUESTIONS = ["我喜欢什么", "周末干什么好", "给我女儿推荐点{}相关的书", "你还记得我对{}的看法吗"]
+
+
+def make_facts(count, rng):
+    return [
+        rng.choice(TEMPLATES).format(rng.choice(SUBJECTS)) + f"（第{i}条）"
+        for i in range(count)
+    ]
+
+
+def make_queries(rng):
+    return [rng.choice(QUESTIONS).format(rng.choice(SUBJECTS)) for _ in range(QUERIES)]
+
+
+def measure(size, quantize, facts, queries, embedder):
+    with tempfile.TemporaryDirectory() as path:
+        store = VectorStore(path, embedder, quantize)
+        start = time.perf_counter()
+        for i in range(0, len(facts), 100):
+            # 关闭去重，只测追加写入
+            store.add(facts[i : i + 100], "2025-01-01 00:00", dedup_score=2.0)
+        insert_s = time.perf_counter() - start
+
+        vectors = embedder.embed(queries)
+        latencies = []
+        results = []
+        for vector in vectors:
+            start = time.perf_counter()
+            found = store.search_vector(vector, TOP_K)
+            latencies.append(time.perf_counter() - start)
+            results.append([item["id"] for _, item in found])
+
+        # 删除一半后压缩
+        store.delete(list(range(0, size, 2)))
+        start = time.perf_counter()
+        store.compact()
+        compact_s = time.perf_counter() - start
+        return insert_s, latencies, results, compact_s
+
+
+async def main():
+    rng = random.Random(0)
+    embedder = HashingEmbedder()
+    queries = make_queries(rng)
+    start = time.perf_counter()
+    embedder.embed(queries)
+    embed_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+    rows = []
+    for size in SIZES:
+        facts = make_facts(size, rng)
+        f_insert, f_lat, f_results, f_compact = measure(
+            size, False, facts, queries, embedder
+        )
+        q_insert, q_lat, q_results, q_compact = measure(
+            size, True, facts, queries, embedder
+        )
+        agree = statistics.mean(
+            len(set(a) & set(b)) / max(1, len(a)) for a, b in zip(f_results, q_results)
+        )
+        for name, insert_s, lat, compact_s in (
+            ("float32", f_insert, f_lat, f_compact),
+            ("int8", q_insert, q_lat, q_compact),
+        ):
+            lat_ms = sorted(x * 1000 for x in lat)
+            rows.append(
+                [
+                    size,
+                    name,
+                    f"{size / insert_s:.0f}",
+                    f"{statistics.median(lat_ms):.3f}",
+                    f"{lat_ms[int(len(lat_ms) * 0.99) - 1]:.3f}",
+                    f"{compact_s * 1000:.1f}",
+                    f"{agree * 100:.1f}%" if name == "int8" else "-",
+                ]
+            )
+
+    print(f"\n哈希向量{embedder.dim}维，单条查询文本计算向量耗时{embed_ms:.3f}ms")
+    print(
+        tabulate(
+            rows,
+            headers=[
+                "记忆条数",
+                "存储",
+                "写入(条/秒)",
+                "检索中位数(ms)",
+                "检索P99(ms)",
+                "压缩一半(ms)",
+                f"与float32的top{TOP_K}一致率",
+            ],
+            tablefmt="github",
+        )
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -3,7 +3,13 @@ import requests
 import xml.etree.ElementTree as ET
 from bs4 import BeautifulSoup
 from config.logger import setup_logging
-from plugins_func.register import register_function, ToolType, ActionResponse, Action
+from plugins_func.register import (
+    register_function,
+    ToolType,
+    ActionResponse,
+    Action,
+    CachePolicy,
+)
 
 TAG = __name__
 logger = setup_logging()
@@ -139,10 +145,18 @@ def map_category(category_text):
     return category_map.get(normalized_category, category_text)
 
 
+def _detail_cache_key(conn, arguments):
+    """只缓存新闻详情，按上一条新闻的链接区分；新闻列表每次随机选择一条，不缓存"""
+    if str(arguments.get("detail", False)).lower() != "true":
+        return None
+    return (getattr(conn, "last_news_link", None) or {}).get("link") or None
+
+
 @register_function(
     "get_news_from_chinanews",
     GET_NEWS_FROM_CHINANEWS_FUNCTION_DESC,
     ToolType.SYSTEM_CTL,
+    cache=CachePolicy(ttl=3600, key_args=("lang",), key=_detail_cache_key),
 )
 def get_news_from_chinanews(
     conn, category: str = None, detail: bool = False, lang: str = "zh_CN"
@@ -160,6 +174,7 @@ def get_news_from_chinanews(
                     Action.REQLLM,
                     "抱歉，没有找到最近查询的新闻，请先获取一条新闻。",
                     None,
+                    cacheable=False,
                 )
 
             link = conn.last_news_link.get("link")
@@ -167,7 +182,10 @@ def get_news_from_chinanews(
 
             if link == "#":
                 return ActionResponse(
-                    Action.REQLLM, "抱歉，该新闻没有可用的链接获取详细内容。", None
+                    Action.REQLLM,
+                    "抱歉，该新闻没有可用的链接获取详细内容。",
+                    None,
+                    cacheable=False,
                 )
 
             logger.bind(tag=TAG).debug(f"获取新闻详情: {title}, URL={link}")
@@ -180,6 +198,7 @@ def get_news_from_chinanews(
                     Action.REQLLM,
                     f"抱歉，无法获取《{title}》的详细内容，可能是链接已失效或网站结构发生变化。",
                     None,
+                    cacheable=False,
                 )
 
             # 构建详情报告
@@ -217,7 +236,10 @@ def get_news_from_chinanews(
 
         if not news_items:
             return ActionResponse(
-                Action.REQLLM, "抱歉，未能获取到新闻信息，请稍后再试。", None
+                Action.REQLLM,
+                "抱歉，未能获取到新闻信息，请稍后再试。",
+                None,
+                cacheable=False,
             )
 
         # 随机选择一条新闻
@@ -247,5 +269,8 @@ def get_news_from_chinanews(
     except Exception as e:
         logger.bind(tag=TAG).error(f"获取新闻出错: {e}")
         return ActionResponse(
-            Action.REQLLM, "抱歉，获取新闻时发生错误，请稍后再试。", None
+            Action.REQLLM,
+            "抱歉，获取新闻时发生错误，请稍后再试。",
+            None,
+            cacheable=False,
         )
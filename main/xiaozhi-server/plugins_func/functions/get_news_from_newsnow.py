@@ -2,7 +2,13 @@ import random
 import requests
 import json
 from config.logger import setup_logging
-from plugins_func.register import register_function, ToolType, ActionResponse, Action
+from plugins_func.register import (
+    register_function,
+    ToolType,
+    ActionResponse,
+    Action,
+    CachePolicy,
+)
 from markitdown import MarkItDown
 
 TAG = __name__
@@ -167,10 +173,18 @@ def fetch_news_detail(url):
         return "无法获取详细内容"
 
 
+def _detail_cache_key(conn, arguments):
+    """只缓存新闻详情，按上一条新闻的链接区分；新闻列表每次随机选择一条，不缓存"""
+    if str(arguments.get("detail", False)).lower() != "true":
+        return None
+    return (getattr(conn, "last_newsnow_link", None) or {}).get("url") or None
+
+
 @register_function(
     "get_news_from_newsnow",
     GET_NEWS_FROM_NEWSNOW_FUNCTION_DESC,
     ToolType.SYSTEM_CTL,
+    cache=CachePolicy(ttl=3600, key_args=("lang",), key=_detail_cache_key),
 )
 def get_news_from_newsnow(
     conn, source: str = "澎湃新闻", detail: bool = False, lang: str = "zh_CN"
@@ -192,6 +206,7 @@ def get_news_from_newsnow(
                     Action.REQLLM,
                     "抱歉，没有找到最近查询的新闻，请先获取一条新闻。",
                     None,
+                    cacheable=False,
                 )
 
             url = conn.last_newsnow_link.get("url")
@@ -201,7 +216,10 @@ def get_news_from_newsnow(
 
             if not url or url == "#":
                 return ActionResponse(
-                    Action.REQLLM, "抱歉，该新闻没有可用的链接获取详细内容。", None
+                    Action.REQLLM,
+                    "抱歉，该新闻没有可用的链接获取详细内容。",
+                    None,
+                    cacheable=False,
                 )
 
             logger.bind(tag=TAG).debug(
@@ -216,6 +234,7 @@ def get_news_from_newsnow(
                     Action.REQLLM,
                     f"抱歉，无法获取《{title}》的详细内容，可能是链接已失效或网站结构发生变化。",
                     None,
+                    cacheable=False,
                 )
 
             # 构建详情报告
@@ -258,6 +277,7 @@ def get_news_from_newsnow(
                 Action.REQLLM,
                 f"抱歉，未能从{source}获取到新闻信息，请稍后再试或尝试其他新闻源。",
                 None,
+                cacheable=False,
             )
 
         # 随机选择一条新闻
@@ -286,5 +306,8 @@ def get_news_from_newsnow(
     except Exception as e:
         logger.bind(tag=TAG).error(f"获取新闻出错: {e}")
         return ActionResponse(
-            Action.REQLLM, "抱歉，获取新闻时发生错误，请稍后再试。", None
+            Action.REQLLM,
+            "抱歉，获取新闻时发生错误，请稍后再试。",
+            None,
+            cacheable=False,
         )
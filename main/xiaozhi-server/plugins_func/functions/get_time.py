@@ -1,6 +1,12 @@
 from datetime import datetime
 import cnlunar
-from plugins_func.register import register_function, ToolType, ActionResponse, Action
+from plugins_func.register import (
+    register_function,
+    ToolType,
+    ActionResponse,
+    Action,
+    CachePolicy,
+)
 
 get_lunar_function_desc = {
     "type": "function",
@@ -30,7 +36,19 @@ get_lunar_function_desc = {
 }
 
 
-@register_function("get_lunar", get_lunar_function_desc, ToolType.WAIT)
+@register_function(
+    "get_lunar",
+    get_lunar_function_desc,
+    ToolType.WAIT,
+    # 未指定日期时查询的是当天，按当天日期区分缓存
+    cache=CachePolicy(
+        ttl=3600,
+        key_args=("date", "query"),
+        key=lambda conn, args: (
+            "" if args.get("date") else f"{datetime.now():%Y-%m-%d}"
+        ),
+    ),
+)
 def get_lunar(date=None, query=None):
     """
     用于获取当前的阴历/农历，和天干地支、节气、生肖、星座、八字、宜忌等黄历信息
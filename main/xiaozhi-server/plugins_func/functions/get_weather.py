@@ -1,7 +1,13 @@
 import requests
 from bs4 import BeautifulSoup
 from config.logger import setup_logging
-from plugins_func.register import register_function, ToolType, ActionResponse, Action
+from plugins_func.register import (
+    register_function,
+    ToolType,
+    ActionResponse,
+    Action,
+    CachePolicy,
+)
 from core.utils.util import get_ip_info
 
 TAG = __name__
@@ -154,7 +160,20 @@ def parse_weather_info(soup):
     return city_name, current_abstract, current_basic, temps_list
 
 
-@register_function("get_weather", GET_WEATHER_FUNCTION_DESC, ToolType.SYSTEM_CTL)
+def _weather_cache_key(conn, arguments):
+    """未指定地点时按客户端IP所在城市查询，查不到时使用设备配置的默认地点，key中加上两者"""
+    if arguments.get("location"):
+        return ""
+    default_location = conn.config["plugins"]["get_weather"].get("default_location")
+    return f"ip:{conn.client_ip}:{default_location}"
+
+
+@register_function(
+    "get_weather",
+    GET_WEATHER_FUNCTION_DESC,
+    ToolType.SYSTEM_CTL,
+    cache=CachePolicy(ttl=1800, key_args=("location", "lang"), key=_weather_cache_key),
+)
 def get_weather(conn, location: str = None, lang: str = "zh_CN"):
     from core.utils.cache.manager import cache_manager, CacheType
 
@@ -197,11 +216,14 @@ def get_weather(conn, location: str = None, lang: str = "zh_CN"):
     city_info = fetch_city_info(location, api_key, api_host)
     if not city_info:
         return ActionResponse(
-            Action.REQLLM, f"未找到相关的城市: {location}，请确认地点是否正确", None
+            Action.REQLLM,
+            f"未找到相关的城市: {location}，请确认地点是否正确",
+            None,
+            cacheable=False,
         )
     soup = fetch_weather_page(city_info["fxLink"])
     if not soup:
-        return ActionResponse(Action.REQLLM, None, "请求失败")
+        return ActionResponse(Action.REQLLM, None, "请求失败", cacheable=False)
     city_name, current_abstract, current_basic, temps_list = parse_weather_info(soup)
 
     weather_report = f"您查询的位置是：{city_name}\n\n当前天气: {current_abstract}\n"
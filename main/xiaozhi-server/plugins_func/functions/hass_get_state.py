@@ -1,4 +1,10 @@
-from plugins_func.register import register_function, ToolType, ActionResponse, Action
+from plugins_func.register import (
+    register_function,
+    ToolType,
+    ActionResponse,
+    Action,
+    CachePolicy,
+)
 from plugins_func.functions.hass_init import initialize_hass_handler
 from config.logger import setup_logging
 import asyncio
@@ -26,7 +32,13 @@ hass_get_state_function_desc = {
 }
 
 
-@register_function("hass_get_state", hass_get_state_function_desc, ToolType.SYSTEM_CTL)
+@register_function(
+    "hass_get_state",
+    hass_get_state_function_desc,
+    ToolType.SYSTEM_CTL,
+    # 设备状态随时可能变化，只合并短时间内的重复查询
+    cache=CachePolicy(ttl=5, key_args=("entity_id",), scope="device"),
+)
 def hass_get_state(conn, entity_id=""):
     try:
         ha_response = handle_hass_get_state(conn, entity_id)
@@ -49,7 +49,12 @@ hass_set_state_function_desc = {
 }
 
 
-@register_function("hass_set_state", hass_set_state_function_desc, ToolType.SYSTEM_CTL)
+@register_function(
+    "hass_set_state",
+    hass_set_state_function_desc,
+    ToolType.SYSTEM_CTL,
+    invalidates=("hass_get_state",),
+)
 def hass_set_state(conn, entity_id="", state=None):
     if state is None:
         state = {}
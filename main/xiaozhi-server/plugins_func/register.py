@@ -35,18 +35,50 @@ class Action(Enum):
 
 
 class ActionResponse:
-    def __init__(self, action: Action, result=None, response=None):
+    def __init__(self, action: Action, result=None, response=None, cacheable=True):
         self.action = action  # 动作类型
         self.result = result  # 动作产生的结果
         self.response = response  # 直接回复的内容
+        # 请求失败等临时性结果设为False，不写入工具结果缓存
+        self.cacheable = cacheable
+
+
+class CachePolicy:
+    """
+    工具结果缓存声明，适用于只读、结果在一段时间内不变的工具
+    ttl: 缓存时间（秒）
+    key_args: 组成缓存key的参数名，None表示全部参数
+    scope: global 所有设备共用；device 按设备区分
+    key: 可选，key(conn, arguments)返回额外的key内容（如默认位置对应的IP），返回None时本次调用不缓存
+    """
+
+    def __init__(self, ttl, key_args=None, scope="global", key=None):
+        self.ttl = ttl
+        self.key_args = tuple(key_args) if key_args is not None else None
+        self.scope = scope
+        self.key = key
+
+    @classmethod
+    def from_config(cls, options):
+        """从配置生成缓存声明，ttl为0时返回None"""
+        if not options or not float(options.get("ttl", 0)):
+            return None
+        return cls(
+            ttl=float(options["ttl"]),
+            key_args=options.get("key_args"),
+            scope=options.get("scope", "global"),
+        )
 
 
 class FunctionItem:
-    def __init__(self, name, description, func, type):
+    def __init__(self, name, description, func, type, cache=None, invalidates=None):
         self.name = name
         self.description = description
         self.func = func
         self.type = type
+        self.cache = cache
+        # 调用后需要失效的其他工具的缓存结果（如设置状态后失效查询状态）
+        self.invalidates = tuple(invalidates or ())
 
 
 class DeviceTypeRegistry:
@@ -79,11 +111,17 @@ class DeviceTypeRegistry:
 all_function_registry = {}
 
 
-def register_function(name, desc, type=None):
-    """注册函数到函数注册字典的装饰器"""
+def register_function(name, desc, type=None, cache=None, invalidates=None):
+    """
+    注册函数到函数注册字典的装饰器
+    cache: CachePolicy，声明后相同参数的调用在ttl内直接返回缓存的结果
+    invalidates: 调用后需要失效缓存的工具名称列表
+    """
 
     def decorator(func):
-        all_function_registry[name] = FunctionItem(name, desc, func, type)
+        all_function_registry[name] = FunctionItem(
+            name, desc, func, type, cache, invalidates
+        )
         logger.bind(tag=TAG).debug(f"函数 '{name}' 已加载，可以注册使用")
         return func
 
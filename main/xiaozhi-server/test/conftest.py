@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 测试从xiaozhi-server目录导入core、config等模块
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
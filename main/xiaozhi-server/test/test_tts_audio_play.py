@@ -0,0 +1,124 @@
+import queue
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import core.providers.tts.base as tts_base
+from core.providers.tts.base import TTSProviderBase
+from core.providers.tts.dto.dto import SentenceType
+
+
+class StubTTS(TTSProviderBase):
+    async def text_to_speak(self, text, output_file):
+        return None
+
+
+def make_conn(loop):
+    return SimpleNamespace(
+        stop_event=threading.Event(),
+        client_abort=False,
+        loop=loop,
+        max_output_size=0,
+        headers={},
+    )
+
+
+def test_streaming_frames_after_first_are_enqueued(monkeypatch):
+    """首句之后的流式音频包逐个交给发送节拍器，上报时收集全部音频"""
+    loop = asyncio.new_event_loop()
+    loop_thread = threading.Thread(target=loop.run_forever, daemon=True)
+    loop_thread.start()
+
+    tts = StubTTS({}, delete_audio_file=True)
+    conn = make_conn(loop)
+    tts.conn = conn
+
+    sent, enqueued, reports = [], [], []
+
+    async def fake_send(conn, sentence_type, audios, text):
+        sent.append((sentence_type, audios, text))
+        # 与sendAudioMessage一致：首句音频发出后不再是首句
+        if isinstance(audios, bytes):
+            tts.tts_audio_first_sentence = False
+
+    monkeypatch.setattr(tts_base, "sendAudioMessage", fake_send)
+    monkeypatch.setattr(
+        tts_base, "enqueue_audio", lambda conn, packet: enqueued.append(packet)
+    )
+    monkeypatch.setattr(
+        tts_base,
+        "enqueue_tts_report",
+        lambda conn, text, audios: reports.append((text, list(audios))),
+    )
+
+    frames = [b"frame-1", b"frame-2", b"frame-3"]
+    tts.tts_audio_queue.put((SentenceType.FIRST, None, "你好"))
+    for frame in frames:
+        tts.tts_audio_queue.put((SentenceType.MIDDLE, frame, None))
+    tts.tts_audio_queue.put((SentenceType.LAST, [], None))
+
+    player = threading.Thread(target=tts._audio_play_priority_thread, daemon=True)
+    player.start()
+    waiter = threading.Event()
+    for _ in range(50):
+        if tts.tts_audio_queue.empty() and len(reports) == 1:
+            break
+        waiter.wait(0.05)
+    conn.stop_event.set()
+    player.join(timeout=2)
+    loop.call_soon_threadsafe(loop.stop)
+    loop_thread.join(timeout=2)
+
+    # 第一个音频包走sendAudioMessage，之后的包交给节拍器
+    assert [audios for _, audios, _ in sent if isinstance(audios, bytes)] == frames[:1]
+    assert enqueued == frames[1:]
+    assert reports == [("你好", frames)]
+
+
+def test_filler_is_not_counted_or_reported(monkeypatch):
+    """等待时的过渡语照常播放，但不计入输出字数，也不上报"""
+    loop = asyncio.new_event_loop()
+    loop_thread = threading.Thread(target=loop.run_forever, daemon=True)
+    loop_thread.start()
+
+    tts = StubTTS({}, delete_audio_file=True)
+    conn = make_conn(loop)
+    conn.max_output_size = 100
+    conn.headers = {"device-id": "device"}
+    tts.conn = conn
+
+    sent, counted, reports = [], [], []
+
+    async def fake_send(conn, sentence_type, audios, text):
+        sent.append((sentence_type, text))
+
+    monkeypatch.setattr(tts_base, "sendAudioMessage", fake_send)
+    async def fake_add_output(device_id, count):
+        counted.append(count)
+
+    monkeypatch.setattr(tts_base, "add_device_output", fake_add_output)
+    monkeypatch.setattr(
+        tts_base,
+        "enqueue_tts_report",
+        lambda conn, text, audios: reports.append((text, list(audios))),
+    )
+
+    tts.tts_audio_queue.put((SentenceType.FILLER, [b"filler"], "稍等"))
+    tts.tts_audio_queue.put((SentenceType.FIRST, [b"reply"], "晴天"))
+    tts.tts_audio_queue.put((SentenceType.LAST, [], None))
+
+    player = threading.Thread(target=tts._audio_play_priority_thread, daemon=True)
+    player.start()
+    waiter = threading.Event()
+    for _ in range(50):
+        if tts.tts_audio_queue.empty() and len(sent) == 3:
+            break
+        waiter.wait(0.05)
+    conn.stop_event.set()
+    player.join(timeout=2)
+    loop.call_soon_threadsafe(loop.stop)
+    loop_thread.join(timeout=2)
+
+    assert [text for _, text in sent] == ["稍等", "晴天", None]
+    assert counted == [len("晴天")]
+    assert [text for text, _ in reports] == ["晴天"]
@@ -0,0 +1,41 @@
+import threading
+from types import SimpleNamespace
+
+from core.providers.tts.base import TTSProviderBase
+
+
+class StubTTS(TTSProviderBase):
+    async def text_to_speak(self, text, output_file):
+        return None
+
+
+def make_tts():
+    tts = StubTTS({}, delete_audio_file=True)
+    tts.conn = SimpleNamespace(config={}, stop_event=threading.Event())
+    tts.synthesized = []
+    tts._synthesize_segment = tts.synthesized.append
+    tts._reset_segmenter()
+    tts.processed_chars = 0
+    tts.tts_text_buff = []
+    return tts
+
+
+def test_short_reply_waits_for_first_segment_deadline():
+    """首段字数不够时，等待时间按首段超时计算"""
+    tts = make_tts()
+    tts.tts_text_buff.append("好的")
+    assert tts._get_segment_text() is None
+    assert tts._segment_wait_timeout() < 1.0
+
+
+def test_no_busy_poll_after_remaining_text_flushed():
+    """LAST时剩余文本整体合成后，不再按首段超时短间隔轮询"""
+    tts = make_tts()
+    tts.tts_text_buff.append("好的")
+    tts._get_segment_text()
+    tts._process_remaining_text_stream()
+
+    assert tts.synthesized == ["好的"]
+    assert tts._segment_wait_timeout() == 1.0
+    assert tts._get_deadline_segment() is None
+    assert tts.first_text_time is None